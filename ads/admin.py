@@ -187,7 +187,8 @@ class AdAdmin(admin.ModelAdmin):
         ('Quantity & Pricing (Step 7)', {
             'fields': (
                 'available_quantity', 'unit_of_measurement', 'minimum_order_quantity',
-                'starting_bid_price', 'currency', 'auction_duration', 'reserve_price'
+                'starting_bid_price', 'currency', 'auction_duration', 'reserve_price',
+                'bid_increment_table'
             )
         }),
         ('System Fields', {
@@ -1,13 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AdsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ads'
-    
-    # def ready(self):
-    #     # Import and connect model trackers
-    #     import ads.model_trackers
-    #     ads.model_trackers.connect_field_tracker()
 
-   
+    def ready(self):
+        from ads.search import restore_search_triggers
+        post_migrate.connect(restore_search_triggers, sender=self)
@@ -3,5 +3,6 @@ Ads services package
 """
 
 from .auction_completion import AuctionCompletionService
+from .auction_scheduler import AuctionScheduler
 
-__all__ = ['AuctionCompletionService']
+__all__ = ['AuctionCompletionService', 'AuctionScheduler']
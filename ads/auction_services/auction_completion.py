@@ -12,15 +12,18 @@ It provides methods for:
 
 import logging
 from datetime import timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from django.utils import timezone
 from django.db import transaction
 from django.db.models import Q
+from django.db.models.functions import Mod
 from ads.models import Ad
 from bids.models import Bid
+from bids.repository import BidRepository
 from notifications.models import Notification
 from notifications.templates import AuctionNotificationTemplates, SellerNotificationTemplates, get_auction_notification_metadata, get_seller_notification_metadata
 from base.services.logging import LoggingService
+from base.utils.response_cache import bump_versions
 
 logger = logging.getLogger(__name__)
 logging_service = LoggingService()
@@ -40,17 +43,9 @@ class AuctionCompletionService:
             List of Ad objects that are expired and ready to close
         """
         try:
-            # Calculate cutoff time with grace period
-            cutoff_time = timezone.now() - timedelta(minutes=grace_period_minutes)
-            
-            # Find active auctions that have passed their end date
-            expired_auctions = Ad.objects.filter(
-                is_active=True,
-                is_complete=True,  # Only complete ads can have active auctions
-                auction_end_date__isnull=False,
-                auction_end_date__lte=cutoff_time,
-                status='active'  # Not suspended
-            ).select_related('user', 'category', 'subcategory', 'location')
+            expired_auctions = self._expired_auctions_queryset(grace_period_minutes).select_related(
+                'user', 'category', 'subcategory', 'location'
+            )
             
             return list(expired_auctions)
             
@@ -58,6 +53,97 @@ class AuctionCompletionService:
             logging_service.log_error(e)
             logger.error(f"Error finding expired auctions: {str(e)}")
             return []
+
+    def claim_expired_auctions(
+        self,
+        grace_period_minutes: int = 5,
+        batch_size: int = 10,
+        shard: Optional[Tuple[int, int]] = None,
+        exclude_ids: Iterable[int] = ()
+    ) -> List[Ad]:
+        """
+        Lock a batch of expired auctions that no other worker is claiming
+
+        Must be called inside transaction.atomic(). Rows are locked with
+        SELECT ... FOR UPDATE SKIP LOCKED until the transaction ends, so
+        concurrent workers each get a disjoint batch. Keep that transaction to
+        the claim itself and close each auction with close_expired_auction(),
+        which locks it again in a transaction of its own; a failure then only
+        rolls back the auction it happened in.
+
+        Args:
+            grace_period_minutes: Grace period in minutes after auction end time
+            batch_size: Maximum number of auctions to claim
+            shard: Optional (index, count); only ids where id % count == index are claimed
+            exclude_ids: Auctions already attempted by this run
+
+        Returns:
+            List of locked Ad objects
+        """
+        queryset = self._expired_auctions_queryset(grace_period_minutes)
+        if shard:
+            index, count = shard
+            queryset = queryset.annotate(shard_key=Mod('id', count)).filter(shard_key=index)
+        if exclude_ids:
+            queryset = queryset.exclude(id__in=list(exclude_ids))
+
+        return list(
+            queryset.select_for_update(skip_locked=True, of=('self',))
+            .select_related('user', 'category', 'subcategory', 'location')
+            .order_by('auction_end_date', 'id')[:batch_size]
+        )
+
+    def claim_auction(self, auction_id: int) -> Optional[Ad]:
+        """
+        Lock a single auction if it is past its end date and still open
+
+        Must be called inside transaction.atomic(). Returns None when the
+        auction is already closed, was extended, or another worker holds it.
+        """
+        return (
+            self._expired_auctions_queryset(0)
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('user', 'category', 'subcategory', 'location')
+            .filter(id=auction_id)
+            .first()
+        )
+
+    def close_expired_auction(self, auction_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Lock and close one expired auction in its own transaction
+
+        Stripe captures and cancels made while closing use idempotency keys
+        per payment intent, so if this transaction rolls back after Stripe
+        acted, the next attempt replays the stored result instead of charging
+        or canceling again.
+
+        Returns:
+            The closure result, or None if the auction was extended, already
+            closed, or is being closed by another worker
+        """
+        try:
+            with transaction.atomic():
+                auction = self.claim_auction(auction_id)
+                if auction is None:
+                    return None
+                return self.close_auction_with_notifications(auction)
+        except Exception as e:
+            logging_service.log_error(e)
+            logger.error(f"Failed to close auction {auction_id}: {str(e)}")
+            return {'success': False, 'auction_id': auction_id, 'message': str(e)}
+
+    def _expired_auctions_queryset(self, grace_period_minutes: int):
+        """Active, complete auctions whose end date is past the grace period"""
+        # Calculate cutoff time with grace period
+        cutoff_time = timezone.now() - timedelta(minutes=grace_period_minutes)
+
+        # Ad.is_active() is a method over status, not a column
+        return Ad.objects.filter(
+            is_complete=True,  # Only complete ads can have active auctions
+            auction_end_date__isnull=False,
+            auction_end_date__lte=cutoff_time,
+            status='active'  # Not suspended
+        )
     
     def close_auction_with_notifications(self, auction: Ad) -> Dict[str, Any]:
         """
@@ -230,12 +316,15 @@ class AuctionCompletionService:
                 
                 # Mark all bids as lost
                 all_bids.update(status='lost')
+                bump_versions('bids.Bid')
 
                 # Update auction status
                 auction.is_active = False
                 auction.status = 'completed'
                 auction.save()
 
+                BidRepository().refresh_bid_summary(auction.id)
+
             return True
         except Exception as e:
             logging_service.log_error(e)
@@ -291,6 +380,8 @@ class AuctionCompletionService:
                 auction.status = 'completed'
                 auction.save()
 
+                BidRepository().refresh_bid_summary(auction.id)
+
             return True
         except Exception as e:
             logging_service.log_error(e)
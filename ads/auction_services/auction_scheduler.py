@@ -0,0 +1,148 @@
+"""
+Auction Scheduler
+
+Keeps the end dates of open auctions in a min-heap so each auction can be
+closed as soon as its deadline passes, instead of waiting for the next
+close_expired_auctions cron run. The heap is refreshed incrementally by
+polling ads whose updated_at moved (Ad.save() bumps it whenever the end
+date or status changes); superseded heap entries are skipped lazily.
+"""
+
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from ads.listing import delist_ended_ads
+from ads.models import Ad
+from .auction_completion import AuctionCompletionService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SchedulerMetrics:
+    """Close lag (time between auction_end_date and closing) for recent auctions"""
+    closed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    max_lag: float = 0.0
+    recent_lags: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, lag_seconds: float, success: bool):
+        self.closed += 1
+        if not success:
+            self.failed += 1
+        self.max_lag = max(self.max_lag, lag_seconds)
+        self.recent_lags.append(lag_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lags = sorted(self.recent_lags)
+        p95 = lags[max(0, -(-95 * len(lags) // 100) - 1)] if lags else 0.0
+        return {
+            'closed': self.closed,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'mean_lag': sum(lags) / len(lags) if lags else 0.0,
+            'p95_lag': p95,
+            'max_lag': self.max_lag,
+        }
+
+
+class AuctionScheduler:
+    """In-process deadline queue for closing auctions on time"""
+
+    # Re-read rows updated slightly before the watermark so transactions that
+    # committed late are not missed
+    POLL_OVERLAP = timedelta(seconds=30)
+
+    def __init__(self, service: Optional[AuctionCompletionService] = None):
+        self.service = service or AuctionCompletionService()
+        self.metrics = SchedulerMetrics()
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._watermark: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def load(self):
+        """Rebuild the heap from every open auction"""
+        started_at = timezone.now()
+        rows = Ad.objects.filter(
+            status='active',
+            is_complete=True,
+            auction_end_date__isnull=False
+        ).values_list('id', 'auction_end_date')
+
+        self._deadlines = dict(rows)
+        self._heap = [(end_date, ad_id) for ad_id, end_date in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._watermark = started_at
+
+    def refresh(self) -> int:
+        """Apply ads changed since the last poll; returns the number of rows seen"""
+        if self._watermark is None:
+            self.load()
+            return len(self._deadlines)
+
+        started_at = timezone.now()
+        rows = Ad.objects.filter(
+            updated_at__gte=self._watermark - self.POLL_OVERLAP
+        ).values_list('id', 'status', 'is_complete', 'auction_end_date')
+
+        seen = 0
+        for ad_id, status, is_complete, end_date in rows:
+            seen += 1
+            if status == 'active' and is_complete and end_date:
+                if self._deadlines.get(ad_id) != end_date:
+                    self._deadlines[ad_id] = end_date
+                    heapq.heappush(self._heap, (end_date, ad_id))
+            else:
+                self._deadlines.pop(ad_id, None)
+
+        self._watermark = started_at
+        return seen
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Earliest pending end date, discarding superseded heap entries"""
+        while self._heap:
+            end_date, ad_id = self._heap[0]
+            if self._deadlines.get(ad_id) == end_date:
+                return end_date
+            heapq.heappop(self._heap)
+        return None
+
+    def close_due(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Close every auction whose deadline has passed"""
+        now = now or timezone.now()
+        results = []
+        end_date = self.next_deadline()
+        if end_date is not None and end_date <= now:
+            # Take ended auctions off the marketplace before the slower closing work
+            delist_ended_ads(now)
+        while True:
+            end_date = self.next_deadline()
+            if end_date is None or end_date > now:
+                return results
+
+            _, ad_id = heapq.heappop(self._heap)
+            del self._deadlines[ad_id]
+
+            result = self._close(ad_id)
+            if result is None:
+                self.metrics.skipped += 1
+                continue
+
+            lag = (timezone.now() - end_date).total_seconds()
+            result['lag'] = lag
+            self.metrics.record(lag, result['success'])
+            results.append(result)
+
+    def _close(self, ad_id: int) -> Optional[Dict[str, Any]]:
+        """Lock and close one auction; None if it was extended, closed or claimed elsewhere"""
+        return self.service.close_expired_auction(ad_id)
@@ -0,0 +1,116 @@
+"""
+Facet counts for the marketplace ad list.
+
+All facets are counted from one grouped query. Ads that pass the non-facet
+filters (completeness, expiry, city, search) are grouped by their facet
+values, and each group row carries one boolean per facet filter that says
+whether the group passes it. A facet's counts then add up the groups that
+pass every other facet's filter. Selecting "PET" therefore still shows how
+many HDPE ads there are, and picking several options ORs them, as it does
+on the list itself.
+
+Results are cached for a short time per normalized filter signature and
+the response-cache versions of the models the counts read. Any write that
+expires the ad list therefore expires the facets too: a save or delete
+through its signal, and a bulk write through bump_versions().
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, ExpressionWrapper, Value, When
+
+from base.utils.response_cache import model_versions
+from .models import Ad
+from .search import search_filter
+from .utils import build_ad_list_filters, normalize_ad_list_params
+
+FACETS_CACHE_TIMEOUT = 60
+# Models the counts are built from (seller_type reads the company sector)
+FACETS_MODELS = ('ads.Ad', 'company.Company', 'category.Category', 'category.SubCategory')
+
+# Facet name -> grouped column
+FACET_COLUMNS = {
+    'category': 'category_id',
+    'subcategory': 'subcategory_id',
+    'origin': 'origin',
+    'contamination': 'contamination',
+    'country': 'location__country',
+    'seller_type': 'seller_type',
+}
+
+
+def ad_facets_key(params):
+    signature = json.dumps([params, model_versions(FACETS_MODELS)], sort_keys=True)
+    return f'ad_facets:{hashlib.sha1(signature.encode()).hexdigest()}'
+
+
+def get_ad_facets(query_params):
+    """Facet counts for AdListView query parameters, cached per normalized filter set"""
+    params = normalize_ad_list_params(query_params)
+    key = ad_facets_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_ad_facets(params)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def compute_ad_facets(params):
+    base, facet_filters = build_ad_list_filters(params)
+    if params['search']:
+        base &= search_filter(params['search'])
+    matches = {
+        f'matches_{name}': ExpressionWrapper(condition, output_field=BooleanField())
+        for name, condition in facet_filters.items()
+    }
+    rows = (
+        Ad.objects.filter(base)
+        .annotate(
+            seller_type=Case(
+                When(user__company__sector='broker', then=Value('broker')),
+                default=Value('non_broker'),
+            ),
+            **matches,
+        )
+        .values(*FACET_COLUMNS.values(), 'category__name', 'subcategory__name', *matches)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    counts = {name: {} for name in FACET_COLUMNS}
+    labels = {'category': {}, 'subcategory': {}}
+    total = 0
+    for row in rows:
+        failed = [name for name in facet_filters if not row[f'matches_{name}']]
+        if not failed:
+            total += row['count']
+        for name, column in FACET_COLUMNS.items():
+            # A facet ignores its own filter and needs every other one to pass
+            if any(other != name for other in failed) or row[column] in (None, ''):
+                continue
+            counts[name][row[column]] = counts[name].get(row[column], 0) + row['count']
+        labels['category'][row['category_id']] = row['category__name']
+        labels['subcategory'][row['subcategory_id']] = row['subcategory__name']
+
+    return {
+        'total': total,
+        'facets': {
+            name: [
+                {'value': value, 'label': _label(name, value, labels), 'count': count}
+                for value, count in sorted(values.items(), key=lambda item: (-item[1], str(item[0])))
+            ]
+            for name, values in counts.items()
+        },
+    }
+
+
+def _label(name, value, labels):
+    if name in labels:
+        return labels[name].get(value)
+    if name in ('origin', 'contamination'):
+        return dict(Ad._meta.get_field(name).choices or []).get(value, value)
+    if name == 'seller_type':
+        return 'Broker' if value == 'broker' else 'Non-broker'
+    return value
@@ -0,0 +1,76 @@
+"""
+Marketplace visibility.
+
+An ad is listed when it is complete and active, its seller's company is
+payment ready, and its auction has not ended. Ad.is_listed stores that, so
+marketplace queries read one column through the partial index on
+(is_listed, -created_at) instead of joining users and companies on every
+request. The flag is kept current by:
+
+- Ad.save(), from the ad's own fields and its company, when one of
+  LISTING_SOURCE_FIELDS changed;
+- Company.save(), when payment_ready flips (refresh_listed_ads);
+- the auction scheduler and close_expired_auctions, once auction_end_date
+  passes (delist_ended_ads).
+
+List queries still check auction_end_date on the indexed rows, so an
+auction stops showing the moment it ends even between scheduler ticks.
+"""
+
+from typing import Optional
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+# Ad fields compute_is_listed() reads; Ad.save() skips it when none changed
+LISTING_SOURCE_FIELDS = ('is_complete', 'status', 'auction_end_date', 'user')
+
+
+def not_ended_filter(now=None) -> Q:
+    """Auctions without an end date or ending after now"""
+    return Q(auction_end_date__isnull=True) | Q(auction_end_date__gt=now or timezone.now())
+
+
+def listed_filter(now=None) -> Q:
+    """The marketplace visibility rule, spelled out over the source columns"""
+    return Q(is_complete=True, status='active', user__company__payment_ready=True) & not_ended_filter(now)
+
+
+def compute_is_listed(ad, now=None) -> bool:
+    """Whether ad should be listed; reads the company only when everything else qualifies"""
+    now = now or timezone.now()
+    if not (ad.is_complete and ad.status == 'active'):
+        return False
+    if ad.auction_end_date and ad.auction_end_date <= now:
+        return False
+    company = ad.user.company if ad.user_id else None
+    return bool(company and company.payment_ready)
+
+
+def refresh_listed_ads(queryset: QuerySet, now=None) -> int:
+    """Recompute is_listed for every ad in queryset; returns the number of rows changed"""
+    listed = listed_filter(now)
+    changed = queryset.filter(listed, is_listed=False).update(is_listed=True)
+    changed += queryset.filter(is_listed=True).exclude(listed).update(is_listed=False)
+    if changed:
+        _invalidate_listings()
+    return changed
+
+
+def delist_ended_ads(now=None) -> int:
+    """Clear is_listed on ads whose auction has ended; returns the number delisted"""
+    from .models import Ad
+
+    changed = Ad.objects.filter(
+        is_listed=True, auction_end_date__lte=now or timezone.now()
+    ).update(is_listed=False)
+    if changed:
+        _invalidate_listings()
+    return changed
+
+
+def _invalidate_listings():
+    """Bulk updates skip post_save, so expire the cached lists and facets here"""
+    from base.utils.response_cache import bump_versions
+
+    bump_versions('ads.Ad')
@@ -0,0 +1,121 @@
+"""
+Django management command to benchmark rendering the marketplace ad list.
+
+Inserts synthetic ads (20,000 by default) with categories, locations and bid
+summaries inside a transaction, then times one page of AdListSerializer
+output two ways, fetch and render timed separately, and rolls everything
+back:
+
+- models: select_related model instances through the per-field path
+- projected: project_ad_list() rows through the dict fast path
+
+Usage:
+    python manage.py benchmark_ad_list
+    python manage.py benchmark_ad_list --ads 50000 --page-size 100 --repeat 50
+"""
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ads.models import Ad, Location
+from ads.serializer import AdListSerializer, project_ad_list
+from bids.models import AdBidSummary
+from category.models import Category, SubCategory
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the ad list serializer, model path vs projected rows (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ads', type=int, default=20000, help='Synthetic ads to insert (default: 20000)')
+        parser.add_argument('--page-size', type=int, default=100, help='Ads rendered per page (default: 100)')
+        parser.add_argument('--repeat', type=int, default=30, help='Timed runs per path (default: 30)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        page_size = options['page_size']
+
+        with transaction.atomic():
+            started = time.monotonic()
+            self._insert_ads(options['ads'], rng)
+            self.stdout.write(f"Inserted {options['ads']} ads in {time.monotonic() - started:.1f}s ({connection.vendor})")
+
+            listed = Ad.objects.filter(is_listed=True).order_by('-created_at')
+            paths = {
+                'models': listed.select_related(
+                    'category', 'subcategory', 'location', 'user', 'user__company', 'bid_summary'
+                )[:page_size],
+                'projected': project_ad_list(listed)[:page_size],
+            }
+            medians = {name: self._time_path(name, queryset, options['repeat']) for name, queryset in paths.items()}
+            for part, label in enumerate(('fetch', 'render', 'total')):
+                speedup = medians['models'][part] / medians['projected'][part]
+                self.stdout.write(f'  {label} speedup {speedup:.1f}x at page_size={page_size}')
+
+            transaction.set_rollback(True)
+
+    def _insert_ads(self, count, rng, batch_size=2000):
+        user = User.objects.create(username='list_benchmark', email='list_benchmark@example.com')
+        categories = [Category.objects.create(name=f'Benchmark category {i}') for i in range(10)]
+        subcategories = [
+            SubCategory.objects.create(name=f'{category.name} / {i}', category=category)
+            for category in categories for i in range(5)
+        ]
+        locations = Location.objects.bulk_create([
+            Location(country='Sweden', city=f'City {i}') for i in range(200)
+        ])
+        now = timezone.now()
+
+        for offset in range(0, count, batch_size):
+            batch = []
+            for i in range(min(batch_size, count - offset)):
+                subcategory = rng.choice(subcategories)
+                batch.append(Ad(
+                    user=user,
+                    title=f'Benchmark ad {offset + i}',
+                    category_id=subcategory.category_id,
+                    subcategory=subcategory,
+                    location=rng.choice(locations),
+                    available_quantity=Decimal(rng.randint(1, 5000)),
+                    starting_bid_price=Decimal(rng.randint(1, 900)),
+                    material_image=f'https://cdn.example.com/ads/{offset + i}.jpg',
+                    status='active',
+                    is_complete=True,
+                    is_listed=True,
+                    auction_start_date=now,
+                    auction_end_date=now + timedelta(hours=rng.randint(1, 24 * 30)),
+                ))
+            ads = Ad.objects.bulk_create(batch)
+            AdBidSummary.objects.bulk_create([
+                AdBidSummary(ad=ad, highest_bid_price=rng.randint(1, 1000), bid_count=rng.randint(1, 20))
+                for ad in ads if rng.random() < 0.6
+            ])
+
+    def _time_path(self, name, queryset, repeat):
+        """Median fetch, render and total milliseconds for one page"""
+        fetches, renders, totals = [], [], []
+        for _ in range(repeat + 1):
+            started = time.perf_counter()
+            rows = list(queryset._chain())
+            fetched = time.perf_counter()
+            AdListSerializer(rows, many=True).data
+            rendered = time.perf_counter()
+            fetches.append((fetched - started) * 1000)
+            renders.append((rendered - fetched) * 1000)
+            totals.append((rendered - started) * 1000)
+
+        # The first run warms up caches and is dropped
+        medians = tuple(sorted(timings[1:])[repeat // 2] for timings in (fetches, renders, totals))
+        self.stdout.write(
+            f'  {name:<10} fetch p50 {medians[0]:7.1f} ms   render p50 {medians[1]:7.1f} ms   '
+            f'total p50 {medians[2]:7.1f} ms'
+        )
+        return medians
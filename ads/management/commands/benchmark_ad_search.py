@@ -0,0 +1,110 @@
+"""
+Django management command to benchmark full-text ad search.
+
+Inserts synthetic ads (500,000 by default) inside a transaction, times ranked
+first-page searches against them, and rolls everything back, so it is safe
+to run against a staging copy of the marketplace database.
+
+Usage:
+    python manage.py benchmark_ad_search
+    python manage.py benchmark_ad_search --ads 100000 --repeat 50
+    python manage.py benchmark_ad_search --term alumin --term "hdpe bottle"
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ads.models import Ad
+from ads.search import optimize_search_index, ranked_search
+from users.models import User
+
+MATERIALS = [
+    'aluminium', 'copper', 'brass', 'steel', 'stainless', 'zinc', 'lead', 'nickel', 'titanium',
+    'hdpe', 'ldpe', 'pet', 'polypropylene', 'polystyrene', 'pvc', 'abs', 'nylon', 'polycarbonate',
+    'cardboard', 'newsprint', 'kraft', 'paperboard', 'glass', 'cullet', 'rubber', 'textile',
+    'cotton', 'wool', 'timber', 'pallet', 'battery', 'cable', 'granulate', 'regrind', 'flakes',
+]
+FORMS = [
+    'bales', 'offcuts', 'turnings', 'sheets', 'film', 'bottles', 'drums', 'scrap', 'pellets',
+    'coils', 'wire', 'profiles', 'crates', 'rolls', 'powder', 'chips', 'blocks', 'tubes',
+]
+QUALIFIERS = [
+    'clean', 'mixed', 'sorted', 'natural', 'coloured', 'clear', 'post-consumer', 'post-industrial',
+    'washed', 'shredded', 'compacted', 'loose', 'premium', 'contaminated', 'certified',
+]
+CITIES = [
+    'stockholm', 'göteborg', 'malmö', 'uppsala', 'västerås', 'örebro', 'linköping', 'helsingborg',
+    'jönköping', 'norrköping', 'lund', 'umeå', 'gävle', 'borås', 'oslo', 'bergen', 'aarhus',
+    'odense', 'helsinki', 'tampere', 'turku', 'espoo', 'hamburg', 'gdansk', 'tallinn', 'riga',
+]
+# From a handful of matches (a grade code) to a large share of the table (a bare material prefix)
+DEFAULT_TERMS = ['g4821', 'copper wire g48', 'clean pet malmo', 'hdpe bottles', 'kraft', 'alumin']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text ad search on synthetic data (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ads', type=int, default=500000, help='Synthetic ads to insert (default: 500000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per term (default: 20)')
+        parser.add_argument('--page-size', type=int, default=20, help='Rows fetched per search (default: 20)')
+        parser.add_argument('--term', action='append', dest='terms', help='Search term (can be repeated)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+
+    def handle(self, *args, **options):
+        terms = options['terms'] or DEFAULT_TERMS
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            started = time.monotonic()
+            self._insert_ads(options['ads'], rng)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE ads_ad')
+            optimize_search_index(connection)
+            self.stdout.write(f"Inserted {options['ads']} ads in {time.monotonic() - started:.1f}s ({connection.vendor})")
+
+            for term in terms:
+                self._time_term(term, options['repeat'], options['page_size'])
+
+            transaction.set_rollback(True)
+
+    def _insert_ads(self, count, rng, batch_size=5000):
+        user = User.objects.create(username='search_benchmark', email='search_benchmark@example.com')
+        for offset in range(0, count, batch_size):
+            batch = []
+            for _ in range(min(batch_size, count - offset)):
+                material, form = rng.choice(MATERIALS), rng.choice(FORMS)
+                grade = f'g{rng.randint(1000, 9999)}'
+                batch.append(Ad(
+                    user=user,
+                    title=f'{rng.choice(QUALIFIERS)} {material} {form} {grade}'.capitalize(),
+                    keywords=f'{material}, {form}',
+                    status='active',
+                    is_complete=True,
+                    search_document='\n'.join([
+                        f'{material}, {form}',
+                        f'{material} {grade}',
+                        f'Nordic {rng.choice(CITIES).capitalize()} Recycling AB',
+                        ' '.join(rng.choice(QUALIFIERS + FORMS) for _ in range(rng.randint(10, 30))),
+                    ]),
+                ))
+            Ad.objects.bulk_create(batch)
+
+    def _time_term(self, term, repeat, page_size):
+        queryset = ranked_search(Ad.objects.filter(status='active', is_complete=True), term).values_list('id', flat=True)
+
+        matches = queryset.count()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset[:page_size])
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f'  {term!r:<22} {matches:>8} matches   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms')
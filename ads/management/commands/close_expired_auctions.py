@@ -8,18 +8,31 @@ This command should be run periodically (e.g., via cron job) to:
 4. Update auction status to 'completed'
 5. Send notifications to winners
 
+Auctions are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED, so
+several workers (threads, or cron hosts) can close auctions side by side
+without closing any auction twice. The claim transaction ends right away;
+each auction is then locked again and closed in its own transaction, so a
+failure in one auction never rolls back another whose payment Stripe has
+already captured.
+
 Usage:
     python manage.py close_expired_auctions
     python manage.py close_expired_auctions --dry-run  # Preview without making changes
     python manage.py close_expired_auctions --verbose  # Detailed output
+    python manage.py close_expired_auctions --workers 8  # Close auctions on 8 threads
+    python manage.py close_expired_auctions --shard 0/3  # Only ids where id % 3 == 0
 """
 
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Q, Max
+from ads.listing import delist_ended_ads
 from ads.models import Ad
 from bids.models import Bid
 from bids.services import BidService
@@ -48,23 +61,59 @@ class Command(BaseCommand):
             default=5,
             help='Grace period in minutes after auction end time (default: 5)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of threads closing auctions in parallel (default: 1)',
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='Only close auctions in shard i of N, given as i/N (e.g. 0/3)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Auctions claimed per worker transaction (default: 10)',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         verbose = options['verbose']
         grace_period = options['grace_period']
+        workers = options['workers']
+        batch_size = options['batch_size']
+        shard = self._parse_shard(options['shard'])
+
+        if workers < 1 or batch_size < 1:
+            raise CommandError('--workers and --batch-size must be at least 1')
+
+        if workers > 1 and not connection.features.has_select_for_update_skip_locked:
+            self.stdout.write(
+                self.style.WARNING('Database does not support SKIP LOCKED; falling back to a single worker')
+            )
+            workers = 1
         
         self.stdout.write(
             self.style.SUCCESS(
-                f'Starting auction closure process (dry_run={dry_run}, grace_period={grace_period}min)'
+                f'Starting auction closure process (dry_run={dry_run}, grace_period={grace_period}min, '
+                f'workers={workers}, shard={options["shard"] or "all"})'
             )
         )
         
         # Initialize auction completion service
         auction_service = AuctionCompletionService()
 
+        if not dry_run:
+            self._close_auctions(auction_service, grace_period, workers, batch_size, shard, verbose)
+            return
+
         # Find expired auctions
         expired_auctions = auction_service.get_expired_auctions(grace_period)
+        if shard:
+            expired_auctions = [auction for auction in expired_auctions if auction.id % shard[1] == shard[0]]
 
         if verbose:
             self.stdout.write(f'Found {len(expired_auctions)} expired auctions to process')
@@ -77,75 +126,30 @@ class Command(BaseCommand):
         successful_count = 0
         failed_count = 0
         
-        if not dry_run:
-            # Process auctions using the service with notifications
-            results = []
-            for auction in expired_auctions:
-                result = auction_service.close_auction_with_notifications(auction)
-                results.append(result)
-
-            # Create batch result format
-            batch_result = {
-                'total_processed': len(results),
-                'successful_count': len([r for r in results if r['success']]),
-                'failed_count': len([r for r in results if not r['success']]),
-                'results': results
-            }
-
-            successful_count = batch_result['successful_count']
-            failed_count = batch_result['failed_count']
-            processed_count = batch_result['total_processed']
-
-            # Display results
-            for result in batch_result['results']:
-                if verbose:
-                    self.stdout.write(f'\nProcessing auction: {result["auction_title"]} (ID: {result["auction_id"]})')
-
-                    if result['success']:
-                        if result['has_winner']:
-                            self.stdout.write(
-                                self.style.SUCCESS(f'  ✓ Auction completed successfully')
-                            )
-                            self.stdout.write(f'    Winner: {result["winner_email"]}')
-                            self.stdout.write(f'    Winning bid: {result["winning_price"]} {result["currency"]}')
-                            self.stdout.write(f'    Volume: {result["winning_volume"]} {result["unit"]}')
-                        else:
-                            self.stdout.write(
-                                self.style.WARNING(f'  ⚠ {result["message"]}')
-                            )
-                            if 'reserve_price' in result:
-                                self.stdout.write(f'    Reserve price: {result["reserve_price"]} {result["currency"]}')
-                                self.stdout.write(f'    Highest bid: {result["highest_bid"]} {result["currency"]}')
-                    else:
-                        self.stdout.write(
-                            self.style.ERROR(f'  ✗ {result["message"]}')
-                        )
+        # Dry run - just show what would be processed
+        for auction in expired_auctions:
+            processed_count += 1
+            self.stdout.write(f'\n[DRY RUN] Would process auction: {auction.title} (ID: {auction.id})')
+            self.stdout.write(f'  End date: {auction.auction_end_date}')
 
-        else:
-            # Dry run - just show what would be processed
-            for auction in expired_auctions:
-                processed_count += 1
-                self.stdout.write(f'\n[DRY RUN] Would process auction: {auction.title} (ID: {auction.id})')
-                self.stdout.write(f'  End date: {auction.auction_end_date}')
-                
-                # Get active bids
-                active_bids = auction.bids.filter(
-                    status__in=['active', 'winning']
-                ).order_by('-bid_price_per_unit', 'created_at')
-
-                if not active_bids.exists():
-                    self.stdout.write(f'  [DRY RUN] Would complete auction without winner')
-                    successful_count += 1
-                else:
-                    highest_bid = active_bids.first()
-                    self.stdout.write(f'  [DRY RUN] Would close auction')
-                    self.stdout.write(f'    Highest bidder: {highest_bid.user.email}')
-                    self.stdout.write(f'    Highest bid: {highest_bid.bid_price_per_unit} {auction.currency}')
-
-                    if auction.reserve_price and highest_bid.bid_price_per_unit < auction.reserve_price:
-                        self.stdout.write(f'    ⚠ Reserve price not met ({auction.reserve_price} {auction.currency})')
-
-                    successful_count += 1
+            # Get active bids
+            active_bids = auction.bids.filter(
+                status__in=['active', 'winning']
+            ).order_by('-bid_price_per_unit', 'created_at')
+
+            if not active_bids.exists():
+                self.stdout.write(f'  [DRY RUN] Would complete auction without winner')
+                successful_count += 1
+            else:
+                highest_bid = active_bids.first()
+                self.stdout.write(f'  [DRY RUN] Would close auction')
+                self.stdout.write(f'    Highest bidder: {highest_bid.user.email}')
+                self.stdout.write(f'    Highest bid: {highest_bid.bid_price_per_unit} {auction.currency}')
+
+                if auction.reserve_price and highest_bid.bid_price_per_unit < auction.reserve_price:
+                    self.stdout.write(f'    ⚠ Reserve price not met ({auction.reserve_price} {auction.currency})')
+
+                successful_count += 1
 
         # Final summary
         self.stdout.write(
@@ -156,8 +160,122 @@ class Command(BaseCommand):
         self.stdout.write(f'  Total processed: {processed_count}')
         self.stdout.write(f'  Successful: {successful_count}')
         self.stdout.write(f'  Failed: {failed_count}')
-        
-        if dry_run:
+        self.stdout.write(
+            self.style.WARNING('This was a dry run - no changes were made')
+        )
+
+    def _close_auctions(self, auction_service, grace_period, workers, batch_size, shard, verbose):
+        """Claim and close expired auctions on one or more workers, then report throughput"""
+        attempted = set()
+        attempted_lock = threading.Lock()
+        started = time.perf_counter()
+
+        # Ended auctions leave the marketplace right away, grace period or not
+        delisted = delist_ended_ads()
+        if verbose and delisted:
+            self.stdout.write(f'Delisted {delisted} ended auctions')
+
+        def run_worker(threaded):
+            results = []
+            try:
+                while True:
+                    # Claimed ids go into attempted before the locks are
+                    # released, so other threads in this run skip them
+                    with transaction.atomic():
+                        with attempted_lock:
+                            exclude_ids = set(attempted)
+                        batch = auction_service.claim_expired_auctions(
+                            grace_period, batch_size, shard, exclude_ids
+                        )
+                        if not batch:
+                            return results
+                        with attempted_lock:
+                            attempted.update(auction.id for auction in batch)
+
+                    for auction in batch:
+                        auction_started = time.perf_counter()
+                        result = auction_service.close_expired_auction(auction.id)
+                        if result is None:
+                            # Closed or extended by another host since the claim
+                            continue
+                        result['duration'] = time.perf_counter() - auction_started
+                        results.append(result)
+            finally:
+                if threaded:
+                    connection.close()
+
+        if workers == 1:
+            results = run_worker(threaded=False)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run_worker, True) for _ in range(workers)]
+                results = [result for future in futures for result in future.result()]
+
+        elapsed = time.perf_counter() - started
+
+        if not results:
+            self.stdout.write(self.style.SUCCESS('No expired auctions found'))
+            return
+
+        if verbose:
+            for result in results:
+                self._write_result(result)
+
+        successful_count = len([r for r in results if r['success']])
+        durations = sorted(r['duration'] for r in results)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nAuction closure process completed:'
+            )
+        )
+        self.stdout.write(f'  Total processed: {len(results)}')
+        self.stdout.write(f'  Successful: {successful_count}')
+        self.stdout.write(f'  Failed: {len(results) - successful_count}')
+        self.stdout.write(f'  Elapsed: {elapsed:.2f}s')
+        self.stdout.write(f'  Throughput: {len(results) / elapsed if elapsed else 0:.2f} auctions/s')
+        self.stdout.write(f'  p95 per auction: {self._percentile(durations, 95):.3f}s')
+
+    def _write_result(self, result):
+        """Print the outcome of closing a single auction"""
+        self.stdout.write(f'\nProcessing auction: {result["auction_title"]} (ID: {result["auction_id"]})')
+
+        if result['success']:
+            if result['has_winner']:
+                self.stdout.write(
+                    self.style.SUCCESS(f'  ✓ Auction completed successfully')
+                )
+                self.stdout.write(f'    Winner: {result["winner_email"]}')
+                self.stdout.write(f'    Winning bid: {result["winning_price"]} {result["currency"]}')
+                self.stdout.write(f'    Volume: {result["winning_volume"]} {result["unit"]}')
+            else:
+                self.stdout.write(
+                    self.style.WARNING(f'  ⚠ {result["message"]}')
+                )
+                if 'reserve_price' in result:
+                    self.stdout.write(f'    Reserve price: {result["reserve_price"]} {result["currency"]}')
+                    self.stdout.write(f'    Highest bid: {result["highest_bid"]} {result["currency"]}')
+        else:
             self.stdout.write(
-                self.style.WARNING('This was a dry run - no changes were made')
+                self.style.ERROR(f'  ✗ {result["message"]}')
             )
+
+    def _parse_shard(self, value):
+        """Parse an i/N shard spec into an (index, count) tuple"""
+        if not value:
+            return None
+        try:
+            index, count = (int(part) for part in value.split('/'))
+        except ValueError:
+            raise CommandError('--shard must look like i/N, e.g. 0/3')
+        if count < 1 or not 0 <= index < count:
+            raise CommandError('--shard index must be between 0 and N-1')
+        return index, count
+
+    @staticmethod
+    def _percentile(values, percent):
+        """Nearest-rank percentile of an already sorted list"""
+        if not values:
+            return 0.0
+        rank = max(0, -(-percent * len(values) // 100) - 1)
+        return values[rank]
@@ -0,0 +1,53 @@
+"""
+Django management command to rebuild the full-text search documents of ads.
+
+Ad.save() keeps each ad's search document current. Run this after renaming a
+category, subcategory or company, after bulk data fixes done with update(),
+or if the SQLite FTS5 index is suspected to have drifted from ads_ad.
+
+Usage:
+    python manage.py rebuild_ad_search_index
+    python manage.py rebuild_ad_search_index --ad 12 --ad 15  # Only specific ads
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from ads.repository import AdRepository
+from ads.search import ensure_search_index, optimize_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents and index for ads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ad',
+            type=int,
+            action='append',
+            dest='ad_ids',
+            help='Only rebuild this ad ID (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk update (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        ad_ids = options['ad_ids']
+        started = time.monotonic()
+
+        ensure_search_index(connection)
+        written = AdRepository().rebuild_search_documents(ad_ids=ad_ids, batch_size=options['batch_size'])
+        if not ad_ids:
+            rebuild_search_index(connection)
+        optimize_search_index(connection)
+
+        scope = f'{len(ad_ids)} requested ads' if ad_ids else 'all ads'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {written} search documents for {scope} in {time.monotonic() - started:.2f}s'
+            )
+        )
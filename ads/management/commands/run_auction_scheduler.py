@@ -0,0 +1,125 @@
+"""
+Django management command that closes auctions as their end date passes.
+
+Runs as a long-lived process alongside (or instead of) the
+close_expired_auctions cron job. Open auction deadlines are kept in a
+min-heap; ads changed since the last poll are re-read every --poll-interval
+seconds, and each auction is closed within about one poll interval of its
+auction_end_date. Closing claims the row with SKIP LOCKED, so it is safe to
+keep the cron job running as a fallback.
+
+Lag metrics (time from auction_end_date to closure) are logged every
+--report-interval seconds.
+
+Usage:
+    python manage.py run_auction_scheduler
+    python manage.py run_auction_scheduler --poll-interval 0.5 --report-interval 30
+    python manage.py run_auction_scheduler --once  # Close what is due and exit
+"""
+
+import logging
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from ads.auction_services.auction_scheduler import AuctionScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Close auctions at their end date using an in-process deadline queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds between polls for changed ads (default: 1.0)',
+        )
+        parser.add_argument(
+            '--report-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between lag metric reports (default: 60)',
+        )
+        parser.add_argument(
+            '--full-refresh-interval',
+            type=float,
+            default=900.0,
+            help='Seconds between full reloads of the deadline heap (default: 900)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Close auctions that are already due, report metrics and exit',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        report_interval = options['report_interval']
+        full_refresh_interval = options['full_refresh_interval']
+
+        if poll_interval <= 0:
+            raise CommandError('--poll-interval must be greater than zero')
+
+        scheduler = AuctionScheduler()
+        scheduler.load()
+        self.stdout.write(
+            self.style.SUCCESS(f'Auction scheduler started with {len(scheduler)} open auctions')
+        )
+
+        if options['once']:
+            self._close_due(scheduler)
+            self._report(scheduler)
+            return
+
+        last_report = last_full_refresh = time.monotonic()
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() - last_full_refresh >= full_refresh_interval:
+                    scheduler.load()
+                    last_full_refresh = time.monotonic()
+                else:
+                    scheduler.refresh()
+
+                self._close_due(scheduler)
+
+                if time.monotonic() - last_report >= report_interval:
+                    self._report(scheduler)
+                    last_report = time.monotonic()
+
+                time.sleep(self._sleep_seconds(scheduler, poll_interval))
+        except KeyboardInterrupt:
+            self.stdout.write('Auction scheduler stopping')
+            self._report(scheduler)
+
+    def _close_due(self, scheduler):
+        for result in scheduler.close_due():
+            message = (
+                f'Closed auction {result["auction_id"]} '
+                f'(lag {result["lag"]:.2f}s): {result.get("message", "")}'
+            )
+            if result['success']:
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.ERROR(message))
+
+    def _report(self, scheduler):
+        metrics = scheduler.metrics.snapshot()
+        summary = (
+            f'open={len(scheduler)} closed={metrics["closed"]} failed={metrics["failed"]} '
+            f'skipped={metrics["skipped"]} mean_lag={metrics["mean_lag"]:.2f}s '
+            f'p95_lag={metrics["p95_lag"]:.2f}s max_lag={metrics["max_lag"]:.2f}s'
+        )
+        logger.info(f'Auction scheduler metrics: {summary}')
+        self.stdout.write(f'Scheduler metrics: {summary}')
+
+    def _sleep_seconds(self, scheduler, poll_interval):
+        """Sleep until the next deadline, but never longer than one poll interval"""
+        next_deadline = scheduler.next_deadline()
+        if next_deadline is None:
+            return poll_interval
+        until_deadline = (next_deadline - timezone.now()).total_seconds()
+        return min(poll_interval, max(until_deadline, 0.0))
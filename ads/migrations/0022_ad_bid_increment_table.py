@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-16 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0021_alter_ad_unit_of_measurement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='bid_increment_table',
+            field=models.JSONField(blank=True, default=list, help_text='Auto-bid increments as [[from_price, increment], ...]; empty uses the platform default'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-16 20:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0022_ad_bid_increment_table'),
+        ('category', '0002_alter_categoryspecification_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['status', 'auction_end_date'], name='ads_ad_status_134255_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['updated_at'], name='ads_ad_updated_e77b11_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-16 20:23
+
+from django.db import migrations, models
+
+from ads.search import build_search_document, ensure_search_index, rebuild_search_index
+
+
+def build_search_index(apps, schema_editor):
+    Ad = apps.get_model('ads', 'Ad')
+    manager = Ad.objects.db_manager(schema_editor.connection.alias)
+    ads = manager.select_related(
+        'category', 'subcategory', 'user__company'
+    )
+    batch = []
+    for ad in ads.iterator(chunk_size=1000):
+        ad.search_document = build_search_document(ad)
+        batch.append(ad)
+        if len(batch) >= 1000:
+            manager.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        manager.bulk_update(batch, ['search_document'])
+
+    ensure_search_index(schema_editor.connection)
+    rebuild_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS ads_ad_search_vector_idx')
+            cursor.execute('ALTER TABLE ads_ad DROP COLUMN IF EXISTS search_vector')
+        elif schema_editor.connection.vendor == 'sqlite':
+            for trigger in ('insert', 'delete', 'update'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS ads_ad_search_{trigger}')
+            cursor.execute('DROP TABLE IF EXISTS ads_ad_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0023_ad_scheduler_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Denormalized text indexed for full-text search (see ads/search.py)'),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-16 22:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+from ads.listing import listed_filter
+
+
+def backfill_is_listed(apps, schema_editor):
+    Ad = apps.get_model('ads', 'Ad')
+    Ad.objects.db_manager(schema_editor.connection.alias).filter(listed_filter()).update(is_listed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0024_ad_search_document'),
+        ('category', '0002_alter_categoryspecification_options_and_more'),
+        ('company', '0007_alter_company_stripe_account_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='is_listed',
+            field=models.BooleanField(default=False, editable=False, help_text='Complete, active, payment-ready seller and auction not ended'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(condition=models.Q(('is_listed', True)), fields=['-created_at', '-id'], name='ads_ad_listed_created_idx'),
+        ),
+        migrations.RunPython(backfill_is_listed, migrations.RunPython.noop),
+    ]
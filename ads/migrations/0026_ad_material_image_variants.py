@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-16 22:22
+
+import base.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0025_ad_is_listed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='material_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='WebP/JPEG renditions of material_image (see base/utils/image_variants.py)'),
+        ),
+        migrations.AlterField(
+            model_name='ad',
+            name='material_image',
+            field=base.fields.FirebaseImageField(blank=True, folder='material_images', max_length=500, null=True, variants_field='material_image_variants'),
+        ),
+    ]
@@ -7,6 +7,7 @@ from users.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from base.fields import FirebaseImageField
+from base.models import FieldTrackerMixin
 
 
 class Location(models.Model):
@@ -23,7 +24,14 @@ class Location(models.Model):
         return f"{self.city}, {self.state_province}, {self.country}"
 
 
-class Ad(models.Model):
+class Ad(FieldTrackerMixin, models.Model):
+    # Compared against their loaded values in save(); the rest feed the search document
+    tracked_fields = (
+        'status', 'auction_duration', 'custom_auction_duration', 'is_listed', 'is_complete',
+        'auction_end_date', 'title', 'description', 'keywords', 'specific_material', 'category',
+        'subcategory', 'user',
+    )
+
     UNIT_CHOICES = [
         ('kg', 'Kilogram'),
         ('ton', 'Tons'),
@@ -198,12 +206,27 @@ class Ad(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))],
         help_text="If no bids reach this price, the auction will not complete"
     )
-    
+    bid_increment_table = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Auto-bid increments as [[from_price, increment], ...]; empty uses the platform default"
+    )
+
     # Step 8: Title, Description & Image
     title = models.CharField(max_length=255, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     keywords = models.CharField(max_length=500, blank=True, null=True, help_text="Keywords separated by commas")
-    material_image = FirebaseImageField(folder='material_images', blank=True, null=True)
+    search_document = models.TextField(
+        blank=True, default='', editable=False,
+        help_text="Denormalized text indexed for full-text search (see ads/search.py)"
+    )
+    material_image = FirebaseImageField(
+        folder='material_images', variants_field='material_image_variants', blank=True, null=True
+    )
+    material_image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        help_text="WebP/JPEG renditions of material_image (see base/utils/image_variants.py)"
+    )
     
     # System fields
     status = models.CharField(max_length=20, choices=[
@@ -226,6 +249,12 @@ class Ad(models.Model):
     # Form step tracking
     current_step = models.IntegerField(default=1)
     is_complete = models.BooleanField(default=False)
+
+    # Denormalized marketplace visibility, maintained by ads/listing.py
+    is_listed = models.BooleanField(
+        default=False, editable=False,
+        help_text="Complete, active, payment-ready seller and auction not ended"
+    )
     
     # Step completion tracking - these are set automatically based on form data
     step_1_complete = models.BooleanField(default=False, help_text="Material Type step completion")
@@ -241,6 +270,19 @@ class Ad(models.Model):
         ordering = ['-created_at']
         verbose_name = "Material Ad"
         verbose_name_plural = "Material Ads"
+        indexes = [
+            # Used by the auction scheduler to load deadlines and poll for changes
+            models.Index(fields=['status', 'auction_end_date']),
+            models.Index(fields=['updated_at']),
+            # Marketplace listing: listed ads in list and keyset order. The
+            # partial condition pins is_listed, so it is not an index column
+            # (SQLite cannot use a leading boolean column for the ordering)
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_listed=True),
+                name='ads_ad_listed_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title}" if self.title else f"Ad #{self.id}"
@@ -253,21 +295,17 @@ class Ad(models.Model):
         
         # Check if we're trying to make the auction active
         # We need to check if status is being changed to 'active'
-        duration_changed = False
         if self.pk:  # If updating existing ad
-            try:
-                old_instance = Ad.objects.get(pk=self.pk)
-                is_activating = old_instance.status != 'active' and self.status == 'active'
-                # Detect any change in auction duration configuration (preset or custom)
-                if (
-                    old_instance.auction_duration != self.auction_duration or
-                    old_instance.custom_auction_duration != self.custom_auction_duration
-                ):
-                    duration_changed = True
-            except Ad.DoesNotExist:
-                is_activating = False
+            is_activating = self.previous('status') != 'active' and self.status == 'active'
+            status_changed = self.has_changed('status')
+            # Detect any change in auction duration configuration (preset or custom)
+            duration_changed = (
+                self.has_changed('auction_duration') or self.has_changed('custom_auction_duration')
+            )
         else:  # New ad
             is_activating = self.status == 'active'
+            status_changed = True
+            duration_changed = False
             
         if is_activating and self.is_complete:
             from company.payment_utils import check_company_payment_readiness
@@ -302,6 +340,26 @@ class Ad(models.Model):
                 self.auction_end_date = self.auction_start_date + timedelta(days=current_duration_days)
                 # (Optional future enhancement) If new end date is in the past due to reducing duration,
                 # business rules could auto-complete the auction. Left as-is for now per current requirements.
+
+        # Keep the full-text search document in step with its source fields
+        from ads.search import SEARCH_SOURCE_FIELDS, build_search_document
+        update_fields = kwargs.get('update_fields')
+        source_fields = SEARCH_SOURCE_FIELDS if update_fields is None else SEARCH_SOURCE_FIELDS.intersection(update_fields)
+        if any(self.has_changed(field) for field in source_fields):
+            self.search_document = build_search_document(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_document'}
+
+        # Keep the marketplace visibility flag in step with the fields above;
+        # unrelated edits skip it, as it may load the user and their company
+        from ads.listing import LISTING_SOURCE_FIELDS, compute_is_listed
+        if any(self.has_changed(field) for field in LISTING_SOURCE_FIELDS):
+            self.is_listed = compute_is_listed(self)
+            if self.has_changed('is_listed') and kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'is_listed'}
+
+        # Lets post_save receivers tell a publish apart from later edits
+        self._activated = is_activating
         super().save(*args, **kwargs)
 
     def clean(self):
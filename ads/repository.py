@@ -9,6 +9,8 @@ from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import Ad, Location, Address, Subscription
+from .listing import not_ended_filter
+from .search import build_search_document, ranked_search, search_filter
 from company.models import Company
 from .serializer import (
     AdCreateSerializer, AdStep1Serializer, AdStep2Serializer, AdStep3Serializer,
@@ -116,20 +118,13 @@ class AdRepository:
         try:
             # Start with all ads, including related objects for optimization
             queryset = Ad.objects.select_related(
-                'user', 'category', 'location', 'user__company'
-            ).prefetch_related('bids').all().order_by('-created_at')
+                'user', 'category', 'location', 'user__company', 'bid_summary'
+            ).all().order_by('-created_at')
             
-            # Apply search filter across multiple fields
+            # Apply search filter: full-text index, plus the seller's username
             if search:
-                queryset = queryset.filter(
-                    Q(title__icontains=search) |
-                    Q(description__icontains=search) |
-                    Q(category__name__icontains=search) |
-                    Q(user__username__icontains=search) |
-                    Q(user__company__official_name__icontains=search) |
-                    Q(specific_material__icontains=search) |
-                    Q(keywords__icontains=search)
-                )
+                match = search_filter(search) or Q(pk__in=[])
+                queryset = queryset.filter(match | Q(user__username__icontains=search))
             
             # Apply status filter
             if status and status != 'all':
@@ -236,7 +231,8 @@ class AdRepository:
             query = Q()
             
             if only_complete:
-                query &= Q(is_complete=True, status='active')
+                # Complete, active and from a payment-ready company (see ads/listing.py)
+                query &= Q(is_listed=True) & not_ended_filter()
             
             # Apply filters
             if category_id:
@@ -282,7 +278,7 @@ class AdRepository:
                 query &= Q(user__company__sector='broker')
 
             ads = Ad.objects.filter(query).select_related(
-                'category', 'subcategory', 'location', 'user', 'user__company'
+                'category', 'subcategory', 'location', 'user', 'user__company', 'bid_summary'
             ).order_by('-created_at')
 
             return RepositoryResponse(True, "Ads retrieved successfully", list(ads))
@@ -299,7 +295,7 @@ class AdRepository:
                 query &= Q(is_complete=True)
 
             ads = Ad.objects.filter(query).select_related(
-                'category', 'subcategory', 'location'
+                'category', 'subcategory', 'location', 'bid_summary'
             ).order_by('-created_at')
 
             return RepositoryResponse(True, "User ads retrieved successfully", list(ads))
@@ -480,26 +476,42 @@ class AdRepository:
             return RepositoryResponse(False, "Failed to get category ads", None)
 
     def search_ads(self, search_term: str) -> RepositoryResponse:
-        """Search ads by title, description, or keywords"""
-        try:
-            query = Q(is_complete=True, status='active') & (
-                Q(title__icontains=search_term) |
-                Q(description__icontains=search_term) |
-                Q(keywords__icontains=search_term) |
-                Q(category__name__icontains=search_term) |
-                Q(subcategory__name__icontains=search_term)
+        """Full-text search of active ads, best matches first; every term matches as a prefix"""
+        try:
+            ads = ranked_search(
+                Ad.objects.filter(is_complete=True, status='active').select_related(
+                    'category', 'subcategory', 'location', 'bid_summary'
+                ),
+                search_term
             )
 
-            ads = Ad.objects.filter(query).select_related(
-                'category', 'subcategory', 'location'
-            ).order_by('-created_at')
-
             return RepositoryResponse(True, "Search completed", list(ads))
 
         except Exception as e:
             logging_service.log_error(e)
             return RepositoryResponse(False, "Search failed", None)
 
+    def rebuild_search_documents(self, ad_ids: Optional[List[int]] = None, batch_size: int = 1000) -> int:
+        """
+        Recompute stored search documents, e.g. after a category or company
+        rename, which Ad.save() does not see. Returns the number of ads written.
+        """
+        ads = Ad.objects.select_related('category', 'subcategory', 'user__company').order_by('id')
+        if ad_ids is not None:
+            ads = ads.filter(id__in=ad_ids)
+
+        written = 0
+        batch = []
+        for ad in ads.iterator(chunk_size=batch_size):
+            ad.search_document = build_search_document(ad)
+            batch.append(ad)
+            if len(batch) >= batch_size:
+                written += Ad.objects.bulk_update(batch, ['search_document'])
+                batch = []
+        if batch:
+            written += Ad.objects.bulk_update(batch, ['search_document'])
+        return written
+
     def update_complete_ad(self, ad_id: int, data: Dict[str, Any], files: Optional[Dict[str, Any]] = None, user: Optional[User] = None) -> RepositoryResponse:
         """Update complete ad with all provided fields"""
         try:
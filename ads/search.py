@@ -0,0 +1,199 @@
+"""
+Full-text search over marketplace ads.
+
+Every Ad keeps a denormalized search_document (keywords, material, category,
+subcategory, company name and description) that Ad.save() rebuilds. The
+database indexes it together with the title:
+
+- PostgreSQL: a generated tsvector column, ads_ad.search_vector, with a GIN
+  index. The title is weighted above the rest of the document.
+- SQLite: an external-content FTS5 table, ads_ad_search, kept in sync by
+  triggers on ads_ad.
+
+Neither object is declared on the model, so migrations stay portable. They
+are created by migration 0024 and re-checked after every migrate, because
+SQLite drops the triggers whenever it rebuilds ads_ad for a schema change.
+Every search term is matched as a prefix, so "alu" finds "aluminium".
+"""
+
+import re
+from typing import Optional
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+# Ad fields that feed the search document
+SEARCH_SOURCE_FIELDS = frozenset({
+    'title', 'description', 'keywords', 'specific_material',
+    'category', 'category_id', 'subcategory', 'subcategory_id', 'user', 'user_id',
+})
+
+MAX_SEARCH_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+')
+
+POSTGRES_SEARCH_INDEX_SQL = [
+    """
+    ALTER TABLE ads_ad ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(search_document, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ads_ad_search_vector_idx ON ads_ad USING gin (search_vector)",
+]
+
+SQLITE_SEARCH_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ads_ad_search USING fts5(
+        title, search_document,
+        content='ads_ad', content_rowid='id', tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )
+"""
+
+SQLITE_SEARCH_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS ads_ad_search_insert AFTER INSERT ON ads_ad BEGIN
+        INSERT INTO ads_ad_search(rowid, title, search_document)
+        VALUES (new.id, new.title, new.search_document);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ads_ad_search_delete AFTER DELETE ON ads_ad BEGIN
+        INSERT INTO ads_ad_search(ads_ad_search, rowid, title, search_document)
+        VALUES ('delete', old.id, old.title, old.search_document);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ads_ad_search_update AFTER UPDATE OF title, search_document ON ads_ad BEGIN
+        INSERT INTO ads_ad_search(ads_ad_search, rowid, title, search_document)
+        VALUES ('delete', old.id, old.title, old.search_document);
+        INSERT INTO ads_ad_search(rowid, title, search_document)
+        VALUES (new.id, new.title, new.search_document);
+    END
+    """,
+]
+
+# Ids of matching ads, for use as a plain filter
+_MATCH_SQL = {
+    'postgresql': "SELECT id FROM ads_ad WHERE search_vector @@ to_tsquery('simple', %s)",
+    'sqlite': "SELECT rowid FROM ads_ad_search WHERE ads_ad_search MATCH %s",
+}
+
+
+def build_search_document(ad) -> str:
+    """Text indexed alongside the title; title is indexed from its own column"""
+    company = ad.user.company if ad.user_id and ad.user.company_id else None
+    parts = [
+        ad.keywords,
+        ad.specific_material,
+        ad.category.name if ad.category_id else None,
+        ad.subcategory.name if ad.subcategory_id else None,
+        company.official_name if company else None,
+        ad.description,
+    ]
+    return '\n'.join(part for part in parts if part)
+
+
+def ensure_search_index(connection) -> None:
+    """Create the backend's search column/table and triggers if they are missing"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for statement in POSTGRES_SEARCH_INDEX_SQL:
+                cursor.execute(statement)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(SQLITE_SEARCH_TABLE_SQL)
+            for statement in SQLITE_SEARCH_TRIGGERS_SQL:
+                cursor.execute(statement)
+
+
+def restore_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """post_migrate hook: put back SQLite triggers lost when ads_ad was rebuilt"""
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and 'ads_ad_search' in connection.introspection.table_names():
+        ensure_search_index(connection)
+
+
+def rebuild_search_index(connection) -> None:
+    """Re-read every search document into the index (SQLite only; Postgres columns are generated)"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO ads_ad_search(ads_ad_search) VALUES ('rebuild')")
+
+
+def optimize_search_index(connection) -> None:
+    """Merge the FTS5 segments that per-row trigger writes leave behind (SQLite only)"""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO ads_ad_search(ads_ad_search) VALUES ('optimize')")
+
+
+def search_terms(text: Optional[str]) -> list:
+    return _TERM_RE.findall((text or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def _prepare_query(terms, vendor):
+    if vendor == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_filter(text: Optional[str], using: str = DEFAULT_DB_ALIAS) -> Optional[Q]:
+    """
+    Q matching ads that contain every term of text as a word prefix, or None
+    when text has no searchable terms. Other backends fall back to icontains.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+
+    vendor = connections[using].vendor
+    if vendor not in _MATCH_SQL:
+        return (
+            Q(title__icontains=text) |
+            Q(description__icontains=text) |
+            Q(keywords__icontains=text) |
+            Q(specific_material__icontains=text) |
+            Q(category__name__icontains=text) |
+            Q(subcategory__name__icontains=text) |
+            Q(user__company__official_name__icontains=text)
+        )
+    return Q(id__in=RawSQL(_MATCH_SQL[vendor], [_prepare_query(terms, vendor)]))
+
+
+def ranked_search(queryset: QuerySet, text: Optional[str]) -> QuerySet:
+    """
+    Filter an Ad queryset to matches for text, annotated with search_rank
+    (higher is better) and ordered best first. The match and the rank are
+    computed in one pass over the index: a GIN scan on PostgreSQL, a join
+    against the FTS5 table on SQLite. Apply it to the outermost queryset,
+    since the SQL refers to the ads_ad table by name.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    query = _prepare_query(terms, vendor)
+    if vendor == 'postgresql':
+        queryset = queryset.extra(
+            select={'search_rank': "ts_rank(ads_ad.search_vector, to_tsquery('simple', %s))"},
+            select_params=[query],
+            where=["ads_ad.search_vector @@ to_tsquery('simple', %s)"],
+            params=[query],
+        )
+    elif vendor == 'sqlite':
+        # The unary + keeps SQLite from probing the FTS table once per ad by
+        # rowid, which re-runs the MATCH for every row; the index drives instead
+        queryset = queryset.extra(
+            select={'search_rank': '-bm25(ads_ad_search, 10.0, 1.0)'},
+            tables=['ads_ad_search'],
+            where=['+ads_ad_search.rowid = ads_ad.id', 'ads_ad_search MATCH %s'],
+            params=[query],
+        )
+    else:
+        queryset = queryset.filter(search_filter(text, using=queryset.db)).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.order_by('-search_rank', '-created_at')
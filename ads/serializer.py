@@ -1,17 +1,31 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from .models import Ad, Location, Subscription, Address
 from category.serializers import CategorySpecificationSerializer
 from category.models import Category, SubCategory, CategorySpecification
 from decimal import Decimal
 import decimal
 from django.contrib.auth import get_user_model
-from django.db.models import Max
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
 from users.serializers import UserSerializer
 from users.models import User
+from base.utils.image_variants import variant_url
 
 User = get_user_model()
 
 
+def get_bid_summary(ad):
+    """Return the denormalized bid summary for an ad, or None if it has no bids"""
+    try:
+        return ad.bid_summary
+    except ObjectDoesNotExist:
+        return None
+
+
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Location
@@ -529,6 +543,148 @@ class AdCompleteSerializer(serializers.ModelSerializer):
         return None
 
 
+# Ad columns AdListSerializer reads; project_ad_list() adds the related values
+AD_LIST_COLUMNS = (
+    'id', 'title', 'available_quantity', 'unit_of_measurement', 'starting_bid_price',
+    'currency', 'material_image', 'material_image_variants', 'created_at', 'updated_at',
+    'is_complete', 'status', 'allow_broker_bids', 'auction_start_date', 'auction_end_date',
+)
+
+
+def project_ad_list(queryset):
+    """
+    Narrow an Ad queryset to the values AdListSerializer renders, as dicts.
+
+    Category, subcategory, location and the bid summary are read through
+    joins in the same query, so no model instances are built. Apply it last:
+    ordering, filtering and ranked_search() must come first.
+    """
+    return queryset.values(
+        *AD_LIST_COLUMNS,
+        *queryset.query.extra_select,
+        category_name=F('category__name'),
+        subcategory_name=F('subcategory__name'),
+        location_summary=Case(
+            When(location__isnull=True, then=Value(None)),
+            default=Concat('location__city', Value(', '), 'location__country'),
+            output_field=models.CharField(),
+        ),
+        highest_bid_price=F('bid_summary__highest_bid_price'),
+    )
+
+
+def get_total_starting_value(starting_bid_price, available_quantity):
+    """Starting price times quantity as a float, 0.0 when either is missing"""
+    try:
+        if starting_bid_price and available_quantity:
+            return float(starting_bid_price * available_quantity)
+        return 0.00
+    except (TypeError, ValueError, decimal.InvalidOperation):
+        return 0.00
+
+
+def get_material_image_thumb(variants, material_image):
+    """WebP thumbnail of material_image, or the original until its variants exist"""
+    return variant_url(variants, material_image, 'thumb') or material_image
+
+
+def format_time_remaining(auction_end_date, now):
+    """Human-readable time left until auction_end_date, None once it has passed"""
+    if not auction_end_date or auction_end_date <= now:
+        return None
+
+    time_diff = auction_end_date - now
+    days = time_diff.days
+    hours, remainder = divmod(time_diff.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+
+    if days > 0:
+        return f"{days} days, {hours} hours"
+    elif hours > 0:
+        return f"{hours} hours, {minutes} minutes"
+    else:
+        return f"{minutes} minutes"
+
+
+class AdListRowSerializer(serializers.ListSerializer):
+    """
+    List serializer for AdListSerializer.
+
+    Rows from project_ad_list() are rendered in one loop and produce exactly
+    the output of the per-field path. Model instances still take that path.
+    """
+    def get_decimal_formatters(self):
+        """to_representation of this call's child decimal fields, looked up once per list"""
+        fields = self.child.fields
+        return tuple(
+            fields[name].to_representation
+            for name in ('available_quantity', 'starting_bid_price', 'base_price')
+        )
+
+    def get_datetime_formatter(self):
+        """Same output as DateTimeField.to_representation, with the timezone looked up once"""
+        output_format = api_settings.DATETIME_FORMAT
+        current_timezone = timezone.get_current_timezone()
+        if output_format is None or output_format.lower() != ISO_8601:
+            return serializers.DateTimeField().to_representation
+
+        def format_datetime(value):
+            if value is None:
+                return None
+            value = value.astimezone(current_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return format_datetime
+
+    def to_representation(self, data):
+        rows = data.all() if isinstance(data, models.manager.BaseManager) else data
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        quantity_repr, price_repr, base_price_repr = self.get_decimal_formatters()
+        datetime_repr = self.get_datetime_formatter()
+        now = timezone.now()
+
+        results = []
+        for row in rows:
+            quantity = row['available_quantity']
+            price = row['starting_bid_price']
+            end = row['auction_end_date']
+            highest = row['highest_bid_price']
+            item = {
+                'id': row['id'],
+                'title': row['title'],
+                'category_name': row['category_name'],
+                'subcategory_name': row['subcategory_name'],
+                'available_quantity': None if quantity is None else quantity_repr(quantity),
+                'unit_of_measurement': row['unit_of_measurement'],
+                'starting_bid_price': None if price is None else price_repr(price),
+                'currency': row['currency'],
+                'location_summary': row['location_summary'],
+                'total_starting_value': get_total_starting_value(price, quantity),
+                'material_image': row['material_image'],
+                'material_image_thumb': get_material_image_thumb(row['material_image_variants'], row['material_image']),
+                'created_at': datetime_repr(row['created_at']),
+                'is_complete': row['is_complete'],
+                'status': row['status'],
+                'allow_broker_bids': row['allow_broker_bids'],
+                'auction_start_date': datetime_repr(row['auction_start_date']),
+                'auction_end_date': datetime_repr(end),
+                'time_remaining': format_time_remaining(end, now),
+                'highest_bid_price': None if highest is None else float(highest),
+                'base_price': None if price is None else base_price_repr(price),
+            }
+            # The dotted sources skip the key entirely when the relation is unset
+            if item['category_name'] is None:
+                del item['category_name']
+            if item['subcategory_name'] is None:
+                del item['subcategory_name']
+            results.append(item)
+        return results
+
+
 class AdListSerializer(serializers.ModelSerializer):
     """Serializer for listing ads (simplified)"""
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -538,6 +694,7 @@ class AdListSerializer(serializers.ModelSerializer):
     time_remaining = serializers.SerializerMethodField()
     highest_bid_price = serializers.SerializerMethodField()
     base_price = serializers.DecimalField(source='starting_bid_price', max_digits=15, decimal_places=2, read_only=True)
+    material_image_thumb = serializers.SerializerMethodField()
 
     class Meta:
         model = Ad
@@ -545,62 +702,34 @@ class AdListSerializer(serializers.ModelSerializer):
             'id', 'title', 'category_name', 'subcategory_name',
             'available_quantity', 'unit_of_measurement', 'starting_bid_price',
             'currency', 'location_summary', 'total_starting_value',
-            'material_image', 'created_at', 'is_complete', 'status',
+            'material_image', 'material_image_thumb', 'created_at', 'is_complete', 'status',
             'allow_broker_bids', 'auction_start_date', 
             'auction_end_date', 'time_remaining', 'highest_bid_price', 'base_price'
         ]
+        list_serializer_class = AdListRowSerializer
 
     def get_total_starting_value(self, obj):
         """Calculate total starting value, handling null values"""
-        try:
-            if obj.starting_bid_price and obj.available_quantity:
-                return float(obj.starting_bid_price * obj.available_quantity)
-            return 0.00
-        except (TypeError, ValueError, decimal.InvalidOperation):
-            return 0.00
+        return get_total_starting_value(obj.starting_bid_price, obj.available_quantity)
 
     def get_location_summary(self, obj):
         if obj.location:
             return f"{obj.location.city}, {obj.location.country}"
         return None
 
+    def get_material_image_thumb(self, obj):
+        return get_material_image_thumb(obj.material_image_variants, obj.material_image)
+
     def get_time_remaining(self, obj):
         """Get time remaining in auction"""
-        from django.utils import timezone
-        now = timezone.now()
-        
-        if not obj.auction_end_date or obj.auction_end_date <= now:
-            return None
-            
-        time_diff = obj.auction_end_date - now
-        days = time_diff.days
-        hours, remainder = divmod(time_diff.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-        
-        if days > 0:
-            return f"{days} days, {hours} hours"
-        elif hours > 0:
-            return f"{hours} hours, {minutes} minutes"
-        else:
-            return f"{minutes} minutes"
+        return format_time_remaining(obj.auction_end_date, timezone.now())
     
     def get_highest_bid_price(self, obj):
         """Get the highest bid price if any bids exist, otherwise return None"""
-        from bids.models import Bid
-        try:
-            # Check for highest bid first
-            highest_bid = Bid.objects.filter(
-                ad_id=obj.id,
-                status__in=['active', 'winning', 'outbid']
-            ).order_by('-bid_price_per_unit').first()
-            
-            if highest_bid:
-                return float(highest_bid.bid_price_per_unit)
-            else:
-                return None
-                
-        except Exception:
-            return None
+        summary = get_bid_summary(obj)
+        if summary and summary.highest_bid_price is not None:
+            return float(summary.highest_bid_price)
+        return None
 
 
 class AdCreateSerializer(serializers.ModelSerializer):
@@ -772,6 +901,7 @@ class AdminAuctionListSerializer(serializers.ModelSerializer):
     countryOfOrigin = serializers.SerializerMethodField()
     createdAt = serializers.SerializerMethodField()
     image = serializers.CharField(source='material_image', read_only=True)
+    imageThumb = serializers.SerializerMethodField()
 
     class Meta:
         model = Ad
@@ -786,7 +916,8 @@ class AdminAuctionListSerializer(serializers.ModelSerializer):
             'seller',
             'countryOfOrigin',
             'createdAt',
-            'image'
+            'image',
+            'imageThumb'
         ]
 
     def get_createdAt(self, obj):
@@ -797,20 +928,17 @@ class AdminAuctionListSerializer(serializers.ModelSerializer):
             return obj.created_at.date()
         return None
 
+    def get_imageThumb(self, obj):
+        return get_material_image_thumb(obj.material_image_variants, obj.material_image)
+
     def get_highestBid(self, obj):
         """
         Get the highest bid amount for this ad
         """
-        try:
-            # Get the highest bid amount using the prefetched bids
-            if hasattr(obj, 'bids') and obj.bids.exists():
-                highest_bid = obj.bids.aggregate(
-                    highest=Max('bid_price_per_unit')
-                )['highest']
-                return float(highest_bid) if highest_bid else 0.0
-            return 0.0
-        except:
-            return 0.0
+        summary = get_bid_summary(obj)
+        if summary and summary.highest_bid_price:
+            return float(summary.highest_bid_price)
+        return 0.0
 
     def get_status(self, obj):
         """
@@ -874,12 +1002,8 @@ class AdminAuctionDetailSerializer(AdminAuctionListSerializer):
         """
         Get total number of bids for this ad
         """
-        try:
-            if hasattr(obj, 'bids'):
-                return obj.bids.count()
-            return 0
-        except:
-            return 0
+        summary = get_bid_summary(obj)
+        return summary.bid_count if summary else 0
 
 
 class AdminAddressListSerializer(serializers.ModelSerializer):
@@ -0,0 +1,106 @@
+"""
+Tests for marketplace facet counts
+"""
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from ads.models import Ad, Location
+from category.models import Category, SubCategory
+from company.models import Company
+from users.models import User
+
+
+class AdFacetsTest(APITestCase):
+    """Test /api/ads/facets/ counts, query count and caching"""
+
+    def setUp(self):
+        cache.clear()
+        broker = Company.objects.create(
+            official_name='Broker AB', vat_number='SE11111111', email='broker@test.com', country='Sweden',
+            sector='broker'
+        )
+        self.seller = User.objects.create(username='facet_seller', email='facet_seller@test.com')
+        self.broker = User.objects.create(username='facet_broker', email='facet_broker@test.com', company=broker)
+        self.plastics = Category.objects.create(name='Plastics')
+        self.pet = SubCategory.objects.create(name='PET', category=self.plastics)
+        self.hdpe = SubCategory.objects.create(name='HDPE', category=self.plastics)
+        self.metals = Category.objects.create(name='Metals')
+        sweden = Location.objects.create(country='Sweden', city='Lund')
+        norway = Location.objects.create(country='Norway', city='Oslo')
+
+        self._ad(self.seller, self.plastics, self.pet, 'post_industrial', sweden)
+        self._ad(self.seller, self.plastics, self.pet, 'post_consumer', sweden)
+        self._ad(self.seller, self.plastics, self.hdpe, 'post_consumer', norway)
+        self._ad(self.broker, self.metals, None, 'post_industrial', norway)
+
+    def _ad(self, user, category, subcategory, origin, location):
+        return Ad.objects.create(
+            user=user, category=category, subcategory=subcategory, origin=origin, location=location
+        )
+
+    def _facets(self, **params):
+        response = self.client.get('/api/ads/facets/', {'complete': 'false', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _counts(self, data, facet):
+        return {row['value']: row['count'] for row in data['facets'][facet]}
+
+    def test_unfiltered_counts(self):
+        data = self._facets()
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(self._counts(data, 'category'), {self.plastics.id: 3, self.metals.id: 1})
+        self.assertEqual(self._counts(data, 'country'), {'Sweden': 2, 'Norway': 2})
+        self.assertEqual(self._counts(data, 'seller_type'), {'broker': 1, 'non_broker': 3})
+        labels = {row['value']: row['label'] for row in data['facets']['subcategory']}
+        self.assertEqual(labels[self.pet.id], 'PET')
+
+    def test_facet_ignores_its_own_selection(self):
+        """Selecting PET narrows other facets but keeps HDPE's count"""
+        data = self._facets(subcategory=str(self.pet.id))
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(self._counts(data, 'subcategory'), {self.pet.id: 2, self.hdpe.id: 1})
+        self.assertEqual(self._counts(data, 'origin'), {'post_industrial': 1, 'post_consumer': 1})
+        self.assertEqual(self._counts(data, 'country'), {'Sweden': 2})
+
+    def test_total_matches_the_list(self):
+        params = {'origin': 'post_consumer', 'exclude_brokers': 'true', 'country': 'norway'}
+        data = self._facets(**params)
+        listed = self.client.get('/api/ads/', {'complete': 'false', **params}).data['count']
+        self.assertEqual(data['total'], listed)
+        self.assertEqual(data['total'], 1)
+
+    def test_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            self._facets(origin='post_consumer,post_industrial', only_brokers='true')
+        with self.assertNumQueries(0):
+            # Same filters in a different order hit the same cache entry
+            self._facets(only_brokers='true', origin='post_industrial,post_consumer')
+
+    def test_status_change_invalidates(self):
+        self._facets(complete='true')
+        ad = Ad.objects.filter(user=self.seller).first()
+        ad.status = 'suspended'
+        ad.save()
+        with self.assertNumQueries(1):
+            self._facets(complete='true')
+
+    def test_bulk_listing_write_invalidates(self):
+        """A bulk is_listed update recomputes facets, though it sends no post_save"""
+        from ads.listing import refresh_listed_ads
+
+        self._facets(complete='true')
+        Company.objects.filter(sector='broker').update(payment_ready=True)
+        Ad.objects.filter(user=self.broker).update(is_complete=True, status='active')
+        refresh_listed_ads(Ad.objects.all())
+        with self.assertNumQueries(1):
+            data = self._facets(complete='true')
+        self.assertEqual(data['total'], 1)
+
+    def test_company_sector_change_invalidates(self):
+        self.assertEqual(self._counts(self._facets(), 'seller_type'), {'broker': 1, 'non_broker': 3})
+        broker = Company.objects.get(sector='broker')
+        broker.sector = 'manufacturing  & Production'
+        broker.save()
+        self.assertEqual(self._counts(self._facets(), 'seller_type'), {'non_broker': 4})
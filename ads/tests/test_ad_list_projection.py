@@ -0,0 +1,87 @@
+"""
+Tests for the projected (.values()) rendering path of AdListSerializer
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from ads.models import Ad, Location
+from ads.serializer import AdListSerializer, project_ad_list
+from bids.models import AdBidSummary
+from category.models import Category, SubCategory
+from users.models import User
+
+
+class AdListProjectionTest(APITestCase):
+    """The dict fast path must render exactly what the model path renders"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='projection_seller', email='projection_seller@test.com')
+        plastics = Category.objects.create(name='Plastics')
+        pet = SubCategory.objects.create(name='PET', category=plastics)
+        lund = Location.objects.create(country='Sweden', city='Lund')
+        now = timezone.now()
+
+        full = Ad.objects.create(
+            user=self.user, title='PET bales', category=plastics, subcategory=pet, location=lund,
+            available_quantity=Decimal('120'), starting_bid_price=Decimal('85'), currency='SEK',
+            material_image='https://cdn.example.com/pet.jpg', status='active', is_complete=True,
+            material_image_variants={
+                'source': 'https://cdn.example.com/pet.jpg',
+                'thumb': {'webp': 'https://cdn.example.com/pet_thumb.webp'},
+            },
+            auction_start_date=now, auction_end_date=now + timedelta(days=3, hours=5),
+        )
+        AdBidSummary.objects.create(ad=full, highest_bid_price=97, bid_count=2)
+        Ad.objects.create(user=self.user, title='Bare draft')
+        Ad.objects.create(
+            user=self.user, title='Ending soon', category=plastics, starting_bid_price=Decimal('10'),
+            auction_end_date=now + timedelta(minutes=42),
+        )
+        Ad.objects.create(user=self.user, title='Expired', auction_end_date=now - timedelta(days=1))
+
+    def test_projection_matches_model_path(self):
+        models_qs = Ad.objects.select_related(
+            'category', 'subcategory', 'location', 'bid_summary'
+        ).order_by('id')
+        expected = AdListSerializer(models_qs, many=True).data
+        projected = AdListSerializer(project_ad_list(Ad.objects.order_by('id')), many=True).data
+
+        # time_remaining is computed against "now", so compare it loosely
+        for row in list(expected) + list(projected):
+            if row['time_remaining']:
+                row['time_remaining'] = row['time_remaining'].split(',')[0]
+        self.assertEqual([dict(row) for row in projected], [dict(row) for row in expected])
+        self.assertEqual(list(projected[0].keys()), AdListSerializer.Meta.fields)
+        self.assertEqual(projected[0]['highest_bid_price'], 97.0)
+        self.assertEqual(projected[0]['location_summary'], 'Lund, Sweden')
+        self.assertEqual(projected[0]['material_image_thumb'], 'https://cdn.example.com/pet_thumb.webp')
+
+    def test_list_endpoint_runs_one_query_per_page(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/ads/', {'complete': 'false', 'cursor': '', 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        # The expired ad is filtered out of the marketplace list
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'ads_ad' in q['sql']]), 1)
+
+    def test_search_results_are_projected(self):
+        response = self.client.get('/api/ads/', {'complete': 'false', 'search': 'bales'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['title'] for row in response.data['results']], ['PET bales'])
+        self.assertNotIn('search_rank', response.data['results'][0])
+
+    def test_decimal_formatters_belong_to_each_serializer(self):
+        """Each list render uses its own child's fields, not ones cached from an earlier instance"""
+        first = AdListSerializer(project_ad_list(Ad.objects.all()), many=True)
+        second = AdListSerializer(project_ad_list(Ad.objects.all()), many=True)
+        first.data
+        formatters = second.get_decimal_formatters()
+        self.assertIs(formatters[0].__self__, second.child.fields['available_quantity'])
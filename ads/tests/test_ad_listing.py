@@ -0,0 +1,147 @@
+"""
+Tests for the denormalized Ad.is_listed marketplace flag
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from ads.auction_services.auction_scheduler import AuctionScheduler
+from ads.listing import delist_ended_ads, listed_filter
+from ads.models import Ad, Location
+from category.models import Category, SubCategory
+from company.models import Company
+from users.models import User
+
+
+class ListingFixtureMixin:
+
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(
+            official_name='Listing AB', vat_number='SE22222222', email='listing@test.com', country='Sweden',
+            payment_ready=True, last_payment_check=timezone.now(),
+        )
+        self.seller = User.objects.create(username='listing_seller', email='listing_seller@test.com',
+                                          company=self.company)
+        metals = Category.objects.create(name='Metals')
+        self.complete_fields = {
+            'category': metals,
+            'subcategory': SubCategory.objects.create(name='Copper', category=metals),
+            'packaging': 'baled',
+            'material_frequency': 'one_time',
+            'location': Location.objects.create(country='Sweden', city='Lund'),
+            'delivery_options': ['pickup_only'],
+            'available_quantity': Decimal('10'),
+            'starting_bid_price': Decimal('100'),
+            'currency': 'SEK',
+        }
+
+    def _ad(self, complete=True, **fields):
+        """An ad, by default with every field its category needs to be complete"""
+        fields = {'user': self.seller, 'title': 'Copper wire', 'status': 'active',
+                  **(self.complete_fields if complete else {}), **fields}
+        return Ad.objects.create(**fields)
+
+    def _assert_flags_match_rule(self):
+        expected = set(Ad.objects.filter(listed_filter()).values_list('id', flat=True))
+        self.assertEqual(set(Ad.objects.filter(is_listed=True).values_list('id', flat=True)), expected)
+
+
+class AdIsListedTest(ListingFixtureMixin, TestCase):
+    """is_listed follows the ad, its company and its end date"""
+
+    def test_save_sets_flag(self):
+        listed = self._ad()
+        draft = self._ad(status='draft')
+        incomplete = self._ad(complete=False)
+        self.assertTrue(listed.is_listed)
+        self.assertFalse(draft.is_listed)
+        self.assertFalse(incomplete.is_listed)
+
+        listed.status = 'suspended'
+        listed.save(update_fields=['status'])
+        listed.refresh_from_db()
+        self.assertFalse(listed.is_listed)
+        self._assert_flags_match_rule()
+
+    def test_unrelated_edit_does_not_load_the_seller(self):
+        """Saving fields that can't affect listing skips the user and company lookups"""
+        ad = Ad.objects.get(id=self._ad().id)
+        ad.currency = 'EUR'
+        with CaptureQueriesContext(connection) as ctx:
+            ad.save()
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('users_user', tables)
+        self.assertNotIn('company_company', tables)
+        self.assertTrue(Ad.objects.get(id=ad.id).is_listed)
+
+    def test_payment_ready_flip_updates_company_ads(self):
+        ads = [self._ad(), self._ad(), self._ad(status='draft')]
+
+        self.company.payment_ready = False
+        self.company.save(update_fields=['payment_ready'])
+        self.assertFalse(Ad.objects.filter(is_listed=True).exists())
+
+        self.company.payment_ready = True
+        self.company.save()
+        self.assertEqual(
+            set(Ad.objects.filter(is_listed=True).values_list('id', flat=True)), {ads[0].id, ads[1].id}
+        )
+        self._assert_flags_match_rule()
+
+    def test_ended_auctions_are_delisted(self):
+        ad = self._ad()
+        Ad.objects.filter(id=ad.id).update(auction_end_date=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(delist_ended_ads(), 1)
+        self.assertFalse(Ad.objects.get(id=ad.id).is_listed)
+        self._assert_flags_match_rule()
+
+    def test_scheduler_delists_before_closing(self):
+        ad = self._ad()
+        Ad.objects.filter(id=ad.id).update(auction_end_date=timezone.now() + timedelta(seconds=1))
+        scheduler = AuctionScheduler()
+        scheduler.load()
+        scheduler._close = lambda ad_id: None
+
+        scheduler.close_due(now=timezone.now() + timedelta(seconds=2))
+        self.assertFalse(Ad.objects.get(id=ad.id).is_listed)
+
+    def test_listing_query_uses_partial_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN output checked on SQLite only')
+        queryset = Ad.objects.filter(is_listed=True).order_by('-created_at')[:20]
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('ads_ad_listed_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AdListVisibilityTest(ListingFixtureMixin, APITestCase):
+    """Marketplace endpoints show exactly the listed ads"""
+
+    def test_list_and_recent_show_listed_ads_only(self):
+        listed = self._ad(title='Listed')
+        self._ad(title='Draft', status='draft')
+        other = Company.objects.create(
+            official_name='Unready AB', vat_number='SE33333333', email='unready@test.com', country='Sweden',
+            payment_ready=True, last_payment_check=timezone.now(),
+        )
+        unready = User.objects.create(username='unready_seller', email='unready@test.com', company=other)
+        self._ad(title='Unready', user=unready)
+        other.payment_ready = False
+        other.save()
+
+        response = self.client.get('/api/ads/')
+        self.assertEqual([row['id'] for row in response.data['results']], [listed.id])
+        response = self.client.get('/api/ads/recent/')
+        self.assertEqual([row['id'] for row in response.data['results']], [listed.id])
@@ -0,0 +1,95 @@
+"""
+Tests for full-text ad search
+"""
+
+from django.db import connection
+from django.test import TestCase
+
+from ads.models import Ad
+from ads.repository import AdRepository
+from ads.search import restore_search_triggers
+from category.models import Category, SubCategory
+from company.models import Company
+from users.models import User
+
+
+class AdSearchTest(TestCase):
+    """Test the maintained search document, prefix matching and ranking"""
+
+    def setUp(self):
+        company = Company.objects.create(
+            official_name='Skåne Metall AB', vat_number='SE99999999', email='metall@test.com', country='Sweden'
+        )
+        self.user = User.objects.create(username='search_seller', email='search_seller@test.com', company=company)
+        metals = Category.objects.create(name='Metals')
+        aluminium = SubCategory.objects.create(name='Aluminium', category=metals)
+        plastics = Category.objects.create(name='Plastics')
+
+        self.title_match = self._ad(title='Aluminium offcuts', category=metals)
+        self.body_match = self._ad(title='Mixed scrap', category=metals, subcategory=aluminium,
+                                   description='Mostly aluminium with some steel')
+        self.other = self._ad(title='PET flakes', category=plastics, keywords='bottles, clear')
+
+    def _ad(self, **fields):
+        ad = Ad.objects.create(user=self.user, **fields)
+        Ad.objects.filter(pk=ad.pk).update(status='active', is_complete=True)
+        return ad
+
+    def _search(self, term):
+        return AdRepository().search_ads(term).data
+
+    def test_document_is_built_on_save(self):
+        """Category, subcategory, company and text fields are indexed"""
+        self.body_match.refresh_from_db()
+        for text in ('Metals', 'Aluminium', 'Skåne Metall AB', 'steel'):
+            self.assertIn(text, self.body_match.search_document)
+
+    def test_prefix_match_ranked_by_title(self):
+        """Prefixes match and a title hit ranks above a description hit"""
+        self.assertEqual(self._search('alumin'), [self.title_match, self.body_match])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self._search('clear bott'), [self.other])
+        self.assertEqual(self._search('clear steel'), [])
+
+    def test_company_name_without_diacritics(self):
+        self.assertEqual(len(self._search('skane')), 3)
+
+    def test_updates_and_deletes_reach_the_index(self):
+        """Saving an ad re-indexes it; deleting it removes it"""
+        self.other.title = 'Copper wire'
+        self.other.save(update_fields=['title'])
+        self.assertEqual(self._search('copper'), [self.other])
+        self.assertEqual(self._search('pet'), [])
+
+        self.title_match.delete()
+        self.assertEqual(self._search('offcuts'), [])
+
+    def test_blank_or_symbol_only_search(self):
+        self.assertEqual(self._search('  %%  '), [])
+
+    def test_triggers_are_restored_after_table_rebuild(self):
+        """SQLite drops triggers with ads_ad on schema changes; post_migrate puts them back"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite specific')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER ads_ad_search_update')
+        restore_search_triggers(using=connection.alias)
+
+        self.other.title = 'Copper wire'
+        self.other.save(update_fields=['title'])
+        self.assertEqual(self._search('copper'), [self.other])
+
+    def test_admin_search(self):
+        """Admin search uses the index and still matches usernames"""
+        data = AdRepository().get_admin_ads_filtered(search='offcut').data
+        self.assertEqual([ad.id for ad in data['results']], [self.title_match.id])
+        data = AdRepository().get_admin_ads_filtered(search='search_sell').data
+        self.assertEqual(len(data['results']), 3)
+
+    def test_marketplace_list_search(self):
+        """?search= on the ad list returns ranked matches"""
+        response = self.client.get('/api/ads/', {'complete': 'false', 'search': 'alumin'})
+        self.assertEqual(
+            [row['id'] for row in response.data['results']], [self.title_match.id, self.body_match.id]
+        )
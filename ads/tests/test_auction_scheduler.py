@@ -0,0 +1,98 @@
+"""
+Tests for AuctionScheduler and the run_auction_scheduler command
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ads.auction_services.auction_scheduler import AuctionScheduler
+from ads.models import Ad, Location
+from category.models import Category, SubCategory
+from users.models import User
+
+
+class AuctionSchedulerTest(TestCase):
+    """Test the deadline heap and its incremental refresh"""
+
+    def setUp(self):
+        self.seller = User.objects.create(username='scheduler_seller', email='scheduler_seller@test.com')
+        self.category = Category.objects.create(name='Scheduler category')
+        self.subcategory = SubCategory.objects.create(name='Scheduler subcategory', category=self.category)
+        self.location = Location.objects.create(country='Sweden', city='Uppsala')
+
+    def _create_auction(self, title, ends_in):
+        ad = Ad.objects.create(
+            user=self.seller,
+            category=self.category,
+            subcategory=self.subcategory,
+            packaging='baled',
+            material_frequency='monthly',
+            location=self.location,
+            delivery_options=['pickup_only'],
+            title=title,
+            available_quantity=Decimal('100'),
+            starting_bid_price=Decimal('10'),
+            currency='EUR',
+        )
+        Ad.objects.filter(pk=ad.pk).update(
+            status='active',
+            auction_start_date=timezone.now() - timedelta(days=1),
+            auction_end_date=timezone.now() + ends_in,
+        )
+        ad.refresh_from_db()
+        return ad
+
+    def test_closes_due_auctions_without_grace_period(self):
+        """An auction one second past its end date is closed and its lag recorded"""
+        due = self._create_auction('Due', ends_in=timedelta(seconds=-1))
+        later = self._create_auction('Later', ends_in=timedelta(hours=1))
+        scheduler = AuctionScheduler()
+        scheduler.load()
+
+        results = scheduler.close_due()
+
+        self.assertEqual([r['auction_id'] for r in results], [due.id])
+        self.assertEqual(Ad.objects.get(pk=due.pk).status, 'completed')
+        self.assertEqual(Ad.objects.get(pk=later.pk).status, 'active')
+        self.assertEqual(scheduler.next_deadline(), later.auction_end_date)
+        self.assertEqual(scheduler.metrics.snapshot()['closed'], 1)
+
+    def test_refresh_picks_up_changed_end_dates(self):
+        """Saving an ad with a new end date reschedules it on the next poll"""
+        ad = self._create_auction('Extended', ends_in=timedelta(seconds=-1))
+        scheduler = AuctionScheduler()
+        scheduler.load()
+
+        ad.auction_end_date = timezone.now() + timedelta(hours=2)
+        ad.save()
+        scheduler.refresh()
+
+        self.assertEqual(scheduler.close_due(), [])
+        self.assertEqual(scheduler.next_deadline(), ad.auction_end_date)
+
+    def test_refresh_drops_auctions_that_are_no_longer_open(self):
+        """Suspended ads leave the heap"""
+        ad = self._create_auction('Suspended', ends_in=timedelta(minutes=5))
+        scheduler = AuctionScheduler()
+        scheduler.load()
+
+        ad.status = 'suspended'
+        ad.save()
+        scheduler.refresh()
+
+        self.assertEqual(len(scheduler), 0)
+        self.assertIsNone(scheduler.next_deadline())
+
+    def test_run_once_reports_lag_metrics(self):
+        """--once closes what is due and prints the lag summary"""
+        self._create_auction('Due', ends_in=timedelta(seconds=-2))
+        out = StringIO()
+        call_command('run_auction_scheduler', '--once', stdout=out)
+
+        self.assertIn('closed=1', out.getvalue())
+        self.assertIn('p95_lag=', out.getvalue())
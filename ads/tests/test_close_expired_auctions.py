@@ -0,0 +1,109 @@
+"""
+Tests for the close_expired_auctions management command
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from ads.auction_services.auction_completion import AuctionCompletionService
+from ads.models import Ad, Location
+from bids.models import Bid
+from category.models import Category, SubCategory
+from users.models import User
+
+
+class CloseExpiredAuctionsCommandTest(TestCase):
+    """Test claiming and closing expired auctions"""
+
+    def setUp(self):
+        self.seller = User.objects.create(username='closing_seller', email='closing_seller@test.com')
+        self.bidder = User.objects.create(username='closing_bidder', email='closing_bidder@test.com')
+        self.category = Category.objects.create(name='Closing category')
+        self.subcategory = SubCategory.objects.create(name='Closing subcategory', category=self.category)
+        self.location = Location.objects.create(country='Sweden', city='Malmö')
+        self.expired = [self._create_auction(f'Expired {i}', minutes_ago=30) for i in range(4)]
+        self.running = self._create_auction('Running', minutes_ago=-60)
+
+    def _create_auction(self, title, minutes_ago):
+        ad = Ad.objects.create(
+            user=self.seller,
+            category=self.category,
+            subcategory=self.subcategory,
+            packaging='baled',
+            material_frequency='monthly',
+            location=self.location,
+            delivery_options=['pickup_only'],
+            title=title,
+            available_quantity=Decimal('100'),
+            starting_bid_price=Decimal('10'),
+            currency='EUR',
+        )
+        Ad.objects.filter(pk=ad.pk).update(
+            status='active',
+            auction_start_date=timezone.now() - timedelta(days=7),
+            auction_end_date=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+        return ad
+
+    def test_get_expired_auctions_filters_on_status(self):
+        """Expired active auctions are found instead of failing on is_active"""
+        expired = AuctionCompletionService().get_expired_auctions(grace_period_minutes=5)
+        self.assertEqual({ad.id for ad in expired}, {ad.id for ad in self.expired})
+
+    def test_claim_respects_shard_and_exclusions(self):
+        """A shard only claims its own ids and skips auctions already attempted"""
+        service = AuctionCompletionService()
+        ids = {ad.id for ad in self.expired}
+        shard_ids = {ad.id for ad in service.claim_expired_auctions(shard=(0, 2))}
+        self.assertEqual(shard_ids, {ad_id for ad_id in ids if ad_id % 2 == 0})
+
+        first = self.expired[0].id
+        claimed = service.claim_expired_auctions(exclude_ids=[first])
+        self.assertNotIn(first, {ad.id for ad in claimed})
+
+    def test_command_closes_each_expired_auction_once(self):
+        """Every expired auction is completed and the summary reports throughput"""
+        Bid.objects.create(ad=self.expired[0], user=self.bidder, bid_price_per_unit=20, volume_requested=5, status='winning')
+        out = StringIO()
+        call_command('close_expired_auctions', '--batch-size', '3', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Total processed: 4', output)
+        self.assertIn('Throughput:', output)
+        self.assertIn('p95 per auction:', output)
+        self.assertEqual(Ad.objects.filter(status='completed').count(), 4)
+        self.assertEqual(Ad.objects.get(pk=self.running.pk).status, 'active')
+        self.assertEqual(Bid.objects.get(ad=self.expired[0]).status, 'won')
+
+    def test_failed_auction_does_not_roll_back_the_batch(self):
+        """Each auction closes in its own transaction, so earlier closures in a batch stay committed"""
+        close = AuctionCompletionService.close_auction_with_notifications
+        failing_id = self.expired[1].id
+
+        def close_or_fail(service, auction):
+            if auction.id == failing_id:
+                raise RuntimeError('capture failed')
+            return close(service, auction)
+
+        out = StringIO()
+        with mock.patch.object(AuctionCompletionService, 'close_auction_with_notifications', close_or_fail):
+            call_command('close_expired_auctions', '--batch-size', '4', stdout=out)
+
+        self.assertIn('Failed: 1', out.getvalue())
+        self.assertEqual(Ad.objects.get(pk=failing_id).status, 'active')
+        self.assertEqual(
+            set(Ad.objects.filter(status='completed').values_list('id', flat=True)),
+            {ad.id for ad in self.expired if ad.id != failing_id}
+        )
+
+    def test_invalid_shard_is_rejected(self):
+        """Shard specs must be i/N with 0 <= i < N"""
+        with self.assertRaises(CommandError):
+            call_command('close_expired_auctions', '--shard', '3/3', stdout=StringIO())
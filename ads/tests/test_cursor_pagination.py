@@ -0,0 +1,78 @@
+"""
+Tests for keyset (?cursor=) pagination on ad lists
+"""
+
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from ads.models import Ad
+from users.models import User
+
+
+class AdCursorPaginationTest(APITestCase):
+    """Test cursor mode on AdListView and UserAdsView"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='cursor_seller', email='cursor_seller@test.com')
+        Ad.objects.bulk_create([Ad(user=self.user, title=f'Ad {i}') for i in range(25)])
+        # Identical timestamps force the id tie-breaker to do its job
+        Ad.objects.filter(id__in=Ad.objects.order_by('id').values('id')[:10]).update(created_at=timezone.now())
+
+    def _walk(self, url, params=None):
+        params = dict(params or {}, cursor='', page_size=10)
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return seen, response
+            response = self.client.get(response.data['next'])
+
+    def test_walks_every_ad_once_in_keyset_order(self):
+        """Following next links visits every ad once, newest first"""
+        seen, last = self._walk('/api/ads/', {'complete': 'false'})
+        expected = list(Ad.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertIsNone(last.data['count'])
+        self.assertIsNone(last.data['total_pages'])
+
+    def test_user_ads_cursor_mode(self):
+        """UserAdsView supports the same cursor mode"""
+        self.client.force_authenticate(self.user)
+        seen, _ = self._walk('/api/ads/user/')
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_user_ads_cursor_keeps_updated_order(self):
+        """Cursor pages list the user's ads most recently updated first, like page mode"""
+        oldest = Ad.objects.order_by('updated_at', 'id').first()
+        oldest.title = 'Edited'
+        oldest.save()
+        self.client.force_authenticate(self.user)
+
+        seen, _ = self._walk('/api/ads/user/')
+        pages = self.client.get('/api/ads/user/', {'page_size': 25})
+        self.assertEqual(seen[0], oldest.id)
+        self.assertEqual(seen, [row['id'] for row in pages.data['results']])
+
+    def test_count_only_when_requested(self):
+        """No COUNT(*) runs unless with_count is sent"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/ads/', {'complete': 'false', 'cursor': ''})
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+        response = self.client.get('/api/ads/', {'complete': 'false', 'cursor': '', 'with_count': 'true'})
+        self.assertEqual(response.data['count'], 25)
+
+    def test_page_number_mode_is_unchanged(self):
+        """Without ?cursor= the page-number envelope is returned"""
+        response = self.client.get('/api/ads/', {'complete': 'false', 'page_size': 10})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(response.data['total_pages'], 3)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/ads/', {'complete': 'false', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
@@ -1,6 +1,6 @@
 from django.urls import path
 from ads.views import (
-    AdStepView, AdDetailView, AdListView, RecentAdListView,
+    AdStepView, AdDetailView, AdListView, AdFacetsView, RecentAdListView,
     UserAdsView, UserAdsCountView, AdStepValidationView, AdActivateView, AdDeactivateView,
     AdminAuctionListView, AdminAuctionDetailView,
     AdminAddressListView, AdminAddressDetailView, AdminAddressVerifyView,
@@ -32,6 +32,7 @@ urlpatterns = [
     
     # List ads with filtering
     path("", AdListView.as_view(), name="list-ads"),
+    path("facets/", AdFacetsView.as_view(), name="ad-facets"),
     
     # User's ads
     path("user/", UserAdsView.as_view(), name="user-ads"),
@@ -1,7 +1,7 @@
 """
 Utility functions for ads app
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from django.db.models import Q
 
 
@@ -115,3 +115,77 @@ def build_multiple_choice_filter(field_name: str, values: List[str]) -> Optional
         # Multiple values - use __in lookup
         return Q(**{f"{field_name}__in": values})
 
+
+
+def normalize_ad_list_params(query_params) -> Dict[str, Any]:
+    """
+    Parse the marketplace list filters (AdListView query parameters) into a
+    canonical dict, so equivalent requests produce the same value.
+
+    Examples:
+        normalize_ad_list_params({'origin': 'b,a', 'country': ' Sweden'})
+        -> {..., 'origin': ['a', 'b'], 'country': 'sweden', ...}
+    """
+    from .search import search_terms
+
+    try:
+        category_id = int(query_params.get('category'))
+    except (TypeError, ValueError):
+        category_id = None  # Skip invalid category_id
+
+    return {
+        'complete': str(query_params.get('complete', 'true')).lower() == 'true',
+        'category': category_id,
+        'subcategory': sorted(set(parse_multiple_ids(query_params.get('subcategory')))),
+        'origin': sorted(set(parse_multiple_values(query_params.get('origin')))),
+        'contamination': sorted(set(parse_multiple_values(query_params.get('contamination')))),
+        'country': (query_params.get('country') or '').strip().lower(),
+        'city': (query_params.get('city') or '').strip().lower(),
+        'exclude_brokers': str(query_params.get('exclude_brokers', 'false')).lower() == 'true',
+        'only_brokers': str(query_params.get('only_brokers', 'false')).lower() == 'true',
+        'search': ' '.join(search_terms(query_params.get('search'))),
+    }
+
+
+def build_ad_list_filters(params: Dict[str, Any]) -> Tuple[Q, Dict[str, Q]]:
+    """
+    Build the marketplace list filters from normalize_ad_list_params() output.
+
+    Returns:
+        (base, facets): base holds the filters that are not facets; facets
+        maps each selected facet (category, subcategory, origin,
+        contamination, country, seller_type) to its Q. The list applies all
+        of them; facet counts need them apart. params['search'] is left to
+        the caller (ranked on the list, a plain match for facets).
+    """
+    from .listing import not_ended_filter
+
+    base = Q()
+    if params['complete']:
+        # Complete, active and from a payment-ready company (see ads/listing.py)
+        base &= Q(is_listed=True)
+
+    # Exclude expired auctions: only those that haven't ended yet or have no end date
+    base &= not_ended_filter()
+
+    if params['city']:
+        base &= Q(location__city__icontains=params['city'])
+
+    facets = {}
+    if params['category'] is not None:
+        facets['category'] = Q(category_id=params['category'])
+    subcategory_filter = build_subcategory_filter(params['subcategory'])
+    if subcategory_filter:
+        facets['subcategory'] = subcategory_filter
+    for field_name in ('origin', 'contamination'):
+        choice_filter = build_multiple_choice_filter(field_name, params[field_name])
+        if choice_filter:
+            facets[field_name] = choice_filter
+    if params['country']:
+        facets['country'] = Q(location__country__icontains=params['country'])
+    if params['exclude_brokers']:
+        facets['seller_type'] = ~Q(user__company__sector='broker')
+    elif params['only_brokers']:
+        facets['seller_type'] = Q(user__company__sector='broker')
+
+    return base, facets
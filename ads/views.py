@@ -14,6 +14,8 @@ from company.payment_utils import requires_payment_ready_company
 from ads.repository import AdRepository
 from ads.services import AdService
 from ads.models import Ad
+from ads.listing import not_ended_filter
+from ads.search import ranked_search
 from .serializer import (
     AdCreateSerializer, AdStep1Serializer, AdStep2Serializer, AdStep3Serializer,
     AdStep4Serializer, AdStep5Serializer, AdStep6Serializer, AdStep7Serializer,
@@ -22,16 +24,16 @@ from .serializer import (
     AdminAddressListSerializer, AdminAddressDetailSerializer,
     AdminSubscriptionListSerializer, AdminSubscriptionDetailSerializer,
     UserSubscriptionSerializer, UpdateUserSubscriptionSerializer, CreateSubscriptionSerializer,
-    UserAddressSerializer, CreateAddressSerializer, UpdateAddressSerializer
+    UserAddressSerializer, CreateAddressSerializer, UpdateAddressSerializer,
+    project_ad_list
 )
 from users.models import User
 from base.utils.pagination import StandardResultsSetPagination
+from base.utils.response_cache import cache_response
 from base.services.logging import LoggingService
 from payments.subscription_service import StripeSubscriptionService
-from .utils import (
-    parse_multiple_ids, build_subcategory_filter,
-    parse_multiple_values, build_multiple_choice_filter
-)
+from .facets import get_ad_facets
+from .utils import build_ad_list_filters, normalize_ad_list_params
 
 ad_repository = AdRepository()
 ad_service = AdService(ad_repository)
@@ -335,73 +337,33 @@ class AdListView(ListAPIView):
     """List ads with optional filtering and pagination"""
     serializer_class = AdListSerializer
     pagination_class = StandardResultsSetPagination
-    
+
+    @cache_response(models=('ads.Ad', 'bids.Bid', 'bids.AdBidSummary', 'category.Category',
+                            'category.SubCategory', 'company.Company'))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         """Get filtered queryset based on query parameters"""
-        query = Q()
-        
-        # Get query parameters for filtering
-        category_id = self.request.query_params.get('category')
-        subcategory_param = self.request.query_params.get('subcategory')
-        origin_param = self.request.query_params.get('origin')
-        contamination_param = self.request.query_params.get('contamination')
-        location_country = self.request.query_params.get('country')
-        location_city = self.request.query_params.get('city')
-        only_complete = self.request.query_params.get('complete', 'true').lower() == 'true'
-        exclude_brokers = self.request.query_params.get('exclude_brokers', 'false').lower() == 'true'
-        only_brokers = self.request.query_params.get('only_brokers', 'false').lower() == 'true'
+        params = normalize_ad_list_params(self.request.query_params)
+        base, facets = build_ad_list_filters(params)
 
-        if only_complete:
-            query &= Q(is_complete=True, status='active')
-            # Only show ads from companies with completed payment setup
-            query &= Q(user__company__payment_ready=True)
-            
-        # Exclude expired auctions from marketplace view
-        # Only show auctions that haven't ended yet or don't have an end date set
-        from django.utils import timezone
-        now = timezone.now()
-        query &= (Q(auction_end_date__isnull=True) | Q(auction_end_date__gt=now))
-        
-        # Apply filters using utility functions
-        if category_id:
-            try:
-                query &= Q(category_id=int(category_id))
-            except ValueError:
-                pass  # Skip invalid category_id
-                
-        # Handle multiple subcategories
-        subcategory_ids = parse_multiple_ids(subcategory_param)
-        subcategory_filter = build_subcategory_filter(subcategory_ids)
-        if subcategory_filter:
-            query &= subcategory_filter
-            
-        # Handle multiple origins
-        origins = parse_multiple_values(origin_param)
-        origin_filter = build_multiple_choice_filter('origin', origins)
-        if origin_filter:
-            query &= origin_filter
-            
-        # Handle multiple contamination levels
-        contaminations = parse_multiple_values(contamination_param)
-        contamination_filter = build_multiple_choice_filter('contamination', contaminations)
-        if contamination_filter:
-            query &= contamination_filter
-            
-        # Location filters (keep existing logic)
-        if location_country:
-            query &= Q(location__country__icontains=location_country)
-        if location_city:
-            query &= Q(location__city__icontains=location_city)
+        queryset = Ad.objects.filter(base, *facets.values()).order_by('-created_at')
+
+        # Full-text search, best matches first (cursor mode keeps its own ordering)
+        if params['search']:
+            queryset = ranked_search(queryset, params['search'])
+
+        return project_ad_list(queryset)
 
-        # Broker filtering (keep existing logic)
-        if exclude_brokers:
-            query &= ~Q(user__company__sector='broker')
-        elif only_brokers:
-            query &= Q(user__company__sector='broker')
 
-        return Ad.objects.filter(query).select_related(
-            'category', 'subcategory', 'location', 'user', 'user__company'
-        ).order_by('-created_at')
+class AdFacetsView(APIView):
+    """Result counts per filter option for the marketplace ad list"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        """Takes the same query parameters as the ad list"""
+        return Response(get_ad_facets(request.query_params), status=status.HTTP_200_OK)
 
 
 class RecentAdListView(ListAPIView):
@@ -409,20 +371,16 @@ class RecentAdListView(ListAPIView):
     serializer_class = AdListSerializer
     permission_classes = [AllowAny]
 
+    @cache_response(models=('ads.Ad', 'bids.Bid', 'bids.AdBidSummary', 'category.Category',
+                            'category.SubCategory', 'company.Company'))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
-        from django.utils import timezone
-        now = timezone.now()
         # Active & complete, payment ready company, not expired
-        return (
-            Ad.objects.filter(
-                is_complete=True,
-                status='active',
-                user__company__payment_ready=True
-            )
-            .filter(Q(auction_end_date__isnull=True) | Q(auction_end_date__gt=now))
-            .select_related('category', 'subcategory', 'location', 'user', 'user__company')
-            .order_by('-created_at')[:8]
-        )
+        return project_ad_list(
+            Ad.objects.filter(not_ended_filter(), is_listed=True).order_by('-created_at')
+        )[:8]
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -433,10 +391,15 @@ class RecentAdListView(ListAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class UserAdsPagination(StandardResultsSetPagination):
+    """Cursor mode follows the view's most-recently-updated-first order"""
+    cursor_fields = ('updated_at', 'id')
+
+
 class UserAdsView(ListAPIView):
     """List current user's ads with pagination"""
     serializer_class = AdListSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = UserAdsPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -447,9 +410,7 @@ class UserAdsView(ListAPIView):
         if only_complete:
             query &= Q(is_complete=True)
 
-        return Ad.objects.filter(query).select_related(
-            'category', 'subcategory', 'location'
-        ).order_by('-updated_at')
+        return project_ad_list(Ad.objects.filter(query).order_by('-updated_at', '-id'))
 
 
 class UserAdsCountView(APIView):
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'base'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from base.services.image_upload_queue import enqueue_staged_uploads
+        from base.utils.response_cache import connect_version_signals
+        connect_version_signals()
+        post_save.connect(enqueue_staged_uploads, dispatch_uid='enqueue_staged_image_uploads')
@@ -2,6 +2,8 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
 from base.services.hybrid_storage_service import hybrid_storage_service
+from base.services.image_upload_queue import image_upload_queue
+from base.services.image_variant_service import image_variant_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,12 +14,17 @@ class FirebaseImageField(models.URLField):
     Custom Django field for storing image URLs with Firebase/Local hybrid storage.
     Tries Firebase first, falls back to local storage if Firebase fails.
     Maintains URL compatibility by using BACKEND_URL for local images.
+    With ASYNC_IMAGE_UPLOADS the cloud upload happens in the background
+    (see base/services/image_upload_queue.py).
+    variants_field names a JSONField on the same model that records WebP/JPEG
+    renditions of each upload (see base/services/image_variant_service.py).
     """
     
     description = "A field for storing image URLs with Firebase/Local hybrid storage"
     
-    def __init__(self, folder="images", max_length=500, **kwargs):
+    def __init__(self, folder="images", max_length=500, variants_field=None, **kwargs):
         self.folder = folder
+        self.variants_field = variants_field
         kwargs['max_length'] = max_length
         super().__init__(**kwargs)
     
@@ -25,6 +32,8 @@ class FirebaseImageField(models.URLField):
         name, path, args, kwargs = super().deconstruct()
         if self.folder != "images":
             kwargs['folder'] = self.folder
+        if self.variants_field:
+            kwargs['variants_field'] = self.variants_field
         return name, path, args, kwargs
     
     def pre_save(self, model_instance, add):
@@ -38,6 +47,13 @@ class FirebaseImageField(models.URLField):
             try:
                 # Get user ID if available
                 user_id = getattr(model_instance, 'user_id', None) or getattr(model_instance, 'user', {}).get('id', None)
+
+                # Stage locally and let the upload worker move it to cloud storage
+                if image_upload_queue.enabled:
+                    staged = image_upload_queue.stage(file, self.attname, folder=self.folder, user_id=user_id)
+                    model_instance.__dict__.setdefault('_staged_image_uploads', {})[self.attname] = staged
+                    setattr(model_instance, self.attname, staged.provisional_url)
+                    return staged.provisional_url
                 
                 # Upload using hybrid storage (Firebase first, local fallback)
                 success, message, image_url = hybrid_storage_service.upload_image(
@@ -49,6 +65,11 @@ class FirebaseImageField(models.URLField):
                 if success and image_url:
                     # Set the image URL as the field value
                     setattr(model_instance, self.attname, image_url)
+                    if self.variants_field:
+                        file.seek(0)
+                        setattr(model_instance, self.variants_field, image_variant_service.create_variants(
+                            file.read(), image_url, file.name, folder=self.folder, user_id=user_id
+                        ))
                     return image_url
                 else:
                     logger.error(f"Failed to upload image: {message}")
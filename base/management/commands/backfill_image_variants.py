@@ -0,0 +1,157 @@
+"""
+Django management command to create WebP/JPEG variants for existing images.
+
+New uploads get their variants from the upload worker; this covers images
+uploaded before variants existed, or whose variants failed. Every
+FirebaseImageField with a variants_field is scanned for rows whose recorded
+variants don't belong to the current image. Images are downloaded (or read
+from MEDIA_ROOT), rendered a batch at a time in the variant process pool,
+uploaded, and recorded with a conditional UPDATE so an image replaced in the
+meantime is left alone.
+
+Usage:
+    python manage.py backfill_image_variants
+    python manage.py backfill_image_variants --batch-size 100 --max 1000
+    python manage.py backfill_image_variants --dry-run
+"""
+
+import logging
+import os
+
+import requests
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from base.fields import FirebaseImageField
+from base.models import PendingImageUpload
+from base.services.hybrid_storage_service import hybrid_storage_service
+from base.services.image_variant_service import image_variant_service
+from base.utils.image_variants import iter_variant_urls
+from base.utils.response_cache import bump_model_version
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Create WebP/JPEG variants for images that do not have current ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Images rendered together (default: 50)')
+        parser.add_argument('--max', type=int, default=None, help='Max total images to process')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the images missing variants')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        remaining = options['max']
+
+        for model, field in self._collect_targets():
+            label = f'{model._meta.label}.{field.name}'
+            created = failed = 0
+            for batch in self._missing(model, field, batch_size):
+                if remaining is not None:
+                    batch = batch[:remaining]
+                if options['dry_run']:
+                    created += len(batch)
+                else:
+                    batch_created, batch_failed = self._process_batch(model, field, batch)
+                    created += batch_created
+                    failed += batch_failed
+                    self.stdout.write(f'{label}: {created} created, {failed} failed')
+                if remaining is not None:
+                    remaining -= len(batch)
+                    if remaining <= 0:
+                        break
+
+            if options['dry_run']:
+                self.stdout.write(f'DRY RUN: {label} has {created} images without variants')
+            else:
+                if created:
+                    bump_model_version(model._meta.label)
+                self.stdout.write(self.style.SUCCESS(f'{label}: {created} created, {failed} failed'))
+            if remaining is not None and remaining <= 0:
+                break
+
+    def _collect_targets(self):
+        return [
+            (model, field)
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, FirebaseImageField) and field.variants_field
+        ]
+
+    def _missing(self, model, field, batch_size):
+        """Batches of (pk, url, user_id) whose variants don't match the current image"""
+        has_user = any(f.name == 'user' for f in model._meta.concrete_fields)
+        columns = ['pk', field.attname, field.variants_field] + (['user_id'] if has_user else [])
+        rows = (
+            model._base_manager.exclude(**{f'{field.attname}__isnull': True})
+            .exclude(**{field.attname: ''})
+            .order_by('pk')
+            .values_list(*columns)
+        )
+        batch = []
+        for row in rows.iterator(chunk_size=500):
+            pk, url, variants = row[:3]
+            if (variants or {}).get('source') == url:
+                continue
+            batch.append((pk, url, row[3] if has_user else None))
+            if len(batch) == batch_size:
+                yield self._skip_pending(batch)
+                batch = []
+        if batch:
+            yield self._skip_pending(batch)
+
+    def _skip_pending(self, batch):
+        """Staged images still waiting for upload get their variants from the worker"""
+        pending = set(PendingImageUpload.objects.filter(
+            status='pending', provisional_url__in=[url for _, url, _ in batch]
+        ).values_list('provisional_url', flat=True))
+        return [item for item in batch if item[1] not in pending]
+
+    def _process_batch(self, model, field, batch):
+        downloaded = []
+        failed = 0
+        for pk, url, user_id in batch:
+            try:
+                downloaded.append((pk, url, user_id, self._fetch(url)))
+            except Exception as e:
+                failed += 1
+                logger.warning(f'Could not fetch {url}: {e}')
+
+        created = 0
+        renders = image_variant_service.render_many(data for _, _, _, data in downloaded)
+        for (pk, url, user_id, _), renditions in zip(downloaded, renders):
+            if isinstance(renditions, Exception):
+                failed += 1
+                logger.warning(f'Could not render {url}: {renditions}')
+                continue
+            try:
+                variants = image_variant_service.store(
+                    renditions, url, os.path.basename(url.split('?', 1)[0]), field.folder, user_id
+                )
+            except Exception as e:
+                failed += 1
+                logger.warning(f'Could not upload variants of {url}: {e}')
+                continue
+
+            recorded = model._base_manager.filter(pk=pk, **{field.attname: url}).update(
+                **{field.variants_field: variants}
+            )
+            if recorded:
+                created += 1
+            else:
+                # The image was replaced while rendering
+                for variant in iter_variant_urls(variants):
+                    hybrid_storage_service.delete_image(variant)
+        return created, failed
+
+    def _fetch(self, url):
+        local_path = hybrid_storage_service._extract_local_path(url)
+        if local_path:
+            with open(os.path.join(hybrid_storage_service.media_root, local_path), 'rb') as image_file:
+                return image_file.read()
+        response = requests.get(url, timeout=20)
+        response.raise_for_status()
+        return response.content
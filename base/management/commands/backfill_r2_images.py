@@ -1,132 +1,265 @@
-import io
+"""
+Backfill existing Firebase image URLs into R2 storage and record the mapping.
+
+Downloads and uploads run on a bounded thread pool (--concurrency) sharing
+one pooled HTTP session; the database is only touched from the main thread.
+URLs already migrated are loaded into a set up front, and results are
+checkpointed to ImageMigrationRecord every --batch-size images, so a restart
+after a crash or Ctrl-C resumes where the last checkpoint left off.
+
+Usage:
+    python manage.py backfill_r2_images --concurrency 16
+    python manage.py backfill_r2_images --max 1000 --verify
+    python manage.py backfill_r2_images --dry-run
+"""
+
 import hashlib
-from typing import List
-from django.core.management.base import BaseCommand
+import io
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import List, Optional
+
+import requests
 from django.apps import apps
 from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from base.fields import FirebaseImageField
 from base.models import ImageMigrationRecord
 from base.services.r2_storage_service import r2_storage_service
-from base.services.firebase_service import firebase_storage_service
-import logging
-import requests
 
 logger = logging.getLogger(__name__)
 
-IMAGE_FIELD_CLASS = 'base.fields.FirebaseImageField'
+DONE_STATUSES = ['migrated', 'verified']
+
+
+@dataclass
+class MigrationItem:
+    firebase_url: str
+    object_model: str
+    object_id: str
+    field_name: str
+
+    @property
+    def key(self):
+        return (self.firebase_url, self.object_model, self.object_id, self.field_name)
+
+
+@dataclass
+class MigrationResult:
+    item: MigrationItem
+    status: str
+    r2_url: Optional[str] = None
+    checksum: str = ''
+    size_bytes: Optional[int] = None
+    error: str = ''
+
 
 class Command(BaseCommand):
     help = "Backfill existing Firebase image URLs into R2 storage and record migration mapping"
 
     def add_arguments(self, parser):
         parser.add_argument('--dry-run', action='store_true', help='Do not upload, just list pending images')
-        parser.add_argument('--batch-size', type=int, default=200, help='Process this many records per batch')
+        parser.add_argument('--batch-size', type=int, default=200, help='Checkpoint results every this many images')
         parser.add_argument('--max', type=int, default=None, help='Max total records to process')
         parser.add_argument('--verify', action='store_true', help='After upload, verify size match')
+        parser.add_argument('--concurrency', type=int, default=8, help='Images downloaded and uploaded in parallel')
 
     def handle(self, *args, **options):
         if not getattr(settings, 'CLOUDFLARE_R2_BUCKET', ''):
             self.stderr.write(self.style.ERROR('R2 not configured. Aborting.'))
             return
-        dry_run = options['dry_run']
-        batch_size = options['batch_size']
-        max_total = options['max']
-        verify = options['verify']
+        if options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--concurrency and --batch-size must be at least 1')
 
         self.stdout.write(self.style.NOTICE('Scanning models for FirebaseImageField usage...'))
-        targets = self._collect_targets()
-        total = 0
-        for model, field in targets:
-            qs = model.objects.exclude(**{f"{field.name}__isnull": True}).exclude(**{field.name: ''})
-            for obj in qs.iterator():
-                firebase_url = getattr(obj, field.name)
-                if not firebase_url or 'firebasestorage.googleapis.com' not in firebase_url:
-                    continue
-                # Skip if already migrated
-                if ImageMigrationRecord.objects.filter(original_firebase_url=firebase_url, status__in=['migrated','verified']).exists():
-                    continue
-                if max_total and total >= max_total:
-                    break
-                total += 1
-                if dry_run:
-                    self.stdout.write(f"DRY RUN: Would migrate {firebase_url}")
-                    self._ensure_record(firebase_url, model, obj, field)
-                    continue
-                try:
-                    success, r2_url = self._migrate(firebase_url, model, obj, field, verify)
-                    if success:
-                        self.stdout.write(self.style.SUCCESS(f"Migrated -> {r2_url}"))
-                    else:
-                        self.stdout.write(self.style.WARNING(f"Migration failed for {firebase_url}"))
-                except Exception as e:
-                    logger.exception("Unexpected error during migration")
-                    rec = self._ensure_record(firebase_url, model, obj, field)
-                    rec.status = 'failed'
-                    rec.last_error = str(e)
-                    rec.attempts += 1
-                    rec.save()
-            if max_total and total >= max_total:
-                break
-        self.stdout.write(self.style.SUCCESS(f"Processed {total} records."))
+        migrated_urls = set(
+            ImageMigrationRecord.objects.filter(status__in=DONE_STATUSES).order_by()
+            .values_list('original_firebase_url', flat=True)
+        )
+        # (url, model, id, field) -> (record pk, attempts) for records written by earlier runs
+        self.records = {
+            (url, model, object_id, field): (pk, attempts)
+            for pk, url, model, object_id, field, attempts in ImageMigrationRecord.objects.order_by().values_list(
+                'pk', 'original_firebase_url', 'object_model', 'object_id', 'field_name', 'attempts'
+            )
+        }
+        items = self._collect_items(migrated_urls, options['max'])
+        self.stdout.write(f'{len(items)} images to migrate, {len(migrated_urls)} already migrated')
+
+        if options['dry_run']:
+            for item in items:
+                self.stdout.write(f"DRY RUN: Would migrate {item.firebase_url}")
+            self._checkpoint([MigrationResult(item, 'pending') for item in items])
+            self.stdout.write(self.style.SUCCESS(f"Processed {len(items)} records."))
+            return
+
+        self._run(items, options)
 
     def _collect_targets(self) -> List:
-        targets = []
-        for model in apps.get_models():
-            for field in model._meta.get_fields():
-                if hasattr(field, 'get_internal_type') and field.get_internal_type() == 'URLField':
-                    # heuristic: check class path
-                    if field.__class__.__module__.startswith('base.fields'):
-                        targets.append((model, field))
-        return targets
-
-    def _ensure_record(self, firebase_url, model, obj, field):
-        rec, _ = ImageMigrationRecord.objects.get_or_create(
-            original_firebase_url=firebase_url,
-            object_model=model._meta.label,
-            object_id=str(obj.pk),
-            field_name=field.name,
-            defaults={'status': 'pending'}
+        # URLField reports its internal type as CharField, so match the class itself
+        return [
+            (model, field)
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, FirebaseImageField)
+        ]
+
+    def _collect_items(self, migrated_urls, max_total) -> List[MigrationItem]:
+        """One item per URL still to migrate; objects sharing a URL share its upload"""
+        items = []
+        seen = set(migrated_urls)
+        for model, field in self._collect_targets():
+            rows = (
+                model.objects.exclude(**{f"{field.name}__isnull": True}).exclude(**{field.name: ''})
+                .filter(**{f"{field.name}__contains": 'firebasestorage.googleapis.com'})
+                .order_by('pk').values_list('pk', field.name)
+            )
+            for pk, firebase_url in rows.iterator():
+                if firebase_url in seen:
+                    continue
+                seen.add(firebase_url)
+                items.append(MigrationItem(firebase_url, model._meta.label, str(pk), field.name))
+                if max_total and len(items) >= max_total:
+                    return items
+        return items
+
+    def _run(self, items, options):
+        session = self._build_session(options['concurrency'])
+        batch_size = options['batch_size']
+        pending_results = []
+        counts = {'migrated': 0, 'verified': 0, 'failed': 0}
+        bytes_done = 0
+        started = time.monotonic()
+        queue = iter(items)
+
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                # Keep a bounded window of work in flight instead of queueing every item
+                in_flight = set()
+                while True:
+                    while len(in_flight) < options['concurrency'] * 2:
+                        item = next(queue, None)
+                        if item is None:
+                            break
+                        in_flight.add(executor.submit(self._migrate, session, item, options['verify']))
+                    if not in_flight:
+                        break
+
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        result = future.result()
+                        counts[result.status] += 1
+                        bytes_done += result.size_bytes or 0
+                        pending_results.append(result)
+                        if result.status == 'failed':
+                            self.stdout.write(self.style.WARNING(
+                                f"Migration failed for {result.item.firebase_url}: {result.error}"
+                            ))
+
+                    if len(pending_results) >= batch_size:
+                        self._checkpoint(pending_results)
+                        pending_results = []
+                        self._report_progress(counts, bytes_done, len(items), started)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Interrupted; saving progress before exiting'))
+            raise
+        finally:
+            # Whatever finished is recorded, so the next run resumes after it
+            self._checkpoint(pending_results)
+
+        self._report_progress(counts, bytes_done, len(items), started)
+        self.stdout.write(self.style.SUCCESS(f"Processed {sum(counts.values())} records."))
+
+    def _build_session(self, concurrency):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=concurrency,
+            pool_maxsize=concurrency,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
         )
-        return rec
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
 
-    def _migrate(self, firebase_url, model, obj, field, verify):
-        rec = self._ensure_record(firebase_url, model, obj, field)
-        rec.attempts += 1
+    def _migrate(self, session, item, verify) -> MigrationResult:
+        """Download one image and upload it to R2; runs on a worker thread, no database access"""
         try:
             # Download image bytes
-            resp = requests.get(firebase_url, timeout=20)
+            resp = session.get(item.firebase_url, timeout=20)
             if resp.status_code != 200:
-                rec.status = 'failed'
-                rec.last_error = f"HTTP {resp.status_code}"
-                rec.save()
-                return False, None
+                return MigrationResult(item, 'failed', error=f"HTTP {resp.status_code}")
             data = resp.content
-            checksum = hashlib.sha256(data).hexdigest()
-            rec.checksum = checksum
-            rec.size_bytes = len(data)
-            # Upload to R2 using same relative path logic (no user id context here, treat as raw)
+
             # Use folder 'backfill' to avoid collisions; or parse from URL later if needed.
             file_like = io.BytesIO(data)
             file_like.name = 'migrated_image'
             success, msg, r2_url = r2_storage_service.upload_image(file_like, folder='backfill', user_id=None)
             if not success:
-                rec.status = 'failed'
-                rec.last_error = msg
-                rec.save()
-                return False, None
-            rec.r2_url = r2_url
+                return MigrationResult(item, 'failed', error=msg)
+
+            status = 'migrated'
             if verify:
                 # HEAD R2 metadata
                 meta = r2_storage_service.get_image_metadata(r2_url)
                 if meta and meta.get('size') == len(data):
-                    rec.status = 'verified'
-                else:
-                    rec.status = 'migrated'
-            else:
-                rec.status = 'migrated'
-            rec.save()
-            return True, r2_url
+                    status = 'verified'
+            return MigrationResult(
+                item, status, r2_url=r2_url, checksum=hashlib.sha256(data).hexdigest(), size_bytes=len(data)
+            )
         except Exception as e:
-            rec.status = 'failed'
-            rec.last_error = str(e)
-            rec.save()
-            return False, None
+            logger.exception("Unexpected error during migration")
+            return MigrationResult(item, 'failed', error=str(e))
+
+    def _checkpoint(self, results: List[MigrationResult]):
+        """Write a batch of results: one bulk_create and one bulk_update"""
+        if not results:
+            return
+        now = timezone.now()
+        attempt = 0 if results[0].status == 'pending' else 1
+        new_records, updated_records = [], []
+        for result in results:
+            fields = {
+                'status': result.status,
+                'r2_url': result.r2_url,
+                'checksum': result.checksum,
+                'size_bytes': result.size_bytes,
+                'last_error': result.error,
+                'updated_at': now,
+            }
+            existing = self.records.get(result.item.key)
+            if existing is None:
+                new_records.append(ImageMigrationRecord(
+                    original_firebase_url=result.item.firebase_url,
+                    object_model=result.item.object_model,
+                    object_id=result.item.object_id,
+                    field_name=result.item.field_name,
+                    attempts=attempt,
+                    **fields,
+                ))
+            elif result.status != 'pending':
+                pk, attempts = existing
+                updated_records.append(ImageMigrationRecord(pk=pk, attempts=attempts + attempt, **fields))
+
+        with transaction.atomic():
+            ImageMigrationRecord.objects.bulk_create(new_records)
+            ImageMigrationRecord.objects.bulk_update(
+                updated_records,
+                ['status', 'r2_url', 'checksum', 'size_bytes', 'last_error', 'updated_at', 'attempts'],
+            )
+
+    def _report_progress(self, counts, bytes_done, total, started):
+        done = sum(counts.values())
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = done / elapsed
+        eta = (total - done) / rate if rate else 0
+        self.stdout.write(
+            f"{done}/{total} images ({counts['failed']} failed) | {rate:.1f} img/s, "
+            f"{bytes_done / elapsed / (1024 * 1024):.1f} MB/s | ETA {eta / 60:.1f} min"
+        )
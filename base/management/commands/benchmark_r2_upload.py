@@ -0,0 +1,171 @@
+"""
+Django management command to benchmark worker memory while uploading to R2.
+
+Writes a batch of large random files to a temp directory and uploads them
+through a boto3 client with the shared R2 client config, pointed at a local
+S3-compatible sink that discards what it receives (no R2 credentials or
+network needed). Each upload path runs in its own process, so neither
+inherits memory the other left with the allocator, and RSS is sampled every
+5 ms:
+
+- streaming: R2StorageService.upload_image (upload_fileobj + TransferConfig)
+- buffered: image_file.read() passed to put_object, as uploads used to do
+
+Multipart uploads spread part buffers over threads; run with
+MALLOC_ARENA_MAX=2 (as the Dockerfile sets) to match production.
+
+Usage:
+    python manage.py benchmark_r2_upload
+    python manage.py benchmark_r2_upload --files 20 --size-mb 10
+    python manage.py benchmark_r2_upload --size-mb 64  # Multipart uploads
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import boto3
+from django.core.files.uploadedfile import UploadedFile
+from django.core.management.base import BaseCommand
+
+from base.services.r2_storage_service import MB, R2StorageService, build_client_config
+
+BUCKET = 'benchmark'
+PATHS = ('streaming', 'buffered')
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    """Accepts PutObject and multipart uploads, discarding the bodies"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        self._drain()
+        self._respond(b'', {'ETag': '"sink"'})
+
+    def do_POST(self):
+        self._drain()
+        if 'uploads' in self.path.split('?', 1)[-1].split('&'):
+            body = b'<InitiateMultipartUploadResult><UploadId>sink</UploadId></InitiateMultipartUploadResult>'
+        else:
+            body = b'<CompleteMultipartUploadResult><ETag>"sink"</ETag></CompleteMultipartUploadResult>'
+        self._respond(body)
+
+    def _drain(self):
+        remaining = int(self.headers.get('Content-Length', 0))
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, MB)))
+
+    def _respond(self, body, headers=None):
+        self.send_response(200)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RSSSampler(threading.Thread):
+    """Tracks peak resident memory of this process"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = self.baseline = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(0.005):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.peak - self.baseline
+
+
+def current_rss():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark peak worker memory for streaming vs buffered R2 uploads (local sink, no credentials)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=12, help='Files uploaded per run (default: 12)')
+        parser.add_argument('--size-mb', type=int, default=10, help='Size of each file (default: 10, the image limit)')
+        parser.add_argument('--mode', choices=PATHS, help='Run one path in this process (used internally)')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            return self._run_mode(options)
+
+        self.stdout.write(f"{options['files']} files of {options['size_mb']} MB")
+        for mode in PATHS:
+            output = subprocess.run(
+                [sys.executable, sys.argv[0], 'benchmark_r2_upload', '--mode', mode,
+                 '--files', str(options['files']), '--size-mb', str(options['size_mb'])],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            self.stdout.write(output.rstrip())
+
+    def _run_mode(self, options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SinkHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        workdir = tempfile.mkdtemp()
+        try:
+            client = boto3.client(
+                's3',
+                endpoint_url=f'http://127.0.0.1:{server.server_port}',
+                aws_access_key_id='benchmark',
+                aws_secret_access_key='benchmark',
+                region_name='auto',
+                config=build_client_config(),
+            )
+            service = R2StorageService()
+            service._client, service._bucket = client, BUCKET
+
+            paths = self._write_files(workdir, options['files'], options['size_mb'])
+            if options['mode'] == 'streaming':
+                self._run('streaming', paths, lambda image_file: service.upload_image(image_file, folder='benchmark'))
+            else:
+                self._run('buffered', paths, lambda image_file: client.put_object(
+                    Bucket=BUCKET, Key=image_file.name, Body=image_file.read(), ContentType=image_file.content_type
+                ))
+        finally:
+            server.shutdown()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _write_files(self, workdir, count, size_mb):
+        paths = []
+        for i in range(count):
+            path = os.path.join(workdir, f'image_{i}.jpg')
+            with open(path, 'wb') as image_file:
+                for _ in range(size_mb):
+                    image_file.write(os.urandom(MB))
+            paths.append(path)
+        return paths
+
+    def _run(self, name, paths, upload):
+        sampler = RSSSampler()
+        sampler.start()
+        started = time.perf_counter()
+        after_each = []
+        for path in paths:
+            with open(path, 'rb') as handle:
+                upload(UploadedFile(
+                    file=handle, name=os.path.basename(path), content_type='image/jpeg', size=os.path.getsize(path)
+                ))
+            after_each.append((current_rss() - sampler.baseline) / MB)
+        elapsed = time.perf_counter() - started
+        peak = sampler.stop() / MB
+
+        growth = ' '.join(f'{value:.0f}' for value in after_each)
+        self.stdout.write(f'  {name:<10} peak +{peak:6.1f} MB   {elapsed:5.2f}s   RSS growth after each file (MB): {growth}')
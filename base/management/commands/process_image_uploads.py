@@ -0,0 +1,84 @@
+"""
+Django management command that pushes staged images to R2/Firebase.
+
+This is the drain command for PendingImageUpload rows (see
+base/utils/work_queue.py): it handles uploads no worker thread has taken,
+retries whose backoff has elapsed and uploads left behind by a process that
+stopped. Several workers, and the worker threads, can run at once.
+
+Usage:
+    python manage.py process_image_uploads
+    python manage.py process_image_uploads --poll-interval 10 --batch-size 100
+    python manage.py process_image_uploads --once  # Process what is due and exit
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from base.models import PendingImageUpload
+from base.services.image_upload_queue import image_upload_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Upload staged images to cloud storage and swap their URLs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds between polls when nothing is due (default: 5.0)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Uploads processed per poll (default: 50)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process uploads that are already due and exit',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        batch_size = options['batch_size']
+        if poll_interval <= 0 or batch_size < 1:
+            raise CommandError('--poll-interval must be greater than zero and --batch-size at least 1')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Image upload worker started with {self._backlog()} uploads pending'
+        ))
+        try:
+            while True:
+                close_old_connections()
+                results = image_upload_queue.process_due(batch_size)
+                for result in results:
+                    self._report(result)
+                if options['once'] and len(results) < batch_size:
+                    break
+                if len(results) < batch_size:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Image upload worker stopping')
+
+        self.stdout.write(f'{self._backlog()} uploads pending')
+
+    def _backlog(self):
+        return PendingImageUpload.objects.filter(status='pending').count()
+
+    def _report(self, result):
+        if result['success']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Upload {result["upload_id"]} {result["status"]}: {result["url"]}'
+            ))
+        else:
+            message = f'Upload {result["upload_id"]} {result["status"]}: {result["message"]}'
+            logger.warning(message)
+            self.stdout.write(self.style.ERROR(message))
@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-16 22:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageMigrationRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_firebase_url', models.URLField(db_index=True, max_length=500)),
+                ('original_local_path', models.CharField(blank=True, help_text='Relative path in MEDIA_ROOT for local source', max_length=500)),
+                ('r2_url', models.URLField(blank=True, db_index=True, max_length=500, null=True)),
+                ('object_model', models.CharField(help_text='Django model label e.g. ads.Ad', max_length=120)),
+                ('object_id', models.CharField(help_text='Primary key of referenced object (string for flexibility)', max_length=64)),
+                ('field_name', models.CharField(help_text='Field name storing the URL', max_length=120)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('migrated', 'Migrated'), ('failed', 'Failed'), ('verified', 'Verified')], default='pending', max_length=32)),
+                ('checksum', models.CharField(blank=True, help_text='Optional content hash for integrity', max_length=64)),
+                ('size_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='base_imagem_status_cce49f_idx'), models.Index(fields=['object_model', 'field_name'], name='base_imagem_object__c59bfc_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PendingImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_model', models.CharField(help_text='Django model label e.g. ads.Ad', max_length=120)),
+                ('object_id', models.CharField(help_text='Primary key of referenced object (string for flexibility)', max_length=64)),
+                ('field_name', models.CharField(help_text='Field name storing the URL', max_length=120)),
+                ('folder', models.CharField(max_length=120)),
+                ('user_id', models.IntegerField(blank=True, help_text='Owner used to organise the cloud path', null=True)),
+                ('local_path', models.CharField(help_text='Relative path of the staged file in MEDIA_ROOT', max_length=500)),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('provisional_url', models.URLField(help_text='Local URL stored on the object until the upload lands', max_length=500)),
+                ('final_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('uploaded', 'Uploaded'), ('superseded', 'Superseded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not retried before this time; also the claim lease')),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='base_pendin_status_475a03_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,143 @@
+import copy
+
 from django.db import models
 from django.utils import timezone
 
+
+class FieldTrackerMixin:
+    """
+    Remembers field values as loaded from the database so saves and signal
+    receivers can tell what changed without re-fetching the row.
+
+    Mix in before models.Model and list the fields to watch in
+    tracked_fields (names or attnames; None tracks every concrete field).
+    The snapshot is taken in from_db() and reset after each save, so
+    post_save receivers still see the values from before the save.
+
+        class Bid(FieldTrackerMixin, models.Model):
+            tracked_fields = ('status',)
+
+        bid.has_changed('status'), bid.previous('status')
+
+    Instances that were never loaded from the database report every
+    tracked field as changed and have no previous values. The one exception
+    is an instance built by hand with an existing pk: its snapshot is read
+    from the database on first use.
+    """
+    tracked_fields = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            attname: copy.deepcopy(value)
+            for attname, value in zip(field_names, values)
+            if attname in cls._tracked_attnames()
+        }
+        return instance
+
+    @classmethod
+    def _tracked_attnames(cls):
+        if '_tracked_attnames_cache' not in cls.__dict__:
+            fields = cls._meta.concrete_fields
+            if cls.tracked_fields is not None:
+                fields = [cls._meta.get_field(name) for name in cls.tracked_fields]
+            cls._tracked_attnames_cache = frozenset(field.attname for field in fields)
+        return cls._tracked_attnames_cache
+
+    def _attname(self, field_name):
+        return self._meta.get_field(field_name).attname
+
+    def _snapshot(self):
+        if '_loaded_values' not in self.__dict__:
+            self._loaded_values = {}
+            if self.pk is not None and not self._state.adding:
+                row = type(self)._base_manager.using(self._state.db).filter(pk=self.pk).values(
+                    *self._tracked_attnames()
+                ).first()
+                self._loaded_values = row or {}
+        return self._loaded_values
+
+    def has_changed(self, field_name):
+        """Whether the field differs from its value when loaded (always True for new rows)"""
+        attname = self._attname(field_name)
+        snapshot = self._snapshot()
+        if attname not in snapshot:
+            # A deferred field that was never read cannot have been changed
+            return self._state.adding or attname not in self.get_deferred_fields()
+        return snapshot[attname] != getattr(self, attname)
+
+    def previous(self, field_name):
+        """The field's value when loaded, or None for new rows"""
+        return self._snapshot().get(self._attname(field_name))
+
+    def changed_fields(self):
+        return {attname for attname in self._tracked_attnames() if self.has_changed(attname)}
+
+    def _reset_snapshot(self, attnames):
+        snapshot = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            snapshot[attname] = copy.deepcopy(getattr(self, attname))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        attnames = self._tracked_attnames()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            attnames = attnames & {self._attname(name) for name in update_fields}
+        self._reset_snapshot(attnames)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        attnames = self._tracked_attnames()
+        if fields is not None:
+            attnames = attnames & {self._attname(name) for name in fields}
+        self._reset_snapshot(attnames)
+
+
+class PendingImageUpload(models.Model):
+    """
+    An image saved to local staging that still has to reach R2/Firebase.
+
+    FirebaseImageField stores the local URL on the object right away; the
+    upload worker (base/services/image_upload_queue.py) pushes the file to
+    cloud storage and swaps the URL once it is there.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('uploaded', 'Uploaded'),
+        ('superseded', 'Superseded'),
+        ('failed', 'Failed'),
+    ]
+
+    object_model = models.CharField(max_length=120, help_text="Django model label e.g. ads.Ad")
+    object_id = models.CharField(max_length=64, help_text="Primary key of referenced object (string for flexibility)")
+    field_name = models.CharField(max_length=120, help_text="Field name storing the URL")
+    folder = models.CharField(max_length=120)
+    user_id = models.IntegerField(blank=True, null=True, help_text="Owner used to organise the cloud path")
+    local_path = models.CharField(max_length=500, help_text="Relative path of the staged file in MEDIA_ROOT")
+    original_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    provisional_url = models.URLField(max_length=500, help_text="Local URL stored on the object until the upload lands")
+    final_url = models.URLField(max_length=500, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Not retried before this time; also the claim lease")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The worker polls due uploads in this order
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        ordering = ['next_attempt_at']
+
+    def __str__(self):
+        return f"PendingImageUpload({self.object_model}:{self.object_id} {self.field_name} {self.status})"
+
+
 class ImageMigrationRecord(models.Model):
     """Track migration from Firebase image URL to R2 URL for auditing and rollback."""
     original_firebase_url = models.URLField(max_length=500, db_index=True)
@@ -129,8 +129,8 @@ class FirebaseStorageService:
                 image_file.seek(0)  # Reset file pointer
                 blob.upload_from_file(image_file, content_type=image_file.content_type)
             else:
-                # Handle other file types
-                blob.upload_from_file(image_file)
+                # Handle other file types (staged uploads carry their content_type)
+                blob.upload_from_file(image_file, content_type=getattr(image_file, 'content_type', None))
             
             # Make blob publicly readable
             blob.make_public()
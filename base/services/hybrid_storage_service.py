@@ -47,57 +47,11 @@ class HybridImageStorageService:
             Tuple[bool, str, Optional[str]]: (success, message, download_url)
         """
         if not force_local:
-            dual_write = getattr(settings, 'DUAL_WRITE_R2', False) and getattr(settings, 'USE_R2', False)
-            r2_enabled = getattr(settings, 'USE_R2', False)
-            r2_result = None
-            firebase_result = None
-
-            # Attempt R2
-            if r2_enabled:
-                try:
-                    r2_success, r2_message, r2_url = r2_storage_service.upload_image(image_file, folder, user_id)
-                    r2_result = (r2_success, r2_message, r2_url)
-                except Exception as e:
-                    r2_result = (False, f"R2 exception: {e}", None)
-                    logger.warning(f"R2 upload error: {e}")
-
-            # If not dual-write and R2 succeeded, short-circuit
-            if r2_result and r2_result[0] and not dual_write:
-                logger.info(f"Successfully uploaded image to R2: {r2_result[2]}")
-                return True, "Image uploaded to R2 successfully", r2_result[2]
-
-            # Attempt Firebase (always if dual-write; else only if R2 disabled or failed)
-            if dual_write or not (r2_result and r2_result[0]):
-                try:
-                    fb_success, fb_message, fb_url = firebase_storage_service.upload_image(image_file, folder, user_id)
-                    firebase_result = (fb_success, fb_message, fb_url)
-                except Exception as e:
-                    firebase_result = (False, f"Firebase exception: {e}", None)
-                    logger.warning(f"Firebase upload error: {e}")
-
-            # Dual-write mapping record
-            if dual_write and firebase_result and firebase_result[0] and r2_result and r2_result[0]:
-                try:
-                    ImageMigrationRecord.objects.get_or_create(
-                        original_firebase_url=firebase_result[2],
-                        object_model='upload',  # will be refined when model context available
-                        object_id=str(user_id) if user_id else 'anonymous',
-                        field_name=folder,
-                        defaults={
-                            'r2_url': r2_result[2],
-                            'status': 'migrated'
-                        }
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to record dual-write mapping: {e}")
-
-            # Return priority: R2 success else Firebase success else local fallback
-            if r2_result and r2_result[0]:
-                return True, "Image uploaded to R2 successfully", r2_result[2]
-            if firebase_result and firebase_result[0]:
-                return True, "Image uploaded to Firebase successfully", firebase_result[2]
+            success, message, url = self.upload_to_cloud(image_file, folder, user_id)
+            if success:
+                return success, message, url
             # else fall through to local
-        
+
         # Fallback to local storage
         try:
             local_url = self._upload_to_local(image_file, folder, user_id)
@@ -108,12 +62,82 @@ class HybridImageStorageService:
             logger.error(f"Local storage upload failed: {str(e)}")
             return False, f"Upload failed: {str(e)}", None
     
+    def upload_to_cloud(self,
+                        image_file: Any,
+                        folder: str = "material_images",
+                        user_id: Optional[int] = None) -> Tuple[bool, str, Optional[str]]:
+        """
+        Upload image to R2 (if enabled) and/or Firebase, without the local fallback.
+
+        Returns:
+            Tuple[bool, str, Optional[str]]: (success, message, download_url)
+        """
+        dual_write = getattr(settings, 'DUAL_WRITE_R2', False) and getattr(settings, 'USE_R2', False)
+        r2_enabled = getattr(settings, 'USE_R2', False)
+        r2_result = None
+        firebase_result = None
+
+        # Attempt R2
+        if r2_enabled:
+            try:
+                r2_success, r2_message, r2_url = r2_storage_service.upload_image(image_file, folder, user_id)
+                r2_result = (r2_success, r2_message, r2_url)
+            except Exception as e:
+                r2_result = (False, f"R2 exception: {e}", None)
+                logger.warning(f"R2 upload error: {e}")
+
+        # If not dual-write and R2 succeeded, short-circuit
+        if r2_result and r2_result[0] and not dual_write:
+            logger.info(f"Successfully uploaded image to R2: {r2_result[2]}")
+            return True, "Image uploaded to R2 successfully", r2_result[2]
+
+        # Attempt Firebase (always if dual-write; else only if R2 disabled or failed)
+        if dual_write or not (r2_result and r2_result[0]):
+            try:
+                fb_success, fb_message, fb_url = firebase_storage_service.upload_image(image_file, folder, user_id)
+                firebase_result = (fb_success, fb_message, fb_url)
+            except Exception as e:
+                firebase_result = (False, f"Firebase exception: {e}", None)
+                logger.warning(f"Firebase upload error: {e}")
+
+        # Dual-write mapping record
+        if dual_write and firebase_result and firebase_result[0] and r2_result and r2_result[0]:
+            try:
+                ImageMigrationRecord.objects.get_or_create(
+                    original_firebase_url=firebase_result[2],
+                    object_model='upload',  # will be refined when model context available
+                    object_id=str(user_id) if user_id else 'anonymous',
+                    field_name=folder,
+                    defaults={
+                        'r2_url': r2_result[2],
+                        'status': 'migrated'
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"Failed to record dual-write mapping: {e}")
+
+        # Return priority: R2 success else Firebase success
+        if r2_result and r2_result[0]:
+            return True, "Image uploaded to R2 successfully", r2_result[2]
+        if firebase_result and firebase_result[0]:
+            return True, "Image uploaded to Firebase successfully", firebase_result[2]
+        messages = [result[1] for result in (r2_result, firebase_result) if result]
+        return False, "; ".join(messages) or "No cloud storage attempted", None
+
     def _upload_to_local(self, 
                         image_file: Any, 
                         folder: str,
                         user_id: Optional[int] = None) -> str:
         """Upload image to local storage and return URL"""
-        
+        _, local_url = self.save_local(image_file, folder, user_id)
+        return local_url
+
+    def save_local(self,
+                   image_file: Any,
+                   folder: str,
+                   user_id: Optional[int] = None) -> Tuple[str, str]:
+        """Write image under MEDIA_ROOT; returns (relative_path, url)"""
+
         # Generate unique filename
         filename = self._generate_filename(image_file.name, user_id)
         
@@ -146,12 +170,19 @@ class HybridImageStorageService:
         # Return full URL using backend URL
         local_url = f"{self.backend_url.rstrip('/')}{self.media_url}{relative_path}"
         
-        return local_url
+        return relative_path, local_url
     
     def delete_image(self, image_url: str) -> Tuple[bool, str]:
-        """Delete image from appropriate storage (Firebase or local)"""
+        """Delete image from appropriate storage (R2, Firebase or local)"""
         
-        if self._is_firebase_url(image_url):
+        if self._is_r2_url(image_url):
+            try:
+                return r2_storage_service.delete_image(image_url)
+            except Exception as e:
+                logger.error(f"Failed to delete R2 image: {str(e)}")
+                return False, f"R2 deletion failed: {str(e)}"
+
+        elif self._is_firebase_url(image_url):
             # Delete from Firebase
             try:
                 return firebase_storage_service.delete_image(image_url)
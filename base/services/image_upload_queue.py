@@ -0,0 +1,237 @@
+"""
+Background upload pipeline for FirebaseImageField.
+
+With ASYNC_IMAGE_UPLOADS on, saving an uploaded image only writes it to
+local staging under MEDIA_ROOT and stores the local URL on the object, so
+the request (and any transaction around it) never waits on R2 or Firebase.
+A PendingImageUpload row is queued when the object is saved. It is a work
+row as described in base/utils/work_queue.py, drained by
+process_image_uploads. Handling an upload:
+
+1. uploads the staged file with the usual R2/Firebase rules, minus the
+   local fallback;
+2. renders and uploads the WebP/JPEG variants when the field records them
+   (FirebaseImageField(variants_field=...));
+3. swaps the URL with a conditional UPDATE that only matches while the
+   object still holds the provisional URL, then removes the staged file.
+
+The local URL keeps serving the image until the swap, including after
+IMAGE_UPLOAD_MAX_ATTEMPTS failures.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from base.models import PendingImageUpload
+from base.services.hybrid_storage_service import hybrid_storage_service
+from base.services.image_variant_service import image_variant_service
+from base.services.logging import LoggingService
+from base.utils.image_variants import iter_variant_urls
+from base.utils.work_queue import backoff_delay, claim_lease, start_after_commit
+
+logger = logging.getLogger(__name__)
+logging_service = LoggingService()
+
+
+@dataclass
+class StagedImage:
+    """An uploaded image written to local staging, waiting for its object's pk"""
+    field_name: str
+    folder: str
+    user_id: Optional[int]
+    local_path: str
+    provisional_url: str
+    original_name: str
+    content_type: str
+
+
+class ImageUploadQueueService:
+    """Stages image uploads locally and moves them to cloud storage in the background"""
+
+    # How long a claimed upload is hidden from other workers
+    CLAIM_LEASE = timedelta(minutes=5)
+    RETRY_BASE_DELAY = timedelta(seconds=30)
+    RETRY_MAX_DELAY = timedelta(hours=1)
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'ASYNC_IMAGE_UPLOADS', False)
+
+    @property
+    def max_attempts(self) -> int:
+        return getattr(settings, 'IMAGE_UPLOAD_MAX_ATTEMPTS', 8)
+
+    def stage(self, image_file: Any, field_name: str, folder: str, user_id: Optional[int] = None) -> StagedImage:
+        """Write image_file to local staging; raises if the file can't be written"""
+        local_path, provisional_url = hybrid_storage_service.save_local(image_file, folder, user_id)
+        return StagedImage(
+            field_name=field_name,
+            folder=folder,
+            user_id=user_id,
+            local_path=local_path,
+            provisional_url=provisional_url,
+            original_name=os.path.basename(image_file.name or 'image.jpg'),
+            content_type=getattr(image_file, 'content_type', None) or '',
+        )
+
+    def enqueue(self, instance, staged_images: List[StagedImage]) -> List[PendingImageUpload]:
+        """Queue the staged images of a saved instance and start them once the transaction commits"""
+        uploads = PendingImageUpload.objects.bulk_create([
+            PendingImageUpload(
+                object_model=instance._meta.label,
+                object_id=str(instance.pk),
+                field_name=staged.field_name,
+                folder=staged.folder,
+                user_id=staged.user_id,
+                local_path=staged.local_path,
+                original_name=staged.original_name,
+                content_type=staged.content_type,
+                provisional_url=staged.provisional_url,
+            )
+            for staged in staged_images
+        ])
+        if getattr(settings, 'IMAGE_UPLOAD_WORKER_THREAD', True):
+            start_after_commit(self._process_all, [upload.id for upload in uploads])
+        return uploads
+
+    def process_due(self, batch_size: int = 50, now=None) -> List[Dict[str, Any]]:
+        """Process up to batch_size uploads whose next attempt is due"""
+        now = now or timezone.now()
+        due_ids = list(
+            PendingImageUpload.objects.filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        results = []
+        for upload_id in due_ids:
+            result = self.process(upload_id, now)
+            if result is not None:
+                results.append(result)
+        return results
+
+    def process(self, upload_id: int, now=None) -> Optional[Dict[str, Any]]:
+        """Claim and upload one staged image; None if another worker holds it or it isn't due"""
+        upload = self.claim(upload_id, now)
+        if upload is None:
+            return None
+
+        try:
+            success, message, final_url = self._upload(upload)
+        except Exception as e:
+            logging_service.log_error(e)
+            success, message, final_url = False, str(e), None
+
+        if not success:
+            return self._record_failure(upload, message)
+
+        try:
+            variant_values = self._create_variants(upload, final_url)
+        except Exception as e:
+            # The original is in the cloud already; swap it in and let
+            # backfill_image_variants add the variants later
+            logging_service.log_error(e)
+            variant_values = {}
+        return self._swap_url(upload, final_url, variant_values)
+
+    def claim(self, upload_id: int, now=None) -> Optional[PendingImageUpload]:
+        """Take the lease on a due upload, counting the attempt"""
+        return claim_lease(PendingImageUpload, upload_id, self.CLAIM_LEASE, now)
+
+    def _upload(self, upload: PendingImageUpload):
+        full_path = os.path.join(hybrid_storage_service.media_root, upload.local_path)
+        with open(full_path, 'rb') as staged_file:
+            image_file = UploadedFile(
+                file=staged_file,
+                name=upload.original_name or os.path.basename(full_path),
+                content_type=upload.content_type or None,
+                size=os.path.getsize(full_path),
+            )
+            return hybrid_storage_service.upload_to_cloud(image_file, upload.folder, upload.user_id)
+
+    def _create_variants(self, upload: PendingImageUpload, final_url: str) -> Dict[str, Any]:
+        """Variants of the staged image, keyed by the field that records them"""
+        field = apps.get_model(upload.object_model)._meta.get_field(upload.field_name)
+        variants_field = getattr(field, 'variants_field', None)
+        if not variants_field:
+            return {}
+        with open(os.path.join(hybrid_storage_service.media_root, upload.local_path), 'rb') as staged_file:
+            data = staged_file.read()
+        variants = image_variant_service.create_variants(
+            data, final_url, upload.original_name, upload.folder, upload.user_id
+        )
+        return {variants_field: variants} if variants else {}
+
+    def _swap_url(self, upload: PendingImageUpload, final_url: str,
+                  variant_values: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Point the object at final_url, unless it no longer holds the provisional URL"""
+        model = apps.get_model(upload.object_model)
+        variant_values = variant_values or {}
+        with transaction.atomic():
+            swapped = model._base_manager.filter(
+                pk=upload.object_id, **{upload.field_name: upload.provisional_url}
+            ).update(**{upload.field_name: final_url}, **variant_values)
+            upload.final_url = final_url
+            upload.status = 'uploaded' if swapped else 'superseded'
+            upload.last_error = ''
+            upload.save(update_fields=['final_url', 'status', 'last_error', 'updated_at'])
+
+        if swapped:
+            # The update bypasses post_save, so expire cached responses that embed the URL
+            from base.utils.response_cache import bump_model_version
+            bump_model_version(upload.object_model)
+        else:
+            # The image was replaced or the object deleted while uploading
+            hybrid_storage_service.delete_image(final_url)
+            for variants in variant_values.values():
+                for url in iter_variant_urls(variants):
+                    hybrid_storage_service.delete_image(url)
+        self._remove_staged_file(upload)
+
+        logger.info(f"Image upload {upload.id} {upload.status}: {final_url}")
+        return {'success': True, 'upload_id': upload.id, 'status': upload.status, 'url': final_url}
+
+    def _record_failure(self, upload: PendingImageUpload, message: str) -> Dict[str, Any]:
+        upload.last_error = message
+        if upload.attempts >= self.max_attempts:
+            # Give up; the object keeps serving the staged local copy
+            upload.status = 'failed'
+        else:
+            upload.next_attempt_at = timezone.now() + backoff_delay(
+                upload.attempts, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY
+            )
+        upload.save(update_fields=['last_error', 'status', 'next_attempt_at', 'updated_at'])
+
+        logger.warning(f"Image upload {upload.id} attempt {upload.attempts} failed: {message}")
+        return {'success': False, 'upload_id': upload.id, 'status': upload.status, 'message': message}
+
+    def _remove_staged_file(self, upload: PendingImageUpload):
+        try:
+            os.remove(os.path.join(hybrid_storage_service.media_root, upload.local_path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove staged image {upload.local_path}: {e}")
+
+    def _process_all(self, upload_ids: List[int]):
+        for upload_id in upload_ids:
+            self.process(upload_id)
+
+
+def enqueue_staged_uploads(sender, instance, **kwargs):
+    """post_save receiver: queue images FirebaseImageField staged during this save"""
+    staged_images = instance.__dict__.pop('_staged_image_uploads', None)
+    if staged_images:
+        image_upload_queue.enqueue(instance, list(staged_images.values()))
+
+
+# Singleton instance
+image_upload_queue = ImageUploadQueueService()
@@ -0,0 +1,130 @@
+"""
+Generate and store WebP/JPEG renditions of uploaded images.
+
+Decoding and resizing a 10 MB upload is CPU bound, so renders run in a
+process pool (IMAGE_VARIANT_WORKERS processes, started lazily with spawn so
+no Django state or open connections are copied into them). With
+IMAGE_VARIANT_WORKERS = 0 they run inline.
+
+Renditions are uploaded with the same cloud-first rules as the original and
+described by a dict recorded in the field named by
+FirebaseImageField(variants_field=...); see base/utils/image_variants.py.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from base.services.hybrid_storage_service import hybrid_storage_service
+from base.utils.image_variants import VARIANT_FORMATS, render_variants
+
+logger = logging.getLogger(__name__)
+
+
+class ImageVariantService:
+    """Renders image variants in a process pool and uploads them"""
+
+    # Seconds to wait for one render before giving up on it
+    RENDER_TIMEOUT = 60
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        return getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+
+    def render(self, data: bytes) -> Dict[str, Dict[str, bytes]]:
+        """Encoded renditions of one image; raises if it can't be decoded"""
+        result = self.render_many([data])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def render_many(self, images: Iterable[bytes]) -> List[Any]:
+        """
+        Render several images at once, spreading them over the pool.
+
+        Returns one entry per image, in order: its renditions, or the
+        exception that stopped it.
+        """
+        images = list(images)
+        executor = self._get_executor()
+        if executor is None:
+            return [self._render_inline(data) for data in images]
+
+        futures = [executor.submit(render_variants, data) for data in images]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=self.RENDER_TIMEOUT))
+            except BrokenProcessPool as e:
+                # A worker died (e.g. out of memory); start a fresh pool next time
+                self._reset_executor()
+                results.append(e)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def store(self, renditions: Dict[str, Dict[str, bytes]], source_url: str, original_name: str,
+              folder: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Upload renditions next to source_url; returns the variants dict to record"""
+        stem = os.path.splitext(os.path.basename(original_name or 'image'))[0] or 'image'
+        variants = {'source': source_url}
+        for name, encoded in renditions.items():
+            variants[name] = {}
+            for fmt, data in encoded.items():
+                _, extension, content_type, _ = VARIANT_FORMATS[fmt]
+                image_file = io.BytesIO(data)
+                image_file.name = f'{stem}_{name}.{extension}'
+                image_file.content_type = content_type
+                success, message, url = hybrid_storage_service.upload_image(
+                    image_file, folder=f'{folder}/variants', user_id=user_id
+                )
+                if not success:
+                    raise IOError(f'Variant {name}/{fmt} upload failed: {message}')
+                variants[name][fmt] = url
+        return variants
+
+    def create_variants(self, data: bytes, source_url: str, original_name: str,
+                        folder: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Render and upload variants of one image; {} if that fails, the original still serves"""
+        try:
+            return self.store(self.render(data), source_url, original_name, folder, user_id)
+        except Exception as e:
+            logger.warning(f"Could not create image variants for {source_url}: {e}")
+            return {}
+
+    def _render_inline(self, data: bytes):
+        try:
+            return render_variants(data)
+        except Exception as e:
+            return e
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Singleton instance
+image_variant_service = ImageVariantService()
@@ -5,12 +5,53 @@ from typing import Optional, Tuple, Any, Dict, List
 import logging
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from django.conf import settings
-from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+
+
+def build_client_config() -> Config:
+    """
+    botocore config shared by every R2 client.
+
+    The connection pool must cover the multipart threads of all uploads that
+    run at once, or requests queue for a connection (and botocore logs
+    "Connection pool is full").
+    """
+    return Config(
+        signature_version='s3v4',
+        max_pool_connections=getattr(settings, 'R2_MAX_POOL_CONNECTIONS', 20),
+        connect_timeout=5,
+        read_timeout=60,
+        tcp_keepalive=True,
+        retries={'max_attempts': 3, 'mode': 'standard'},
+    )
+
+
+def build_transfer_config() -> TransferConfig:
+    """
+    Streaming upload settings.
+
+    Files up to the threshold are streamed in a single PUT. Larger files go up
+    in parallel parts; a part is read into memory before it is sent, so only
+    as many parts as there are threads may be buffered at once.
+    """
+    concurrency = getattr(settings, 'R2_MAX_CONCURRENCY', 4)
+    config = TransferConfig(
+        multipart_threshold=getattr(settings, 'R2_MULTIPART_THRESHOLD_MB', 16) * MB,
+        multipart_chunksize=getattr(settings, 'R2_MULTIPART_CHUNKSIZE_MB', 8) * MB,
+        max_concurrency=concurrency,
+        use_threads=True,
+    )
+    # Not a boto3 constructor argument; s3transfer reads ahead 10 parts by default
+    config.max_in_memory_upload_chunks = concurrency
+    return config
+
+
 class R2StorageService:
     """Cloudflare R2 storage service mirroring FirebaseStorageService interface."""
 
@@ -19,6 +60,7 @@ class R2StorageService:
         self._bucket = getattr(settings, 'CLOUDFLARE_R2_BUCKET', None)
         self._public_base = getattr(settings, 'R2_PUBLIC_BASE_URL', '').rstrip('/')
         self._endpoint_url = f"https://{getattr(settings, 'CLOUDFLARE_ACCOUNT_ID', '')}.r2.cloudflarestorage.com" if getattr(settings, 'CLOUDFLARE_ACCOUNT_ID', '') else None
+        self._transfer_config = build_transfer_config()
         self._initialize()
 
     def _initialize(self):
@@ -37,7 +79,7 @@ class R2StorageService:
                 endpoint_url=self._endpoint_url,
                 aws_access_key_id=access_key,
                 aws_secret_access_key=secret_key,
-                config=Config(signature_version='s3v4')
+                config=build_client_config()
             )
         except Exception as e:
             logger.error(f"Failed to initialize R2 client: {e}")
@@ -60,13 +102,7 @@ class R2StorageService:
             if hasattr(image_file, 'seek'):
                 image_file.seek(0)
 
-            # Read bytes
-            if isinstance(image_file, (InMemoryUploadedFile, TemporaryUploadedFile)):
-                body = image_file.read()
-                content_type = image_file.content_type
-            else:
-                body = image_file.read()
-                content_type = None
+            content_type = getattr(image_file, 'content_type', None)
 
             extra_args = {}
             if content_type:
@@ -74,7 +110,10 @@ class R2StorageService:
             # Public read (optional) - R2 handles access policies; omit ACL if using bucket-wide public policy
             # extra_args['ACL'] = 'public-read'
 
-            self.client.put_object(Bucket=self._bucket, Key=key, Body=body, **extra_args)
+            # Stream from the file object (spooled uploads stay on disk); large files go multipart
+            self.client.upload_fileobj(
+                image_file, self._bucket, key, ExtraArgs=extra_args, Config=self._transfer_config
+            )
 
             public_url = self._build_public_url(key)
             logger.info(f"Uploaded image to R2: {key}")
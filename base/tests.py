@@ -0,0 +1,392 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from ads.models import Ad
+from ads.serializer import AdminAuctionListSerializer, AdListSerializer
+from base.models import ImageMigrationRecord, PendingImageUpload
+from base.services.hybrid_storage_service import hybrid_storage_service
+from base.services.image_upload_queue import image_upload_queue
+from base.services.r2_storage_service import MB, R2StorageService
+from base.utils.image_variants import render_variants, variant_url
+from bids.models import Bid
+from bids.repository import BidRepository
+from category.models import Category
+from pricing.models import PricingPageContent, PricingPlan
+from users.models import User
+
+
+class ResponseCacheTest(APITestCase):
+    """Test the versioned response cache on public listing endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        # pricing_data creates its page content on first use
+        PricingPageContent.objects.create()
+
+    def test_repeat_request_is_a_hit(self):
+        """Reordered query parameters hit the same entry without touching the database"""
+        first = self.client.get('/api/ads/', {'complete': 'false', 'page_size': 5})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/ads/?page_size=5&complete=false')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_model_save_invalidates(self):
+        """Saving a dependent model bumps its version so the next request recomputes"""
+        self.client.get('/api/pricing/data/')
+        self.assertEqual(self.client.get('/api/pricing/data/')['X-Cache'], 'HIT')
+
+        PricingPlan.objects.create(name='Premium', plan_type='premium', price=799)
+        response = self.client.get('/api/pricing/data/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([plan['name'] for plan in response.data['data']['pricing_plans']], ['Premium'])
+
+    def test_bulk_bid_writes_invalidate(self):
+        """Bid writes that send no signals still bump the versions the ad list depends on"""
+        user = User.objects.create(username='bulk_bidder', email='bulk_bidder@test.com')
+        ad = Ad.objects.create(user=user, title='Copper wire', auction_duration=7)
+        Bid.objects.bulk_create([Bid(user=user, ad=ad, bid_price_per_unit=10, volume_requested=1)])
+        bid = Bid.objects.get(ad=ad)
+        repository = BidRepository()
+
+        for bulk_write in (lambda: repository.mark_bids_outbid([bid.id]),
+                           lambda: repository.rebuild_bid_summaries([ad.id])):
+            self.client.get('/api/ads/', {'complete': 'false'})
+            self.assertEqual(self.client.get('/api/ads/', {'complete': 'false'})['X-Cache'], 'HIT')
+            bulk_write()
+            self.assertEqual(self.client.get('/api/ads/', {'complete': 'false'})['X-Cache'], 'MISS')
+
+    def test_unrelated_model_does_not_invalidate(self):
+        self.client.get('/api/pricing/data/')
+        Category.objects.create(name='Metals')
+        self.assertEqual(self.client.get('/api/pricing/data/')['X-Cache'], 'HIT')
+
+    def test_stats_report_hit_ratio(self):
+        for _ in range(3):
+            self.client.get('/api/category/ad-form-choices/')
+
+        admin = User.objects.create(username='cache_admin', email='cache_admin@test.com', is_staff=True)
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/api/base/cache/stats/').data
+        self.assertEqual(stats['views']['AdFormChoicesView'], {'hits': 2, 'misses': 1, 'hit_ratio': 0.6667})
+        self.assertEqual(stats['backend'], 'LocMemCache')
+
+
+class FieldTrackerMixinTest(TestCase):
+    """Test change detection against the values loaded from the database"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='tracker', email='tracker@example.com')
+        self.ad = Ad.objects.create(user=self.user, title='Copper wire', auction_duration=7)
+
+    def test_loaded_instance_tracks_changes(self):
+        ad = Ad.objects.get(pk=self.ad.pk)
+        self.assertFalse(ad.has_changed('auction_duration'))
+        ad.auction_duration = 14
+        self.assertTrue(ad.has_changed('auction_duration'))
+        self.assertEqual(ad.previous('auction_duration'), 7)
+        self.assertEqual(ad.changed_fields(), {'auction_duration'})
+
+    def test_save_does_not_refetch_row(self):
+        ad = Ad.objects.get(pk=self.ad.pk)
+        ad.auction_duration = 14
+        with CaptureQueriesContext(connection) as queries:
+            ad.save()
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "ads_ad"' in q['sql']]
+        self.assertEqual(selects, [])
+        # The snapshot follows the saved values
+        self.assertFalse(ad.has_changed('auction_duration'))
+        self.assertEqual(ad.previous('auction_duration'), 14)
+
+    def test_new_instance_reports_changes(self):
+        ad = Ad(user=self.user, title='Draft')
+        self.assertTrue(ad.has_changed('status'))
+        self.assertIsNone(ad.previous('status'))
+
+    def test_deferred_field_is_unchanged(self):
+        ad = Ad.objects.only('id').get(pk=self.ad.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(ad.has_changed('title'))
+
+    def test_update_fields_resets_only_saved_fields(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.email = 'new@example.com'
+        user.role = 'Admin'
+        user.save(update_fields=['email'])
+        self.assertFalse(user.has_changed('email'))
+        self.assertTrue(user.has_changed('role'))
+
+    def test_previous_bid_status(self):
+        Bid.objects.bulk_create([Bid(user=self.user, ad=self.ad, bid_price_per_unit=10, volume_requested=1)])
+        bid = Bid.objects.get(ad=self.ad)
+        bid.status = 'outbid'
+        self.assertEqual(bid.previous('status'), 'active')
+        self.assertTrue(bid.has_changed('status'))
+
+
+CLOUD_URL = 'https://cdn.example.com/material_images/copper.jpg'
+
+
+@override_settings(ASYNC_IMAGE_UPLOADS=True, IMAGE_UPLOAD_WORKER_THREAD=False, IMAGE_UPLOAD_MAX_ATTEMPTS=2)
+class ImageUploadQueueTest(TestCase):
+    """Test staging image uploads locally and swapping in the cloud URL"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        patcher = mock.patch.object(hybrid_storage_service, 'media_root', self.media_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username='uploader', email='uploader@example.com')
+
+    def _ad_with_image(self):
+        image = SimpleUploadedFile('copper.jpg', b'\xff\xd8\xff' + b'0' * 64, content_type='image/jpeg')
+        with mock.patch.object(hybrid_storage_service, 'upload_to_cloud') as upload_to_cloud:
+            ad = Ad.objects.create(user=self.user, title='Copper wire', material_image=image)
+        upload_to_cloud.assert_not_called()
+        return ad
+
+    def _staged_path(self, upload):
+        return os.path.join(self.media_root, upload.local_path)
+
+    def test_save_stages_image_without_uploading(self):
+        ad = self._ad_with_image()
+        upload = PendingImageUpload.objects.get()
+        self.assertEqual(upload.object_id, str(ad.pk))
+        self.assertEqual(upload.field_name, 'material_image')
+        self.assertEqual(Ad.objects.get(pk=ad.pk).material_image, upload.provisional_url)
+        self.assertTrue(os.path.exists(self._staged_path(upload)))
+
+    def test_process_swaps_url_and_removes_staged_file(self):
+        ad = self._ad_with_image()
+        with mock.patch.object(hybrid_storage_service, 'upload_to_cloud', return_value=(True, 'ok', CLOUD_URL)):
+            results = image_upload_queue.process_due()
+
+        upload = PendingImageUpload.objects.get()
+        self.assertEqual(results[0]['status'], 'uploaded')
+        self.assertEqual(upload.status, 'uploaded')
+        self.assertEqual(Ad.objects.get(pk=ad.pk).material_image, CLOUD_URL)
+        self.assertFalse(os.path.exists(self._staged_path(upload)))
+
+    def test_replaced_image_is_not_overwritten(self):
+        ad = self._ad_with_image()
+        Ad.objects.filter(pk=ad.pk).update(material_image='https://cdn.example.com/newer.jpg')
+        with mock.patch.object(hybrid_storage_service, 'upload_to_cloud', return_value=(True, 'ok', CLOUD_URL)), \
+                mock.patch.object(hybrid_storage_service, 'delete_image') as delete_image:
+            image_upload_queue.process_due()
+
+        self.assertEqual(PendingImageUpload.objects.get().status, 'superseded')
+        self.assertEqual(Ad.objects.get(pk=ad.pk).material_image, 'https://cdn.example.com/newer.jpg')
+        delete_image.assert_called_once_with(CLOUD_URL)
+
+    def test_failed_upload_backs_off_then_gives_up(self):
+        ad = self._ad_with_image()
+        failing = mock.patch.object(hybrid_storage_service, 'upload_to_cloud', return_value=(False, 'R2 down', None))
+        with failing:
+            image_upload_queue.process_due()
+            upload = PendingImageUpload.objects.get()
+            self.assertEqual((upload.status, upload.attempts), ('pending', 1))
+            self.assertGreater(upload.next_attempt_at, upload.updated_at)
+            # Not due again until the backoff has elapsed
+            self.assertEqual(image_upload_queue.process_due(), [])
+
+            image_upload_queue.process_due(now=upload.next_attempt_at + timedelta(seconds=1))
+
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts, upload.last_error), ('failed', 2, 'R2 down'))
+        # The staged copy keeps serving the image
+        self.assertEqual(Ad.objects.get(pk=ad.pk).material_image, upload.provisional_url)
+        self.assertTrue(os.path.exists(self._staged_path(upload)))
+
+    def test_claim_is_exclusive(self):
+        self._ad_with_image()
+        upload = PendingImageUpload.objects.get()
+        self.assertIsNotNone(image_upload_queue.claim(upload.id))
+        self.assertIsNone(image_upload_queue.claim(upload.id))
+
+
+def image_bytes(size=(2400, 1200), mode='RGBA', fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 80, 40, 128) if mode == 'RGBA' else (200, 80, 40)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(ASYNC_IMAGE_UPLOADS=True, IMAGE_UPLOAD_WORKER_THREAD=False, IMAGE_VARIANT_WORKERS=0)
+class ImageVariantTest(TestCase):
+    """Test rendering, recording and serving image variants"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        patcher = mock.patch.object(hybrid_storage_service, 'media_root', self.media_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create(username='variants', email='variants@example.com')
+
+    def _fake_upload(self, image_file, folder='material_images', user_id=None):
+        return True, 'ok', f'https://cdn.example.com/{folder}/{image_file.name}'
+
+    def test_render_sizes_and_formats(self):
+        variants = render_variants(image_bytes())
+        for name, edge in (('full', 1600), ('card', 800), ('thumb', 320)):
+            with Image.open(io.BytesIO(variants[name]['webp'])) as webp:
+                self.assertEqual((webp.format, webp.size), ('WEBP', (edge, edge // 2)))
+            with Image.open(io.BytesIO(variants[name]['jpeg'])) as jpeg:
+                self.assertEqual((jpeg.format, jpeg.mode, jpeg.size), ('JPEG', 'RGB', (edge, edge // 2)))
+
+    def test_small_images_are_not_upscaled(self):
+        variants = render_variants(image_bytes((300, 200), 'RGB', 'JPEG'))
+        with Image.open(io.BytesIO(variants['full']['jpeg'])) as full:
+            self.assertEqual(full.size, (300, 200))
+
+    def test_variants_of_a_replaced_image_are_ignored(self):
+        variants = {'source': 'https://cdn.example.com/a.jpg', 'thumb': {'webp': 'https://cdn.example.com/a.webp'}}
+        self.assertEqual(variant_url(variants, 'https://cdn.example.com/a.jpg'), 'https://cdn.example.com/a.webp')
+        self.assertIsNone(variant_url(variants, 'https://cdn.example.com/b.jpg'))
+
+    def test_upload_worker_records_variants(self):
+        image = SimpleUploadedFile('copper.png', image_bytes(), content_type='image/png')
+        ad = Ad.objects.create(user=self.user, title='Copper wire', material_image=image)
+        with mock.patch.object(hybrid_storage_service, 'upload_to_cloud', return_value=(True, 'ok', CLOUD_URL)), \
+                mock.patch.object(hybrid_storage_service, 'upload_image', side_effect=self._fake_upload):
+            image_upload_queue.process_due()
+
+        ad.refresh_from_db()
+        self.assertEqual(ad.material_image, CLOUD_URL)
+        self.assertEqual(ad.material_image_variants['source'], CLOUD_URL)
+        thumb = 'https://cdn.example.com/material_images/variants/copper_thumb.webp'
+        self.assertEqual(ad.material_image_variants['thumb']['webp'], thumb)
+        self.assertEqual(AdListSerializer(ad).data['material_image_thumb'], thumb)
+        self.assertEqual(AdminAuctionListSerializer(ad).data['imageThumb'], thumb)
+
+    def test_variant_failure_still_swaps_original(self):
+        image = SimpleUploadedFile('copper.png', image_bytes(), content_type='image/png')
+        ad = Ad.objects.create(user=self.user, title='Copper wire', material_image=image)
+        with mock.patch.object(hybrid_storage_service, 'upload_to_cloud', return_value=(True, 'ok', CLOUD_URL)), \
+                mock.patch('base.services.image_upload_queue.image_variant_service.create_variants',
+                           side_effect=OSError('corrupt image')):
+            results = image_upload_queue.process_due()
+
+        self.assertEqual(results[0]['status'], 'uploaded')
+        ad.refresh_from_db()
+        self.assertEqual(ad.material_image, CLOUD_URL)
+        self.assertFalse(ad.material_image_variants)
+
+    def test_thumb_falls_back_to_original(self):
+        ad = Ad.objects.create(user=self.user, title='Copper wire', material_image=CLOUD_URL)
+        self.assertEqual(AdListSerializer(ad).data['material_image_thumb'], CLOUD_URL)
+
+    def test_backfill_command(self):
+        local_path, local_url = hybrid_storage_service.save_local(
+            SimpleUploadedFile('old.jpg', image_bytes(mode='RGB', fmt='JPEG')), 'material_images'
+        )
+        ad = Ad.objects.create(user=self.user, title='Old upload', material_image=local_url)
+        Ad.objects.create(user=self.user, title='Broken', material_image='https://cdn.example.com/missing.jpg')
+
+        out = io.StringIO()
+        with mock.patch.object(hybrid_storage_service, 'upload_image', side_effect=self._fake_upload), \
+                mock.patch('base.management.commands.backfill_image_variants.requests.get',
+                           side_effect=OSError('404')):
+            call_command('backfill_image_variants', stdout=out)
+
+        ad.refresh_from_db()
+        self.assertEqual(ad.material_image_variants['source'], local_url)
+        self.assertIn('ads.Ad.material_image: 1 created, 1 failed', out.getvalue())
+
+
+class R2StorageServiceTest(TestCase):
+    """Test that uploads stream from the file object"""
+
+    def test_upload_streams_spooled_file(self):
+        service = R2StorageService()
+        service._client, service._bucket = mock.Mock(), 'images'
+        image_file = TemporaryUploadedFile('large.jpg', 'image/jpeg', 12 * MB, None)
+        image_file.write(b'0' * MB)
+        self.addCleanup(image_file.close)
+
+        success, _, url = service.upload_image(image_file, folder='material_images', user_id=7)
+
+        self.assertTrue(success)
+        service.client.put_object.assert_not_called()
+        args, kwargs = service.client.upload_fileobj.call_args
+        self.assertIs(args[0], image_file)
+        self.assertEqual(args[1], 'images')
+        self.assertTrue(args[2].startswith('material_images/user_7/large_7_'))
+        self.assertEqual(kwargs['ExtraArgs'], {'ContentType': 'image/jpeg'})
+        self.assertEqual(kwargs['Config'].multipart_threshold, 16 * MB)
+        self.assertEqual(kwargs['Config'].max_in_memory_upload_chunks, kwargs['Config'].max_request_concurrency)
+        self.assertTrue(url.endswith(args[2]))
+
+
+FIREBASE_URL = 'https://firebasestorage.googleapis.com/v0/b/nordic/o/{}.jpg'
+
+
+@override_settings(CLOUDFLARE_R2_BUCKET='images')
+class BackfillR2ImagesTest(TestCase):
+    """Test the concurrent, resumable Firebase to R2 backfill"""
+
+    def setUp(self):
+        user = User.objects.create(username='backfill', email='backfill@example.com')
+        for name in ('a', 'b', 'c', 'broken'):
+            Ad.objects.create(user=user, title=name, material_image=FIREBASE_URL.format(name))
+        # Shares a URL with the first ad, so it is uploaded once
+        Ad.objects.create(user=user, title='a again', material_image=FIREBASE_URL.format('a'))
+        ImageMigrationRecord.objects.create(
+            original_firebase_url=FIREBASE_URL.format('c'), r2_url='https://r2.example.com/c.jpg',
+            object_model='ads.Ad', object_id='3', field_name='material_image', status='migrated',
+        )
+        session = mock.patch('base.management.commands.backfill_r2_images.requests.Session')
+        self.session = session.start().return_value
+        self.addCleanup(session.stop)
+        self.session.get.side_effect = lambda url, timeout: mock.Mock(
+            status_code=404 if 'broken' in url else 200, content=b'image-bytes'
+        )
+        upload = mock.patch('base.management.commands.backfill_r2_images.r2_storage_service.upload_image',
+                            return_value=(True, 'ok', 'https://r2.example.com/migrated.jpg'))
+        self.upload = upload.start()
+        self.addCleanup(upload.stop)
+
+    def _run(self, **options):
+        out = io.StringIO()
+        call_command('backfill_r2_images', concurrency=3, batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_migrates_each_url_once_and_checkpoints(self):
+        output = self._run()
+
+        self.assertEqual(self.upload.call_count, 2)
+        migrated = ImageMigrationRecord.objects.filter(status='migrated')
+        self.assertEqual(
+            set(migrated.values_list('original_firebase_url', flat=True)),
+            {FIREBASE_URL.format(name) for name in ('a', 'b', 'c')},
+        )
+        failed = ImageMigrationRecord.objects.get(status='failed')
+        self.assertEqual((failed.last_error, failed.attempts), ('HTTP 404', 1))
+        self.assertIn('3/3 images (1 failed)', output)
+        self.assertIn('ETA', output)
+
+    def test_rerun_resumes_with_failed_images_only(self):
+        self._run()
+        self.upload.reset_mock()
+        self.session.get.reset_mock()
+
+        with self.assertNumQueries(6):
+            # Preload migrated URLs and records, scan ads, one checkpoint (update + savepoint pair)
+            self._run()
+        self.session.get.assert_called_once_with(FIREBASE_URL.format('broken'), timeout=20)
+        self.assertEqual(ImageMigrationRecord.objects.get(status='failed').attempts, 2)
+        self.assertEqual(ImageMigrationRecord.objects.count(), 4)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import SystemStatsView, UserDashboardStatsView, TotalBidsCountView
+from .views import SystemStatsView, UserDashboardStatsView, TotalBidsCountView, ResponseCacheStatsView
 
 app_name = 'base'
 
@@ -12,4 +12,7 @@ urlpatterns = [
     
     # Total bids count endpoint
     path('bids/count/', TotalBidsCountView.as_view(), name='total-bids-count'),
+
+    # Public response cache hit ratio (admin only)
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
 ]
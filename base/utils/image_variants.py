@@ -0,0 +1,84 @@
+"""
+Image renditions for listing cards and tables.
+
+render_variants() turns an uploaded image into downscaled WebP and JPEG
+copies. It only depends on Pillow, so it can run in a spawned worker process
+(see base/services/image_variant_service.py) without setting up Django.
+
+Variant URLs are stored next to the original as
+
+    {"source": <original url>,
+     "thumb": {"webp": <url>, "jpeg": <url>},
+     "card": {...}, "full": {...}}
+
+"source" ties the set to the image it was made from: once the original is
+replaced the old set is ignored until new variants are recorded.
+"""
+
+import io
+import math
+from typing import Dict, Iterator, Optional
+
+from PIL import Image, ImageOps
+
+# Longest edge in pixels, largest first so each size is scaled from the previous one
+VARIANT_SIZES = (
+    ('full', 1600),
+    ('card', 800),
+    ('thumb', 320),
+)
+
+# Pillow format, file extension, content type and save options per output format
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def render_variants(data: bytes) -> Dict[str, Dict[str, bytes]]:
+    """Encoded bytes for every size and format, e.g. {'thumb': {'webp': b'...'}}"""
+    with Image.open(io.BytesIO(data)) as source:
+        # JPEGs decode straight at a reduced scale when far larger than needed
+        scale = VARIANT_SIZES[0][1] / max(source.size)
+        if scale < 1:
+            source.draft('RGB', (math.ceil(source.width * scale), math.ceil(source.height * scale)))
+        image = _flatten(ImageOps.exif_transpose(source))
+
+    variants = {}
+    for name, edge in VARIANT_SIZES:
+        # thumbnail() keeps the aspect ratio and never upscales
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        variants[name] = {fmt: _encode(image, fmt) for fmt in VARIANT_FORMATS}
+    return variants
+
+
+def variant_url(variants: Optional[dict], source_url: Optional[str], name: str = 'thumb',
+                fmt: str = 'webp') -> Optional[str]:
+    """URL of one rendition of source_url, None when no current variants exist"""
+    if not variants or not source_url or variants.get('source') != source_url:
+        return None
+    urls = variants.get(name) or {}
+    return urls.get(fmt) or next(iter(urls.values()), None)
+
+
+def iter_variant_urls(variants: Optional[dict]) -> Iterator[str]:
+    """Every rendition URL in a variants dict"""
+    for name, _ in VARIANT_SIZES:
+        yield from ((variants or {}).get(name) or {}).values()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB copy of image, with any transparency composited onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    pil_format, _, _, options = VARIANT_FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
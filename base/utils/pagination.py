@@ -1,16 +1,116 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset (cursor) mode for page-number paginators.
 
-class StandardResultsSetPagination(PageNumberPagination):
+    Sending ?cursor= (empty for the first page) switches the request to
+    seeking on cursor_fields, newest first, instead of COUNT(*) plus OFFSET,
+    so deep pages cost the same as the first one. The total count is only
+    computed when ?with_count=true is also sent. The response keeps the
+    paginator's usual envelope; `next` carries the cursor of the following
+    page and `previous` is not available.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    cursor_fields = ('created_at', 'id')
+
+    cursor_mode = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_mode = True
+        self.request = request
+        self.keyset_page_size = self.get_page_size(request)
+        position = self.get_cursor_position(request)
+
+        # Combined (UNION) querysets can't be filtered; their builders apply
+        # get_cursor_position() to every branch themselves
+        if position is not None and not queryset.query.combinator:
+            queryset = queryset.filter(self.seek_filter(position))
+        queryset = queryset.order_by(*[f'-{field}' for field in self.cursor_fields])
+
+        self.keyset_count = None
+        if str(request.query_params.get(self.count_query_param, '')).lower() in ('true', '1', 'yes'):
+            self.keyset_count = queryset.count()
+
+        rows = list(queryset[:self.keyset_page_size + 1])
+        self.has_next = len(rows) > self.keyset_page_size
+        self.page_rows = rows[:self.keyset_page_size]
+        return self.page_rows
+
+    def get_cursor_position(self, request):
+        """Decode ?cursor= into a tuple of cursor_fields values, or None for the first page"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (ValueError, TypeError):
+            raise NotFound('Invalid cursor')
+
+    def seek_filter(self, position, prefix=''):
+        """Rows strictly after position in (first field DESC, second field DESC) order"""
+        first, second = self.cursor_fields
+        value, pk = position
+        return Q(**{f'{prefix}{first}__lt': value}) | Q(**{f'{prefix}{first}': value, f'{prefix}{second}__lt': pk})
+
+    def encode_cursor(self, row):
+        first, second = self.cursor_fields
+        # Rows are model instances, or dicts for .values() querysets
+        value, pk = (row[first], row[second]) if isinstance(row, dict) else (getattr(row, first), getattr(row, second))
+        payload = json.dumps([value.isoformat(), pk])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def get_next_cursor_link(self):
+        if not self.has_next or not self.page_rows:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page_rows[-1]))
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.keyset_count,
+            'next': self.get_next_cursor_link(),
+            'previous': None,
+            'results': data,
+        })
+
+
+class StandardResultsSetPagination(KeysetPaginationMixin, PageNumberPagination):
     """
     Standard pagination class for API responses
     """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
-    
+
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return Response({
+                'count': self.keyset_count,
+                'next': self.get_next_cursor_link(),
+                'previous': None,
+                'results': data,
+                'page_size': self.keyset_page_size,
+                'total_pages': None,
+                'current_page': None
+            })
         return Response({
             'count': self.page.paginator.count,
             'next': self.get_next_link(),
@@ -19,4 +119,4 @@ class StandardResultsSetPagination(PageNumberPagination):
             'page_size': self.get_page_size(self.request),
             'total_pages': self.page.paginator.num_pages,
             'current_page': self.page.number
-        }) 
\ No newline at end of file
+        })
@@ -0,0 +1,151 @@
+"""
+Versioned response cache for public, read-heavy endpoints.
+
+A cached response is stored under its path, its normalized query string and
+the current version of every model the view reads. Saving or deleting an
+instance of a versioned model bumps that model's version with one cache
+increment; bulk writes, which send no signals, call bump_versions().
+Entries built from older versions are simply never read again and expire
+on their own.
+
+Each view's hits and misses are counted in the cache for
+get_response_cache_stats(). Use a shared backend (see CACHES) to get
+cluster-wide numbers.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.views import View
+from rest_framework.response import Response
+
+# Models whose writes invalidate cached responses
+VERSIONED_MODELS = (
+    'ads.Ad',
+    'bids.Bid',
+    'bids.AdBidSummary',
+    'category.Category',
+    'category.SubCategory',
+    'company.Company',
+    'pricing.PricingPlan',
+    'pricing.PlanFeature',
+    'pricing.BaseFeature',
+    'pricing.PricingPageContent',
+)
+
+_cached_views = set()
+
+
+def _version_key(label):
+    return f'response_cache:version:{label.lower()}'
+
+
+def _stats_key(view_name, outcome):
+    return f'response_cache:stats:{view_name}:{outcome}'
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def bump_model_version(label):
+    """Invalidate every cached response that depends on the model label (e.g. 'ads.Ad')"""
+    _incr(_version_key(label))
+
+
+def bump_versions(*labels):
+    """
+    Bump several model versions at once. queryset.update(), bulk_update()
+    and bulk_create() send no signals, so call this after such writes.
+    """
+    for label in labels:
+        bump_model_version(label)
+
+
+def _bump_on_write(sender, **kwargs):
+    bump_model_version(sender._meta.label)
+
+
+def connect_version_signals():
+    """Bump model versions on save and delete; called from BaseConfig.ready()"""
+    for label in VERSIONED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_bump_on_write, sender=model, dispatch_uid=f'response_cache_save_{label}')
+        post_delete.connect(_bump_on_write, sender=model, dispatch_uid=f'response_cache_delete_{label}')
+
+
+def model_versions(models):
+    """Current versions of the model labels as 'label=version' strings, for building cache keys"""
+    versions = cache.get_many([_version_key(label) for label in models])
+    return [f'{label}={versions.get(_version_key(label), 0)}' for label in models]
+
+
+def response_cache_key(request, models):
+    params = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+    signature = '|'.join([request.path, repr(params), *model_versions(models)])
+    return f'response_cache:{hashlib.sha1(signature.encode()).hexdigest()}'
+
+
+def cache_response(models, timeout=None):
+    """
+    Cache successful GET responses of a DRF view method or @api_view function.
+
+    Args:
+        models: Labels of the models the response is built from
+        timeout: Seconds to keep entries (default: settings.RESPONSE_CACHE_TIMEOUT)
+    """
+    def decorator(view_func):
+        view_name = view_func.__qualname__.replace('.get', '')
+        _cached_views.add(view_name)
+
+        @wraps(view_func)
+        def wrapper(*args, **kwargs):
+            request = args[1] if isinstance(args[0], View) else args[0]
+            if request.method != 'GET':
+                return view_func(*args, **kwargs)
+
+            key = response_cache_key(request, models)
+            cached = cache.get(key)
+            if cached is not None:
+                _incr(_stats_key(view_name, 'hits'))
+                status_code, data = cached
+                return Response(data, status=status_code, headers={'X-Cache': 'HIT'})
+
+            _incr(_stats_key(view_name, 'misses'))
+            response = view_func(*args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (response.status_code, response.data),
+                          timeout if timeout is not None else settings.RESPONSE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+    return decorator
+
+
+def get_response_cache_stats():
+    """Hit and miss counts with hit ratios, per cached view and overall"""
+    names = sorted(_cached_views)
+    counts = cache.get_many([_stats_key(name, outcome) for name in names for outcome in ('hits', 'misses')])
+
+    def summary(hits, misses):
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+    views = {
+        name: summary(counts.get(_stats_key(name, 'hits'), 0), counts.get(_stats_key(name, 'misses'), 0))
+        for name in names
+    }
+    return {
+        'backend': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        'overall': summary(sum(v['hits'] for v in views.values()), sum(v['misses'] for v in views.values())),
+        'views': views,
+    }
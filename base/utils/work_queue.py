@@ -0,0 +1,69 @@
+"""
+Background work backed by database rows.
+
+This is the one mechanism for work that must not run inside the request,
+used by the image upload queue (base/services/image_upload_queue.py) and the
+Stripe event inbox (payments/event_inbox.py). A unit of work is a row with a
+status ('pending' until done), an attempts counter and a next_attempt_at
+time:
+
+1. a worker claims a due row with claim_lease(), a compare-and-set UPDATE
+   that moves next_attempt_at forward by a lease and counts the attempt, so
+   two workers never take the same row and a crashed worker's row comes due
+   again once the lease runs out;
+2. a failed attempt is retried after backoff_delay(), doubling each time up
+   to a ceiling, until the queue's max attempts mark it failed;
+3. a management command (process_image_uploads, drain_stripe_events) drains
+   due rows from cron and is what guarantees the work gets done.
+
+start_after_commit() can also kick off a daemon thread once the enqueuing
+transaction commits, to cut the wait until the next cron run. It is an
+optimization only: a thread lost to a worker restart leaves its rows
+pending for the command. Each queue is switched off by default
+(ASYNC_IMAGE_UPLOADS, STRIPE_EVENT_WORKER_THREAD); turn it on only where
+its drain command is scheduled.
+"""
+
+import threading
+from datetime import timedelta
+from typing import Callable, Optional, Type
+
+from django.db import connection, transaction
+from django.db.models import F, Model
+from django.utils import timezone
+
+from base.services.logging import LoggingService
+
+logging_service = LoggingService()
+
+
+def claim_lease(model: Type[Model], row_id: int, lease: timedelta, now=None) -> Optional[Model]:
+    """Take the lease on a due pending row, counting the attempt; None if it isn't due or is held"""
+    now = now or timezone.now()
+    claimed = model.objects.filter(
+        id=row_id, status='pending', next_attempt_at__lte=now
+    ).update(next_attempt_at=now + lease, attempts=F('attempts') + 1)
+    if not claimed:
+        return None
+    return model.objects.get(id=row_id)
+
+
+def backoff_delay(attempts: int, base: timedelta, maximum: timedelta) -> timedelta:
+    """Delay before retrying after the given number of attempts"""
+    return min(base * 2 ** (attempts - 1), maximum)
+
+
+def start_after_commit(target: Callable, *args):
+    """Run target(*args) on a daemon thread once the current transaction commits"""
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_in_thread, args=(target, args), daemon=True).start()
+    )
+
+
+def _run_in_thread(target: Callable, args: tuple):
+    try:
+        target(*args)
+    except Exception as e:
+        logging_service.log_error(e)
+    finally:
+        connection.close()
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from base.utils.responses import APIResponse
+from base.utils.response_cache import get_response_cache_stats
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Q, Count
 
@@ -342,3 +343,13 @@ class TotalBidsCountView(APIView):
                 {"error": f"Failed to retrieve total bids count: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    Return hit/miss counts and hit ratios of the public response cache
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_response_cache_stats(), status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Bid, BidHistory
+from .models import Bid, BidHistory, AdBidSummary
 
 
 class BidHistoryInline(admin.TabularInline):
@@ -74,4 +74,14 @@ class BidHistoryAdmin(admin.ModelAdmin):
         ('Timestamp', {
             'fields': ('timestamp',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(AdBidSummary)
+class AdBidSummaryAdmin(admin.ModelAdmin):
+    list_display = ['ad', 'highest_bid_price', 'bid_count', 'unique_bidders', 'total_volume_requested', 'last_bid_at']
+    search_fields = ['ad__title']
+    readonly_fields = [
+        'ad', 'highest_bid_price', 'leading_bid', 'bid_count', 'unique_bidders',
+        'total_volume_requested', 'last_bid_at', 'updated_at'
+    ]
+    ordering = ['-last_bid_at']
@@ -0,0 +1,84 @@
+"""
+Proxy (max-price) bid resolution.
+
+Every live bid has a ceiling: its max_auto_bid_price when set, otherwise its
+current price. The bid with the highest ceiling leads (earliest bid wins a
+tie) and pays one increment over the runner-up's ceiling, capped at its own
+ceiling. Every other proxy has been bid up to its ceiling and is outbid.
+This is what a sequence of one-increment raises would settle on, computed
+in a single sort instead of a loop of writes.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+
+
+@dataclass
+class ProxyEntry:
+    bid_id: int
+    price: int
+    max_price: Optional[int]
+    placed_at: datetime
+
+    @property
+    def ceiling(self) -> int:
+        if self.max_price and self.max_price > self.price:
+            return self.max_price
+        return self.price
+
+
+@dataclass
+class ResolvedBid:
+    bid_id: int
+    price: int
+    status: str
+
+
+def get_increment_table(ad) -> List[List[int]]:
+    """Return the ad's increment table, falling back to the platform default"""
+    table = getattr(ad, 'bid_increment_table', None) or settings.BID_INCREMENT_TABLE
+    rows = []
+    for row in table:
+        try:
+            threshold, increment = int(row[0]), int(row[1])
+        except (TypeError, ValueError, IndexError):
+            continue
+        if increment > 0:
+            rows.append([threshold, increment])
+    return sorted(rows) or [[0, 1]]
+
+
+def get_bid_increment(price: int, table: Sequence[Sequence[int]]) -> int:
+    """Return the increment for the highest table row at or below the price"""
+    increment = table[0][1]
+    for threshold, row_increment in table:
+        if price < threshold:
+            break
+        increment = row_increment
+    return increment
+
+
+def resolve_proxy_bids(entries: Iterable[ProxyEntry], table: Sequence[Sequence[int]]) -> Dict[int, ResolvedBid]:
+    """
+    Settle all live bids on an ad against each other.
+
+    Returns the final price and status of every entry keyed by bid id; the
+    caller persists only the rows that changed.
+    """
+    ranked = sorted(entries, key=lambda entry: (-entry.ceiling, entry.placed_at, entry.bid_id))
+    if not ranked:
+        return {}
+
+    leader = ranked[0]
+    leader_price = leader.price
+    if len(ranked) > 1:
+        runner_up = ranked[1].ceiling
+        if runner_up >= leader.price:
+            leader_price = min(leader.ceiling, runner_up + get_bid_increment(runner_up, table))
+
+    resolved = {leader.bid_id: ResolvedBid(leader.bid_id, leader_price, 'winning')}
+    for entry in ranked[1:]:
+        resolved[entry.bid_id] = ResolvedBid(entry.bid_id, entry.ceiling, 'outbid')
+    return resolved
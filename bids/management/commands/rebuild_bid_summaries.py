@@ -0,0 +1,47 @@
+"""
+Django management command to rebuild the denormalized per-ad bid summaries.
+
+AdBidSummary rows are normally kept in sync by BidService on every bid write.
+Run this after the initial deploy, after bulk data fixes, or whenever the
+summaries are suspected to have drifted from the bids table.
+
+Usage:
+    python manage.py rebuild_bid_summaries
+    python manage.py rebuild_bid_summaries --ad 12 --ad 15  # Only specific ads
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from bids.repository import BidRepository
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-ad bid summaries from the bids table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ad',
+            type=int,
+            action='append',
+            dest='ad_ids',
+            help='Only rebuild the summary for this ad ID (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        ad_ids = options['ad_ids']
+        started = time.monotonic()
+
+        written = BidRepository().rebuild_bid_summaries(ad_ids=ad_ids, batch_size=options['batch_size'])
+
+        scope = f'{len(ad_ids)} requested ads' if ad_ids else 'all ads'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {written} bid summaries for {scope} in {time.monotonic() - started:.2f}s'
+            )
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-16 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0021_alter_ad_unit_of_measurement'),
+        ('bids', '0007_add_transfer_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdBidSummary',
+            fields=[
+                ('ad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='bid_summary', serialize=False, to='ads.ad')),
+                ('highest_bid_price', models.IntegerField(blank=True, help_text='Highest bid price per unit across counted bids', null=True)),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('unique_bidders', models.PositiveIntegerField(default=0)),
+                ('total_volume_requested', models.BigIntegerField(default=0)),
+                ('last_bid_at', models.DateTimeField(blank=True, help_text='Most recent bid placement or update', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('leading_bid', models.ForeignKey(blank=True, help_text='Highest bid, earliest placed wins ties', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bids.bid')),
+            ],
+            options={
+                'verbose_name': 'Ad Bid Summary',
+                'verbose_name_plural': 'Ad Bid Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-16 22:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0026_ad_material_image_variants'),
+        ('bids', '0008_adbidsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['authorization_status', 'authorization_expires_at'], name='bids_bid_authori_c07a70_idx'),
+        ),
+    ]
@@ -4,8 +4,12 @@ from django.core.exceptions import ValidationError
 from decimal import Decimal
 from ads.models import Ad
 from users.models import User
+from base.models import FieldTrackerMixin
+
+class Bid(FieldTrackerMixin, models.Model):
+    # Status transitions drive the notifications in bids/signals.py
+    tracked_fields = ('status',)
 
-class Bid(models.Model):
     STATUS_CHOICES = [
         ("active", "Active"),
         ("outbid", "Outbid"),
@@ -154,6 +158,8 @@ class Bid(models.Model):
             models.Index(fields=['ad', '-bid_price_per_unit']),
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['status']),
+            # Holds about to expire (refresh_expiring_authorizations)
+            models.Index(fields=['authorization_status', 'authorization_expires_at']),
         ]
 
     def __str__(self):
@@ -254,3 +260,45 @@ class BidHistory(models.Model):
 
 
 
+
+
+class AdBidSummary(models.Model):
+    """Denormalized per-ad bid aggregates, refreshed on every bid write"""
+    # Bids in these statuses never count towards the summary
+    EXCLUDED_STATUSES = ['cancelled']
+
+    ad = models.OneToOneField(
+        Ad,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="bid_summary"
+    )
+    highest_bid_price = models.IntegerField(
+        blank=True,
+        null=True,
+        help_text="Highest bid price per unit across counted bids"
+    )
+    leading_bid = models.ForeignKey(
+        Bid,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+        help_text="Highest bid, earliest placed wins ties"
+    )
+    bid_count = models.PositiveIntegerField(default=0)
+    unique_bidders = models.PositiveIntegerField(default=0)
+    total_volume_requested = models.BigIntegerField(default=0)
+    last_bid_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Most recent bid placement or update"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ad Bid Summary"
+        verbose_name_plural = "Ad Bid Summaries"
+
+    def __str__(self):
+        return f"Ad #{self.ad_id}: {self.bid_count} bids, highest {self.highest_bid_price}"
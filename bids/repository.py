@@ -2,10 +2,12 @@ from typing import List, Optional
 from django.db.models import Q, Max, Min, Avg, Sum, Count
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db import transaction
 from decimal import Decimal
 
+from base.utils.response_cache import bump_versions
 from base.utils.responses import RepositoryResponse
-from .models import Bid, BidHistory
+from .models import Bid, BidHistory, AdBidSummary
 from ads.models import Ad
 from users.models import User
 from base.services.logging import LoggingService
@@ -50,6 +52,46 @@ class BidRepository:
         except Exception as e:
             return RepositoryResponse(success=False, message=f"Error creating bid: {str(e)}", data=None)
 
+    def lock_ad_for_bidding(self, ad_id: int) -> Ad:
+        """
+        Lock the ad row for the rest of the transaction so bids on the
+        same ad are placed one at a time.
+        """
+        return Ad.objects.select_for_update(of=('self',)).select_related('user').get(id=ad_id)
+
+    def get_bid_placement_state(self, ad_id: int, user: User) -> List[dict]:
+        """
+        Fetch every live bid on an ad plus the user's own bid (in any status)
+        in one query. Call after lock_ad_for_bidding.
+        """
+        return list(
+            Bid.objects.filter(
+                Q(status__in=['active', 'winning', 'outbid']) | Q(user=user),
+                ad_id=ad_id
+            ).values(
+                'id', 'user_id', 'status', 'bid_price_per_unit', 'volume_requested',
+                'max_auto_bid_price', 'created_at'
+            )
+        )
+
+    def mark_bids_outbid(self, bid_ids: List[int]) -> int:
+        """Flip the given bids to outbid with a single UPDATE"""
+        if not bid_ids:
+            return 0
+        updated = Bid.objects.filter(id__in=bid_ids).update(status='outbid', updated_at=timezone.now())
+        bump_versions('bids.Bid')
+        return updated
+
+    def apply_resolved_bids(self, bids: List[Bid]) -> int:
+        """Write settled prices and statuses for the given bids in one bulk UPDATE"""
+        if not bids:
+            return 0
+        updated = Bid.objects.bulk_update(
+            bids, ['bid_price_per_unit', 'total_bid_value', 'status', 'is_auto_bid', 'updated_at']
+        )
+        bump_versions('bids.Bid')
+        return updated
+
     def update_existing_bid(self, bid: Bid, data: dict) -> RepositoryResponse:
         """Update an existing bid with new data"""
         try:
@@ -93,18 +135,21 @@ class BidRepository:
             bid = Bid.objects.get(id=bid_id, user=user)
             
             previous_price = bid.bid_price_per_unit
-            bid.bid_price_per_unit = Decimal(str(bid_price_per_unit))
-            bid.save()
-            
-            # Create history entry
-            BidHistory.objects.create(
-                bid=bid,
-                previous_price=previous_price,
-                new_price=bid.bid_price_per_unit,
-                previous_volume=bid.volume_requested,
-                new_volume=bid.volume_requested,
-                change_reason='bid_updated'
-            )
+            with transaction.atomic():
+                bid.bid_price_per_unit = Decimal(str(bid_price_per_unit))
+                bid.save()
+                
+                # Create history entry
+                BidHistory.objects.create(
+                    bid=bid,
+                    previous_price=previous_price,
+                    new_price=bid.bid_price_per_unit,
+                    previous_volume=bid.volume_requested,
+                    new_volume=bid.volume_requested,
+                    change_reason='bid_updated'
+                )
+                
+                self.refresh_bid_summary(bid.ad_id)
             
             return RepositoryResponse(success=True, data=bid, message="Bid updated successfully")
             
@@ -117,8 +162,10 @@ class BidRepository:
         """Delete (cancel) a bid"""
         try:
             bid = Bid.objects.get(id=bid_id, user=user)
-            bid.status = 'cancelled'
-            bid.save()
+            with transaction.atomic():
+                bid.status = 'cancelled'
+                bid.save()
+                self.refresh_bid_summary(bid.ad_id)
             
             return RepositoryResponse(success=True, data=None, message="Bid cancelled successfully")
             
@@ -215,17 +262,21 @@ class BidRepository:
         except Exception:
             return []
 
+    def get_user_bids_queryset(self, user: User, status: Optional[str] = None):
+        """User bids newest first, optionally filtered by status"""
+        queryset = Bid.objects.filter(user=user).select_related('ad').order_by('-created_at')
+
+        # Apply status filter
+        if status and status != 'all':
+            valid_statuses = ['active', 'outbid', 'winning', 'won', 'lost', 'cancelled']
+            if status in valid_statuses:
+                queryset = queryset.filter(status=status)
+        return queryset
+
     def get_user_bids_paginated(self, user: User, status: Optional[str] = None, page: int = 1, page_size: int = 10) -> RepositoryResponse:
         """Get paginated user bids with filtering"""
         try:
-            # Base queryset
-            queryset = Bid.objects.filter(user=user).select_related('ad').order_by('-created_at')
-
-            # Apply status filter
-            if status and status != 'all':
-                valid_statuses = ['active', 'outbid', 'winning', 'won', 'lost', 'cancelled']
-                if status in valid_statuses:
-                    queryset = queryset.filter(status=status)
+            queryset = self.get_user_bids_queryset(user, status)
 
             # Apply pagination
             paginator = Paginator(queryset, page_size)
@@ -309,6 +360,88 @@ class BidRepository:
             logging_service.log_error(e)
             return {}
 
+    def refresh_bid_summary(self, ad_id: int) -> Optional[AdBidSummary]:
+        """
+        Recompute the denormalized bid summary for one ad.
+        Call inside the same transaction as the bid write.
+        """
+        bids = Bid.objects.filter(ad_id=ad_id).exclude(status__in=AdBidSummary.EXCLUDED_STATUSES)
+
+        stats = bids.aggregate(
+            bid_count=Count('id'),
+            unique_bidders=Count('user', distinct=True),
+            total_volume_requested=Sum('volume_requested'),
+            last_bid_at=Max('updated_at'),
+        )
+
+        if not stats['bid_count']:
+            AdBidSummary.objects.filter(ad_id=ad_id).delete()
+            return None
+
+        leading = bids.order_by('-bid_price_per_unit', 'created_at').values('id', 'bid_price_per_unit').first()
+
+        summary, _ = AdBidSummary.objects.update_or_create(
+            ad_id=ad_id,
+            defaults={
+                'highest_bid_price': leading['bid_price_per_unit'],
+                'leading_bid_id': leading['id'],
+                'bid_count': stats['bid_count'],
+                'unique_bidders': stats['unique_bidders'],
+                'total_volume_requested': stats['total_volume_requested'] or 0,
+                'last_bid_at': stats['last_bid_at'],
+            }
+        )
+        return summary
+
+    def rebuild_bid_summaries(self, ad_ids: Optional[List[int]] = None, batch_size: int = 1000) -> int:
+        """
+        Rebuild bid summaries from the bids table with one grouped aggregate
+        and a single ordered pass for the leading bids. Returns rows written.
+        """
+        bids = Bid.objects.exclude(status__in=AdBidSummary.EXCLUDED_STATUSES)
+        if ad_ids is not None:
+            bids = bids.filter(ad_id__in=ad_ids)
+
+        grouped = bids.values('ad_id').annotate(
+            bid_count=Count('id'),
+            unique_bidders=Count('user', distinct=True),
+            total_volume_requested=Sum('volume_requested'),
+            last_bid_at=Max('updated_at'),
+        ).order_by()
+        stats_by_ad = {row['ad_id']: row for row in grouped}
+
+        # Rows arrive grouped by ad with the leader first
+        leaders = {}
+        ordered = bids.order_by('ad_id', '-bid_price_per_unit', 'created_at').values_list(
+            'ad_id', 'id', 'bid_price_per_unit'
+        )
+        for ad_id, bid_id, price in ordered.iterator(chunk_size=batch_size):
+            if ad_id not in leaders:
+                leaders[ad_id] = (bid_id, price)
+
+        summaries = [
+            AdBidSummary(
+                ad_id=ad_id,
+                highest_bid_price=leaders[ad_id][1],
+                leading_bid_id=leaders[ad_id][0],
+                bid_count=row['bid_count'],
+                unique_bidders=row['unique_bidders'],
+                total_volume_requested=row['total_volume_requested'] or 0,
+                last_bid_at=row['last_bid_at'],
+            )
+            for ad_id, row in stats_by_ad.items()
+        ]
+
+        with transaction.atomic():
+            stale = AdBidSummary.objects.all()
+            if ad_ids is not None:
+                stale = stale.filter(ad_id__in=ad_ids)
+            stale.delete()
+            AdBidSummary.objects.bulk_create(summaries, batch_size=batch_size)
+        bump_versions('bids.AdBidSummary')
+
+        return len(summaries)
+
     def search_bids(self, filters: dict) -> RepositoryResponse:
         """Search bids with filters"""
         try:
@@ -351,18 +484,6 @@ class BidRepository:
             logging_service.log_error(e)
             return []
 
-    def get_outbid_users_for_auto_bidding(self, ad_id: int, current_highest_price: Decimal) -> List[Bid]:
-        """Get users with auto-bidding enabled who were outbid"""
-        try:
-            return list(Bid.objects.filter(
-                ad_id=ad_id,
-                status='outbid',
-                max_auto_bid_price__gt=current_highest_price,
-                max_auto_bid_price__isnull=False
-            ).select_related('user').order_by('-max_auto_bid_price'))
-        except Exception:
-            return []
-
     def update_bid_statuses_for_ad(self, ad_id: int) -> bool:
         """Update all bid statuses for an ad based on current highest bid"""
         try:
@@ -405,6 +526,7 @@ class BidRepository:
             else:
                 # No winner - mark all bids as lost
                 Bid.objects.filter(ad_id=ad_id).update(status='lost')
+            bump_versions('bids.Bid')
             
             return True
             
@@ -455,6 +577,7 @@ class BidRepository:
             # Update the bid status
             bid.status = "active"
             bid.save()
+            self.refresh_bid_summary(bid.ad_id)
             
             return RepositoryResponse(True, "Bid approved by administrator", bid)
             
@@ -479,6 +602,7 @@ class BidRepository:
             # Update the bid status
             bid.status = "cancelled"
             bid.save()
+            self.refresh_bid_summary(bid.ad_id)
             
             return RepositoryResponse(True, "Bid rejected by administrator", bid)
             
@@ -506,6 +630,8 @@ class BidRepository:
             
             # Mark other bids for this ad as lost
             Bid.objects.filter(ad=bid.ad).exclude(id=bid.id).update(status="lost")
+            bump_versions('bids.Bid')
+            self.refresh_bid_summary(bid.ad_id)
             
             return RepositoryResponse(True, "Bid marked as won by administrator", bid)
             
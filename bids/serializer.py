@@ -107,7 +107,6 @@ class BidCreateSerializer(serializers.ModelSerializer):
         ad = data.get('ad')
         volume_requested = data.get('volume_requested')
         bid_price = data.get('bid_price_per_unit')
-        user = self.context['request'].user if 'request' in self.context else None
         
         if ad and volume_requested:
             # Check if volume requested doesn't exceed available quantity
@@ -128,129 +127,29 @@ class BidCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     f"Bid price ({bid_price}) must be at least the starting bid price ({ad.starting_bid_price})."
                 )
-            
-            # CRITICAL FIX: Check if bid is higher than existing bids from other users
-            if user and ad:
-                # Get the highest bid from other users (excluding current user's bid)
-                highest_other_bid = Bid.objects.filter(
-                    ad=ad,
-                    status__in=['active', 'winning', 'outbid']
-                ).exclude(user=user).order_by('-bid_price_per_unit').first()
-                
-                if highest_other_bid:
-                    if bid_price <= highest_other_bid.bid_price_per_unit:
-                        raise serializers.ValidationError(
-                            f"Your bid ({bid_price}) must be higher than the current highest bid ({highest_other_bid.bid_price_per_unit}) from other bidders."
-                        )
         
+        # Bids from other users are compared in BidService.create_bid, under the ad row lock
         return data
     
     def create(self, validated_data):
-        """Create bid with pre-authorization payment hold"""
-        from payments.preauth_service import PreAuthorizationService
-        from django.db import transaction
-        
-        # Get user from request context
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            validated_data['user'] = request.user
-
-        user = validated_data['user']
-        ad = validated_data['ad']
-        new_bid_price = validated_data['bid_price_per_unit']
-        payment_method_id = validated_data.pop('payment_method_id')  # Remove from validated_data
-
-        # Check if user already has a bid for this ad
-        existing_bid = Bid.objects.filter(user=user, ad=ad).first()
-
-        if existing_bid:
-            # Cancel existing authorization if it exists
-            if existing_bid.stripe_payment_intent_id:
-                preauth_service = PreAuthorizationService()
-                cancel_result = preauth_service.cancel_authorization(existing_bid)
-                if not cancel_result['success']:
-                    raise serializers.ValidationError({
-                        'payment_method_id': f"Failed to cancel previous authorization: {cancel_result['message']}"
-                    })
-
-            # Validate that new bid amount is not lower than previous bid
-            if new_bid_price < existing_bid.bid_price_per_unit:
-                raise serializers.ValidationError({
-                    'bid_price_per_unit': f"New bid amount ({new_bid_price}) cannot be lower than your previous bid ({existing_bid.bid_price_per_unit})"
-                })
-
-            # Store previous values for history tracking
-            previous_price = existing_bid.bid_price_per_unit
-            previous_volume = existing_bid.volume_requested
-
-            # Update existing bid with new values
-            for field, value in validated_data.items():
-                if field not in ['user', 'payment_method_id']:  # Don't update user field
-                    setattr(existing_bid, field, value)
-
-            # Calculate total bid value
-            existing_bid.total_bid_value = (
-                existing_bid.bid_price_per_unit * existing_bid.volume_requested
-            )
-
-            # Save the updated bid
-            existing_bid.save()
+        """Place the bid and its pre-authorization payment hold through BidService"""
+        from .repository import BidRepository
+        from .services import BidService
 
-            # Create new authorization for updated bid
-            preauth_service = PreAuthorizationService()
-            auth_result = preauth_service.create_authorization_hold(existing_bid, payment_method_id)
-            
-            if not auth_result['success']:
-                raise serializers.ValidationError({
-                    'payment_method_id': f"Payment authorization failed: {auth_result['message']}"
-                })
-
-            # Create bid history entry AFTER successful authorization
-            from .models import BidHistory
-            BidHistory.objects.create(
-                bid=existing_bid,
-                previous_price=previous_price,
-                new_price=validated_data['bid_price_per_unit'],
-                previous_volume=previous_volume,
-                new_volume=validated_data['volume_requested'],
-                change_reason='bid_updated'
-            )
-
-            return existing_bid
-        else:
-            # Calculate total bid value for new bid
-            validated_data['total_bid_value'] = (
-                validated_data['bid_price_per_unit'] * validated_data['volume_requested']
+        request = self.context.get('request')
+        try:
+            return BidService(BidRepository()).create_bid(
+                ad_id=validated_data['ad'].id,
+                bid_price_per_unit=validated_data['bid_price_per_unit'],
+                volume_requested=validated_data['volume_requested'],
+                user=request.user if request else None,
+                volume_type=validated_data.get('volume_type', 'partial'),
+                notes=validated_data.get('notes') or '',
+                max_auto_bid_price=validated_data.get('max_auto_bid_price'),
+                payment_method_id=validated_data['payment_method_id'],
             )
-
-            # Create new bid with atomic transaction
-            with transaction.atomic():
-                # Create new bid
-                new_bid = super().create(validated_data)
-
-                # Create authorization hold
-                preauth_service = PreAuthorizationService()
-                auth_result = preauth_service.create_authorization_hold(new_bid, payment_method_id)
-                
-                if not auth_result['success']:
-                    # If authorization fails, delete the bid and raise error
-                    new_bid.delete()
-                    raise serializers.ValidationError({
-                        'payment_method_id': f"Payment authorization failed: {auth_result['message']}"
-                    })
-
-                # Create bid history entry for the initial bid
-                from .models import BidHistory
-                BidHistory.objects.create(
-                    bid=new_bid,
-                    previous_price=None,  # No previous price for new bids
-                    new_price=new_bid.bid_price_per_unit,
-                    previous_volume=None,  # No previous volume for new bids
-                    new_volume=new_bid.volume_requested,
-                    change_reason='bid_placed'
-                )
-
-                return new_bid
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
 
 
 class AdBasicSerializer(serializers.ModelSerializer):
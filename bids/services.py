@@ -1,14 +1,20 @@
+import uuid
 from typing import Any, Dict, List, Optional
 from decimal import Decimal
+from django.db import transaction
 from django.db.models import Q, Avg, Sum, Count, Max, Min
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from base.services.logging import LoggingService
+from base.utils.response_cache import bump_versions
 from base.utils.responses import RepositoryResponse
 from .repository import BidRepository
+from .auto_bidding import ProxyEntry, get_increment_table, resolve_proxy_bids
 from .models import Bid, BidHistory
+from .signals import send_outbid_notifications
 from ads.models import Ad
 from users.models import User
+from payments.preauth_service import AUTHORIZATION_FIELDS, PreAuthorizationService
 from .serializer import BidListSerializer, BidStatsSerializer
 
 logging_service = LoggingService()
@@ -26,9 +32,24 @@ class BidService:
         user: Optional[User] = None, 
         volume_type: str = "partial",
         notes: str = "",
-        max_auto_bid_price: Optional[float] = None
+        max_auto_bid_price: Optional[float] = None,
+        payment_method_id: Optional[str] = None
     ) -> Bid:
-        """Create a new bid with comprehensive validation"""
+        """
+        Create a new bid with comprehensive validation.
+
+        The ad row is locked for the whole placement so concurrent bids on the
+        same auction are checked against each other in order. Auto-bid ceilings
+        are settled in memory and only the changed rows are written back in
+        bulk, keeping the query count independent of the number of bidders.
+
+        With a payment_method_id the bid's authorization hold is placed first,
+        before the ad row is locked, so no bidder waits on another bidder's
+        Stripe round trip. A declined card stops the placement before anything
+        is written. If the placement is then rejected or fails to commit, the
+        new hold is released; a hold it replaces is released only once the new
+        bid commits.
+        """
         try:
             # Validate user authentication
             if not user or not user.is_authenticated:
@@ -38,86 +59,231 @@ class BidService:
             if user.company and getattr(user.company, 'status', None) != 'approved':
                 raise ValueError("Your company is under verification (1–2 business days). You can bid once it is approved.")
 
+            # Validate bid constraints
+            if bid_price_per_unit <= 0:
+                raise ValueError("Bid price must be greater than zero")
+
+            if volume_requested <= 0:
+                raise ValueError("Volume requested must be greater than zero")
+
+            authorization = {}
+            if payment_method_id:
+                authorization = self._authorize_bid(
+                    ad_id, user, int(bid_price_per_unit), int(volume_requested), payment_method_id
+                )
+
+            try:
+                bid = self._place_locked_bid(
+                    ad_id, user, bid_price_per_unit, volume_requested, volume_type, notes,
+                    max_auto_bid_price, authorization
+                )
+            except Exception:
+                if authorization:
+                    PreAuthorizationService().release_hold(authorization['stripe_payment_intent_id'])
+                raise
+
+            return bid
+
+        except Exception as e:
+            logging_service.log_error(e)
+            raise e
+
+    def _place_locked_bid(
+        self,
+        ad_id: int,
+        user: User,
+        bid_price_per_unit: float,
+        volume_requested: float,
+        volume_type: str,
+        notes: str,
+        max_auto_bid_price: Optional[float],
+        authorization: dict
+    ) -> Bid:
+        """Validate and write the bid with the ad row locked; returns once it has committed"""
+        with transaction.atomic():
             # Validate ad exists and is active
             try:
-                ad = Ad.objects.get(id=ad_id)
+                ad = self.repository.lock_ad_for_bidding(ad_id)
             except Ad.DoesNotExist:
                 raise ValueError("Ad not found")
 
-            if not ad.is_active or not ad.is_complete:
+            if not ad.is_active() or not ad.is_complete:
                 raise ValueError("Cannot bid on inactive or incomplete ads")
 
             # Check if user is not the ad owner
             if user == ad.user:
                 raise ValueError("You cannot bid on your own ad")
 
-            # Validate bid constraints
-            if bid_price_per_unit <= 0:
-                raise ValueError("Bid price must be greater than zero")
-
-            if volume_requested <= 0:
-                raise ValueError("Volume requested must be greater than zero")
-
             # Check ad constraints
             if ad.starting_bid_price and bid_price_per_unit < float(ad.starting_bid_price):
                 raise ValueError(f"Bid price must be at least {ad.starting_bid_price}")
 
-            # CRITICAL FIX: Check if bid is higher than existing bids from other users
-            highest_other_bid = Bid.objects.filter(
-                ad=ad,
-                status__in=['active', 'winning', 'outbid']
-            ).exclude(user=user).order_by('-bid_price_per_unit').first()
-            
-            if highest_other_bid:
-                if bid_price_per_unit <= float(highest_other_bid.bid_price_per_unit):
-                    raise ValueError(
-                        f"Your bid ({bid_price_per_unit}) must be higher than the current highest bid ({highest_other_bid.bid_price_per_unit}) from other bidders."
-                    )
-
             if ad.minimum_order_quantity and volume_requested < float(ad.minimum_order_quantity):
                 raise ValueError(f"Volume must be at least {ad.minimum_order_quantity}")
 
             if volume_requested > float(ad.available_quantity):
                 raise ValueError(f"Volume cannot exceed {ad.available_quantity}")
 
-            # Prepare bid data
-            data = {
-                'ad_id': ad_id,
-                'bid_price_per_unit': bid_price_per_unit,
-                'volume_requested': volume_requested,
-                'volume_type': volume_type,
-                'notes': notes,
-            }
-
-            if max_auto_bid_price:
-                data['max_auto_bid_price'] = max_auto_bid_price
-
-            response = self.repository.place_bid(data, user)
-
-            if not response.success:
-                raise ValueError(response.message)
-
-            bid = response.data
-            
-            # Update other bids status and handle auto-bidding
-            self._update_bid_statuses(ad_id, bid.id)
-            self._handle_auto_bidding(ad_id, bid)
-            
-            # Create history entry
-            BidHistory.objects.create(
-                bid=bid,
-                new_price=bid.bid_price_per_unit,
-                new_volume=bid.volume_requested,
-                change_reason='bid_placed'
+            state = self.repository.get_bid_placement_state(ad_id, user)
+            own_state = next((row for row in state if row['user_id'] == user.id), None)
+            competing = [row for row in state if row['user_id'] != user.id]
+
+            if own_state and bid_price_per_unit < float(own_state['bid_price_per_unit']):
+                raise ValueError(
+                    f"New bid amount ({bid_price_per_unit}) cannot be lower than your previous bid ({own_state['bid_price_per_unit']})"
+                )
+
+            # Bid must be higher than existing bids from other users
+            highest_other_price = max((row['bid_price_per_unit'] for row in competing), default=None)
+            if highest_other_price is not None and bid_price_per_unit <= float(highest_other_price):
+                raise ValueError(
+                    f"Your bid ({bid_price_per_unit}) must be higher than the current highest bid ({highest_other_price}) from other bidders."
+                )
+
+            bid = self._save_placed_bid(
+                ad, user, own_state,
+                bid_price_per_unit=int(bid_price_per_unit),
+                volume_requested=int(volume_requested),
+                volume_type=volume_type,
+                notes=notes,
+                max_auto_bid_price=int(max_auto_bid_price) if max_auto_bid_price else None,
+                **authorization
             )
 
-            return bid
-
+            history = [
+                BidHistory(
+                    bid=bid,
+                    previous_price=own_state['bid_price_per_unit'] if own_state else None,
+                    new_price=bid.bid_price_per_unit,
+                    previous_volume=own_state['volume_requested'] if own_state else None,
+                    new_volume=bid.volume_requested,
+                    change_reason='bid_updated' if own_state else 'bid_placed'
+                )
+            ]
+            history.extend(self._settle_proxy_bids(ad, bid, competing))
+            BidHistory.objects.bulk_create(history)
+
+            self.repository.refresh_bid_summary(ad_id)
+
+        return bid
+
+    def _authorize_bid(
+        self, ad_id: int, user: User, bid_price_per_unit: int, volume_requested: int, payment_method_id: str
+    ) -> dict:
+        """
+        Place the authorization hold for a bid about to be placed, without any
+        lock held. Returns the authorization fields to store on the bid;
+        raises ValueError if the hold fails
+        """
+        try:
+            ad = Ad.objects.select_related('user__company').get(id=ad_id)
         except Ad.DoesNotExist:
-            raise ValueError("Ad not found or inactive")
-        except Exception as e:
-            logging_service.log_error(e)
-            raise e
+            raise ValueError("Ad not found")
+
+        # The user's existing bid keys the hold when there is one; otherwise a
+        # stand-in that is never saved
+        bid = Bid.objects.filter(ad=ad, user=user).first() or Bid(ad=ad, user=user)
+        bid.ad = ad
+        bid.user = user
+        bid.bid_price_per_unit = bid_price_per_unit
+        bid.volume_requested = volume_requested
+
+        # A new attempt per placement, so a card declined before is tried again
+        result = PreAuthorizationService().create_authorization_hold(
+            bid, payment_method_id, save=False, attempt=uuid.uuid4().hex
+        )
+        if not result['success']:
+            raise ValueError(f"Payment authorization failed: {result['message']}")
+
+        return {field: getattr(bid, field) for field in AUTHORIZATION_FIELDS}
+
+    def _save_placed_bid(self, ad: Ad, user: User, own_state: Optional[dict], **fields) -> Bid:
+        """Insert the user's bid, or overwrite their existing one, as the leading bid"""
+        if not own_state:
+            return Bid.objects.create(ad=ad, user=user, status='winning', **fields)
+
+        # Bids are unique per (user, ad), so a repeat bid updates the existing row
+        bid = Bid.objects.get(id=own_state['id'])
+        replaced_intent = bid.stripe_payment_intent_id if bid.authorization_status == 'authorized' else None
+        if replaced_intent and fields.get('stripe_payment_intent_id') not in (None, replaced_intent):
+            transaction.on_commit(lambda: PreAuthorizationService().release_hold(replaced_intent))
+        bid.ad = ad
+        bid.user = user
+        if fields.get('max_auto_bid_price') is None:
+            fields.pop('max_auto_bid_price', None)
+        for field, value in fields.items():
+            setattr(bid, field, value)
+        bid.status = 'winning'
+        bid.save()
+        return bid
+
+    def _settle_proxy_bids(self, ad: Ad, bid: Bid, competing: List[dict]) -> List[BidHistory]:
+        """
+        Resolve the placed bid against every live bid and auto-bid ceiling,
+        then persist only the rows whose price or status changed. Returns the
+        unsaved history rows for the caller to bulk insert.
+        """
+        entries = [ProxyEntry(bid.id, bid.bid_price_per_unit, bid.max_auto_bid_price, bid.created_at)]
+        entries.extend(
+            ProxyEntry(row['id'], row['bid_price_per_unit'], row['max_auto_bid_price'], row['created_at'])
+            for row in competing
+        )
+        resolved = resolve_proxy_bids(entries, get_increment_table(ad))
+
+        history = []
+        changed = []
+        outbid_ids = []
+        # Bids that lose the lead here, with their status before, for the outbid notifications
+        newly_outbid = {}
+        now = timezone.now()
+        rows = [
+            {
+                'id': bid.id,
+                'status': bid.status,
+                'bid_price_per_unit': bid.bid_price_per_unit,
+                'volume_requested': bid.volume_requested,
+            }
+        ] + competing
+        for row in rows:
+            result = resolved[row['id']]
+            price_changed = result.price != row['bid_price_per_unit']
+            if price_changed:
+                history.append(BidHistory(
+                    bid_id=row['id'],
+                    previous_price=row['bid_price_per_unit'],
+                    new_price=result.price,
+                    previous_volume=row['volume_requested'],
+                    new_volume=row['volume_requested'],
+                    change_reason='auto_bid'
+                ))
+            if result.status == 'outbid' and row['status'] in ['active', 'winning']:
+                newly_outbid[row['id']] = row['status']
+                history.append(BidHistory(
+                    bid_id=row['id'],
+                    previous_price=result.price,
+                    new_price=result.price,
+                    previous_volume=row['volume_requested'],
+                    new_volume=row['volume_requested'],
+                    change_reason='outbid'
+                ))
+
+            if price_changed or (row['id'] == bid.id and result.status != bid.status):
+                target = bid if row['id'] == bid.id else Bid(id=row['id'])
+                target.bid_price_per_unit = result.price
+                target.total_bid_value = Decimal(result.price) * Decimal(row['volume_requested'])
+                target.status = result.status
+                target.is_auto_bid = price_changed or target.is_auto_bid
+                target.updated_at = now
+                changed.append(target)
+            elif result.status == 'outbid' and row['status'] != 'outbid':
+                outbid_ids.append(row['id'])
+
+        self.repository.mark_bids_outbid(outbid_ids)
+        self.repository.apply_resolved_bids(changed)
+        if newly_outbid:
+            # Bulk writes skip the post_save handler in bids/signals.py
+            transaction.on_commit(lambda: send_outbid_notifications(newly_outbid))
+        return history
 
     def update_bid(
         self, 
@@ -184,15 +350,18 @@ class BidService:
             if notes is not None:
                 data['notes'] = notes
 
-            response = self.repository.update_existing_bid(bid, data)
-            if not response.success:
-                raise ValueError(response.message)
+            with transaction.atomic():
+                response = self.repository.update_existing_bid(bid, data)
+                if not response.success:
+                    raise ValueError(response.message)
+
+                updated_bid = response.data
+
+                # Update bid statuses for the ad
+                self._update_bid_statuses(bid.ad.id)
+
+                self.repository.refresh_bid_summary(bid.ad_id)
 
-            updated_bid = response.data
-            
-            # Update bid statuses for the ad
-            self._update_bid_statuses(bid.ad.id)
-            
             return updated_bid
 
         except Bid.DoesNotExist:
@@ -210,12 +379,15 @@ class BidService:
             if bid.ad.auction_end_date and bid.ad.auction_end_date < timezone.now():
                 raise ValueError("Cannot delete bid - auction has ended")
             
-            bid.status = 'cancelled'
-            bid.save()
-            
-            # Update other bid statuses
-            self._update_bid_statuses(bid.ad.id)
-            
+            with transaction.atomic():
+                bid.status = 'cancelled'
+                bid.save()
+
+                # Update other bid statuses
+                self._update_bid_statuses(bid.ad.id)
+
+                self.repository.refresh_bid_summary(bid.ad_id)
+
         except Bid.DoesNotExist:
             raise ValueError("Bid not found or you don't have permission to delete it")
         except Exception as e:
@@ -272,6 +444,12 @@ class BidService:
             logging_service.log_error(e)
             return []
 
+    def get_user_bids_queryset(self, user: User, status: Optional[str] = None):
+        """
+        Get the user's bids as a queryset, for keyset pagination
+        """
+        return self.repository.get_user_bids_queryset(user, status)
+
     def get_user_bids_paginated(self, user: User, status: Optional[str] = None, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
         """
         Get paginated user bids with filtering
@@ -301,62 +479,29 @@ class BidService:
         """Get comprehensive statistics for bids on an ad"""
         try:
             bids = Bid.objects.filter(ad_id=ad_id, status__in=['active', 'winning', 'outbid', 'rejected'])
-            
-            if not bids.exists():
-                return {
-                    "total_bids": 0,
-                    "highest_bid": 0,
-                    "lowest_bid": 0,
-                    "average_bid": 0,
-                    "total_volume_requested": 0,
-                    "unique_bidders": 0,
-                    "bid_range": 0,
-                    "active_bids": 0,
-                    "winning_bids": 0,
-                    "outbid_bids": 0,
-                    "rejected_bids": 0
-                }
-            
-            # Get basic aggregated stats
+
+            # Aggregates and the status breakdown in a single query
             stats = bids.aggregate(
                 total_bids=Count('id'),
                 highest_bid=Max('bid_price_per_unit'),
                 lowest_bid=Min('bid_price_per_unit'),
                 average_bid=Avg('bid_price_per_unit'),
                 total_volume_requested=Sum('volume_requested'),
-                unique_bidders=Count('user', distinct=True)
+                unique_bidders=Count('user', distinct=True),
+                active_bids=Count('id', filter=Q(status='active')),
+                winning_bids=Count('id', filter=Q(status='winning')),
+                outbid_bids=Count('id', filter=Q(status='outbid')),
+                rejected_bids=Count('id', filter=Q(status='rejected'))
             )
-            
-            # Calculate bid range
-            highest = stats['highest_bid'] or 0
-            lowest = stats['lowest_bid'] or 0
-            stats['bid_range'] = highest - lowest
-            
-            # Get status breakdown
-            status_counts = bids.values('status').annotate(count=Count('id'))
-            stats['active_bids'] = 0
-            stats['winning_bids'] = 0
-            stats['outbid_bids'] = 0
-            stats['rejected_bids'] = 0
-            
-            for status_count in status_counts:
-                status_name = status_count['status']
-                count = status_count['count']
-                
-                if status_name == 'active':
-                    stats['active_bids'] = count
-                elif status_name == 'winning':
-                    stats['winning_bids'] = count
-                elif status_name == 'outbid':
-                    stats['outbid_bids'] = count
-                elif status_name == 'rejected':
-                    stats['rejected_bids'] = count
-            
+
             # Ensure all values are not None
             for key in stats:
                 if stats[key] is None:
                     stats[key] = 0
-            
+
+            # Calculate bid range
+            stats['bid_range'] = stats['highest_bid'] - stats['lowest_bid']
+
             return stats
             
         except Exception as e:
@@ -392,95 +537,59 @@ class BidService:
         except Exception as e:
             logging_service.log_error(e)
 
-    def _handle_auto_bidding(self, ad_id: int, new_bid: Bid):
-        """Handle automatic bidding for users who were outbid"""
-        try:
-            # Get users with auto-bidding enabled who were outbid
-            outbid_users = self.repository.get_outbid_users_for_auto_bidding(
-                ad_id, new_bid.bid_price_per_unit
-            )
-            
-            for outbid_bid in outbid_users:
-                # Calculate new auto bid price (increment by minimum step)
-                increment = Decimal('0.01')  # You can make this configurable
-                new_auto_price = new_bid.bid_price_per_unit + increment
-                
-                # Check if within auto bid limit
-                if new_auto_price <= outbid_bid.max_auto_bid_price:
-                    # Place auto bid
-                    auto_bid_data = {
-                        'bid_price_per_unit': float(new_auto_price),
-                        'volume_requested': float(outbid_bid.volume_requested),
-                        'volume_type': outbid_bid.volume_type,
-                        'notes': outbid_bid.notes + " (Auto-bid)"
-                    }
-                    
-                    # Update the existing bid instead of creating new one
-                    auto_response = self.repository.update_existing_bid(outbid_bid, auto_bid_data)
-                    if auto_response.success:
-                        # Mark as auto bid
-                        auto_bid = auto_response.data
-                        auto_bid.is_auto_bid = True
-                        auto_bid.save()
-                        
-                        # Create history entry
-                        BidHistory.objects.create(
-                            bid=auto_bid,
-                            previous_price=outbid_bid.bid_price_per_unit,
-                            new_price=auto_bid.bid_price_per_unit,
-                            previous_volume=outbid_bid.volume_requested,
-                            new_volume=auto_bid.volume_requested,
-                            change_reason='auto_bid'
-                        )
-            
-        except Exception as e:
-            logging_service.log_error(e)
-
     def close_auction(self, ad_id: int) -> Dict[str, Any]:
         """Close auction and determine winner"""
         try:
-            ad = Ad.objects.get(id=ad_id)
-            winning_bid = self.get_highest_bid_for_ad(ad_id)
-            
-            if winning_bid:
-                # Check reserve price
-                if ad.reserve_price and winning_bid.bid_price_per_unit < ad.reserve_price:
-                    # Reserve not met
-                    Bid.objects.filter(ad_id=ad_id, status__in=['active', 'winning']).update(status='lost')
-                    return {
-                        "success": False,
-                        "message": "Reserve price not met",
-                        "reserve_price": ad.reserve_price,
-                        "highest_bid": winning_bid.bid_price_per_unit
-                    }
-                else:
-                    # Auction successful
-                    winning_bid.status = 'won'
-                    winning_bid.save()
-                    
-                    # Mark other bids as lost
-                    Bid.objects.filter(ad_id=ad_id, status__in=['active', 'outbid']).update(status='lost')
-                    
-                    return {
-                        "success": True,
-                        "message": "Auction completed successfully",
-                        "winning_bid": winning_bid,
-                        "final_price": winning_bid.bid_price_per_unit,
-                        "volume": winning_bid.volume_requested
-                    }
-            else:
-                return {
-                    "success": False,
-                    "message": "No bids received",
-                    "winning_bid": None
-                }
-                
+            with transaction.atomic():
+                result = self._settle_auction_bids(ad_id)
+                self.repository.refresh_bid_summary(ad_id)
+            return result
         except Ad.DoesNotExist:
             return {"success": False, "message": "Ad not found"}
         except Exception as e:
             logging_service.log_error(e)
             return {"success": False, "message": "Error closing auction"}
-            
+
+    def _settle_auction_bids(self, ad_id: int) -> Dict[str, Any]:
+        """Mark the winning and losing bids for a closing auction"""
+        ad = Ad.objects.get(id=ad_id)
+        winning_bid = self.get_highest_bid_for_ad(ad_id)
+
+        if winning_bid:
+            # Check reserve price
+            if ad.reserve_price and winning_bid.bid_price_per_unit < ad.reserve_price:
+                # Reserve not met
+                Bid.objects.filter(ad_id=ad_id, status__in=['active', 'winning']).update(status='lost')
+                bump_versions('bids.Bid')
+                return {
+                    "success": False,
+                    "message": "Reserve price not met",
+                    "reserve_price": ad.reserve_price,
+                    "highest_bid": winning_bid.bid_price_per_unit
+                }
+            else:
+                # Auction successful
+                winning_bid.status = 'won'
+                winning_bid.save()
+
+                # Mark other bids as lost
+                Bid.objects.filter(ad_id=ad_id, status__in=['active', 'outbid']).update(status='lost')
+                bump_versions('bids.Bid')
+
+                return {
+                    "success": True,
+                    "message": "Auction completed successfully",
+                    "winning_bid": winning_bid,
+                    "final_price": winning_bid.bid_price_per_unit,
+                    "volume": winning_bid.volume_requested
+                }
+        else:
+            return {
+                "success": False,
+                "message": "No bids received",
+                "winning_bid": None
+            }
+
     def admin_approve_bid(self, bid_id: int, admin_user: User) -> dict:
         """
         Admin approval for a bid
@@ -599,9 +708,12 @@ class BidService:
                 return {"success": False, "message": "Cannot finalize a non-active auction"}
 
             # Mark this bid as won and others as lost (mirror repository logic without admin check)
-            bid.status = 'won'
-            bid.save()
-            Bid.objects.filter(ad=ad).exclude(id=bid.id).update(status='lost')
+            with transaction.atomic():
+                bid.status = 'won'
+                bid.save()
+                Bid.objects.filter(ad=ad).exclude(id=bid.id).update(status='lost')
+                bump_versions('bids.Bid')
+                self.repository.refresh_bid_summary(ad.id)
 
             # Trigger auction manual closure & notifications/payment capture
             try:
@@ -7,31 +7,17 @@ and manual auction closure scenarios.
 """
 
 import logging
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save
 from django.db.models import Q
 from django.dispatch import receiver
 from .models import Bid
+from notifications.cache import invalidate_notification_stats
 from notifications.models import Notification
 from notifications.templates import AuctionNotificationTemplates, BidNotificationTemplates, get_auction_notification_metadata, get_bid_notification_metadata
 
 logger = logging.getLogger(__name__)
 
 
-@receiver(pre_save, sender=Bid)
-def store_previous_bid_status(sender, instance, **kwargs):
-    """
-    Store the previous bid status before saving to detect status changes
-    """
-    if instance.pk:
-        try:
-            previous_bid = Bid.objects.get(pk=instance.pk)
-            instance._previous_status = previous_bid.status
-        except Bid.DoesNotExist:
-            instance._previous_status = None
-    else:
-        instance._previous_status = None
-
-
 @receiver(post_save, sender=Bid)
 def handle_bid_status_changes(sender, instance, created, **kwargs):
     """
@@ -45,13 +31,13 @@ def handle_bid_status_changes(sender, instance, created, **kwargs):
         # New bid created - handle new bid notifications if needed
         return
     
-    # Get previous status
-    previous_status = getattr(instance, '_previous_status', None)
-    current_status = instance.status
-    
     # Only process if status actually changed
-    if previous_status == current_status:
+    if not instance.has_changed('status'):
         return
+
+    # Status as loaded from the database (tracked by FieldTrackerMixin)
+    previous_status = instance.previous('status')
+    current_status = instance.status
     
     try:
         # Handle winner notifications
@@ -208,6 +194,70 @@ def _send_outbid_notification_signal(outbid_bid: Bid, previous_status: str):
         logger.error(f"Error sending outbid notification for bid {outbid_bid.id}: {str(e)}")
 
 
+def send_outbid_notifications(previous_statuses: dict):
+    """
+    Send outbid notifications for bids moved to outbid in bulk
+
+    queryset.update() and bulk_update() send no post_save, so the placement
+    path calls this once its transaction commits. previous_statuses maps each
+    bid id to its status before the write. Uses the same template, metadata
+    and duplicate check as _send_outbid_notification_signal, in three queries
+    however many bids were outbid.
+    """
+    if not previous_statuses:
+        return
+
+    try:
+        already_notified = set(Notification.objects.filter(
+            type='bid',
+            metadata__action_type='outbid',
+            metadata__bid_id__in=list(previous_statuses)
+        ).values_list('metadata__bid_id', flat=True))
+
+        outbid_bids = Bid.objects.filter(
+            id__in=[bid_id for bid_id in previous_statuses if bid_id not in already_notified],
+            status='outbid',
+            ad__status='active'
+        ).select_related('ad')
+
+        notifications = []
+        for outbid_bid in outbid_bids:
+            auction = outbid_bid.ad
+            template = AuctionNotificationTemplates.outbid_notification(
+                auction.title,
+                outbid_bid.bid_price_per_unit,
+                auction.currency,
+                auction.unit_of_measurement
+            )
+            metadata = get_bid_notification_metadata(
+                auction.id,
+                outbid_bid.id,
+                outbid_bid.bid_price_per_unit,
+                outbid_bid.volume_requested,
+                auction.currency,
+                auction.unit_of_measurement,
+                'outbid',
+                previous_status=previous_statuses[outbid_bid.id],
+                new_status=outbid_bid.status
+            )
+            notifications.append(Notification(
+                user_id=outbid_bid.user_id,
+                title=template['title'],
+                message=template['message'],
+                type='bid',
+                priority='normal',
+                metadata=metadata
+            ))
+
+        if notifications:
+            Notification.objects.bulk_create(notifications)
+            invalidate_notification_stats([notification.user_id for notification in notifications])
+            logger.info(f"Outbid notifications sent for {len(notifications)} bids")
+
+    except Exception as e:
+        logger.error(f"Error sending outbid notifications for bids {list(previous_statuses)}: {str(e)}")
+
+
 def _send_payment_completion_notification_signal(paid_bid: Bid):
     """
     Send payment completion notification to both buyer and seller
@@ -1,7 +1,8 @@
 from django.test import TestCase
 import json
+from unittest import mock
 from decimal import Decimal
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, skipUnlessDBFeature
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
@@ -9,12 +10,14 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Bid, BidHistory
+from .models import Bid, BidHistory, AdBidSummary
 from .services import BidService
 from .repository import BidRepository
+from .auto_bidding import ProxyEntry, get_bid_increment, resolve_proxy_bids
 from ads.models import Ad, Location
 from category.models import Category, SubCategory
 from company.models import Company
+from payments.stripe_gateway import FakeStripeGateway
 
 User = get_user_model()
 
@@ -640,3 +643,560 @@ class BidHistoryTest(TestCase):
         self.assertEqual(latest_history.previous_price, Decimal('55.00'))
         self.assertEqual(latest_history.new_price, Decimal('60.00'))
         self.assertEqual(latest_history.change_reason, 'bid_updated')
+
+
+class AdBidSummaryTest(TestCase):
+    """Test the denormalized per-ad bid summary"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            username='summary_seller',
+            email='summary_seller@test.com',
+            password='testpass123'
+        )
+        self.bidders = [
+            User.objects.create_user(
+                username=f'summary_bidder{i}',
+                email=f'summary_bidder{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(3)
+        ]
+        self.category = Category.objects.create(name="Metals")
+        self.subcategory = SubCategory.objects.create(name="Aluminium", category=self.category)
+        self.location = Location.objects.create(country="Sweden", city="Malmö")
+        self.ads = [
+            Ad.objects.create(
+                user=self.seller,
+                category=self.category,
+                subcategory=self.subcategory,
+                location=self.location,
+                title=f"Aluminium lot {i}",
+                available_quantity=Decimal('100'),
+                starting_bid_price=Decimal('50'),
+                currency='EUR',
+                unit_of_measurement='ton',
+            )
+            for i in range(3)
+        ]
+        self.ad = self.ads[0]
+        self.repository = BidRepository()
+
+    def _bid(self, user, price, volume=10, ad=None):
+        return Bid.objects.create(
+            user=user,
+            ad=ad or self.ad,
+            bid_price_per_unit=price,
+            volume_requested=volume
+        )
+
+    def test_legacy_repository_writes_refresh_summary(self):
+        """Cancelling or repricing through the repository keeps the summary current"""
+        leader = self._bid(self.bidders[0], 70)
+        other = self._bid(self.bidders[1], 60)
+        self.repository.refresh_bid_summary(self.ad.id)
+
+        self.repository.delete_bid(leader.id, self.bidders[0])
+        self.assertEqual(AdBidSummary.objects.get(ad=self.ad).highest_bid_price, 60)
+
+        self.repository.update_bid(other.id, 65, self.bidders[1])
+        summary = AdBidSummary.objects.get(ad=self.ad)
+        self.assertEqual((summary.highest_bid_price, summary.bid_count), (65, 1))
+
+    def test_refresh_tracks_highest_and_counts(self):
+        """Summary reflects the leading bid and aggregate counts"""
+        self._bid(self.bidders[0], 55, volume=10)
+        leader = self._bid(self.bidders[1], 70, volume=20)
+        self._bid(self.bidders[2], 60, volume=5)
+
+        summary = self.repository.refresh_bid_summary(self.ad.id)
+
+        self.assertEqual(summary.highest_bid_price, 70)
+        self.assertEqual(summary.leading_bid_id, leader.id)
+        self.assertEqual(summary.bid_count, 3)
+        self.assertEqual(summary.unique_bidders, 3)
+        self.assertEqual(summary.total_volume_requested, 35)
+        self.assertIsNotNone(summary.last_bid_at)
+
+    def test_cancelled_bids_are_excluded(self):
+        """Cancelling the leader hands the lead to the next bid"""
+        self._bid(self.bidders[0], 55)
+        leader = self._bid(self.bidders[1], 70)
+        self.repository.refresh_bid_summary(self.ad.id)
+
+        leader.status = 'cancelled'
+        leader.save()
+        summary = self.repository.refresh_bid_summary(self.ad.id)
+
+        self.assertEqual(summary.highest_bid_price, 55)
+        self.assertEqual(summary.bid_count, 1)
+
+    def test_refresh_removes_summary_without_bids(self):
+        """An ad whose bids are all cancelled has no summary row"""
+        bid = self._bid(self.bidders[0], 55)
+        self.repository.refresh_bid_summary(self.ad.id)
+
+        bid.status = 'cancelled'
+        bid.save()
+
+        self.assertIsNone(self.repository.refresh_bid_summary(self.ad.id))
+        self.assertFalse(AdBidSummary.objects.filter(ad=self.ad).exists())
+
+    def test_rebuild_matches_incremental_refresh(self):
+        """Bulk rebuild produces the same rows as per-ad refreshes"""
+        self._bid(self.bidders[0], 55, ad=self.ads[0])
+        self._bid(self.bidders[1], 80, ad=self.ads[0])
+        self._bid(self.bidders[2], 65, ad=self.ads[1])
+
+        written = self.repository.rebuild_bid_summaries()
+
+        self.assertEqual(written, 2)
+        rebuilt = {
+            s.ad_id: (s.highest_bid_price, s.leading_bid_id, s.bid_count, s.total_volume_requested)
+            for s in AdBidSummary.objects.all()
+        }
+        for ad_id in rebuilt:
+            refreshed = self.repository.refresh_bid_summary(ad_id)
+            self.assertEqual(
+                rebuilt[ad_id],
+                (refreshed.highest_bid_price, refreshed.leading_bid_id, refreshed.bid_count,
+                 refreshed.total_volume_requested)
+            )
+
+    def test_list_serializer_runs_constant_queries(self):
+        """Serializing a page of ads does not query bids per ad"""
+        from ads.serializer import AdListSerializer
+
+        for i, ad in enumerate(self.ads):
+            self._bid(self.bidders[i], 60 + i, ad=ad)
+        self.repository.rebuild_bid_summaries()
+
+        queryset = Ad.objects.select_related(
+            'category', 'subcategory', 'location', 'bid_summary'
+        ).order_by('id')
+
+        with self.assertNumQueries(1):
+            data = AdListSerializer(queryset, many=True).data
+
+        self.assertEqual([row['highest_bid_price'] for row in data], [60.0, 61.0, 62.0])
+
+
+def _create_live_ad(seller, title="Live auction", starting_price=50):
+    """Create a complete ad and flip it to active without the payment readiness hook"""
+    category = Category.objects.create(name=f"{title} category")
+    subcategory = SubCategory.objects.create(name=f"{title} subcategory", category=category)
+    location = Location.objects.create(country="Sweden", city="Göteborg")
+    ad = Ad.objects.create(
+        user=seller,
+        category=category,
+        subcategory=subcategory,
+        packaging='baled',
+        material_frequency='monthly',
+        location=location,
+        delivery_options=['pickup_only'],
+        title=title,
+        available_quantity=Decimal('1000'),
+        starting_bid_price=Decimal(starting_price),
+        currency='EUR',
+        unit_of_measurement='ton',
+    )
+    Ad.objects.filter(pk=ad.pk).update(status='active')
+    ad.refresh_from_db()
+    return ad
+
+
+class BidPlacementEngineTest(TestCase):
+    """Test the row-locked, single-pass placement path in BidService.create_bid"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            username='engine_seller', email='engine_seller@test.com', password='testpass123'
+        )
+        self.bidders = User.objects.bulk_create([
+            User(username=f'engine_bidder{i}', email=f'engine_bidder{i}@test.com')
+            for i in range(50)
+        ])
+        self.ad = _create_live_ad(self.seller)
+        self.service = BidService(BidRepository())
+
+    def _place(self, user, price, volume=10):
+        return self.service.create_bid(
+            ad_id=self.ad.id, bid_price_per_unit=price, volume_requested=volume, user=user
+        )
+
+    def test_new_bid_leads_and_outbids_others(self):
+        """The new bid becomes winning and the previous leader is outbid"""
+        first = self._place(self.bidders[0], 60)
+        second = self._place(self.bidders[1], 70)
+
+        first.refresh_from_db()
+        self.assertEqual(second.status, 'winning')
+        self.assertEqual(first.status, 'outbid')
+        self.assertEqual(self.ad.bid_summary.highest_bid_price, 70)
+        self.assertEqual(
+            list(BidHistory.objects.filter(bid=first).values_list('change_reason', flat=True).order_by('id')),
+            ['bid_placed', 'outbid']
+        )
+
+    def test_outbid_bidder_is_notified(self):
+        """The previous leader gets an outbid notification once the new bid commits"""
+        from notifications.models import Notification
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._place(self.bidders[0], 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._place(self.bidders[1], 70)
+
+        notification = Notification.objects.get(user=self.bidders[0])
+        self.assertEqual(notification.type, 'bid')
+        self.assertEqual(notification.metadata['bid_id'], first.id)
+        self.assertEqual(notification.metadata['action_type'], 'outbid')
+        self.assertEqual(notification.metadata['previous_status'], 'winning')
+        self.assertFalse(Notification.objects.filter(user=self.bidders[1]).exists())
+
+    def test_bid_must_beat_competing_bids(self):
+        """A bid at or below the current leader is rejected"""
+        self._place(self.bidders[0], 60)
+        with self.assertRaises(ValueError):
+            self._place(self.bidders[1], 60)
+
+    def test_rebid_updates_existing_bid(self):
+        """A repeat bid overwrites the user's own row and records an update"""
+        bid = self._place(self.bidders[0], 60)
+        self._place(self.bidders[1], 70)
+        rebid = self._place(self.bidders[0], 80)
+
+        self.assertEqual(rebid.id, bid.id)
+        self.assertEqual(Bid.objects.filter(ad=self.ad, user=self.bidders[0]).count(), 1)
+        self.assertEqual(BidHistory.objects.filter(bid=bid, change_reason='bid_updated').count(), 1)
+
+    def test_query_count_is_independent_of_competing_bids(self):
+        """Placing over 1 or 49 active bids costs the same number of queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._place(self.bidders[0], 51)
+        with CaptureQueriesContext(connection) as few:
+            self._place(self.bidders[1], 52)
+
+        # Simulate 47 more bids left active by a legacy write path
+        Bid.objects.bulk_create([
+            Bid(ad=self.ad, user=user, bid_price_per_unit=53 + i, volume_requested=10, status='active')
+            for i, user in enumerate(self.bidders[2:49])
+        ])
+        with CaptureQueriesContext(connection) as many:
+            self._place(self.bidders[49], 500)
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertEqual(Bid.objects.filter(ad=self.ad, status='winning').count(), 1)
+        self.assertEqual(Bid.objects.filter(ad=self.ad, status='outbid').count(), 49)
+
+
+class ProxyBidResolverTest(TestCase):
+    """Test the in-memory proxy bid resolution"""
+
+    TABLE = [[0, 1], [100, 5]]
+
+    def _entry(self, bid_id, price, max_price=None, minute=0):
+        return ProxyEntry(bid_id, price, max_price, timezone.now().replace(minute=minute))
+
+    def test_increment_table_lookup(self):
+        """The highest row at or below the price sets the increment"""
+        self.assertEqual(get_bid_increment(99, self.TABLE), 1)
+        self.assertEqual(get_bid_increment(100, self.TABLE), 5)
+
+    def test_highest_ceiling_pays_one_increment_over_runner_up(self):
+        """Competing proxies settle at the runner-up ceiling plus an increment"""
+        resolved = resolve_proxy_bids([
+            self._entry(1, 60, 90, minute=1),
+            self._entry(2, 61, 120, minute=2),
+            self._entry(3, 62, minute=3),
+        ], self.TABLE)
+
+        self.assertEqual((resolved[2].price, resolved[2].status), (91, 'winning'))
+        self.assertEqual((resolved[1].price, resolved[1].status), (90, 'outbid'))
+        self.assertEqual((resolved[3].price, resolved[3].status), (62, 'outbid'))
+
+    def test_leader_price_is_capped_at_its_ceiling(self):
+        """The winner never pays more than its own maximum"""
+        resolved = resolve_proxy_bids([
+            self._entry(1, 60, 100, minute=1),
+            self._entry(2, 70, 99, minute=2),
+        ], self.TABLE)
+        self.assertEqual(resolved[1].price, 100)
+
+    def test_equal_ceilings_go_to_earliest_bid(self):
+        """A tie on maximum is won by the bid placed first"""
+        resolved = resolve_proxy_bids([
+            self._entry(1, 70, 80, minute=2),
+            self._entry(2, 60, 80, minute=1),
+        ], self.TABLE)
+        self.assertEqual((resolved[2].price, resolved[2].status), (80, 'winning'))
+
+
+class ProxyBiddingServiceTest(TestCase):
+    """Test proxy bids settled through BidService.create_bid"""
+
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            username='proxy_seller', email='proxy_seller@test.com', password='testpass123'
+        )
+        self.bidders = User.objects.bulk_create([
+            User(username=f'proxy_bidder{i}', email=f'proxy_bidder{i}@test.com')
+            for i in range(21)
+        ])
+        self.ad = _create_live_ad(self.seller, title="Proxy auction")
+        self.service = BidService(BidRepository())
+
+    def _place(self, user, price, max_price=None):
+        return self.service.create_bid(
+            ad_id=self.ad.id, bid_price_per_unit=price, volume_requested=10,
+            user=user, max_auto_bid_price=max_price
+        )
+
+    def test_proxy_outbids_manual_bid(self):
+        """A manual bid below a proxy ceiling is answered by one increment"""
+        proxy = self._place(self.bidders[0], 60, max_price=100)
+        manual = self._place(self.bidders[1], 70)
+
+        proxy.refresh_from_db()
+        self.assertEqual(manual.status, 'outbid')
+        self.assertEqual(proxy.status, 'winning')
+        self.assertEqual(proxy.bid_price_per_unit, 71)
+        self.assertEqual(proxy.total_bid_value, Decimal('710'))
+        self.assertTrue(proxy.is_auto_bid)
+        self.assertEqual(self.ad.bid_summary.highest_bid_price, 71)
+
+    def test_per_ad_increment_table(self):
+        """The ad's own increment table overrides the platform default"""
+        Ad.objects.filter(pk=self.ad.pk).update(bid_increment_table=[[0, 5]])
+        proxy = self._place(self.bidders[0], 60, max_price=100)
+        self._place(self.bidders[1], 70)
+
+        proxy.refresh_from_db()
+        self.assertEqual(proxy.bid_price_per_unit, 75)
+
+    def test_twenty_proxies_settle_in_constant_queries(self):
+        """Twenty competing proxies settle in a single placement"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        Bid.objects.bulk_create([
+            Bid(ad=self.ad, user=user, bid_price_per_unit=51 + i, volume_requested=10,
+                status='outbid', max_auto_bid_price=100 + i)
+            for i, user in enumerate(self.bidders[:20])
+        ])
+        with CaptureQueriesContext(connection) as ctx:
+            manual = self._place(self.bidders[20], 80)
+
+        self.assertLessEqual(len(ctx.captured_queries), 15)
+        self.assertEqual(manual.status, 'outbid')
+        winner = Bid.objects.get(ad=self.ad, status='winning')
+        self.assertEqual(winner.user, self.bidders[19])
+        self.assertEqual(winner.bid_price_per_unit, 119)
+        self.assertEqual(BidHistory.objects.filter(change_reason='auto_bid').count(), 20)
+
+
+class BidCreateEndpointTest(APITestCase):
+    """Test that POST /api/bids/create/ places bids through BidService.create_bid"""
+
+    def setUp(self):
+        self.gateway = FakeStripeGateway()
+        patcher = mock.patch('payments.preauth_service.stripe_gateway', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        seller_company = Company.objects.create(
+            official_name="Seller AB", vat_number="SE-seller", email="seller@company.com", country="Sweden",
+            stripe_account_id="acct_seller", payment_ready=True
+        )
+        buyer_company = Company.objects.create(
+            official_name="Buyer AB", vat_number="SE-buyer", email="buyer@company.com", country="Sweden",
+            status='approved'
+        )
+        self.seller = User.objects.create_user(
+            username='endpoint_seller', email='endpoint_seller@test.com', password='testpass123',
+            company=seller_company
+        )
+        self.bidders = [
+            User.objects.create_user(
+                username=f'endpoint_bidder{i}', email=f'endpoint_bidder{i}@test.com', password='testpass123',
+                company=buyer_company
+            )
+            for i in range(2)
+        ]
+        self.ad = _create_live_ad(self.seller, title="Endpoint auction")
+
+    def _post(self, user, price, max_price=None, card='pm_card_visa'):
+        self.client.force_authenticate(user)
+        data = {'ad': self.ad.id, 'bid_price_per_unit': price, 'volume_requested': 10, 'payment_method_id': card}
+        if max_price:
+            data['max_auto_bid_price'] = max_price
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/bids/create/', data, format='json')
+
+    def test_bid_is_placed_with_a_hold(self):
+        response = self._post(self.bidders[0], 60)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        bid = Bid.objects.get(id=response.data['bid']['id'])
+        self.assertEqual((bid.status, bid.authorization_status), ('winning', 'authorized'))
+        self.assertEqual(self.gateway.objects[bid.stripe_payment_intent_id]['amount'], 60000)
+        self.assertEqual(self.ad.bid_summary.highest_bid_price, 60)
+
+    def test_rebid_replaces_hold_after_commit(self):
+        first_intent = Bid.objects.get(id=self._post(self.bidders[0], 60).data['bid']['id']).stripe_payment_intent_id
+        response = self._post(self.bidders[0], 65)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        bid = Bid.objects.get(user=self.bidders[0], ad=self.ad)
+        self.assertNotEqual(bid.stripe_payment_intent_id, first_intent)
+        self.assertEqual(self.gateway.objects[first_intent]['status'], 'canceled')
+        self.assertEqual(self.gateway.objects[bid.stripe_payment_intent_id]['status'], 'requires_capture')
+
+    def test_bid_below_leader_is_rejected(self):
+        self._post(self.bidders[0], 60)
+        response = self._post(self.bidders[1], 60)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('must be higher than the current highest bid', response.data['error'])
+        self.assertFalse(Bid.objects.filter(user=self.bidders[1]).exists())
+        # The hold placed before the lock is released again
+        rejected_holds = [
+            intent for intent in self.gateway.objects.values()
+            if intent['metadata'].get('buyer_id') == str(self.bidders[1].id)
+        ]
+        self.assertEqual([intent['status'] for intent in rejected_holds], ['canceled'])
+
+    def test_hold_is_released_when_placement_rolls_back(self):
+        with mock.patch.object(BidRepository, 'refresh_bid_summary', side_effect=RuntimeError('write failed')):
+            response = self._post(self.bidders[0], 60)
+
+        self.assertGreaterEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Bid.objects.filter(user=self.bidders[0]).exists())
+        self.assertEqual([intent['status'] for intent in self.gateway.objects.values()], ['canceled'])
+
+    def test_hold_is_placed_before_the_ad_is_locked(self):
+        """The Stripe call happens outside the locked transaction"""
+        calls = []
+        lock = BidRepository.lock_ad_for_bidding
+        create_intent = self.gateway.create_payment_intent
+
+        def record_lock(repository, ad_id):
+            calls.append('lock')
+            return lock(repository, ad_id)
+
+        def record_intent(*args, **kwargs):
+            calls.append('authorize')
+            return create_intent(*args, **kwargs)
+
+        with mock.patch.object(BidRepository, 'lock_ad_for_bidding', record_lock), \
+                mock.patch.object(self.gateway, 'create_payment_intent', record_intent):
+            response = self._post(self.bidders[0], 60)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(calls, ['authorize', 'lock'])
+
+    def test_declined_rebid_leaves_bid_and_summary_unchanged(self):
+        bid = Bid.objects.get(id=self._post(self.bidders[0], 60).data['bid']['id'])
+        response = self._post(self.bidders[0], 65, card='pm_card_chargeDeclined')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        rebid = Bid.objects.get(id=bid.id)
+        self.assertEqual((rebid.bid_price_per_unit, rebid.stripe_payment_intent_id), (60, bid.stripe_payment_intent_id))
+        self.assertEqual(self.gateway.objects[bid.stripe_payment_intent_id]['status'], 'requires_capture')
+        self.assertEqual(AdBidSummary.objects.get(ad=self.ad).highest_bid_price, 60)
+        self.assertFalse(BidHistory.objects.filter(bid=bid, change_reason='bid_updated').exists())
+
+    def test_proxy_bid_answers_manual_bid_over_http(self):
+        proxy_id = self._post(self.bidders[0], 60, max_price=100).data['bid']['id']
+        response = self._post(self.bidders[1], 70)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['bid']['status'], 'outbid')
+        proxy = Bid.objects.get(id=proxy_id)
+        self.assertEqual((proxy.status, proxy.bid_price_per_unit, proxy.is_auto_bid), ('winning', 71, True))
+        self.assertEqual(self.ad.bid_summary.highest_bid_price, 71)
+        self.assertTrue(BidHistory.objects.filter(bid=proxy, change_reason='auto_bid', new_price=71).exists())
+
+
+class UserBidsCursorPaginationTest(APITestCase):
+    """Test ?cursor= on the current user's bid list"""
+
+    def setUp(self):
+        self.seller = User.objects.create(username='cursor_bid_seller', email='cursor_bid_seller@test.com')
+        self.bidder = User.objects.create(username='cursor_bidder', email='cursor_bidder@test.com')
+        ads = Ad.objects.bulk_create([Ad(user=self.seller, title=f'Lot {i}') for i in range(12)])
+        Bid.objects.bulk_create([
+            Bid(ad=ad, user=self.bidder, bid_price_per_unit=10 + i, volume_requested=1)
+            for i, ad in enumerate(ads)
+        ])
+        self.client.force_authenticate(self.bidder)
+
+    def test_cursor_mode_keeps_envelope(self):
+        """Cursor pages keep the bids/pagination/statistics envelope"""
+        response = self.client.get('/api/bids/my/', {'cursor': '', 'page_size': 5})
+        self.assertEqual(len(response.data['bids']), 5)
+        self.assertIsNone(response.data['pagination']['count'])
+        self.assertEqual(response.data['statistics']['total_bids'], 12)
+
+        seen = [row['id'] for row in response.data['bids']]
+        while response.data['pagination']['next']:
+            response = self.client.get(response.data['pagination']['next'])
+            seen.extend(row['id'] for row in response.data['bids'])
+        self.assertEqual(seen, list(Bid.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentBidPlacementTest(TransactionTestCase):
+    """50 bidders racing on one ad end with exactly one, highest, winning bid"""
+
+    BIDDERS = 50
+
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            username='race_seller', email='race_seller@test.com', password='testpass123'
+        )
+        self.bidders = User.objects.bulk_create([
+            User(username=f'race_bidder{i}', email=f'race_bidder{i}@test.com')
+            for i in range(self.BIDDERS)
+        ])
+        self.ad = _create_live_ad(self.seller, title="Hot auction")
+
+    def test_concurrent_bidders(self):
+        import random
+        import threading
+        from django.db import connection
+
+        service = BidService(BidRepository())
+        prices = random.Random(7).sample(range(51, 51 + self.BIDDERS * 3), self.BIDDERS)
+        accepted = []
+        barrier = threading.Barrier(self.BIDDERS)
+
+        def bid(user, price):
+            try:
+                barrier.wait()
+                service.create_bid(ad_id=self.ad.id, bid_price_per_unit=price, volume_requested=10, user=user)
+                accepted.append(price)
+            except ValueError:
+                pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=bid, args=pair) for pair in zip(self.bidders, prices)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        winning = Bid.objects.filter(ad=self.ad, status='winning')
+        self.assertEqual(winning.count(), 1)
+        self.assertEqual(winning.get().bid_price_per_unit, max(accepted))
+        self.assertEqual(Bid.objects.filter(ad=self.ad, status='outbid').count(), len(accepted) - 1)
+
+        # Every accepted bid beat the one committed before it
+        placed = list(
+            BidHistory.objects.filter(bid__ad=self.ad, change_reason='bid_placed')
+            .order_by('id').values_list('new_price', flat=True)
+        )
+        self.assertEqual(placed, sorted(placed))
+        self.assertEqual(len(placed), len(accepted))
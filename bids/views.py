@@ -2,8 +2,9 @@ from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
 from decimal import Decimal
 
@@ -366,20 +367,38 @@ class UserBidsListView(APIView):
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
-            # Get user bids with pagination
-            pagination_data = bid_service.get_user_bids_paginated(
-                user=request.user,
-                status=status_filter,
-                page=page,
-                page_size=page_size
-            )
+            if 'cursor' in request.query_params:
+                # Keyset mode: seek on (created_at, id) with no COUNT(*) unless asked for
+                paginator = StandardResultsSetPagination()
+                bids = paginator.paginate_queryset(
+                    bid_service.get_user_bids_queryset(request.user, status_filter), request, view=self
+                )
+                pagination_data = {
+                    'results': bids,
+                    'count': paginator.keyset_count,
+                    'next': paginator.get_next_cursor_link(),
+                    'previous': None,
+                    'page_size': paginator.keyset_page_size,
+                    'total_pages': None,
+                    'current_page': None,
+                }
+            else:
+                # Get user bids with pagination
+                pagination_data = bid_service.get_user_bids_paginated(
+                    user=request.user,
+                    status=status_filter,
+                    page=page,
+                    page_size=page_size
+                )
 
             # Serialize the results
             serializer = BidListSerializer(pagination_data['results'], many=True)
 
             # Calculate statistics
-            total_bids = Bid.objects.filter(user=request.user).count()
-            active_bids = Bid.objects.filter(user=request.user, status='active').count()
+            statistics = Bid.objects.filter(user=request.user).aggregate(
+                total_bids=Count('id'),
+                active_bids=Count('id', filter=Q(status='active'))
+            )
 
             # Format response
             response_data = {
@@ -393,14 +412,16 @@ class UserBidsListView(APIView):
                     "current_page": pagination_data['current_page']
                 },
                 "statistics": {
-                    "total_bids": total_bids,
-                    "active_bids": active_bids,
+                    "total_bids": statistics['total_bids'],
+                    "active_bids": statistics['active_bids'],
                     "total_bidders": 1  # Current user
                 }
             }
 
             return Response(response_data, status=status.HTTP_200_OK)
 
+        except NotFound:
+            raise
         except Exception as e:
             return Response(
                 {"error": f"Failed to retrieve user bids: {str(e)}"},
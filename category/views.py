@@ -7,6 +7,7 @@ from category.services import CategoryService, SubCategoryService
 from category.serializers import CategorySerializer, SubCategorySerializer, CategorySpecificationChoicesSerializer
 from category.models import CategorySpecification
 from ads.models import Ad
+from base.utils.response_cache import cache_response
 
 category_repository = CategoryRepository()
 sub_repository = SubCategoryRepository()
@@ -75,6 +76,7 @@ class CategorySpecificationChoicesView(APIView):
     """API endpoint to get all available specification choices for the frontend"""
     permission_classes = [AllowAny]
 
+    @cache_response(models=('category.Category',))
     def get(self, request):
         """Return all specification choices for material grade, color, and form"""
         try:
@@ -96,6 +98,7 @@ class AdFormChoicesView(APIView):
     """API endpoint to get all form choices for ads including units and auction durations"""
     permission_classes = [AllowAny]
 
+    @cache_response(models=('category.Category',))
     def get(self, request):
         """Return all form choices for creating/editing ads"""
         try:
@@ -4,5 +4,8 @@ from django.apps import AppConfig
 class CategorySubscriptionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'category_subscriptions'
-    
+
+    def ready(self):
+        # Register the ad publish receiver
+        import category_subscriptions.signals  # noqa: F401
 
@@ -1,62 +1,106 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.db.models import Q
 
 from ads.models import Ad
+from base.services.logging import LoggingService
+from notifications.cache import invalidate_notification_stats
 from notifications.models import Notification
 from .models import CategorySubscription
 
+logger = logging.getLogger(__name__)
+logging_service = LoggingService()
+
+FANOUT_CHUNK_SIZE = 1000
+
+
 @receiver(post_save, sender=Ad)
 def notify_category_subscribers(sender, instance, created, **kwargs):
     """
     Send notifications to users who are subscribed to the category or subcategory
-    of a newly created and activated ad.
+    of an ad when it is published.
     """
-    # Only send notifications for newly created ads that are active
-    if created and instance.is_active:
-        notify_subscribers_for_ad(instance)
-    # Also handle when an ad becomes active after creation
-    elif not created and instance.is_active:
-        # Check if tracker is available and has changed
-        if hasattr(instance, 'tracker') and instance.tracker.has_changed('is_active') and instance.tracker.previous('is_active') is False:
-            notify_subscribers_for_ad(instance)
-        # Fallback: if no tracker, just check if it's currently active (less precise but works)
-        elif not hasattr(instance, 'tracker'):
-            # We can't track changes without the tracker, so we'll just notify for active ads
-            # This is less efficient but ensures the system works
-            notify_subscribers_for_ad(instance)
-
-def notify_subscribers_for_ad(ad):
-    """
-    Create notifications for all users subscribed to the ad's category or subcategory
-    """
-    if not ad.category:
+    # Ad.save() flags the save that moves the ad to active; later edits don't re-notify
+    if not getattr(instance, '_activated', False) or not instance.is_active() or not instance.category_id:
         return
-    
-    # Find all users subscribed to this category or subcategory
-    query = Q(category=ad.category)
-    
-    if ad.subcategory:
-        # Include users subscribed to this specific subcategory
-        query |= Q(category=ad.category, subcategory=ad.subcategory)
-    
-    # Get unique users who have subscribed
-    subscriptions = CategorySubscription.objects.filter(query).select_related('user').distinct('user')
-    
-    # Create a notification for each subscribed user
-    for subscription in subscriptions:
-        user = subscription.user
-        
-        # Skip notification if the user is the one who created the ad
-        if user == ad.user:
-            continue
-        
-        # Create the notification
-        category_name = ad.subcategory.name if ad.subcategory else ad.category.name
-        
-        Notification.objects.create(
-            user=user,
-            title=f"New {category_name} Auction Available",
-            message=f"A new auction for {ad.title} has been posted in the {category_name} category that you're subscribed to.",
-            type='auction'
+
+    ad_id = instance.id
+    if settings.CATEGORY_NOTIFICATION_FANOUT_ASYNC:
+        transaction.on_commit(
+            lambda: threading.Thread(target=_fan_out_in_thread, args=(ad_id,), daemon=True).start()
         )
+    else:
+        transaction.on_commit(lambda: notify_subscribers_for_ad(ad_id))
+
+
+def _fan_out_in_thread(ad_id):
+    try:
+        notify_subscribers_for_ad(ad_id)
+    except Exception as e:
+        logging_service.log_error(e)
+    finally:
+        connection.close()
+
+
+def notify_subscribers_for_ad(ad_id, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Create notifications for all users subscribed to the ad's category or subcategory.
+
+    Subscriber ids are streamed and notifications inserted chunk_size at a time.
+    Each row carries a per-ad dedupe key, so a user subscribed to both the
+    category and the subcategory, or an ad published twice, yields one
+    notification per user. Returns the number of subscribers processed.
+    """
+    ad = Ad.objects.select_related('category', 'subcategory').filter(id=ad_id).first()
+    if not ad or not ad.category:
+        return 0
+
+    # Whole-category subscribers plus subscribers to this specific subcategory
+    query = Q(category_id=ad.category_id, subcategory__isnull=True)
+    if ad.subcategory_id:
+        query |= Q(category_id=ad.category_id, subcategory_id=ad.subcategory_id)
+
+    user_ids = (
+        CategorySubscription.objects.filter(query)
+        .exclude(user_id=ad.user_id)
+        .values_list('user_id', flat=True)
+        .distinct()
+        .order_by('user_id')
+    )
+
+    category_name = ad.subcategory.name if ad.subcategory else ad.category.name
+    title = f"New {category_name} Auction Available"
+    message = f"A new auction for {ad.title} has been posted in the {category_name} category that you're subscribed to."
+    dedupe_key = f"category_subscription:ad:{ad.id}"
+
+    processed = 0
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=chunk_size):
+        batch.append(Notification(
+            user_id=user_id,
+            title=title,
+            message=message,
+            type='auction',
+            metadata={'ad_id': ad.id},
+            dedupe_key=dedupe_key,
+        ))
+        if len(batch) >= chunk_size:
+            processed += _insert_notifications(batch)
+            batch = []
+
+    if batch:
+        processed += _insert_notifications(batch)
+
+    logger.info(f"Category subscription fan-out for ad {ad.id} reached {processed} subscribers")
+    return processed
+
+
+def _insert_notifications(batch):
+    Notification.objects.bulk_create(batch, ignore_conflicts=True)
+    invalidate_notification_stats([notification.user_id for notification in batch])
+    return len(batch)
@@ -1,3 +1,82 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from ads.models import Ad, Location
+from category.models import Category, SubCategory
+from notifications.models import Notification
+from users.models import User
+from .models import CategorySubscription
+from .signals import notify_subscribers_for_ad
+
+
+@override_settings(CATEGORY_NOTIFICATION_FANOUT_ASYNC=False)
+class CategorySubscriptionFanOutTest(TestCase):
+    """Test notification fan-out when an ad is published"""
+
+    def setUp(self):
+        self.seller = User.objects.create(username='fanout_seller', email='fanout_seller@test.com')
+        self.category = Category.objects.create(name='Plastics')
+        self.subcategory = SubCategory.objects.create(name='PET', category=self.category)
+        self.other_subcategory = SubCategory.objects.create(name='HDPE', category=self.category)
+        self.location = Location.objects.create(country='Sweden', city='Lund')
+
+        self.subscribers = User.objects.bulk_create([
+            User(username=f'fanout_user{i}', email=f'fanout_user{i}@test.com') for i in range(5)
+        ])
+        # Two whole-category subscribers, one of them also on the subcategory
+        CategorySubscription.objects.create(user=self.subscribers[0], category=self.category)
+        CategorySubscription.objects.create(user=self.subscribers[1], category=self.category)
+        CategorySubscription.objects.create(
+            user=self.subscribers[1], category=self.category, subcategory=self.subcategory
+        )
+        CategorySubscription.objects.create(
+            user=self.subscribers[2], category=self.category, subcategory=self.subcategory
+        )
+        # Different subcategory, and the seller's own subscription
+        CategorySubscription.objects.create(
+            user=self.subscribers[3], category=self.category, subcategory=self.other_subcategory
+        )
+        CategorySubscription.objects.create(user=self.seller, category=self.category)
+
+        self.ad = Ad.objects.create(
+            user=self.seller,
+            category=self.category,
+            subcategory=self.subcategory,
+            packaging='baled',
+            material_frequency='monthly',
+            location=self.location,
+            delivery_options=['pickup_only'],
+            title='Clear PET flakes',
+            available_quantity=Decimal('100'),
+            starting_bid_price=Decimal('10'),
+            currency='EUR',
+        )
+
+    def _publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ad.status = 'active'
+            self.ad.save()
+
+    def _notified_users(self):
+        return sorted(Notification.objects.filter(metadata__ad_id=self.ad.id).values_list('user_id', flat=True))
+
+    def test_publishing_notifies_each_matching_subscriber_once(self):
+        """Category and matching subcategory subscribers get one notification each"""
+        self._publish()
+        self.assertEqual(self._notified_users(), sorted(u.id for u in self.subscribers[:3]))
+
+    def test_edits_after_publishing_do_not_renotify(self):
+        """Saving an already active ad sends nothing new"""
+        self._publish()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ad.description = 'Updated description'
+            self.ad.save()
+        self.assertEqual(len(self._notified_users()), 3)
+
+    def test_fan_out_is_idempotent_and_chunked(self):
+        """Re-running the fan-out with small chunks does not duplicate rows"""
+        self.assertEqual(notify_subscribers_for_ad(self.ad.id, chunk_size=2), 3)
+        with self.assertNumQueries(4):
+            notify_subscribers_for_ad(self.ad.id, chunk_size=2)
+        self.assertEqual(len(self._notified_users()), 3)
@@ -0,0 +1,108 @@
+"""
+Django management command to reconcile cached payment readiness with Stripe.
+
+Pages through the platform's connected accounts (one Account.list request
+per --page-size accounts instead of a retrieve per company), recomputes
+each company's readiness and stores what changed with bulk_update; the rest
+only have last_payment_check moved forward, in one UPDATE. A company whose
+account is no longer listed is marked not ready. Ads of companies whose
+payment_ready flipped are listed or delisted to match.
+
+Run it on a schedule shorter than PAYMENT_READINESS_TTL and publishing an
+ad never has to wait for Stripe.
+
+Usage:
+    python manage.py reconcile_payment_readiness
+    python manage.py reconcile_payment_readiness --page-size 50 --dry-run
+"""
+
+import time
+from collections import defaultdict
+
+import stripe
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ads.listing import refresh_listed_ads
+from ads.models import Ad
+from company.models import Company
+from company.payment_utils import READINESS_FIELDS, account_readiness, set_account_readiness
+from payments.stripe_gateway import stripe_gateway
+
+FLAG_FIELDS = ['payment_ready', 'stripe_capabilities_complete', 'stripe_onboarding_complete']
+NOT_READY = {'payment_ready': False, 'capabilities_complete': False, 'onboarding_complete': False}
+
+
+class Command(BaseCommand):
+    help = "Refresh every company's cached payment readiness from Stripe's account list"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Accounts per Stripe request (max 100)')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        if not 1 <= page_size <= 100:
+            raise CommandError('--page-size must be between 1 and 100')
+
+        started = time.monotonic()
+        companies_by_account = defaultdict(list)
+        for company in Company.objects.exclude(stripe_account_id__isnull=True).exclude(stripe_account_id='').only(
+            'id', 'official_name', 'stripe_account_id', *READINESS_FIELDS
+        ):
+            companies_by_account[company.stripe_account_id].append(company)
+        now = timezone.now()
+
+        changed, unchanged, flipped = [], [], []
+
+        def reconcile(company, readiness):
+            before = [getattr(company, name) for name in FLAG_FIELDS]
+            set_account_readiness(company, readiness, checked_at=now)
+            if [getattr(company, name) for name in FLAG_FIELDS] == before:
+                unchanged.append(company.id)
+                return
+            changed.append(company)
+            if company.payment_ready != before[0]:
+                flipped.append(company)
+
+        pages = 0
+        params = {'limit': page_size}
+        try:
+            while True:
+                page = stripe_gateway.list_accounts(params)
+                pages += 1
+                for account in page.data:
+                    for company in companies_by_account.pop(account.id, []):
+                        reconcile(company, account_readiness(account))
+                if not page.has_more or not page.data:
+                    break
+                params['starting_after'] = page.data[-1].id
+        except stripe.error.StripeError as e:
+            # Keep what was read; accounts not reached yet are left alone
+            self.stderr.write(self.style.ERROR(f'Stopped after {pages} pages: {e}'))
+            companies_by_account.clear()
+
+        # Listed accounts are gone from the map; what is left no longer exists on Stripe
+        missing = [company for companies in companies_by_account.values() for company in companies]
+        for company in missing:
+            reconcile(company, NOT_READY)
+
+        for company in flipped:
+            state = 'ready' if company.payment_ready else 'no longer ready'
+            self.stdout.write(f'{company.official_name} ({company.stripe_account_id}): {state}')
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                Company.objects.bulk_update(changed, READINESS_FIELDS, batch_size=500)
+                Company.objects.filter(id__in=unchanged).update(last_payment_check=now)
+            # bulk_update skips Company.save(), which normally keeps ads in step
+            if flipped:
+                refresh_listed_ads(Ad.objects.filter(user__company__in=[company.id for company in flipped]))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would update" if options["dry_run"] else "Updated"} {len(changed)} of '
+            f'{len(changed) + len(unchanged)} companies ({len(flipped)} changed payment readiness, '
+            f'{len(missing)} without a Stripe account) from {pages} Stripe requests '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
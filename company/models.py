@@ -1,7 +1,11 @@
 from django.db import models
 from django.core.validators import MinLengthValidator
+from base.models import FieldTrackerMixin
+
+class Company(FieldTrackerMixin, models.Model):
+    # Compared against its loaded value in save() to relist or delist the company's ads
+    tracked_fields = ('payment_ready',)
 
-class Company(models.Model):
     SECTOR_CHOICES = [
         ('manufacturing  & Production', 'Manufacturing & Production'),
         ('construction', 'Construction & Demolition'),
@@ -55,3 +59,12 @@ class Company(models.Model):
 
     def __str__(self):
         return f"{self.official_name} ({self.status})"
+
+    def save(self, *args, **kwargs):
+        payment_ready_changed = not self._state.adding and self.has_changed('payment_ready')
+        super().save(*args, **kwargs)
+
+        if payment_ready_changed:
+            from ads.listing import refresh_listed_ads
+            from ads.models import Ad
+            refresh_listed_ads(Ad.objects.filter(user__company=self))
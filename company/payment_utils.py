@@ -1,5 +1,11 @@
 """
 Payment readiness utilities for marketplace functionality
+
+Company.payment_ready caches whether a company's Stripe account can take
+payments; last_payment_check records when it was last confirmed. It is
+refreshed from account.updated webhooks and by reconcile_payment_readiness,
+and publishing an ad only asks Stripe when the cached state is older than
+PAYMENT_READINESS_TTL.
 """
 import stripe
 from functools import wraps
@@ -10,10 +16,89 @@ from datetime import timedelta
 from rest_framework.exceptions import PermissionDenied
 import logging
 
+from payments.stripe_gateway import stripe_gateway
+from .models import Company
+
 logger = logging.getLogger(__name__)
 
-# Configure Stripe
-stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
+REQUIRED_CAPABILITIES = ('card_payments', 'transfers')
+READINESS_FIELDS = ['payment_ready', 'stripe_capabilities_complete', 'stripe_onboarding_complete', 'last_payment_check']
+
+
+def payment_check_ttl():
+    return timedelta(seconds=getattr(settings, 'PAYMENT_READINESS_TTL', 24 * 60 * 60))
+
+
+def is_payment_check_stale(company, now=None):
+    """Whether the cached readiness is too old to publish an ad on"""
+    return not company.last_payment_check or company.last_payment_check < (now or timezone.now()) - payment_check_ttl()
+
+
+def account_readiness(account):
+    """
+    Readiness of a Stripe account, from a retrieved account or a webhook payload
+    
+    Returns:
+        dict: capabilities, requirements and the three readiness flags
+    """
+    capabilities = {}
+    for capability, status_info in (account.get('capabilities') or {}).items():
+        # Handle both object and string status formats
+        capabilities[capability] = status_info.get('status') if isinstance(status_info, dict) else status_info
+
+    requirements_info = account.get('requirements') or {}
+    requirements = (requirements_info.get('currently_due') or []) + (requirements_info.get('eventually_due') or [])
+    # Document verification may still be pending on an account that can take payments
+    critical_requirements = [req for req in requirements if not req.endswith('.verification.document')]
+
+    capabilities_complete = all(capabilities.get(cap) == 'active' for cap in REQUIRED_CAPABILITIES)
+    onboarding_complete = bool(account.get('details_submitted')) and capabilities_complete
+    return {
+        'capabilities': capabilities,
+        'requirements': requirements,
+        'capabilities_complete': capabilities_complete,
+        'onboarding_complete': onboarding_complete,
+        'payment_ready': (
+            onboarding_complete
+            and bool(account.get('charges_enabled'))
+            and bool(account.get('payouts_enabled'))
+            and not critical_requirements
+        ),
+    }
+
+
+def set_account_readiness(company, readiness, checked_at=None):
+    """Copy account_readiness() flags onto a company without saving it"""
+    company.payment_ready = readiness['payment_ready']
+    company.stripe_capabilities_complete = readiness['capabilities_complete']
+    company.stripe_onboarding_complete = readiness['onboarding_complete']
+    company.last_payment_check = checked_at or timezone.now()
+
+
+def apply_account_readiness(company, account):
+    """
+    Store the readiness of a Stripe account on the company using it
+    
+    Returns:
+        bool: Whether the company is payment ready
+    """
+    set_account_readiness(company, account_readiness(account))
+    company.save(update_fields=READINESS_FIELDS)
+    return company.payment_ready
+
+
+def refresh_payment_readiness(account):
+    """
+    Update the companies using a Stripe account from an account.updated payload,
+    without calling Stripe
+    
+    Returns:
+        int: Number of companies updated
+    """
+    companies = list(Company.objects.filter(stripe_account_id=account['id']))
+    for company in companies:
+        apply_account_readiness(company, account)
+    return len(companies)
 
 
 def check_stripe_account_capabilities(stripe_account_id):
@@ -30,7 +115,7 @@ def check_stripe_account_capabilities(stripe_account_id):
         return False, {}, "No Stripe account ID found"
     
     try:
-        account = stripe.Account.retrieve(stripe_account_id)
+        account = stripe_gateway.retrieve_account(stripe_account_id)
         
         required_capabilities = ['transfers', 'card_payments']
         capabilities_status = {}
@@ -69,26 +154,19 @@ def update_company_payment_status(company):
         company.payment_ready = False
         company.stripe_capabilities_complete = False
         company.stripe_onboarding_complete = False
-    else:
-        is_ready, _, _ = check_stripe_account_capabilities(
-            company.stripe_account_id
-        )
-        
-        company.stripe_capabilities_complete = is_ready
-        company.payment_ready = is_ready
-        
-        # Check if onboarding is complete (simplified check)
-        company.stripe_onboarding_complete = is_ready
-    
-    company.last_payment_check = timezone.now()
-    company.save(update_fields=[
-        'payment_ready', 
-        'stripe_capabilities_complete', 
-        'stripe_onboarding_complete', 
-        'last_payment_check'
-    ])
-    
-    return company.payment_ready
+        company.last_payment_check = timezone.now()
+        company.save(update_fields=READINESS_FIELDS)
+        return False
+
+    try:
+        account = stripe_gateway.retrieve_account(company.stripe_account_id)
+    except stripe.error.StripeError as e:
+        # Keep the cached state rather than unpublishing on a Stripe outage;
+        # last_payment_check stays old, so the next check tries again
+        logger.warning(f"Could not refresh payment status for company {company.id}: {e}")
+        return company.payment_ready
+
+    return apply_account_readiness(company, account)
 
 
 def requires_payment_ready_company(f):
@@ -120,12 +198,7 @@ def requires_payment_ready_company(f):
         logger.info(f"🏢 Company found: {company.official_name}")
         
         # Check if we need to refresh the payment status
-        should_refresh = (
-            not company.last_payment_check or 
-            company.last_payment_check < timezone.now() - timedelta(hours=24)
-        )
-        
-        if should_refresh:
+        if is_payment_check_stale(company):
             logger.info("🔄 Refreshing payment status...")
             update_company_payment_status(company)
             
@@ -158,12 +231,7 @@ def check_company_payment_readiness(company):
         return False
         
     # Check if we need to refresh the status
-    should_refresh = (
-        not company.last_payment_check or 
-        company.last_payment_check < timezone.now() - timedelta(hours=24)
-    )
-    
-    if should_refresh:
+    if is_payment_check_stale(company):
         return update_company_payment_status(company)
         
     return company.payment_ready
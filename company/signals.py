@@ -2,6 +2,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from company.models import Company
+from notifications.cache import invalidate_notification_stats
 from notifications.models import Notification
 
 User = get_user_model()
@@ -45,3 +46,4 @@ def notify_admin_new_company(sender, instance: Company, created: bool, **kwargs)
     ]
     if notifications:
         Notification.objects.bulk_create(notifications)
+        invalidate_notification_stats([admin.id for admin in admin_users])
@@ -6,10 +6,9 @@ import logging
 from django.conf import settings
 from django.urls import reverse
 from typing import Dict, Optional, Tuple
+from payments.stripe_gateway import stripe_gateway
 from .models import Company
-
-# Configure Stripe
-stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
+from .payment_utils import account_readiness, refresh_payment_readiness, set_account_readiness
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +23,7 @@ class StripeConnectService:
         """
         try:
             # Create Stripe Express account
-            account = stripe.Account.create(
+            account = stripe_gateway.create_account(dict(
                 type='express',
                 country='SE',  # Sweden - adjust based on your market
                 email=user_email,
@@ -37,7 +36,7 @@ class StripeConnectService:
                     'company_id': str(company.id),
                     'company_name': company.official_name,
                 }
-            )
+            ), idempotency_key=f'company:{company.id}:express-account')
             
             # Save account ID to company
             company.stripe_account_id = account.id
@@ -55,12 +54,12 @@ class StripeConnectService:
                     refresh_url = f"{frontend_base_url}/dashboard/payments/setup"
                     
                     # Create account link for onboarding
-                    account_link = stripe.AccountLink.create(
+                    account_link = stripe_gateway.create_account_link(dict(
                         account=account.id,
                         refresh_url=refresh_url,
                         return_url=return_url,
                         type='account_onboarding',
-                    )
+                    ))
                     onboarding_url = account_link.url
                     logger.info(f"Created onboarding URL for account {account.id}")
                 except Exception as e:
@@ -91,12 +90,12 @@ class StripeConnectService:
             refresh_url = f"{frontend_base_url}/dashboard/payments/setup"
             
             # Create account link
-            account_link = stripe.AccountLink.create(
+            account_link = stripe_gateway.create_account_link(dict(
                 account=company.stripe_account_id,
                 refresh_url=refresh_url,
                 return_url=return_url,
                 type='account_onboarding',
-            )
+            ))
             
             logger.info(f"Created onboarding link for account {company.stripe_account_id}")
             return True, "Onboarding link created", account_link.url
@@ -125,21 +124,10 @@ class StripeConnectService:
                     'capabilities': {},
                 }
             
-            account = stripe.Account.retrieve(company.stripe_account_id)
-            
-            # Check capabilities status
-            capabilities = {}
-            for capability, status_info in account.capabilities.items():
-                # Handle both object and string status formats
-                if hasattr(status_info, 'status'):
-                    capabilities[capability] = status_info.status
-                else:
-                    capabilities[capability] = status_info
-            
-            # Get requirements
-            requirements = []
-            if account.requirements:
-                requirements = account.requirements.currently_due + account.requirements.eventually_due
+            account = stripe_gateway.retrieve_account(company.stripe_account_id)
+            readiness = account_readiness(account)
+            capabilities = readiness['capabilities']
+            requirements = readiness['requirements']
             
             status_info = {
                 'exists': True,
@@ -155,34 +143,10 @@ class StripeConnectService:
             }
             
             # Update company payment status based on account status
-            # Check for critical requirements (ignore document verification for now)
-            critical_requirements = [req for req in requirements 
-                                   if not req.endswith('.verification.document')]
-            
-            payment_ready = (
-                account.charges_enabled and 
-                account.payouts_enabled and 
-                account.details_submitted and
-                len(critical_requirements) == 0 and
-                capabilities.get('card_payments') == 'active' and
-                capabilities.get('transfers') == 'active'
-            )
-            
-            # Update company fields
-            company.payment_ready = payment_ready
-            company.stripe_capabilities_complete = (
-                capabilities.get('card_payments') == 'active' and
-                capabilities.get('transfers') == 'active'
-            )
-            # Onboarding is complete if basic details are submitted (document verification can be pending)
-            company.stripe_onboarding_complete = (
-                account.details_submitted and 
-                capabilities.get('card_payments') == 'active' and
-                capabilities.get('transfers') == 'active'
-            )
+            set_account_readiness(company, readiness)
             company.save()
             
-            logger.info(f"Updated account status for company {company.id}: payment_ready={payment_ready}")
+            logger.info(f"Updated account status for company {company.id}: payment_ready={company.payment_ready}")
             return status_info
             
         except stripe.error.StripeError as e:
@@ -202,7 +166,7 @@ class StripeConnectService:
             if not company.stripe_account_id:
                 return False, "No Stripe account found", None
             
-            login_link = stripe.Account.create_login_link(company.stripe_account_id)
+            login_link = stripe_gateway.create_login_link(company.stripe_account_id)
             
             logger.info(f"Created login link for account {company.stripe_account_id}")
             return True, "Login link created", login_link.url
@@ -215,20 +179,18 @@ class StripeConnectService:
             return False, "An unexpected error occurred", None
 
     @staticmethod
-    def handle_account_update_webhook(account_id: str) -> bool:
+    def handle_account_update_webhook(account: dict) -> bool:
         """
         Handle account.updated webhook from Stripe
+        The payload carries the whole account, so no Stripe call is needed
         Returns: True if processed successfully
         """
+        account_id = account['id']
         try:
-            # Find company with this account ID
-            company = Company.objects.filter(stripe_account_id=account_id).first()
-            if not company:
+            if not refresh_payment_readiness(account):
                 logger.warning(f"No company found for Stripe account {account_id}")
                 return False
             
-            # Update account status
-            StripeConnectService.check_account_status(company)
             logger.info(f"Processed account update webhook for account {account_id}")
             return True
             
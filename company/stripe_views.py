@@ -214,7 +214,7 @@ class StripeWebhookView(APIView):
                 account_id = account['id']
                 
                 # Update account status
-                StripeConnectService.handle_account_update_webhook(account_id)
+                StripeConnectService.handle_account_update_webhook(account)
                 logger.info(f"Processed account.updated webhook for {account_id}")
                 
             else:
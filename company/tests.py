@@ -1,3 +1,120 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import stripe
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from company.models import Company
+from company.payment_utils import check_company_payment_readiness, refresh_payment_readiness
+from payments.stripe_gateway import FakeStripeGateway
+
+
+def ready_account(account_id, **overrides):
+    return {
+        'id': account_id, 'object': 'account', 'charges_enabled': True, 'payouts_enabled': True,
+        'details_submitted': True, 'capabilities': {'card_payments': 'active', 'transfers': 'active'},
+        'requirements': {'currently_due': [], 'eventually_due': []}, **overrides,
+    }
+
+
+@override_settings(PAYMENT_READINESS_TTL=3600)
+class PaymentReadinessCacheTest(TestCase):
+    """Test that payment readiness is served from the company row until it goes stale"""
+
+    def setUp(self):
+        self.gateway = FakeStripeGateway()
+        patcher = mock.patch('company.payment_utils.stripe_gateway', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gateway.objects['acct_1'] = ready_account('acct_1')
+        self.company = Company.objects.create(
+            official_name='Seller AB', vat_number='SE1', email='seller@example.com', country='Sweden',
+            stripe_account_id='acct_1', payment_ready=True, last_payment_check=timezone.now(),
+        )
+
+    def test_fresh_state_does_not_call_stripe(self):
+        self.assertTrue(check_company_payment_readiness(self.company))
+        self.assertEqual(self.gateway.calls, [])
+
+    def test_stale_state_is_refreshed_from_stripe(self):
+        self.gateway.objects['acct_1']['charges_enabled'] = False
+        Company.objects.filter(id=self.company.id).update(last_payment_check=timezone.now() - timedelta(hours=2))
+        self.company.refresh_from_db()
+
+        self.assertFalse(check_company_payment_readiness(self.company))
+        self.assertEqual(self.gateway.calls, ['accounts.retrieve'])
+        self.company.refresh_from_db()
+        self.assertFalse(self.company.payment_ready)
+        self.assertGreater(self.company.last_payment_check, timezone.now() - timedelta(minutes=1))
+
+    def test_stripe_outage_keeps_cached_state(self):
+        stale = timezone.now() - timedelta(hours=2)
+        Company.objects.filter(id=self.company.id).update(last_payment_check=stale)
+        self.company.refresh_from_db()
+        self.gateway.failure_rate = 1.0
+
+        self.assertTrue(check_company_payment_readiness(self.company))
+        self.company.refresh_from_db()
+        self.assertEqual((self.company.payment_ready, self.company.last_payment_check), (True, stale))
+
+    def test_webhook_payload_updates_without_calling_stripe(self):
+        payload = ready_account('acct_1', requirements={'currently_due': ['external_account'], 'eventually_due': []})
+        self.assertEqual(refresh_payment_readiness(payload), 1)
+        self.company.refresh_from_db()
+        self.assertFalse(self.company.payment_ready)
+        self.assertTrue(self.company.stripe_capabilities_complete)
+        self.assertEqual(self.gateway.calls, [])
+
+
+class ReconcilePaymentReadinessTest(TestCase):
+    """Test the batch reconciler against the in-memory gateway"""
+
+    def setUp(self):
+        self.gateway = FakeStripeGateway()
+        patcher = mock.patch('company.management.commands.reconcile_payment_readiness.stripe_gateway', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for account_id in ('acct_ready', 'acct_restricted', 'acct_other'):
+            self.gateway.objects[account_id] = ready_account(account_id)
+        self.gateway.objects['acct_restricted']['payouts_enabled'] = False
+
+        long_ago = timezone.now() - timedelta(days=3)
+        self.ready, self.restricted, self.deleted = [
+            Company.objects.create(
+                official_name=name, vat_number=name, email=f'{name}@example.com', country='Sweden',
+                stripe_account_id=account_id, payment_ready=payment_ready, last_payment_check=long_ago,
+            )
+            for name, account_id, payment_ready in [
+                ('ready', 'acct_ready', False), ('restricted', 'acct_restricted', True), ('deleted', 'acct_gone', True),
+            ]
+        ]
+
+    def _reconcile(self, *args):
+        output = StringIO()
+        call_command('reconcile_payment_readiness', '--page-size', '2', *args, stdout=output)
+        return output.getvalue()
+
+    def test_pages_through_accounts_and_updates_companies(self):
+        output = self._reconcile()
+
+        self.assertEqual(self.gateway.calls, ['accounts.list', 'accounts.list'])
+        self.assertIn('Updated 3 of 3 companies (3 changed payment readiness, 1 without a Stripe account)', output)
+        for company, ready in [(self.ready, True), (self.restricted, False), (self.deleted, False)]:
+            company.refresh_from_db()
+            self.assertEqual(company.payment_ready, ready, company.official_name)
+            self.assertGreater(company.last_payment_check, timezone.now() - timedelta(minutes=1))
+
+    def test_dry_run_saves_nothing(self):
+        self.assertIn('Would update 3 of 3 companies', self._reconcile('--dry-run'))
+        self.ready.refresh_from_db()
+        self.assertFalse(self.ready.payment_ready)
+
+    def test_stripe_error_leaves_unread_companies_alone(self):
+        with mock.patch.object(self.gateway, 'list_accounts', side_effect=stripe.error.APIConnectionError('down')):
+            self._reconcile()
+        self.deleted.refresh_from_db()
+        self.assertTrue(self.deleted.payment_ready)
@@ -124,6 +124,29 @@ if SECONDARY_DATABASE_URL:
         conn_health_checks=True,
     )
 
+# Cache: set REDIS_URL to share it between processes through a Redis-compatible
+# server (needs the redis package); otherwise each process keeps a local-memory cache
+REDIS_URL = env('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'nordicloop',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'nordicloop',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds public listing responses stay cached (see base/utils/response_cache.py)
+RESPONSE_CACHE_TIMEOUT = env('RESPONSE_CACHE_TIMEOUT', default=60, cast=int)
+
 # Authentication
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -247,6 +270,22 @@ CLOUDFLARE_R2_SECRET_ACCESS_KEY = env('CLOUDFLARE_R2_SECRET_ACCESS_KEY', default
 R2_PUBLIC_BASE_URL = env('R2_PUBLIC_BASE_URL', default='')
 R2_SIGNED_URL_TTL = env.int('R2_SIGNED_URL_TTL', default=3600)
 DUAL_WRITE_R2 = env.bool('DUAL_WRITE_R2', default=False)
+# Streaming uploads: images (10 MB max) go up as one streamed PUT; larger files
+# are sent in parallel parts, buffering at most concurrency x chunksize
+R2_MULTIPART_THRESHOLD_MB = env.int('R2_MULTIPART_THRESHOLD_MB', default=16)
+R2_MULTIPART_CHUNKSIZE_MB = env.int('R2_MULTIPART_CHUNKSIZE_MB', default=8)
+R2_MAX_CONCURRENCY = env.int('R2_MAX_CONCURRENCY', default=4)
+R2_MAX_POOL_CONNECTIONS = env.int('R2_MAX_POOL_CONNECTIONS', default=20)
+
+# Image uploads are staged locally and pushed to R2/Firebase in the background
+# (base/services/image_upload_queue.py, on base/utils/work_queue.py). Off by
+# default: turn it on only where process_image_uploads runs, or images keep
+# serving their local staged URLs
+ASYNC_IMAGE_UPLOADS = env.bool('ASYNC_IMAGE_UPLOADS', default=False)
+IMAGE_UPLOAD_WORKER_THREAD = env.bool('IMAGE_UPLOAD_WORKER_THREAD', default=True)
+IMAGE_UPLOAD_MAX_ATTEMPTS = env.int('IMAGE_UPLOAD_MAX_ATTEMPTS', default=8)
+# Processes rendering WebP/JPEG image variants (0 renders in the calling thread)
+IMAGE_VARIANT_WORKERS = env.int('IMAGE_VARIANT_WORKERS', default=2)
 
 # Backend URL for local image serving
 BACKEND_URL = env('BACKEND_URL', default='http://127.0.0.1:8000')
@@ -261,6 +300,39 @@ STRIPE_PUBLISHABLE_KEY = env('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = env('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = env('STRIPE_WEBHOOK_SECRET', default='')
 
+# All Stripe calls go through payments/stripe_gateway.py. Timeouts are in
+# seconds; the SDK retries network errors STRIPE_MAX_NETWORK_RETRIES times
+# with the same idempotency key. After STRIPE_CIRCUIT_FAILURE_THRESHOLD
+# consecutive failures calls fail fast for STRIPE_CIRCUIT_RESET_SECONDS.
+# STRIPE_GATEWAY='fake' swaps in an in-memory Stripe for load tests.
+STRIPE_GATEWAY = env('STRIPE_GATEWAY', default='live')
+STRIPE_READ_TIMEOUT = env.float('STRIPE_READ_TIMEOUT', default=10)
+STRIPE_WRITE_TIMEOUT = env.float('STRIPE_WRITE_TIMEOUT', default=30)
+STRIPE_MAX_NETWORK_RETRIES = env.int('STRIPE_MAX_NETWORK_RETRIES', default=2)
+STRIPE_MAX_POOL_CONNECTIONS = env.int('STRIPE_MAX_POOL_CONNECTIONS', default=20)
+STRIPE_CIRCUIT_FAILURE_THRESHOLD = env.int('STRIPE_CIRCUIT_FAILURE_THRESHOLD', default=5)
+STRIPE_CIRCUIT_RESET_SECONDS = env.float('STRIPE_CIRCUIT_RESET_SECONDS', default=30)
+STRIPE_FAKE_LATENCY = env.float('STRIPE_FAKE_LATENCY', default=0.0)
+STRIPE_FAKE_JITTER = env.float('STRIPE_FAKE_JITTER', default=0.0)
+STRIPE_FAKE_FAILURE_RATE = env.float('STRIPE_FAKE_FAILURE_RATE', default=0.0)
+
+# Webhook events are stored in payments.StripeEvent and handled by
+# drain_stripe_events (payments/event_inbox.py, on base/utils/work_queue.py).
+# The worker thread also drains them right after each webhook; leave it off
+# until drain_stripe_events is scheduled
+STRIPE_EVENT_WORKER_THREAD = env.bool('STRIPE_EVENT_WORKER_THREAD', default=False)
+STRIPE_EVENT_MAX_ATTEMPTS = env.int('STRIPE_EVENT_MAX_ATTEMPTS', default=10)
+
+# Seconds a company's cached payment readiness (Company.payment_ready) is
+# trusted before publishing an ad checks Stripe again. account.updated
+# webhooks and reconcile_payment_readiness refresh it in between.
+PAYMENT_READINESS_TTL = env.int('PAYMENT_READINESS_TTL', default=24 * 60 * 60)
+
+# Seconds a worker trusts its in-process copy of a company's plan, commission
+# rate and features (payments/entitlements.py). Writes in the same process
+# invalidate it at once; this bounds staleness across workers.
+ENTITLEMENT_CACHE_TTL = env.int('ENTITLEMENT_CACHE_TTL', default=60)
+
 # Frontend URL for Stripe redirects
 FRONTEND_URL = env('FRONTEND_URL', default='http://localhost:3000')
 
@@ -271,4 +343,14 @@ EMAIL_PORT = env('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = env('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
-DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='noreply@nordicloop.com')
\ No newline at end of file
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='noreply@nordicloop.com')
+
+# Proxy bidding (bids/auto_bidding.py): the minimum raise over the current
+# price, as [from_price, increment] rows. Ads without their own
+# bid_increment_table use this one.
+BID_INCREMENT_TABLE = [[0, 1]]
+
+# Category subscription notifications are sent once the publishing
+# transaction commits, inside the request. True moves the fan-out to a
+# daemon thread, which nothing retries if the worker exits mid-way
+CATEGORY_NOTIFICATION_FANOUT_ASYNC = env('CATEGORY_NOTIFICATION_FANOUT_ASYNC', default=False, cast=bool)
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .cache import invalidate_notification_stats
 from .models import Notification
 
 @admin.register(Notification)
@@ -38,12 +39,14 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def mark_as_read(self, request, queryset):
         """Mark selected notifications as read"""
+        invalidate_notification_stats(set(queryset.values_list('user_id', flat=True)))
         updated = queryset.update(is_read=True)
         self.message_user(request, f'{updated} notifications marked as read.')
     mark_as_read.short_description = 'Mark selected notifications as read'
     
     def mark_as_unread(self, request, queryset):
         """Mark selected notifications as unread"""
+        invalidate_notification_stats(set(queryset.values_list('user_id', flat=True)))
         updated = queryset.update(is_read=False)
         self.message_user(request, f'{updated} notifications marked as unread.')
     mark_as_unread.short_description = 'Mark selected notifications as unread'
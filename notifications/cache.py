@@ -0,0 +1,31 @@
+"""
+Per-user cache of notification stats.
+
+User-specific notifications invalidate their owner's entry. Broadcasts
+(user=None) are shared by every user, so they bump a generation number that
+is part of every key instead of deleting keys one by one.
+"""
+from django.core.cache import cache
+
+STATS_CACHE_TIMEOUT = 300
+BROADCAST_GENERATION_KEY = 'notification_stats:broadcast_generation'
+
+
+def notification_stats_key(user_id):
+    generation = cache.get(BROADCAST_GENERATION_KEY, 0)
+    return f'notification_stats:{generation}:{user_id}'
+
+
+def invalidate_notification_stats(user_ids=None):
+    """Drop cached stats for the given users, or for everyone when user_ids is None"""
+    if user_ids is None:
+        try:
+            cache.incr(BROADCAST_GENERATION_KEY)
+        except ValueError:
+            cache.set(BROADCAST_GENERATION_KEY, 1, None)
+        return
+
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        generation = cache.get(BROADCAST_GENERATION_KEY, 0)
+        cache.delete_many([f'notification_stats:{generation}:{user_id}' for user_id in user_ids])
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-16 20:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_dedupe_key'),
+        ('users', '0009_passwordresetotp_purpose'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadCursor',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_read_cursor', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('read_before', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationReadReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['subscription_target', '-date'], name='notification_broadcast_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationreadreceipt',
+            name='notification',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_receipts', to='notifications.notification'),
+        ),
+        migrations.AddField(
+            model_name='notificationreadreceipt',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_read_receipts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreadreceipt',
+            constraint=models.UniqueConstraint(fields=('user', 'notification'), name='notification_receipt_user_uniq'),
+        ),
+    ]
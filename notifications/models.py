@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from .cache import invalidate_notification_stats
 
 class Notification(models.Model):
     """
@@ -55,9 +56,83 @@ class Notification(models.Model):
         default='all',
         help_text="Target users based on their subscription plan"
     )
+    dedupe_key = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        help_text="Set on fan-out notifications so each user gets at most one per key"
+    )
     
     class Meta:
         ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'dedupe_key'],
+                condition=models.Q(dedupe_key__isnull=False),
+                name='notification_user_dedupe_key_uniq'
+            ),
+        ]
+        indexes = [
+            # Own inbox branch: WHERE user_id = ? [AND is_read = ?] ORDER BY date DESC
+            models.Index(fields=['user', 'is_read', '-date'], name='notification_inbox_idx'),
+            models.Index(fields=['user', '-date'], name='notification_user_date_idx'),
+            # Broadcast branch: WHERE user_id IS NULL AND subscription_target IN (...)
+            models.Index(
+                fields=['subscription_target', '-date'],
+                condition=models.Q(user__isnull=True),
+                name='notification_broadcast_idx'
+            ),
+        ]
         
     def __str__(self):
         return f"{self.title} - {self.date.strftime('%Y-%m-%d %H:%M')}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_notification_stats([self.user_id] if self.user_id else None)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        invalidate_notification_stats([user_id] if user_id else None)
+        return result
+
+
+class NotificationReadReceipt(models.Model):
+    """
+    Per-user read state for broadcast notifications, which are stored once
+    with user=None and shared by every targeted user
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='read_receipts')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_read_receipts'
+    )
+    read_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'notification'], name='notification_receipt_user_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} read {self.notification_id}"
+
+
+class NotificationReadCursor(models.Model):
+    """
+    Read watermark for broadcast notifications: every broadcast dated at or
+    before read_before counts as read for the user. Set by read-all so that
+    marking everything read is a single write.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_read_cursor'
+    )
+    read_before = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id} read broadcasts before {self.read_before:%Y-%m-%d %H:%M}"
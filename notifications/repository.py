@@ -0,0 +1,168 @@
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, Exists, F, OuterRef, Q, QuerySet, Subquery, Value, When
+from django.utils import timezone
+
+from ads.models import Subscription
+from users.models import User
+from .cache import STATS_CACHE_TIMEOUT, invalidate_notification_stats, notification_stats_key
+from .models import Notification, NotificationReadCursor, NotificationReadReceipt
+
+
+class NotificationRepository:
+    """
+    Read access to a user's inbox: their own notifications merged with the
+    broadcasts (user=None) targeted at all users or at their plan.
+
+    Broadcasts are stored once; their per-user read state lives in
+    NotificationReadReceipt and NotificationReadCursor and is exposed on every
+    row as the user_is_read annotation.
+    """
+
+    def visible_to(self, user: User) -> QuerySet:
+        """
+        Notifications the user can see, annotated with user_is_read. Use for
+        lookups and aggregates; list endpoints should use inbox()
+        """
+        return Notification.objects.filter(
+            Q(user=user) | (Q(user__isnull=True) & self._broadcast_targets(user))
+        ).annotate(user_is_read=self._read_state(user))
+
+    def inbox(
+        self,
+        user: User,
+        notification_type: Optional[str] = None,
+        priority: Optional[str] = None,
+        search: Optional[str] = None,
+        is_read: Optional[bool] = None,
+        seek: Optional[Q] = None
+    ) -> QuerySet:
+        """
+        The user's notifications newest first, as a UNION ALL of their own rows
+        and targeted broadcasts so each branch is an index scan
+        (notification_inbox_idx and notification_broadcast_idx) instead of one
+        OR that forces a scan of the whole table. The result supports
+        count(), slicing and pagination but not further filtering, so a
+        keyset position is passed in as seek and applied to both branches.
+        """
+        filters = Q()
+        if notification_type:
+            filters &= Q(type=notification_type)
+        if priority:
+            filters &= Q(priority=priority)
+        if search:
+            filters &= Q(title__icontains=search) | Q(message__icontains=search)
+        if seek is not None:
+            filters &= seek
+
+        own = Notification.objects.filter(filters, user=user).annotate(user_is_read=F('is_read'))
+        broadcasts = Notification.objects.filter(
+            filters, self._broadcast_targets(user), user__isnull=True
+        ).annotate(user_is_read=self._read_state(user))
+
+        if is_read is not None:
+            own = own.filter(is_read=is_read)
+            broadcasts = broadcasts.filter(user_is_read=is_read)
+
+        # Branches must be unordered; the ordering applies to the combined result
+        return own.order_by().union(broadcasts.order_by(), all=True).order_by('-date', '-id')
+
+    def _broadcast_targets(self, user: User) -> Q:
+        """Broadcasts aimed at everyone or at the plan of the user's company"""
+        targets = Q(subscription_target='all')
+        if user.company_id:
+            active_plan = Subscription.objects.filter(
+                company_id=user.company_id, status='active'
+            ).values('plan')
+            targets |= Q(subscription_target__in=Subquery(active_plan))
+        return targets
+
+    def recipient_count(self, subscription_target: str) -> int:
+        """Number of users a broadcast to subscription_target reaches"""
+        if subscription_target == 'all':
+            return User.objects.count()
+        active_companies = Subscription.objects.filter(
+            plan=subscription_target, status='active'
+        ).values('company_id')
+        return User.objects.filter(company_id__in=Subquery(active_companies)).count()
+
+    def _read_state(self, user: User) -> Case:
+        """Own rows use is_read; broadcasts use the user's receipt or read-all watermark"""
+        receipt = NotificationReadReceipt.objects.filter(user=user, notification=OuterRef('pk'))
+        cursor = NotificationReadCursor.objects.filter(user=user).values('read_before')
+        return Case(
+            When(user__isnull=False, then=F('is_read')),
+            When(Exists(receipt), then=Value(True)),
+            When(date__lte=Subquery(cursor), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+
+    def mark_read(self, user: User, notification: Notification) -> None:
+        """Mark one notification read; broadcasts get a receipt instead of a shared flag"""
+        if notification.user_id is None:
+            NotificationReadReceipt.objects.get_or_create(user=user, notification=notification)
+        elif not notification.is_read:
+            notification.is_read = True
+            notification.save(update_fields=['is_read'])
+        invalidate_notification_stats([user.id])
+
+    def mark_many_read(self, user: User, queryset: QuerySet) -> int:
+        """
+        Mark every unread notification in a visible_to() queryset as read:
+        one UPDATE for the user's own rows and one bulk insert of receipts
+        for broadcasts
+        """
+        unread = queryset.filter(user_is_read=False)
+        updated = unread.filter(user=user).update(is_read=True)
+
+        broadcast_ids = list(unread.filter(user__isnull=True).values_list('id', flat=True))
+        NotificationReadReceipt.objects.bulk_create(
+            [NotificationReadReceipt(user=user, notification_id=notification_id) for notification_id in broadcast_ids],
+            ignore_conflicts=True
+        )
+        invalidate_notification_stats([user.id])
+        return updated + len(broadcast_ids)
+
+    def mark_all_read(self, user: User) -> int:
+        """Mark everything read: one UPDATE for own rows, one watermark write for broadcasts"""
+        unread_broadcasts = self.visible_to(user).filter(user__isnull=True, user_is_read=False).count()
+        updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+        NotificationReadCursor.objects.update_or_create(user=user, defaults={'read_before': timezone.now()})
+        invalidate_notification_stats([user.id])
+        return updated + unread_broadcasts
+
+    def get_stats(self, user: User) -> Dict[str, Any]:
+        """Inbox totals by read state, type and priority, cached per user"""
+        key = notification_stats_key(user.id)
+        stats = cache.get(key)
+        if stats is None:
+            stats = self._compute_stats(user)
+            cache.set(key, stats, STATS_CACHE_TIMEOUT)
+        return stats
+
+    def _compute_stats(self, user: User) -> Dict[str, Any]:
+        """All counts in one aggregate query, however many types and priorities exist"""
+        aggregates = {
+            'total_count': Count('id'),
+            'unread_count': Count('id', filter=Q(user_is_read=False)),
+        }
+        for notification_type, _ in Notification.NOTIFICATION_TYPES:
+            aggregates[f'type__{notification_type}'] = Count('id', filter=Q(type=notification_type))
+        for priority, _ in Notification.PRIORITY_CHOICES:
+            aggregates[f'priority__{priority}'] = Count('id', filter=Q(priority=priority))
+
+        row = self.visible_to(user).aggregate(**aggregates)
+        return {
+            'total_count': row['total_count'],
+            'unread_count': row['unread_count'],
+            'read_count': row['total_count'] - row['unread_count'],
+            'type_counts': {
+                notification_type: row[f'type__{notification_type}']
+                for notification_type, _ in Notification.NOTIFICATION_TYPES
+            },
+            'priority_counts': {
+                priority: row[f'priority__{priority}'] for priority, _ in Notification.PRIORITY_CHOICES
+            },
+        }
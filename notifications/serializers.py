@@ -12,6 +12,13 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'message', 'date', 'is_read', 'type', 'priority', 'action_url', 'metadata', 'user', 'company_name', 'subscription_target']
         read_only_fields = ['id', 'date']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Broadcast read state is per user; inbox querysets annotate it as user_is_read
+        if hasattr(instance, 'user_is_read'):
+            data['is_read'] = instance.user_is_read
+        return data
+
 class CreateNotificationSerializer(serializers.ModelSerializer):
     """
     Serializer for creating notifications
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -6,19 +6,6 @@ from .models import Notification
 
 User = get_user_model()
 
-@receiver(pre_save, sender=User)
-def track_user_changes(sender, instance, **kwargs):
-    """
-    Track user changes before saving to compare with previous state
-    """
-    if instance.pk:
-        try:
-            instance._previous_user = User.objects.get(pk=instance.pk)
-        except User.DoesNotExist:
-            instance._previous_user = None
-    else:
-        instance._previous_user = None
-
 @receiver(post_save, sender=User)
 def notify_user_account_changes(sender, instance, created, **kwargs):
     """
@@ -38,13 +25,8 @@ def notify_user_account_changes(sender, instance, created, **kwargs):
             }
         )
     else:
-        # Check for important changes
-        previous = getattr(instance, '_previous_user', None)
-        if not previous:
-            return
-
-        # Check for password changes
-        if previous.password != instance.password:
+        # Check for password changes (compared with the values loaded from the database)
+        if instance.has_changed('password'):
             Notification.objects.create(
                 user=instance,
                 title="Password Changed",
@@ -58,7 +40,7 @@ def notify_user_account_changes(sender, instance, created, **kwargs):
             )
 
         # Check for email changes
-        if previous.email != instance.email:
+        if instance.has_changed('email'):
             Notification.objects.create(
                 user=instance,
                 title="Email Address Updated",
@@ -67,14 +49,14 @@ def notify_user_account_changes(sender, instance, created, **kwargs):
                 priority='normal',
                 metadata={
                     'user_id': instance.id,
-                    'previous_email': previous.email,
+                    'previous_email': instance.previous('email'),
                     'new_email': instance.email,
                     'action_type': 'email_change'
                 }
             )
 
         # Check for role changes
-        if hasattr(previous, 'role') and hasattr(instance, 'role') and previous.role != instance.role:
+        if instance.has_changed('role'):
             Notification.objects.create(
                 user=instance,
                 title="Account Role Updated",
@@ -83,7 +65,7 @@ def notify_user_account_changes(sender, instance, created, **kwargs):
                 priority='normal',
                 metadata={
                     'user_id': instance.id,
-                    'previous_role': previous.role,
+                    'previous_role': instance.previous('role'),
                     'new_role': instance.role,
                     'action_type': 'role_change'
                 }
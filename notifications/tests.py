@@ -1,3 +1,240 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ads.models import Subscription
+from company.models import Company
+from users.models import User
+from .models import Notification, NotificationReadReceipt
+from .repository import NotificationRepository
+
+
+class BroadcastNotificationTest(APITestCase):
+    """Test plan-targeted broadcasts stored once with per-user read state"""
+
+    def setUp(self):
+        self.admin = User.objects.create(username='notify_admin', email='notify_admin@test.com', role='Admin')
+        premium_company = Company.objects.create(
+            official_name='Premium AB', vat_number='SE12345678', email='premium@test.com', country='Sweden'
+        )
+        Subscription.objects.create(
+            company=premium_company, plan='premium', status='active',
+            start_date=date.today(), end_date=date.today() + timedelta(days=30), amount='799'
+        )
+        self.premium_users = User.objects.bulk_create([
+            User(username=f'premium{i}', email=f'premium{i}@test.com', company=premium_company)
+            for i in range(3)
+        ])
+        self.free_user = User.objects.create(username='free_user', email='free_user@test.com')
+
+    def _broadcast(self, target, title='Premium update'):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/notifications/broadcast/', {
+            'title': title, 'message': 'Hello', 'type': 'system', 'subscription_target': target
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['notification_id']
+
+    def _unread_count(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/notifications/unread-count/').data['count']
+
+    def test_plan_broadcast_is_stored_once(self):
+        """A premium broadcast is one row, visible only to premium users"""
+        self._broadcast('premium')
+
+        self.assertEqual(Notification.objects.filter(title='Premium update').count(), 1)
+        self.assertEqual(self._unread_count(self.premium_users[0]), 1)
+        self.assertEqual(self._unread_count(self.free_user), 0)
+
+    def test_broadcast_response_reports_recipients(self):
+        """The response keeps notifications_created and notification_ids for existing clients"""
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/notifications/broadcast/', {
+            'title': 'Premium update', 'message': 'Hello', 'type': 'system', 'subscription_target': 'premium'
+        }, format='json')
+
+        self.assertEqual(response.data['notifications_created'], len(self.premium_users))
+        self.assertEqual(response.data['notification_ids'], [response.data['notification_id']])
+        self.assertEqual(response.data['target'], 'premium')
+
+    def test_reading_a_broadcast_is_per_user(self):
+        """Marking a broadcast read creates a receipt and leaves other users unread"""
+        notification_id = self._broadcast('premium')
+
+        self.client.force_authenticate(self.premium_users[0])
+        response = self.client.put(f'/api/notifications/{notification_id}/read/')
+        self.assertTrue(response.data['is_read'])
+
+        self.assertEqual(self._unread_count(self.premium_users[0]), 0)
+        self.assertEqual(self._unread_count(self.premium_users[1]), 1)
+        self.assertFalse(Notification.objects.get(id=notification_id).is_read)
+        self.assertEqual(NotificationReadReceipt.objects.count(), 1)
+
+    def test_read_all_sets_watermark(self):
+        """read-all covers existing broadcasts without per-broadcast rows"""
+        self._broadcast('all', title='Maintenance')
+        self._broadcast('premium')
+        Notification.objects.create(user=self.premium_users[0], title='Bid placed', message='x', type='bid')
+
+        self.client.force_authenticate(self.premium_users[0])
+        response = self.client.put('/api/notifications/read-all/')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(NotificationReadReceipt.objects.count(), 0)
+        self.assertEqual(self._unread_count(self.premium_users[0]), 0)
+
+        Notification.objects.create(user=None, title='Later', message='x', date=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self._unread_count(self.premium_users[0]), 1)
+
+    def test_list_merges_own_and_broadcast_rows(self):
+        """The list shows own notifications and targeted broadcasts with per-user is_read"""
+        self._broadcast('premium')
+        Notification.objects.create(user=self.premium_users[0], title='Bid placed', message='x', type='bid', is_read=True)
+
+        self.client.force_authenticate(self.premium_users[0])
+        response = self.client.get('/api/notifications/')
+        results = {row['title']: row['is_read'] for row in response.data['results']}
+        self.assertEqual(results, {'Premium update': False, 'Bid placed': True})
+
+        response = self.client.get('/api/notifications/', {'is_read': 'false'})
+        self.assertEqual([row['title'] for row in response.data['results']], ['Premium update'])
+
+    def test_mark_type_as_read_covers_broadcasts(self):
+        """Marking a type read updates own rows and adds receipts for broadcasts"""
+        self._broadcast('premium')
+        Notification.objects.create(user=self.premium_users[0], title='Notice', message='x', type='system')
+
+        self.client.force_authenticate(self.premium_users[0])
+        response = self.client.post('/api/notifications/mark-type-as-read/', {'type': 'system'}, format='json')
+        self.assertEqual(response.data['updated_count'], 2)
+        self.assertEqual(self._unread_count(self.premium_users[0]), 0)
+        self.assertEqual(self._unread_count(self.premium_users[1]), 1)
+
+
+class NotificationStatsTest(APITestCase):
+    """Test the single-query, cached stats endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='stats_user', email='stats_user@test.com')
+        Notification.objects.bulk_create([
+            Notification(user=self.user, title='Bid', message='x', type='bid', priority='high'),
+            Notification(user=self.user, title='Paid', message='x', type='payment', is_read=True),
+            Notification(user=None, title='Maintenance', message='x', type='system'),
+        ])
+        self.client.force_authenticate(self.user)
+
+    def test_stats_counts(self):
+        """Totals merge own rows and broadcasts"""
+        data = self.client.get('/api/notifications/stats/').data
+        self.assertEqual((data['total_count'], data['unread_count'], data['read_count']), (3, 2, 1))
+        self.assertEqual(data['type_counts']['bid'], 1)
+        self.assertEqual(data['type_counts']['system'], 1)
+        self.assertEqual(data['priority_counts']['high'], 1)
+
+    def test_query_count_is_fixed_as_types_grow(self):
+        """Adding notification types does not add queries"""
+        extra_types = Notification.NOTIFICATION_TYPES + [(f'extra_{i}', f'Extra {i}') for i in range(20)]
+        with mock.patch.object(Notification, 'NOTIFICATION_TYPES', extra_types):
+            with self.assertNumQueries(1):
+                stats = NotificationRepository().get_stats(self.user)
+        self.assertEqual(stats['type_counts']['extra_0'], 0)
+
+    def test_stats_are_cached_and_invalidated(self):
+        """Cached stats are served without queries until notifications change"""
+        self.client.get('/api/notifications/stats/')
+        with self.assertNumQueries(0):
+            NotificationRepository().get_stats(self.user)
+
+        Notification.objects.create(user=self.user, title='Outbid', message='x', type='bid')
+        self.assertEqual(self.client.get('/api/notifications/stats/').data['unread_count'], 3)
+
+        Notification.objects.create(user=None, title='Release', message='x', type='feature')
+        self.assertEqual(self.client.get('/api/notifications/stats/').data['unread_count'], 4)
+
+        self.client.put('/api/notifications/read-all/')
+        self.assertEqual(self.client.get('/api/notifications/stats/').data['unread_count'], 0)
+
+
+class NotificationInboxPlanTest(APITestCase):
+    """
+    The inbox query must stay index-only on the notifications table. A
+    production-sized table (millions of rows) is not practical here, so on
+    PostgreSQL sequential scans are disabled for the session: if the plan
+    still contains one, no index can serve the query.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='plan_user', email='plan_user@test.com')
+        other = User.objects.create(username='plan_other', email='plan_other@test.com')
+        Notification.objects.bulk_create(
+            [Notification(user=other, title=f'N{i}', message='x') for i in range(200)]
+            + [Notification(user=self.user, title=f'Own {i}', message='x') for i in range(5)]
+            + [Notification(user=None, title='Broadcast', message='x')]
+        )
+        self.repository = NotificationRepository()
+
+    def _plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE notifications_notification')
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                return queryset.explain()
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET enable_seqscan')
+        return queryset.explain()
+
+    def _assert_no_table_scan(self, queryset):
+        plan = self._plan(queryset)
+        self.assertNotIn('Seq Scan on notifications_notification', plan)
+        for line in plan.splitlines():
+            if 'SCAN notifications_notification' in line:
+                self.assertIn('INDEX', line, plan)
+
+    def test_inbox_uses_indexes(self):
+        """Both UNION ALL branches are index scans"""
+        self._assert_no_table_scan(self.repository.inbox(self.user))
+
+    def test_unread_inbox_uses_indexes(self):
+        """The polled unread query is index-only too"""
+        self._assert_no_table_scan(self.repository.inbox(self.user, is_read=False))
+
+    def test_inbox_returns_both_sources(self):
+        """The union keeps own rows and broadcasts, newest first"""
+        titles = [n.title for n in self.repository.inbox(self.user)]
+        self.assertEqual(len(titles), 6)
+        self.assertIn('Broadcast', titles)
+        self.assertEqual(self.repository.inbox(self.user, is_read=False).count(), 6)
+
+
+class NotificationCursorPaginationTest(APITestCase):
+    """Test ?cursor= on the notification list"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='cursor_user', email='cursor_user@test.com')
+        Notification.objects.bulk_create(
+            [Notification(user=self.user, title=f'Own {i}', message='x') for i in range(30)]
+            + [Notification(user=None, title=f'Broadcast {i}', message='x') for i in range(5)]
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_walks_merged_inbox(self):
+        """Every own row and broadcast is visited once across cursor pages"""
+        response = self.client.get('/api/notifications/', {'cursor': '', 'page_size': 10})
+        seen = []
+        while True:
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(len(seen), 35)
+        self.assertEqual(len(set(seen)), 35)
+        self.assertIsNone(response.data['count'])
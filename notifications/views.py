@@ -2,19 +2,20 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from base.utils.pagination import KeysetPaginationMixin
 from django.db.models import Q
 from .models import Notification
+from .repository import NotificationRepository
 from .serializers import NotificationSerializer, CreateNotificationSerializer
 from .permissions import IsAdminUser
-from users.models import User
-from ads.models import Subscription
 import json
 
 
-class NotificationPagination(PageNumberPagination):
+class NotificationPagination(KeysetPaginationMixin, PageNumberPagination):
     """
     Custom pagination for notifications
     """
+    cursor_fields = ('date', 'id')
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -28,60 +29,38 @@ class NotificationViewSet(viewsets.ModelViewSet):
     pagination_class = NotificationPagination
     http_method_names = ['get', 'post', 'put', 'delete']
 
-    def _get_users_by_subscription_target(self, subscription_target):
-        """
-        Helper method to get users based on subscription target
-        """
-        if subscription_target == 'all':
-            return User.objects.all()
-
-        # Get companies with the specified subscription plan
-        companies_with_plan = Subscription.objects.filter(
-            plan=subscription_target,
-            status='active'
-        ).values_list('company_id', flat=True)
+    repository = NotificationRepository()
 
-        # Get users from those companies
-        return User.objects.filter(company_id__in=companies_with_plan)
-    
     def get_queryset(self):
         # Regular users can only see their own notifications
         user = self.request.user
         if not user.is_staff and not user.is_superuser and user.role != 'Admin':
-            return Notification.objects.filter(Q(user=user) | Q(user=None))
+            return self.repository.visible_to(user)
         # Admin users can see all notifications if using admin endpoints
         if self.action in ['list_all', 'create_notification', 'broadcast', 'delete_broadcast']:
             return Notification.objects.all()
-        # Otherwise return their own notifications
-        return Notification.objects.filter(Q(user=user) | Q(user=None))
+        # Otherwise return their own notifications and the broadcasts targeted at them
+        return self.repository.visible_to(user)
     
+    def _cursor_seek(self, request):
+        """Keyset filter for ?cursor= requests, applied inside the inbox union"""
+        position = self.paginator.get_cursor_position(request)
+        return self.paginator.seek_filter(position) if position else None
+
     def list(self, request):
         """
         Get all notifications for the current user with pagination and filtering
         """
-        queryset = self.get_queryset().order_by('-date')
-
-        # Apply filters if provided
-        notification_type = request.query_params.get('type')
-        priority = request.query_params.get('priority')
-        search = request.query_params.get('search')
         is_read = request.query_params.get('is_read')
-
-        if notification_type:
-            queryset = queryset.filter(type=notification_type)
-
-        if priority:
-            queryset = queryset.filter(priority=priority)
-
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(message__icontains=search)
-            )
-
-        if is_read is not None:
+        queryset = self.repository.inbox(
+            request.user,
+            notification_type=request.query_params.get('type'),
+            priority=request.query_params.get('priority'),
+            search=request.query_params.get('search'),
             # Convert string to boolean
-            is_read_bool = is_read.lower() in ('true', '1', 'yes')
-            queryset = queryset.filter(is_read=is_read_bool)
+            is_read=is_read.lower() in ('true', '1', 'yes') if is_read is not None else None,
+            seek=self._cursor_seek(request)
+        )
 
         # Apply pagination
         page = self.paginate_queryset(queryset)
@@ -97,23 +76,14 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """
         Get all unread notifications for the current user with pagination and filtering
         """
-        queryset = self.get_queryset().filter(is_read=False).order_by('-date')
-
-        # Apply filters if provided
-        notification_type = request.query_params.get('type')
-        priority = request.query_params.get('priority')
-        search = request.query_params.get('search')
-
-        if notification_type:
-            queryset = queryset.filter(type=notification_type)
-
-        if priority:
-            queryset = queryset.filter(priority=priority)
-
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(message__icontains=search)
-            )
+        queryset = self.repository.inbox(
+            request.user,
+            notification_type=request.query_params.get('type'),
+            priority=request.query_params.get('priority'),
+            search=request.query_params.get('search'),
+            is_read=False,
+            seek=self._cursor_seek(request)
+        )
 
         # Apply pagination
         page = self.paginate_queryset(queryset)
@@ -129,7 +99,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """
         Get count of unread notifications for the current user
         """
-        count = self.get_queryset().filter(is_read=False).count()
+        count = self.repository.inbox(request.user, is_read=False).count()
         return Response({'count': count}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='stats')
@@ -137,27 +107,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """
         Get notification statistics for the current user
         """
-        queryset = self.get_queryset()
-        total_count = queryset.count()
-        unread_count = queryset.filter(is_read=False).count()
-
-        # Count by type
-        type_counts = {}
-        for notification_type, _ in Notification.NOTIFICATION_TYPES:
-            type_counts[notification_type] = queryset.filter(type=notification_type).count()
-
-        # Count by priority
-        priority_counts = {}
-        for priority, _ in Notification.PRIORITY_CHOICES:
-            priority_counts[priority] = queryset.filter(priority=priority).count()
-
-        return Response({
-            'total_count': total_count,
-            'unread_count': unread_count,
-            'read_count': total_count - unread_count,
-            'type_counts': type_counts,
-            'priority_counts': priority_counts
-        }, status=status.HTTP_200_OK)
+        return Response(self.repository.get_stats(request.user), status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], url_path='mark-type-as-read')
     def mark_type_as_read(self, request):
@@ -168,10 +118,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
         if not notification_type:
             return Response({'error': 'Type is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        updated_count = self.get_queryset().filter(
-            type=notification_type,
-            is_read=False
-        ).update(is_read=True)
+        updated_count = self.repository.mark_many_read(
+            request.user, self.get_queryset().filter(type=notification_type)
+        )
 
         return Response({
             'success': True,
@@ -185,8 +134,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
         Mark a notification as read
         """
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        self.repository.mark_read(request.user, notification)
+        notification.user_is_read = True
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
     
@@ -195,8 +144,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """
         Mark all notifications as read for the current user
         """
-        queryset = self.get_queryset().filter(is_read=False)
-        updated_count = queryset.update(is_read=True)
+        updated_count = self.repository.mark_all_read(request.user)
         return Response({'success': True, 'count': updated_count})
     
     # Admin endpoints
@@ -253,38 +201,22 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def broadcast(self, request):
         """
         Create a notification for users based on subscription target (admin only)
+
+        The broadcast is stored once with no user; each user's inbox picks it
+        up through the subscription target and tracks read state separately.
         """
         serializer = CreateNotificationSerializer(data=request.data)
         if serializer.is_valid():
             subscription_target = serializer.validated_data.get('subscription_target', 'all')
-
-            if subscription_target == 'all':
-                # Create a system notification with no specific user (broadcast to all)
-                notification = serializer.save(user=None)
-                return Response({
-                    'success': True,
-                    'notification_id': notification.id,
-                    'target': 'all_users'
-                }, status=status.HTTP_201_CREATED)
-            else:
-                # Create individual notifications for users with specific subscription
-                target_users = self._get_users_by_subscription_target(subscription_target)
-                notifications_created = []
-
-                for user in target_users:
-                    notification_data = serializer.validated_data.copy()
-                    notification = Notification.objects.create(
-                        user=user,
-                        **notification_data
-                    )
-                    notifications_created.append(notification.id)
-
-                return Response({
-                    'success': True,
-                    'notifications_created': len(notifications_created),
-                    'target': subscription_target,
-                    'notification_ids': notifications_created
-                }, status=status.HTTP_201_CREATED)
+            notification = serializer.save(user=None)
+            return Response({
+                'success': True,
+                'notification_id': notification.id,
+                # Kept for existing clients: every recipient now shares the one row
+                'notifications_created': self.repository.recipient_count(subscription_target),
+                'notification_ids': [notification.id],
+                'target': 'all_users' if subscription_target == 'all' else subscription_target
+            }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['delete'], permission_classes=[IsAdminUser], url_path='delete-broadcast')
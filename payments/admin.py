@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import StripeAccount, PaymentIntent, Transaction, PayoutSchedule
+from .models import StripeAccount, PaymentIntent, Transaction, PayoutSchedule, StripeEvent
 
 
 @admin.register(StripeAccount)
@@ -142,3 +142,12 @@ class PayoutScheduleAdmin(admin.ModelAdmin):
         return 'No'
     is_overdue_display.short_description = 'Overdue'
     is_overdue_display.admin_order_field = 'scheduled_date'
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('stripe_event_id', 'event_type', 'object_id', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type', 'received_at')
+    search_fields = ('stripe_event_id', 'object_id')
+    readonly_fields = ('stripe_event_id', 'event_type', 'object_id', 'payload', 'stripe_created',
+                       'received_at', 'processed_at', 'attempts', 'last_error')
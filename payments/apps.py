@@ -4,5 +4,7 @@ from django.apps import AppConfig
 class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payments'
-    
-  
+
+    def ready(self):
+        from payments.entitlements import connect_entitlement_signals
+        connect_entitlement_signals()
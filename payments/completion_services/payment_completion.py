@@ -17,6 +17,7 @@ from notifications.models import Notification
 from notifications.templates import AuctionNotificationTemplates, get_auction_notification_metadata
 from ..models import PaymentIntent, Transaction
 from base.services.logging import LoggingService
+from base.utils.response_cache import bump_versions
 
 logger = logging.getLogger(__name__)
 logging_service = LoggingService()
@@ -46,6 +47,7 @@ class PaymentCompletionService:
                 # Update bid status to 'paid' (bypass validation for payment completion)
                 from django.db import models
                 Bid.objects.filter(id=winning_bid.id).update(status='paid')
+                bump_versions('bids.Bid')
                 
                 # Create commission transaction (platform receives commission)
                 commission_transaction = Transaction.objects.create(
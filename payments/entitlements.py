@@ -0,0 +1,166 @@
+"""
+In-process cache of what each company's subscription entitles it to.
+
+An Entitlement is the company's effective plan, its commission rate and the
+plan's included features (pricing.PlanFeature, by base feature name). It is
+built from the local ads.Subscription row, which the subscription webhooks
+keep in step with Stripe, so a lookup never calls Stripe:
+
+- a cached company costs no query;
+- an uncached company costs one query for its (plan, status);
+- plan features are read for every plan at once, in one query, and shared by
+  all companies.
+
+Saving or deleting a Subscription drops that company's entry, and writes to
+PricingPlan, PlanFeature or BaseFeature drop everything (signals connected
+from PaymentsConfig.ready()). Invalidation is local to the process, so
+entries also expire after ENTITLEMENT_CACHE_TTL seconds; that bounds how
+long another worker, or a queryset.update() that sends no signals, can go
+unnoticed. Call entitlement_cache.invalidate() after such writes.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+# Commission the platform takes per plan, in percent of the order value
+COMMISSION_RATES = {
+    'free': Decimal('9.00'),
+    'standard': Decimal('7.00'),
+    'premium': Decimal('0.00'),
+}
+
+# Subscription statuses that grant the subscribed plan; anything else is free
+ENTITLED_STATUSES = ('active',)
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    """What a company may do under its current subscription"""
+    company_id: int
+    plan: str
+    subscription_status: Optional[str]
+    commission_rate: Decimal
+    features: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    def has_feature(self, name: str) -> bool:
+        return name in self.features
+
+
+class EntitlementCache:
+    """Per-company entitlements held in process memory with explicit invalidation"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[int, tuple] = {}
+        self._plan_features: Optional[tuple] = None
+        # Bumped by every invalidation, so a load that raced one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl if self._ttl is not None else settings.ENTITLEMENT_CACHE_TTL
+
+    def get(self, company_id: Optional[int]) -> Entitlement:
+        """Return the company's entitlement; a user without a company gets the free plan"""
+        if company_id is None:
+            return self._build(None, None, None)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(company_id)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        from ads.models import Subscription
+        row = Subscription.objects.filter(company_id=company_id).values_list('plan', 'status').first()
+        plan, status = row if row else (None, None)
+        entitlement = self._build(company_id, plan, status)
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[company_id] = (now + self.ttl, entitlement)
+        return entitlement
+
+    def invalidate(self, company_id: Optional[int] = None):
+        """Drop one company's entry, or every entry and the plan features when no company is given"""
+        with self._lock:
+            self._generation += 1
+            if company_id is None:
+                self._entries.clear()
+                self._plan_features = None
+            else:
+                self._entries.pop(company_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _build(self, company_id, plan, status) -> Entitlement:
+        effective_plan = plan if plan in COMMISSION_RATES and status in ENTITLED_STATUSES else 'free'
+        return Entitlement(
+            company_id=company_id,
+            plan=effective_plan,
+            subscription_status=status,
+            commission_rate=COMMISSION_RATES[effective_plan],
+            features=self._features_for(effective_plan),
+        )
+
+    def _features_for(self, plan: str) -> Dict[str, Optional[str]]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._plan_features
+            generation = self._generation
+        if cached and cached[0] > now:
+            return cached[1].get(plan, {})
+
+        from pricing.models import PlanFeature
+        features_by_plan: Dict[str, Dict[str, Optional[str]]] = {}
+        for plan_type, name, value in PlanFeature.objects.filter(
+            is_included=True, plan__is_active=True, base_feature__is_active=True
+        ).values_list('plan__plan_type', 'base_feature__name', 'feature_value'):
+            features_by_plan.setdefault(plan_type, {})[name] = value
+
+        with self._lock:
+            if generation == self._generation:
+                self._plan_features = (now + self.ttl, features_by_plan)
+        return features_by_plan.get(plan, {})
+
+
+entitlement_cache = EntitlementCache()
+
+
+def _invalidate_company(sender, instance, **kwargs):
+    company_id = instance.company_id
+    entitlement_cache.invalidate(company_id)
+    # Again once the write is visible, in case a lookup re-read the old row meanwhile
+    transaction.on_commit(lambda: entitlement_cache.invalidate(company_id))
+
+
+def _invalidate_all(sender, **kwargs):
+    entitlement_cache.invalidate()
+    transaction.on_commit(entitlement_cache.invalidate)
+
+
+def connect_entitlement_signals():
+    """Invalidate cached entitlements on subscription and plan writes; called from PaymentsConfig.ready()"""
+    from ads.models import Subscription
+    from pricing.models import BaseFeature, PlanFeature, PricingPlan
+
+    for name, signal in (('save', post_save), ('delete', post_delete)):
+        signal.connect(_invalidate_company, sender=Subscription, dispatch_uid=f'entitlements_{name}_subscription')
+        for model in (PricingPlan, PlanFeature, BaseFeature):
+            signal.connect(_invalidate_all, sender=model,
+                           dispatch_uid=f'entitlements_{name}_{model._meta.model_name}')
@@ -0,0 +1,223 @@
+"""
+Durable inbox for Stripe webhook events.
+
+The webhook view only verifies the signature, stores the raw event in
+StripeEvent and answers 200, so slow handlers can't push Stripe past its
+timeout. stripe_event_id is unique: a redelivered event is dropped on insert
+and never handled twice.
+
+Each event is a work row as described in base/utils/work_queue.py, and
+drain_stripe_events is its drain command; it also reports backlog depth
+and latency. Events are handled in order of their Stripe creation time.
+The handler runs in one transaction with marking the event processed, and
+while a failed event waits for its retry, later events for the same object
+wait too, so an older update never lands after a newer one.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from base.services.logging import LoggingService
+from base.utils.work_queue import backoff_delay, claim_lease, start_after_commit
+from .models import StripeEvent
+
+logger = logging.getLogger(__name__)
+logging_service = LoggingService()
+
+
+@dataclass
+class StripeEventMetrics:
+    """Receive-to-processed latency and handler time for recently handled events"""
+    processed: int = 0
+    failed: int = 0
+    max_latency: float = 0.0
+    recent_latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+    recent_handler_times: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, latency_seconds: float, handler_seconds: float, success: bool):
+        if not success:
+            self.failed += 1
+            return
+        self.processed += 1
+        self.max_latency = max(self.max_latency, latency_seconds)
+        self.recent_latencies.append(latency_seconds)
+        self.recent_handler_times.append(handler_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self.recent_latencies)
+        handler_times = list(self.recent_handler_times)
+        p95 = latencies[max(0, -(-95 * len(latencies) // 100) - 1)] if latencies else 0.0
+        return {
+            'processed': self.processed,
+            'failed': self.failed,
+            'mean_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p95_latency': p95,
+            'max_latency': self.max_latency,
+            'mean_handler_ms': 1000 * sum(handler_times) / len(handler_times) if handler_times else 0.0,
+        }
+
+
+class StripeEventInbox:
+    """Stores verified Stripe events and hands them to the webhook handlers"""
+
+    # How long a claimed event is hidden from other workers
+    CLAIM_LEASE = timedelta(minutes=5)
+    RETRY_BASE_DELAY = timedelta(seconds=30)
+    RETRY_MAX_DELAY = timedelta(hours=1)
+
+    def __init__(self):
+        self.metrics = StripeEventMetrics()
+        self._drain_lock = threading.Lock()
+
+    @property
+    def max_attempts(self) -> int:
+        return getattr(settings, 'STRIPE_EVENT_MAX_ATTEMPTS', 10)
+
+    def record(self, event: Dict[str, Any]) -> bool:
+        """Store a verified event; False if it was already received"""
+        data_object = (event.get('data') or {}).get('object') or {}
+        created = event.get('created')
+        try:
+            with transaction.atomic():
+                StripeEvent.objects.create(
+                    # Development payloads may come without an id
+                    stripe_event_id=event.get('id') or f'evt_local_{uuid.uuid4().hex}',
+                    event_type=event.get('type', ''),
+                    object_id=str(data_object.get('id') or ''),
+                    payload=event,
+                    stripe_created=datetime.fromtimestamp(created, dt_timezone.utc) if created else None,
+                )
+        except IntegrityError:
+            logger.info(f"Duplicate Stripe event ignored: {event.get('id')}")
+            return False
+
+        if getattr(settings, 'STRIPE_EVENT_WORKER_THREAD', False):
+            start_after_commit(self._drain)
+        return True
+
+    def record_payload(self, payload: bytes) -> bool:
+        """Store the raw body of a verified webhook request"""
+        return self.record(json.loads(payload.decode('utf-8')))
+
+    def process_due(self, batch_size: int = 100, now=None) -> List[Dict[str, Any]]:
+        """Handle up to batch_size due events, oldest first"""
+        now = now or timezone.now()
+        due = list(
+            StripeEvent.objects.filter(status='pending', next_attempt_at__lte=now)
+            .order_by(F('stripe_created').asc(nulls_last=True), 'id')
+            .values_list('id', 'object_id', 'stripe_created')[:batch_size]
+        )
+        if not due:
+            return []
+
+        # Objects with an older event waiting for a retry (or held by another worker)
+        blocked = dict(
+            StripeEvent.objects.filter(status='pending', next_attempt_at__gt=now)
+            .exclude(object_id='')
+            .values('object_id').annotate(first_created=Min('stripe_created'))
+            .values_list('object_id', 'first_created')
+        )
+
+        results = []
+        for event_id, object_id, created in due:
+            if object_id in blocked and self._is_after(created, blocked[object_id]):
+                continue
+            result = self.process(event_id, now)
+            if result is None:
+                continue
+            results.append(result)
+            if not result['success'] and object_id:
+                blocked.setdefault(object_id, created)
+        return results
+
+    def process(self, event_id: int, now=None) -> Optional[Dict[str, Any]]:
+        """Claim and handle one event; None if another worker holds it or it isn't due"""
+        event = self.claim(event_id, now)
+        if event is None:
+            return None
+
+        from .webhooks import EVENT_HANDLERS
+        handler = EVENT_HANDLERS.get(event.event_type)
+        started = time.monotonic()
+        try:
+            with transaction.atomic():
+                if handler:
+                    handler(event.payload['data']['object'])
+                else:
+                    logger.info(f"Unhandled Stripe webhook event: {event.event_type}")
+                event.status = 'processed'
+                event.processed_at = timezone.now()
+                event.last_error = ''
+                event.save(update_fields=['status', 'processed_at', 'last_error'])
+        except Exception as e:
+            logging_service.log_error(e)
+            self.metrics.record(0.0, time.monotonic() - started, success=False)
+            return self._record_failure(event, str(e))
+
+        latency = (event.processed_at - event.received_at).total_seconds()
+        self.metrics.record(latency, time.monotonic() - started, success=True)
+        return {'success': True, 'event_id': event.stripe_event_id, 'type': event.event_type,
+                'status': event.status, 'latency': latency}
+
+    def claim(self, event_id: int, now=None) -> Optional[StripeEvent]:
+        """Take the lease on a due event, counting the attempt"""
+        return claim_lease(StripeEvent, event_id, self.CLAIM_LEASE, now)
+
+    def backlog(self, now=None) -> Dict[str, Any]:
+        """Depth of the inbox: pending events, age of the oldest, events given up on"""
+        now = now or timezone.now()
+        counts = dict(
+            StripeEvent.objects.filter(status__in=['pending', 'failed'])
+            .values('status').annotate(total=Count('id')).values_list('status', 'total')
+        )
+        oldest = StripeEvent.objects.filter(status='pending').aggregate(oldest=Min('received_at'))['oldest']
+        return {
+            'pending': counts.get('pending', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_age': (now - oldest).total_seconds() if oldest else 0.0,
+        }
+
+    def _record_failure(self, event: StripeEvent, message: str) -> Dict[str, Any]:
+        event.last_error = message
+        if event.attempts >= self.max_attempts:
+            event.status = 'failed'
+        else:
+            event.next_attempt_at = timezone.now() + backoff_delay(
+                event.attempts, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY
+            )
+        event.save(update_fields=['last_error', 'status', 'next_attempt_at'])
+
+        logger.warning(f"Stripe event {event.stripe_event_id} attempt {event.attempts} failed: {message}")
+        return {'success': False, 'event_id': event.stripe_event_id, 'type': event.event_type,
+                'status': event.status, 'message': message}
+
+    def _is_after(self, created, first_blocked_created) -> bool:
+        if created is None or first_blocked_created is None:
+            return True
+        return created >= first_blocked_created
+
+    def _drain(self):
+        # One drain per process at a time; a busy drain picks up the new event too
+        if not self._drain_lock.acquire(blocking=False):
+            return
+        try:
+            while self.process_due():
+                pass
+        finally:
+            self._drain_lock.release()
+
+
+# Singleton instance
+stripe_event_inbox = StripeEventInbox()
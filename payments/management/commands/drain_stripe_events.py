@@ -0,0 +1,111 @@
+"""
+Django management command that handles Stripe webhook events from the inbox.
+
+The webhook view stores each verified event in payments.StripeEvent and
+answers Stripe right away; this is the drain command that handles them
+(see base/utils/work_queue.py), including retries whose backoff has
+elapsed. Several workers can run at once.
+
+Backlog depth (pending events, age of the oldest) and processing latency
+(time from receipt to handled) are logged every --report-interval seconds.
+
+Usage:
+    python manage.py drain_stripe_events
+    python manage.py drain_stripe_events --poll-interval 1 --batch-size 200
+    python manage.py drain_stripe_events --once  # Handle what is due, report and exit
+"""
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from payments.event_inbox import stripe_event_inbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Handle stored Stripe webhook events in order, with retries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds between polls when nothing is due (default: 2.0)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Events handled per batch (default: 100)',
+        )
+        parser.add_argument(
+            '--report-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between backlog and latency reports (default: 60)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Handle events that are already due, report metrics and exit',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        batch_size = options['batch_size']
+        if poll_interval <= 0 or batch_size < 1:
+            raise CommandError('--poll-interval must be greater than zero and --batch-size at least 1')
+
+        backlog = stripe_event_inbox.backlog()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stripe event worker started with {backlog["pending"]} events pending'
+        ))
+
+        last_report = time.monotonic()
+        try:
+            while True:
+                close_old_connections()
+                results = stripe_event_inbox.process_due(batch_size)
+                for result in results:
+                    self._log_result(result)
+
+                if options['once']:
+                    if len(results) < batch_size:
+                        break
+                    continue
+
+                if time.monotonic() - last_report >= options['report_interval']:
+                    self._report()
+                    last_report = time.monotonic()
+                if len(results) < batch_size:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stripe event worker stopping')
+
+        self._report()
+
+    def _log_result(self, result):
+        if result['success']:
+            self.stdout.write(
+                f'Handled {result["type"]} {result["event_id"]} ({result["latency"]:.2f}s after receipt)'
+            )
+        else:
+            message = f'Event {result["type"]} {result["event_id"]} {result["status"]}: {result["message"]}'
+            logger.warning(message)
+            self.stdout.write(self.style.ERROR(message))
+
+    def _report(self):
+        backlog = stripe_event_inbox.backlog()
+        metrics = stripe_event_inbox.metrics.snapshot()
+        summary = (
+            f'pending={backlog["pending"]} oldest_pending={backlog["oldest_age"]:.1f}s '
+            f'failed_total={backlog["failed"]} processed={metrics["processed"]} failed={metrics["failed"]} '
+            f'mean_latency={metrics["mean_latency"]:.2f}s p95_latency={metrics["p95_latency"]:.2f}s '
+            f'max_latency={metrics["max_latency"]:.2f}s mean_handler={metrics["mean_handler_ms"]:.1f}ms'
+        )
+        logger.info(f'Stripe event metrics: {summary}')
+        self.stdout.write(f'Stripe event metrics: {summary}')
@@ -0,0 +1,163 @@
+"""
+Django management command to load-test bid pre-authorization and capture.
+
+Runs PreAuthorizationService against the in-memory Stripe gateway, so it
+needs STRIPE_GATEWAY=fake and never reaches Stripe. Synthetic bids (one
+seller, one auction, a buyer per bid) are created and then authorized and
+captured from --concurrency threads, the way concurrent bid requests and the
+auction closer would do it. Everything it created is deleted afterwards.
+
+The fake answers after --latency seconds (plus up to --jitter) and fails
+--failure-rate of calls with a network error, so slow or flaky Stripe can be
+simulated. With --latency above STRIPE_WRITE_TIMEOUT every call times out,
+and once the circuit breaker opens the rest fail fast. Per-phase latency
+percentiles and the gateway's own counters are printed at the end.
+
+Usage:
+    STRIPE_GATEWAY=fake python manage.py loadtest_stripe_payments
+    STRIPE_GATEWAY=fake python manage.py loadtest_stripe_payments --bids 500 --concurrency 32 --latency 0.3 --jitter 0.5
+    STRIPE_GATEWAY=fake STRIPE_WRITE_TIMEOUT=1 python manage.py loadtest_stripe_payments --latency 2  # Slow Stripe
+"""
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ads.models import Ad, Location
+from bids.models import Bid
+from category.models import Category, SubCategory
+from company.models import Company
+from payments.preauth_service import PreAuthorizationService
+from payments.stripe_gateway import FakeStripeGateway, stripe_gateway
+from users.models import User
+
+DECLINED_CARD = 'pm_card_chargeDeclined'
+
+
+class Command(BaseCommand):
+    help = 'Load-test bid pre-authorization and capture against the in-memory Stripe gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=200, help='Bids to authorize and capture (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Threads making payment calls (default: 16)')
+        parser.add_argument('--latency', type=float, default=0.2, help='Seconds each Stripe call takes (default: 0.2)')
+        parser.add_argument('--jitter', type=float, default=0.3, help='Extra random latency up to this many seconds')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of calls failing with a network error')
+        parser.add_argument('--decline-rate', type=float, default=0.05, help='Share of bids paying with a declined card')
+
+    def handle(self, *args, **options):
+        if not isinstance(stripe_gateway, FakeStripeGateway):
+            raise CommandError('Set STRIPE_GATEWAY=fake; this command must not run against Stripe')
+        if options['bids'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--bids and --concurrency must be at least 1')
+
+        stripe_gateway.latency = options['latency']
+        stripe_gateway.jitter = options['jitter']
+        stripe_gateway.failure_rate = options['failure_rate']
+        service = PreAuthorizationService()
+
+        run_id = uuid.uuid4().hex[:8]
+        created = self._create_bids(run_id, options['bids'])
+        try:
+            bid_ids = created['bid_ids']
+            declined_every = round(1 / options['decline_rate']) if options['decline_rate'] > 0 else 0
+            cards = {
+                bid_id: DECLINED_CARD if declined_every and i % declined_every == 0 else 'pm_card_visa'
+                for i, bid_id in enumerate(bid_ids, start=1)
+            }
+            self.stdout.write(
+                f"{len(bid_ids)} bids, {options['concurrency']} threads, Stripe latency "
+                f"{options['latency']:.2f}s + up to {options['jitter']:.2f}s, failure rate {options['failure_rate']:.0%}"
+            )
+
+            self._run_phase('authorize', bid_ids, options['concurrency'],
+                            lambda bid: service.create_authorization_hold(bid, cards[bid.id]))
+            authorized = list(
+                Bid.objects.filter(id__in=bid_ids, authorization_status='authorized').values_list('id', flat=True)
+            )
+            self._run_phase('capture', authorized, options['concurrency'], service.capture_authorization)
+
+            metrics = stripe_gateway.metrics.snapshot()
+            self.stdout.write(
+                f"Gateway: {metrics['calls']} calls, {metrics['errors']} errors, "
+                f"{metrics['short_circuited']} short-circuited, p95 {metrics['p95_ms']:.0f} ms, "
+                f"max {metrics['max_ms']:.0f} ms, circuit {stripe_gateway.breaker.state}"
+            )
+        finally:
+            self._cleanup(created)
+
+    def _run_phase(self, name, bid_ids, concurrency, call):
+        def run(bid_id):
+            bid = Bid.objects.select_related('ad__user__company', 'user').get(id=bid_id)
+            started = time.monotonic()
+            try:
+                result = call(bid)
+            finally:
+                connection.close()
+            return time.monotonic() - started, result['success']
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(run, bid_ids))
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(latency for latency, _ in outcomes)
+        succeeded = sum(1 for _, success in outcomes if success)
+        if not latencies:
+            self.stdout.write(f'  {name:<9} nothing to do')
+            return
+
+        def percentile(p):
+            return 1000 * latencies[max(0, -(-p * len(latencies) // 100) - 1)]
+
+        self.stdout.write(
+            f'  {name:<9} {succeeded}/{len(outcomes)} ok  {len(outcomes) / elapsed:6.1f}/s  '
+            f'p50 {percentile(50):6.0f} ms  p95 {percentile(95):6.0f} ms  p99 {percentile(99):6.0f} ms  '
+            f'max {1000 * latencies[-1]:6.0f} ms'
+        )
+
+    def _create_bids(self, run_id, count):
+        company = Company.objects.create(
+            official_name=f'Load test seller {run_id}',
+            vat_number=f'LT{run_id}',
+            email=f'seller-{run_id}@loadtest.invalid',
+            country='Sweden',
+            stripe_account_id=f'acct_loadtest_{run_id}',
+            payment_ready=True,
+        )
+        seller = User.objects.create(username=f'loadtest_seller_{run_id}', email=f'seller-{run_id}@loadtest.invalid',
+                                     company=company)
+        category = Category.objects.create(name=f'Load test {run_id}')
+        subcategory = SubCategory.objects.create(name=f'Load test {run_id}', category=category)
+        location = Location.objects.create(country='Sweden', city='Stockholm')
+        ad = Ad.objects.create(
+            user=seller, category=category, subcategory=subcategory, location=location,
+            title=f'Load test auction {run_id}', available_quantity=Decimal('100000'),
+            starting_bid_price=Decimal('10.00'), currency='SEK', unit_of_measurement='tons',
+            minimum_order_quantity=Decimal('1'), is_complete=True, status='active',
+        )
+        buyers = User.objects.bulk_create([
+            User(username=f'loadtest_buyer_{run_id}_{i}', email=f'buyer-{run_id}-{i}@loadtest.invalid')
+            for i in range(count)
+        ])
+        bids = Bid.objects.bulk_create([
+            Bid(user=buyer, ad=ad, bid_price_per_unit=Decimal('12.00') + i % 50, volume_requested=Decimal('10'),
+                total_bid_value=(Decimal('12.00') + i % 50) * 10)
+            for i, buyer in enumerate(buyers)
+        ])
+        return {
+            'bid_ids': [bid.id for bid in bids],
+            'user_ids': [seller.id] + [buyer.id for buyer in buyers],
+            'company': company, 'category': category, 'location': location,
+        }
+
+    def _cleanup(self, created):
+        # Users cascade to the ad, bids, payment intents and transactions
+        User.objects.filter(id__in=created['user_ids']).delete()
+        created['location'].delete()
+        created['category'].delete()
+        created['company'].delete()
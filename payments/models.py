@@ -198,3 +198,41 @@ class PayoutSchedule(models.Model):
     @property
     def is_overdue(self):
         return self.status == 'scheduled' and self.scheduled_date < timezone.now().date()
+
+
+class StripeEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events, processed by drain_stripe_events
+    """
+    EVENT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    # Unique, so a redelivered event is dropped on insert
+    stripe_event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    # data.object.id; events for one object are processed in order
+    object_id = models.CharField(max_length=255, blank=True, db_index=True)
+    payload = models.JSONField()
+    stripe_created = models.DateTimeField(blank=True, null=True, help_text="When Stripe created the event")
+
+    status = models.CharField(max_length=20, choices=EVENT_STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Stripe Event"
+        verbose_name_plural = "Stripe Events"
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.stripe_event_id}) - {self.status}"
@@ -18,9 +18,16 @@ from bids.models import Bid
 from users.models import User
 from payments.models import StripeAccount
 from payments.services import CommissionCalculatorService
+from payments.stripe_gateway import stripe_gateway
 
 logger = logging.getLogger(__name__)
 
+# Bid fields a hold is recorded in; bulk writers pass these to bulk_update
+AUTHORIZATION_FIELDS = [
+    'stripe_payment_method_id', 'stripe_payment_intent_id', 'authorization_status',
+    'authorization_amount', 'authorization_created_at', 'authorization_expires_at',
+]
+
 
 class PreAuthorizationService:
     """
@@ -30,19 +37,18 @@ class PreAuthorizationService:
     def __init__(self):
         self.stripe_api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
         self.commission_service = CommissionCalculatorService()
-        
-        if not self.stripe_api_key:
-            logger.warning("Stripe API key not configured")
-        else:
-            stripe.api_key = self.stripe_api_key
     
-    def create_authorization_hold(self, bid: Bid, payment_method_id: str) -> Dict[str, Any]:
+    def create_authorization_hold(self, bid: Bid, payment_method_id: str, save: bool = True,
+                                  attempt: Optional[str] = None) -> Dict[str, Any]:
         """
         Create an authorization hold for a bid amount
         
         Args:
             bid: The bid object to authorize payment for
             payment_method_id: Stripe payment method ID from frontend
+            save: Save the bid; pass False to write many bids back with bulk_update
+            attempt: Nonce for a new placement by the buyer, so a declined hold
+                is not replayed from Stripe when they try again
             
         Returns:
             Dict with success status and authorization details
@@ -97,8 +103,18 @@ class PreAuthorizationService:
             # No transfer_data or application_fee - platform receives full amount initially
             # Transfer to seller will happen separately when payment is captured/completed
             
-            # Create the payment intent
-            payment_intent = stripe.PaymentIntent.create(**intent_params)
+            # Create the payment intent. The key is unique per hold, card and
+            # amount, so a retried request can't place a second hold, and a
+            # different amount never collides with a stored result. Stripe
+            # also stores declines under the key; callers acting for the buyer
+            # pass a fresh attempt so the next try reaches the card again. A bid
+            # not saved yet has no id, so its key rests on the attempt alone
+            bid_ref = bid.id or 'new'
+            previous_intent = bid.stripe_payment_intent_id or 'first'
+            idempotency_key = f'bid:{bid_ref}:authorize:{previous_intent}:{payment_method_id}:{total_amount_cents}'
+            if attempt:
+                idempotency_key = f'{idempotency_key}:{attempt}'
+            payment_intent = stripe_gateway.create_payment_intent(intent_params, idempotency_key=idempotency_key)
             
             # Update bid with authorization details
             with transaction.atomic():
@@ -115,7 +131,8 @@ class PreAuthorizationService:
                 bid.authorization_created_at = timezone.now()
                 # Authorization typically expires in 7 days
                 bid.authorization_expires_at = timezone.now() + timedelta(days=7)
-                bid.save()
+                if save:
+                    bid.save()
             
             logger.info(f"Authorization hold created for bid {bid.id}: {payment_intent.id}")
             
@@ -180,7 +197,10 @@ class PreAuthorizationService:
                 }
             
             # Capture the payment
-            payment_intent = stripe.PaymentIntent.capture(bid.stripe_payment_intent_id)
+            payment_intent = stripe_gateway.capture_payment_intent(
+                bid.stripe_payment_intent_id,
+                idempotency_key=f'{bid.stripe_payment_intent_id}:capture',
+            )
             
             # Update bid status and create payment records
             with transaction.atomic():
@@ -281,12 +301,13 @@ class PreAuthorizationService:
                 'message': f'Error processing payment capture: {str(e)}'
             }
     
-    def cancel_authorization(self, bid: Bid) -> Dict[str, Any]:
+    def cancel_authorization(self, bid: Bid, save: bool = True) -> Dict[str, Any]:
         """
         Cancel (release) an authorization hold when bid loses or is canceled
         
         Args:
             bid: The bid to release authorization for
+            save: Save the bid; pass False to write many bids back with bulk_update
             
         Returns:
             Dict with success status and cancellation details
@@ -305,12 +326,16 @@ class PreAuthorizationService:
                 }
             
             # Cancel the payment intent
-            payment_intent = stripe.PaymentIntent.cancel(bid.stripe_payment_intent_id)
+            payment_intent = stripe_gateway.cancel_payment_intent(
+                bid.stripe_payment_intent_id,
+                idempotency_key=f'{bid.stripe_payment_intent_id}:cancel',
+            )
             
             # Update bid status
             with transaction.atomic():
                 bid.authorization_status = 'canceled'
-                bid.save()
+                if save:
+                    bid.save()
             
             logger.info(f"Authorization canceled for bid {bid.id}: {payment_intent.id}")
             
@@ -335,6 +360,31 @@ class PreAuthorizationService:
                 'message': f'Error processing authorization cancellation: {str(e)}'
             }
     
+    def release_hold(self, payment_intent_id: str) -> Dict[str, Any]:
+        """
+        Cancel a hold that a newer one on the same bid has replaced
+        
+        Args:
+            payment_intent_id: The replaced payment intent
+            
+        Returns:
+            Dict with success status
+        """
+        try:
+            stripe_gateway.cancel_payment_intent(payment_intent_id, idempotency_key=f'{payment_intent_id}:cancel')
+            logger.info(f"Released replaced authorization {payment_intent_id}")
+            return {
+                'success': True,
+                'message': 'Authorization released successfully'
+            }
+        except stripe.error.StripeError as e:
+            # Stripe releases it on its own when it expires
+            logger.error(f"Stripe error releasing replaced authorization {payment_intent_id}: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Error releasing authorization: {str(e)}'
+            }
+    
     def check_authorization_expiry(self, bid: Bid) -> Dict[str, Any]:
         """
         Check if authorization is expiring soon and handle renewal if needed
@@ -381,12 +431,13 @@ class PreAuthorizationService:
                 'message': f'Error checking authorization expiry: {str(e)}'
             }
     
-    def refresh_authorization(self, bid: Bid) -> Dict[str, Any]:
+    def refresh_authorization(self, bid: Bid, save: bool = True) -> Dict[str, Any]:
         """
         Create a new authorization if the current one is expiring
         
         Args:
             bid: The bid to refresh authorization for
+            save: Save the bid; pass False to write many bids back with bulk_update
             
         Returns:
             Dict with success status and new authorization details
@@ -398,12 +449,18 @@ class PreAuthorizationService:
                     'message': 'No payment method stored for this bid'
                 }
             
-            # Cancel existing authorization if it exists
-            if bid.stripe_payment_intent_id:
-                self.cancel_authorization(bid)
+            # Cancel existing authorization if it exists. Stripe already
+            # released a hold past its expiry, so only a live one is canceled
+            expired = bid.authorization_expires_at and bid.authorization_expires_at <= timezone.now()
+            if bid.stripe_payment_intent_id and not expired:
+                cancel_result = self.cancel_authorization(bid, save=save)
+                if not cancel_result['success']:
+                    # Never place a second hold while the first may still be live
+                    return cancel_result
             
-            # Create new authorization
-            return self.create_authorization_hold(bid, bid.stripe_payment_method_id)
+            # Create new authorization. Its idempotency key includes the
+            # previous intent, so a retried refresh reuses the same new hold
+            return self.create_authorization_hold(bid, bid.stripe_payment_method_id, save=save)
             
         except Exception as e:
             logger.error(f"Error refreshing authorization for bid {bid.id}: {str(e)}")
@@ -430,7 +487,7 @@ class PreAuthorizationService:
                 }
             
             # Retrieve payment intent from Stripe
-            payment_intent = stripe.PaymentIntent.retrieve(bid.stripe_payment_intent_id)
+            payment_intent = stripe_gateway.retrieve_payment_intent(bid.stripe_payment_intent_id)
             
             # Update local status if different
             if bid.authorization_status != payment_intent.status:
@@ -484,7 +541,7 @@ class PreAuthorizationService:
             
             # Get the original payment intent to verify it was captured
             try:
-                payment_intent = stripe.PaymentIntent.retrieve(captured_payment_intent_id)
+                payment_intent = stripe_gateway.retrieve_payment_intent(captured_payment_intent_id)
                 if payment_intent.status != 'succeeded':
                     return {
                         'success': False,
@@ -511,7 +568,7 @@ class PreAuthorizationService:
             transfer_amount_cents = int(total_amount * 100)
             
             # Create transfer to seller
-            transfer = stripe.Transfer.create(
+            transfer = stripe_gateway.create_transfer(dict(
                 amount=transfer_amount_cents,
                 currency=bid.ad.currency.lower(),
                 destination=seller_company.stripe_account_id,
@@ -522,7 +579,7 @@ class PreAuthorizationService:
                     'commission_rate': str(commission_rate),
                     'transfer_type': 'seller_payout',
                 }
-            )
+            ), idempotency_key=f'{captured_payment_intent_id}:seller-transfer')
             
             # Update bid with transfer information
             bid.stripe_transfer_id = transfer.id
@@ -7,6 +7,7 @@ from bids.models import Bid
 from users.models import User
 from .models import PaymentIntent, Transaction, PayoutSchedule, StripeAccount
 from .services import StripeConnectService, CommissionCalculatorService
+from .stripe_gateway import stripe_gateway
 from .completion_services.payment_completion import PaymentCompletionService
 
 logger = logging.getLogger(__name__)
@@ -40,11 +41,10 @@ class BidPaymentProcessor:
                 # If payment intent exists and has a Stripe ID, retrieve the client secret
                 if existing_payment_intent.stripe_payment_intent_id:
                     try:
-                        import stripe
-                        stripe.api_key = self.stripe_service.stripe_api_key
-                        
                         # Retrieve existing Stripe payment intent
-                        stripe_intent = stripe.PaymentIntent.retrieve(existing_payment_intent.stripe_payment_intent_id)
+                        stripe_intent = stripe_gateway.retrieve_payment_intent(
+                            existing_payment_intent.stripe_payment_intent_id
+                        )
                         
                         # Update local status if needed
                         if existing_payment_intent.status != stripe_intent.status:
@@ -5,21 +5,14 @@ from typing import Dict, Any, Optional, Tuple
 from django.conf import settings
 from django.utils import timezone
 from users.models import User
-from ads.models import Subscription
+from .entitlements import COMMISSION_RATES, entitlement_cache
 from .models import StripeAccount, PaymentIntent, Transaction, PayoutSchedule
+from .stripe_gateway import stripe_gateway
 from notifications.models import Notification
 from notifications.templates import SellerNotificationTemplates, AdminNotificationTemplates, get_payout_notification_metadata, get_admin_notification_metadata
 
 logger = logging.getLogger(__name__)
 
-# Initialize Stripe
-stripe_secret_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
-if stripe_secret_key:
-    stripe.api_key = stripe_secret_key
-    logger.info("Stripe API key configured successfully")
-else:
-    logger.warning("Stripe API key not found in settings")
-
 
 class StripeConnectService:
     """
@@ -28,11 +21,6 @@ class StripeConnectService:
     
     def __init__(self):
         self.stripe_api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
-        if not self.stripe_api_key:
-            logger.warning("Stripe API key not configured")
-        else:
-            # Ensure stripe module uses the API key
-            stripe.api_key = self.stripe_api_key
     
     def create_connect_account(self, user: User, bank_account_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -46,7 +34,7 @@ class StripeConnectService:
                     'message': 'Stripe API key not configured'
                 }
             # Create Stripe Custom account
-            account = stripe.Account.create(
+            account = stripe_gateway.create_account(dict(
                 type='custom',
                 country=bank_account_data.get('bank_country', 'SE'),
                 email=user.email,
@@ -68,7 +56,7 @@ class StripeConnectService:
                     'date': int(timezone.now().timestamp()),
                     'ip': '127.0.0.1',  # You should pass the actual IP
                 },
-            )
+            ))
             
             # Add bank account
             external_account_data = {
@@ -84,9 +72,9 @@ class StripeConnectService:
             if routing_number:
                 external_account_data['routing_number'] = routing_number
             
-            bank_account = stripe.Account.create_external_account(
+            bank_account = stripe_gateway.create_external_account(
                 account.id,
-                external_account=external_account_data
+                {'external_account': external_account_data}
             )
             
             # Create or update StripeAccount record
@@ -134,7 +122,7 @@ class StripeConnectService:
         Update account status from Stripe
         """
         try:
-            account = stripe.Account.retrieve(stripe_account_id)
+            account = stripe_gateway.retrieve_account(stripe_account_id)
             
             stripe_account = StripeAccount.objects.get(stripe_account_id=stripe_account_id)
             stripe_account.charges_enabled = account.charges_enabled
@@ -195,7 +183,7 @@ class StripeConnectService:
             
             # With platform-hold model, customer always pays platform directly
             # Platform will transfer to seller separately after payment is captured
-            intent = stripe.PaymentIntent.create(
+            intent = stripe_gateway.create_payment_intent(dict(
                 amount=total_amount_cents,
                 currency=payment_intent_obj.currency.lower(),
                 metadata={
@@ -211,7 +199,7 @@ class StripeConnectService:
                 automatic_payment_methods={
                     'enabled': True,
                 },
-            )
+            ))
             
             # Update payment intent with Stripe ID
             payment_intent_obj.stripe_payment_intent_id = intent.id
@@ -262,7 +250,7 @@ class StripeConnectService:
             payout_amount_cents = int(payout_schedule.total_amount * 100)
             
             # Create transfer from platform to seller (platform-hold model)
-            transfer = stripe.Transfer.create(
+            transfer = stripe_gateway.create_transfer(dict(
                 amount=payout_amount_cents,
                 currency=payout_schedule.currency.lower(),
                 destination=seller_company.stripe_account_id,
@@ -272,7 +260,7 @@ class StripeConnectService:
                     'transfer_type': 'admin_payout',
                     'processed_via': 'admin_dashboard'
                 }
-            )
+            ), idempotency_key=f'payout-schedule:{payout_schedule.id}:transfer')
             
             # Update payout schedule
             payout_schedule.stripe_payout_id = transfer.id  # Store transfer ID
@@ -549,29 +537,14 @@ class CommissionCalculatorService:
     Service for calculating commission rates based on subscription plans
     """
     
-    COMMISSION_RATES = {
-        'free': Decimal('9.00'),      # 9%
-        'standard': Decimal('7.00'),  # 7%
-        'premium': Decimal('0.00'),   # 0%
-    }
+    COMMISSION_RATES = COMMISSION_RATES
     
     def get_commission_rate(self, user: User) -> Decimal:
         """
         Get commission rate for a user based on their subscription plan
         """
         try:
-            # Get user's active subscription
-            subscription = Subscription.objects.filter(
-                company=user.company,
-                status='active'
-            ).first()
-            
-            if subscription:
-                return self.COMMISSION_RATES.get(subscription.plan, self.COMMISSION_RATES['free'])
-            else:
-                # Default to free plan commission
-                return self.COMMISSION_RATES['free']
-                
+            return entitlement_cache.get(user.company_id).commission_rate
         except Exception as e:
             logger.error(f"Error getting commission rate for user {user.id}: {str(e)}")
             return self.COMMISSION_RATES['free']
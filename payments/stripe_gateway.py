@@ -0,0 +1,490 @@
+"""
+Single entry point for Stripe API calls.
+
+Services call StripeGateway instead of the SDK's global stripe.api_key and
+class methods, so every call goes through:
+
+- one pooled HTTP session (connections to api.stripe.com are reused across
+  requests and threads);
+- a timeout per call: reads (STRIPE_READ_TIMEOUT) fail fast, writes
+  (STRIPE_WRITE_TIMEOUT) get longer because confirming a payment can be slow;
+- an idempotency key on writes, so a retried capture or transfer is applied
+  once; callers pass a key derived from their own records where a retry may
+  come from a later request, otherwise one is generated per call;
+- a circuit breaker: after STRIPE_CIRCUIT_FAILURE_THRESHOLD consecutive
+  network, rate limit or 5xx errors, calls fail immediately with
+  StripeUnavailableError for STRIPE_CIRCUIT_RESET_SECONDS instead of each
+  request waiting out its timeout.
+
+Results and errors are the SDK's own StripeObject and stripe.error classes,
+so callers keep their existing handling.
+
+FakeStripeGateway answers from memory with configurable latency and errors
+(STRIPE_GATEWAY='fake'), for load tests of bid pre-authorization and
+auction capture without reaching Stripe.
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Errors that say Stripe (or the path to it) is unhealthy, not that the request was wrong
+TRANSIENT_ERRORS = (stripe.error.APIConnectionError, stripe.error.RateLimitError, stripe.error.APIError)
+
+
+class StripeUnavailableError(stripe.error.APIConnectionError):
+    """Raised without calling Stripe while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one trial call through after the reset timeout"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"Stripe circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a trial call that neither proved nor disproved Stripe's health"""
+        with self._lock:
+            self._trial_running = False
+
+
+@dataclass
+class GatewayMetrics:
+    """Call counts and latency of recent Stripe calls"""
+    calls: int = 0
+    errors: int = 0
+    short_circuited: int = 0
+    recent_latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, latency_seconds: float, success: bool):
+        self.calls += 1
+        if not success:
+            self.errors += 1
+        self.recent_latencies.append(latency_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self.recent_latencies)
+        p95 = latencies[max(0, -(-95 * len(latencies) // 100) - 1)] if latencies else 0.0
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'short_circuited': self.short_circuited,
+            'mean_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            'p95_ms': 1000 * p95,
+            'max_ms': 1000 * latencies[-1] if latencies else 0.0,
+        }
+
+
+class StripeGateway:
+    """Stripe API calls over a shared connection pool, with timeouts and a circuit breaker"""
+
+    def __init__(self):
+        self.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
+        self.read_timeout = getattr(settings, 'STRIPE_READ_TIMEOUT', 10)
+        self.write_timeout = getattr(settings, 'STRIPE_WRITE_TIMEOUT', 30)
+        self.max_network_retries = getattr(settings, 'STRIPE_MAX_NETWORK_RETRIES', 2)
+        self.breaker = CircuitBreaker(
+            getattr(settings, 'STRIPE_CIRCUIT_FAILURE_THRESHOLD', 5),
+            getattr(settings, 'STRIPE_CIRCUIT_RESET_SECONDS', 30),
+        )
+        self.metrics = GatewayMetrics()
+        self._clients = {}
+        self._session = None
+        self._lock = threading.Lock()
+        if not self.api_key:
+            logger.warning("Stripe API key not found in settings")
+
+    # Payment intents
+
+    def create_payment_intent(self, params: Dict[str, Any], idempotency_key: Optional[str] = None):
+        return self._request('payment_intents.create', params=params, write=True, idempotency_key=idempotency_key)
+
+    def retrieve_payment_intent(self, intent_id: str):
+        return self._request('payment_intents.retrieve', intent_id)
+
+    def capture_payment_intent(self, intent_id: str, idempotency_key: Optional[str] = None):
+        return self._request('payment_intents.capture', intent_id, write=True, idempotency_key=idempotency_key)
+
+    def cancel_payment_intent(self, intent_id: str, idempotency_key: Optional[str] = None):
+        return self._request('payment_intents.cancel', intent_id, write=True, idempotency_key=idempotency_key)
+
+    # Connect accounts and transfers
+
+    def create_transfer(self, params: Dict[str, Any], idempotency_key: Optional[str] = None):
+        return self._request('transfers.create', params=params, write=True, idempotency_key=idempotency_key)
+
+    def create_account(self, params: Dict[str, Any], idempotency_key: Optional[str] = None):
+        return self._request('accounts.create', params=params, write=True, idempotency_key=idempotency_key)
+
+    def retrieve_account(self, account_id: str):
+        return self._request('accounts.retrieve', account_id)
+
+    def list_accounts(self, params: Dict[str, Any]):
+        return self._request('accounts.list', params=params)
+
+    def create_external_account(self, account_id: str, params: Dict[str, Any]):
+        return self._request('accounts.external_accounts.create', account_id, params=params, write=True)
+
+    def create_account_link(self, params: Dict[str, Any]):
+        return self._request('account_links.create', params=params, write=True)
+
+    def create_login_link(self, account_id: str):
+        return self._request('accounts.login_links.create', account_id, write=True)
+
+    # Billing
+
+    def create_customer(self, params: Dict[str, Any], idempotency_key: Optional[str] = None):
+        return self._request('customers.create', params=params, write=True, idempotency_key=idempotency_key)
+
+    def retrieve_customer(self, customer_id: str):
+        return self._request('customers.retrieve', customer_id)
+
+    def list_customers(self, params: Dict[str, Any]):
+        return self._request('customers.list', params=params)
+
+    def create_price(self, params: Dict[str, Any], idempotency_key: Optional[str] = None):
+        return self._request('prices.create', params=params, write=True, idempotency_key=idempotency_key)
+
+    def list_prices(self, params: Dict[str, Any]):
+        return self._request('prices.list', params=params)
+
+    def retrieve_subscription(self, subscription_id: str):
+        return self._request('subscriptions.retrieve', subscription_id)
+
+    def list_subscriptions(self, params: Dict[str, Any]):
+        return self._request('subscriptions.list', params=params)
+
+    def update_subscription(self, subscription_id: str, params: Dict[str, Any]):
+        return self._request('subscriptions.update', subscription_id, params=params, write=True)
+
+    def cancel_subscription(self, subscription_id: str):
+        return self._request('subscriptions.cancel', subscription_id, write=True)
+
+    def list_subscription_items(self, params: Dict[str, Any]):
+        return self._request('subscription_items.list', params=params)
+
+    def create_checkout_session(self, params: Dict[str, Any]):
+        return self._request('checkout.sessions.create', params=params, write=True)
+
+    def retrieve_checkout_session(self, session_id: str):
+        return self._request('checkout.sessions.retrieve', session_id)
+
+    # Plumbing
+
+    def _request(self, operation: str, *args, params: Optional[Dict[str, Any]] = None,
+                 write: bool = False, idempotency_key: Optional[str] = None):
+        if not self.breaker.allow():
+            self.metrics.short_circuited += 1
+            raise StripeUnavailableError(f"Stripe is unavailable; not calling {operation}")
+
+        options = {}
+        if write:
+            # The same key on every retry, including the SDK's own network retries
+            options['idempotency_key'] = idempotency_key or f'{operation}:{uuid.uuid4().hex}'
+        timeout = self.write_timeout if write else self.read_timeout
+
+        started = time.monotonic()
+        try:
+            result = self._invoke(operation, args, params or {}, options, timeout)
+        except TRANSIENT_ERRORS as e:
+            self.metrics.record(time.monotonic() - started, success=False)
+            self.breaker.record_failure()
+            logger.warning(f"Stripe {operation} failed after {time.monotonic() - started:.2f}s: {e}")
+            raise
+        except stripe.error.StripeError:
+            # Declines and invalid requests mean Stripe answered
+            self.metrics.record(time.monotonic() - started, success=False)
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        self.metrics.record(time.monotonic() - started, success=True)
+        self.breaker.record_success()
+        return result
+
+    def _invoke(self, operation, args, params, options, timeout):
+        method = self._client(timeout)
+        for name in operation.split('.'):
+            method = getattr(method, name)
+        return method(*args, params=params, options=options)
+
+    def _client(self, timeout) -> stripe.StripeClient:
+        """One StripeClient per timeout, all sharing the pooled session"""
+        client = self._clients.get(timeout)
+        if client is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+                client = self._clients.setdefault(timeout, stripe.StripeClient(
+                    self.api_key,
+                    http_client=stripe.RequestsClient(timeout=timeout, session=self._session),
+                    max_network_retries=self.max_network_retries,
+                ))
+        return client
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        pool_size = getattr(settings, 'STRIPE_MAX_POOL_CONNECTIONS', 20)
+        # Retries are left to the SDK, which knows which Stripe errors are safe to retry
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        return session
+
+
+class FakeStripeGateway(StripeGateway):
+    """
+    In-memory Stripe for load tests and local development.
+
+    Objects live in a dict for the life of the process. Every call sleeps
+    `latency` seconds (plus up to `jitter`), and fails with an
+    APIConnectionError with probability `failure_rate`; a call slower than
+    its timeout fails like a real timeout does. Writes replay their stored
+    result, declines included, when an idempotency key is reused, and reject
+    a reused key sent with different parameters, as Stripe does. The payment
+    method 'pm_card_chargeDeclined' is declined, like in Stripe test mode.
+    """
+
+    def __init__(self, latency: float = None, jitter: float = None, failure_rate: float = None):
+        super().__init__()
+        self.latency = getattr(settings, 'STRIPE_FAKE_LATENCY', 0.0) if latency is None else latency
+        self.jitter = getattr(settings, 'STRIPE_FAKE_JITTER', 0.0) if jitter is None else jitter
+        self.failure_rate = getattr(settings, 'STRIPE_FAKE_FAILURE_RATE', 0.0) if failure_rate is None else failure_rate
+        self.objects = {}
+        self.calls = []
+        self._idempotent_results = {}
+        self._store_lock = threading.Lock()
+
+    def _invoke(self, operation, args, params, options, timeout):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > timeout:
+            time.sleep(timeout)
+            raise stripe.error.APIConnectionError(f"Request to Stripe timed out after {timeout}s")
+        time.sleep(delay)
+        if random.random() < self.failure_rate:
+            raise stripe.error.APIConnectionError("Simulated network error communicating with Stripe")
+
+        key = options.get('idempotency_key')
+        request = (operation, args, params)
+        with self._store_lock:
+            self.calls.append(operation)
+            if key in self._idempotent_results:
+                stored_request, outcome = self._idempotent_results[key]
+                if stored_request != request:
+                    raise stripe.error.IdempotencyError(
+                        'Keys for idempotent requests can only be used with the same parameters they were first used with.',
+                        http_status=400,
+                    )
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            handler = getattr(self, '_' + operation.replace('.', '_'))
+            try:
+                result = stripe.util.convert_to_stripe_object(handler(*args, **params))
+            except stripe.error.StripeError as e:
+                # Stripe stores client errors such as declines under the key too
+                if key:
+                    self._idempotent_results[key] = (request, e)
+                raise
+            if key:
+                self._idempotent_results[key] = (request, result)
+            return result
+
+    def _new(self, prefix, object_type, **values):
+        obj = {'id': f'{prefix}_fake_{uuid.uuid4().hex[:16]}', 'object': object_type,
+               'created': int(time.time()), 'metadata': {}, **values}
+        self.objects[obj['id']] = obj
+        return obj
+
+    def _get(self, object_type, object_id):
+        obj = self.objects.get(object_id)
+        if obj is None or obj['object'] != object_type:
+            raise stripe.error.InvalidRequestError(
+                f"No such {object_type}: '{object_id}'", 'id', code='resource_missing', http_status=404
+            )
+        return obj
+
+    def _list(self, object_type, **filters):
+        data = [
+            obj for obj in self.objects.values()
+            if obj['object'] == object_type and all(obj.get(k) == v for k, v in filters.items())
+        ]
+        return {'object': 'list', 'data': data, 'has_more': False}
+
+    def _payment_intents_create(self, amount, currency, payment_method=None, confirm=False,
+                                capture_method='automatic', **params):
+        if confirm and payment_method == 'pm_card_chargeDeclined':
+            raise stripe.error.CardError('Your card was declined.', None, 'card_declined', http_status=402)
+        if not confirm:
+            status = 'requires_payment_method'
+        else:
+            status = 'requires_capture' if capture_method == 'manual' else 'succeeded'
+        intent = self._new('pi', 'payment_intent', amount=amount, currency=currency, status=status,
+                           payment_method=payment_method, capture_method=capture_method,
+                           metadata={k: str(v) for k, v in params.get('metadata', {}).items()})
+        intent['client_secret'] = f"{intent['id']}_secret_fake"
+        return intent
+
+    def _payment_intents_retrieve(self, intent_id):
+        return self._get('payment_intent', intent_id)
+
+    def _payment_intents_capture(self, intent_id):
+        intent = self._get('payment_intent', intent_id)
+        if intent['status'] != 'requires_capture':
+            raise stripe.error.InvalidRequestError(
+                f"This PaymentIntent could not be captured because it has a status of {intent['status']}.",
+                None, code='payment_intent_unexpected_state', http_status=400,
+            )
+        intent.update(status='succeeded', amount_received=intent['amount'])
+        return intent
+
+    def _payment_intents_cancel(self, intent_id):
+        intent = self._get('payment_intent', intent_id)
+        if intent['status'] in ('succeeded', 'canceled'):
+            raise stripe.error.InvalidRequestError(
+                f"You cannot cancel this PaymentIntent because it has a status of {intent['status']}.",
+                None, code='payment_intent_unexpected_state', http_status=400,
+            )
+        intent['status'] = 'canceled'
+        return intent
+
+    def _transfers_create(self, **params):
+        return self._new('tr', 'transfer', **params)
+
+    def _accounts_create(self, **params):
+        return self._new(
+            'acct', 'account', charges_enabled=True, payouts_enabled=True, details_submitted=True,
+            capabilities={'card_payments': 'active', 'transfers': 'active'},
+            requirements={'currently_due': [], 'eventually_due': [], 'past_due': [], 'disabled_reason': None},
+            **{k: v for k, v in params.items() if k != 'capabilities'},
+        )
+
+    def _accounts_retrieve(self, account_id):
+        return self._get('account', account_id)
+
+    def _accounts_list(self, limit=10, starting_after=None):
+        accounts = self._list('account')['data']
+        if starting_after:
+            accounts = accounts[[a['id'] for a in accounts].index(starting_after) + 1:]
+        return {'object': 'list', 'data': accounts[:limit], 'has_more': len(accounts) > limit}
+
+    def _accounts_external_accounts_create(self, account_id, **params):
+        self._get('account', account_id)
+        bank_account = params.get('external_account', {})
+        return self._new('ba', 'bank_account', account=account_id, status='new',
+                         last4=str(bank_account.get('account_number', ''))[-4:])
+
+    def _account_links_create(self, account, **params):
+        return {'object': 'account_link', 'url': f'https://connect.stripe.test/setup/{account}',
+                'created': int(time.time())}
+
+    def _accounts_login_links_create(self, account_id):
+        return {'object': 'login_link', 'url': f'https://connect.stripe.test/express/{account_id}',
+                'created': int(time.time())}
+
+    def _customers_create(self, **params):
+        return self._new('cus', 'customer', **params)
+
+    def _customers_retrieve(self, customer_id):
+        return self._get('customer', customer_id)
+
+    def _customers_list(self, email=None, limit=10):
+        customers = self._list('customer', **({'email': email} if email else {}))
+        customers['data'] = customers['data'][:limit]
+        return customers
+
+    def _prices_create(self, **params):
+        return self._new('price', 'price', **params)
+
+    def _prices_list(self, lookup_keys=(), limit=10):
+        prices = [p for p in self._list('price')['data'] if p.get('lookup_key') in lookup_keys]
+        return {'object': 'list', 'data': prices[:limit], 'has_more': False}
+
+    def _subscriptions_retrieve(self, subscription_id):
+        return self._get('subscription', subscription_id)
+
+    def _subscriptions_list(self, **filters):
+        return self._list('subscription', **filters)
+
+    def _subscriptions_update(self, subscription_id, **params):
+        subscription = self._get('subscription', subscription_id)
+        subscription.update({k: v for k, v in params.items() if k != 'items'})
+        return subscription
+
+    def _subscriptions_cancel(self, subscription_id):
+        subscription = self._get('subscription', subscription_id)
+        subscription['status'] = 'canceled'
+        return subscription
+
+    def _subscription_items_list(self, subscription):
+        return self._list('subscription_item', subscription=subscription)
+
+    def _checkout_sessions_create(self, **params):
+        session = self._new('cs', 'checkout.session', payment_status='unpaid', status='open',
+                            customer=params.get('customer'), mode=params.get('mode'))
+        session['url'] = f"https://checkout.stripe.test/{session['id']}"
+        return session
+
+    def _checkout_sessions_retrieve(self, session_id):
+        return self._get('checkout.session', session_id)
+
+
+def build_stripe_gateway() -> StripeGateway:
+    if getattr(settings, 'STRIPE_GATEWAY', 'live') == 'fake':
+        logger.warning("Using the in-memory Stripe gateway; no payments reach Stripe")
+        return FakeStripeGateway()
+    return StripeGateway()
+
+
+# Singleton instance
+stripe_gateway = build_stripe_gateway()
@@ -13,6 +13,7 @@ from users.models import User
 from company.models import Company
 from ads.models import Subscription
 from pricing.models import PricingPlan
+from .stripe_gateway import stripe_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +28,6 @@ class StripeSubscriptionService:
     
     def __init__(self):
         self.stripe_api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
-        if not self.stripe_api_key:
-            logger.warning(STRIPE_API_KEY_NOT_CONFIGURED)
-        else:
-            stripe.api_key = self.stripe_api_key
     
     def create_customer(self, user: User, company: Company) -> Dict[str, Any]:
         """
@@ -49,7 +46,7 @@ class StripeSubscriptionService:
                 if subscription.stripe_customer_id:
                     try:
                         # Verify customer still exists in Stripe
-                        customer = stripe.Customer.retrieve(subscription.stripe_customer_id)
+                        customer = stripe_gateway.retrieve_customer(subscription.stripe_customer_id)
                         if getattr(customer, 'deleted', False):  # Use getattr with default False
                             # Customer was deleted, create new one
                             logger.info(f"Stored customer {subscription.stripe_customer_id} was deleted, creating new one")
@@ -68,10 +65,10 @@ class StripeSubscriptionService:
                 pass
             
             # Check if customer already exists by email (fallback)
-            existing_customers = stripe.Customer.list(
+            existing_customers = stripe_gateway.list_customers(dict(
                 email=user.email,
                 limit=10  # Get more in case some are deleted
-            )
+            ))
             
             # Find the first non-deleted customer
             active_customer = None
@@ -104,7 +101,7 @@ class StripeSubscriptionService:
                     logger.info(f"Found {len(existing_customers.data)} deleted customers for {user.email}, creating new one")
             
             # Create new customer
-            customer = stripe.Customer.create(
+            customer = stripe_gateway.create_customer(dict(
                 email=user.email,
                 name=f"{user.first_name} {user.last_name}".strip() or user.email,
                 description=f"Customer for {company.official_name}",
@@ -114,7 +111,7 @@ class StripeSubscriptionService:
                     'company_name': company.official_name,
                     'user_email': user.email
                 }
-            )
+            ))
             
             # Store customer ID in subscription if exists
             try:
@@ -194,7 +191,7 @@ class StripeSubscriptionService:
                 if existing_subscription.is_paid_plan() and existing_subscription.stripe_subscription_id:
                     # Cancel existing Stripe subscription before creating new one
                     try:
-                        stripe.Subscription.delete(existing_subscription.stripe_subscription_id)
+                        stripe_gateway.cancel_subscription(existing_subscription.stripe_subscription_id)
                         logger.info(f"Canceled existing subscription {existing_subscription.stripe_subscription_id}")
                     except stripe.InvalidRequestError as e:
                         logger.warning(f"Could not cancel existing subscription: {str(e)}")
@@ -202,7 +199,7 @@ class StripeSubscriptionService:
                 pass
             
             # Create checkout session with enhanced metadata
-            checkout_session = stripe.checkout.Session.create(
+            checkout_session = stripe_gateway.create_checkout_session(dict(
                 customer=customer_id,
                 payment_method_types=['card'],
                 line_items=[{
@@ -237,7 +234,7 @@ class StripeSubscriptionService:
                     'address': 'auto',
                     'name': 'auto'
                 }
-            )
+            ))
             
             logger.info(f"Created checkout session {checkout_session.id} for {user.email} - {plan_type} plan")
             
@@ -325,10 +322,10 @@ class StripeSubscriptionService:
             lookup_key = f"plan_{pricing_plan.plan_type}_{int(pricing_plan.price * 100)}_{pricing_plan.currency.lower()}"
             
             # Try to find existing price
-            prices = stripe.Price.list(
+            prices = stripe_gateway.list_prices(dict(
                 lookup_keys=[lookup_key],
                 limit=1
-            )
+            ))
             
             if prices.data:
                 price = prices.data[0]
@@ -340,7 +337,7 @@ class StripeSubscriptionService:
                 }
             
             # Create new price
-            price = stripe.Price.create(
+            price = stripe_gateway.create_price(dict(
                 unit_amount=int(pricing_plan.price * 100),  # Convert to cents
                 currency=pricing_plan.currency.lower(),
                 recurring={'interval': 'month'},
@@ -352,7 +349,7 @@ class StripeSubscriptionService:
                     'plan_type': pricing_plan.plan_type,
                     'pricing_plan_id': pricing_plan.id
                 }
-            )
+            ), idempotency_key=f'price:{lookup_key}')
             
             logger.info(f"Created Stripe price {price.id} for plan {pricing_plan.plan_type}")
             return {
@@ -540,9 +537,9 @@ class StripeSubscriptionService:
             # Cancel Stripe subscription if it exists
             if current_subscription.stripe_subscription_id:
                 try:
-                    stripe.Subscription.modify(
+                    stripe_gateway.update_subscription(
                         current_subscription.stripe_subscription_id,
-                        cancel_at_period_end=True
+                        {'cancel_at_period_end': True}
                     )
                     logger.info(f"Set Stripe subscription to cancel at period end: {current_subscription.stripe_subscription_id}")
                 except stripe.StripeError as e:
@@ -583,8 +580,8 @@ class StripeSubscriptionService:
             new_price_id = price_result['price_id']
             
             # Get subscription items using the correct method
-            subscription_items = stripe.SubscriptionItem.list(
-                subscription=current_subscription.stripe_subscription_id
+            subscription_items = stripe_gateway.list_subscription_items(
+                {'subscription': current_subscription.stripe_subscription_id}
             )
             
             if not subscription_items.data:
@@ -616,8 +613,7 @@ class StripeSubscriptionService:
                     ).first()
 
             # Update the subscription with new price
-            stripe.Subscription.modify(
-                current_subscription.stripe_subscription_id,
+            stripe_gateway.update_subscription(current_subscription.stripe_subscription_id, dict(
                 items=[{
                     'id': subscription_items.data[0].id,
                     'price': new_price_id,
@@ -631,11 +627,11 @@ class StripeSubscriptionService:
                     'company_name': current_subscription.company.official_name
                 },
                 proration_behavior='create_prorations'  # Prorate the change
-            )
+            ))
             
             # Update local subscription - get fresh items after modification
-            updated_items = stripe.SubscriptionItem.list(
-                subscription=current_subscription.stripe_subscription_id
+            updated_items = stripe_gateway.list_subscription_items(
+                {'subscription': current_subscription.stripe_subscription_id}
             )
             
             amount_cents = updated_items.data[0].price.unit_amount
@@ -702,10 +698,10 @@ class StripeSubscriptionService:
             customer_id = customer_result['customer_id']
             
             # Find active subscriptions for this customer
-            subscriptions = stripe.Subscription.list(
+            subscriptions = stripe_gateway.list_subscriptions(dict(
                 customer=customer_id,
                 status='active'
-            )
+            ))
             
             if not subscriptions.data:
                 # Update local subscription status
@@ -720,7 +716,7 @@ class StripeSubscriptionService:
             
             # Cancel the Stripe subscription
             stripe_subscription = subscriptions.data[0]
-            stripe.Subscription.delete(stripe_subscription.id)
+            stripe_gateway.cancel_subscription(stripe_subscription.id)
             
             # Update local subscription
             subscription.status = 'expired'
@@ -777,10 +773,10 @@ class StripeSubscriptionService:
             customer_id = customer_result['customer_id']
             
             # Find active subscriptions for this customer
-            subscriptions = stripe.Subscription.list(
+            subscriptions = stripe_gateway.list_subscriptions(dict(
                 customer=customer_id,
                 status='active'
-            )
+            ))
             
             if not subscriptions.data:
                 # Update local subscription status
@@ -795,7 +791,7 @@ class StripeSubscriptionService:
             
             # Cancel the Stripe subscription
             stripe_subscription = subscriptions.data[0]
-            stripe.Subscription.delete(stripe_subscription.id)
+            stripe_gateway.cancel_subscription(stripe_subscription.id)
             
             # Update local subscription
             subscription.status = 'expired'
@@ -822,10 +818,12 @@ class StripeSubscriptionService:
     
     def get_subscription_status(self, user: User, company: Company) -> Dict[str, Any]:
         """
-        Get the current subscription status from both local database and Stripe
+        Get the current subscription status from the local database.
+
+        The local row is kept in step with Stripe by the subscription webhooks
+        (see subscription_views), so this never calls Stripe.
         """
         try:
-            # Get local subscription
             try:
                 subscription = Subscription.objects.get(company=company)
             except Subscription.DoesNotExist:
@@ -836,37 +834,11 @@ class StripeSubscriptionService:
                     'message': 'No subscription found'
                 }
             
-            # For free plans, return local data
-            if subscription.plan == 'free':
-                return {
-                    'success': True,
-                    'subscription': subscription,
-                    'has_subscription': True,
-                    'message': 'Free subscription active'
-                }
-            
-            # For paid plans, check Stripe status
-            customer_result = self.create_customer(user, company)
-            if customer_result['success']:
-                customer_id = customer_result['customer_id']
-                
-                # Get active Stripe subscriptions
-                stripe_subscriptions = stripe.Subscription.list(
-                    customer=customer_id,
-                    status='active'
-                )
-                
-                if stripe_subscriptions.data:
-                    # Update local subscription if needed
-                    if subscription.status != 'active':
-                        subscription.status = 'active'
-                        subscription.save()
-                
             return {
                 'success': True,
                 'subscription': subscription,
                 'has_subscription': True,
-                'message': 'Subscription found'
+                'message': 'Free subscription active' if subscription.plan == 'free' else 'Subscription found'
             }
             
         except Exception as e:
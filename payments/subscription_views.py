@@ -17,6 +17,7 @@ import logging
 import json
 
 from .subscription_service import StripeSubscriptionService
+from .stripe_gateway import stripe_gateway
 from ads.models import Subscription
 from pricing.models import PricingPlan
 from users.models import User
@@ -268,8 +269,7 @@ def verify_checkout_session(request):
         
         # Retrieve the checkout session from Stripe
         try:
-            stripe.api_key = getattr(settings, 'STRIPE_SECRET_KEY', '')
-            session = stripe.checkout.Session.retrieve(session_id)
+            session = stripe_gateway.retrieve_checkout_session(session_id)
         except stripe.StripeError as e:
             logger.error(f"Stripe error retrieving session {session_id}: {str(e)}")
             return Response({
@@ -401,53 +401,74 @@ def handle_subscription_created(stripe_subscription):
         logger.error(f"Error handling subscription created: {str(e)}")
 
 
+def _local_subscription(stripe_subscription_id, company_id=None):
+    """Find the local row for a Stripe subscription, by its id first and then by company"""
+    subscription = Subscription.objects.select_related('company').filter(
+        stripe_subscription_id=stripe_subscription_id
+    ).first()
+    if subscription is None and company_id:
+        subscription = Subscription.objects.select_related('company').filter(company_id=company_id).first()
+    return subscription
+
+
+def _from_timestamp(value):
+    return timezone.datetime.fromtimestamp(value, tz=timezone.get_current_timezone()) if value else None
+
+
 def handle_subscription_updated(stripe_subscription):
     """Handle subscription updates"""
     try:
         logger.info(f"Subscription updated: {stripe_subscription['id']}")
         
         # Handle subscription updates (plan changes, etc.)
-        metadata = stripe_subscription.get('metadata', {})
-        company_id = metadata.get('company_id')
-        
-        if company_id:
-            try:
-                company = Company.objects.get(id=company_id)
-                subscription = Subscription.objects.get(company=company)
-                
-                # Update status based on Stripe subscription status
-                if stripe_subscription['status'] == 'active':
-                    subscription.status = 'active'
-                elif stripe_subscription['status'] in ['canceled', 'unpaid']:
-                    subscription.status = 'expired'
-                elif stripe_subscription['status'] == 'past_due':
-                    subscription.status = 'payment_failed'
+        metadata = stripe_subscription.get('metadata') or {}
+        subscription = _local_subscription(stripe_subscription['id'], metadata.get('company_id'))
+        if subscription is None:
+            logger.error(f"Could not find local subscription for Stripe subscription {stripe_subscription['id']}")
+            return
+        company = subscription.company
+        
+        # Update status based on Stripe subscription status
+        if stripe_subscription['status'] == 'active':
+            subscription.status = 'active'
+        elif stripe_subscription['status'] == 'trialing':
+            subscription.status = 'trialing'
+        elif stripe_subscription['status'] in ['canceled', 'unpaid']:
+            subscription.status = 'expired'
+        elif stripe_subscription['status'] == 'past_due':
+            subscription.status = 'payment_failed'
+        
+        # Update subscription details from Stripe data
+        subscription.stripe_subscription_id = stripe_subscription['id']
+        subscription.cancel_at_period_end = bool(stripe_subscription.get('cancel_at_period_end'))
+        subscription.auto_renew = not subscription.cancel_at_period_end
+        subscription.canceled_at = _from_timestamp(stripe_subscription.get('canceled_at'))
+        period_end = _from_timestamp(stripe_subscription.get('current_period_end'))
+        if period_end:
+            subscription.end_date = period_end.date()
+            subscription.next_billing_date = period_end.date()
+        
+        # Extract plan information from subscription
+        if 'items' in stripe_subscription and stripe_subscription['items']['data']:
+            first_item = stripe_subscription['items']['data'][0]
+            if 'price' in first_item and 'metadata' in first_item['price']:
+                plan_metadata = first_item['price']['metadata']
+                plan_type = plan_metadata.get('plan_type', 'free')
                 
-                # Update subscription details from Stripe data
-                subscription.stripe_subscription_id = stripe_subscription['id']
+                # Update plan and amount
+                subscription.plan = plan_type
+                subscription.stripe_price_id = first_item['price'].get('id') or subscription.stripe_price_id
+                if first_item['price']['unit_amount']:
+                    amount = first_item['price']['unit_amount'] / 100  # Convert from cents
+                    currency = first_item['price']['currency'].upper()
+                    subscription.amount = f"{amount:.2f} {currency}"
                 
-                # Extract plan information from subscription
-                if 'items' in stripe_subscription and stripe_subscription['items']['data']:
-                    first_item = stripe_subscription['items']['data'][0]
-                    if 'price' in first_item and 'metadata' in first_item['price']:
-                        plan_metadata = first_item['price']['metadata']
-                        plan_type = plan_metadata.get('plan_type', 'free')
-                        
-                        # Update plan and amount
-                        subscription.plan = plan_type
-                        if first_item['price']['unit_amount']:
-                            amount = first_item['price']['unit_amount'] / 100  # Convert from cents
-                            currency = first_item['price']['currency'].upper()
-                            subscription.amount = f"{amount:.2f} {currency}"
-                        
-                        logger.info(f"Updated subscription plan to {plan_type} for company {company.official_name}")
-                
-                subscription.save()
-                
-                logger.info(f"Updated subscription for company {company.official_name}: {subscription.plan} - {subscription.amount}")
-            
-            except (Company.DoesNotExist, Subscription.DoesNotExist):
-                logger.error(f"Could not find local subscription for Stripe subscription {stripe_subscription['id']}")
+                logger.info(f"Updated subscription plan to {plan_type} for company {company.official_name}")
+        
+        # Saving invalidates the company's cached entitlements (payments/entitlements.py)
+        subscription.save()
+        
+        logger.info(f"Updated subscription for company {company.official_name}: {subscription.plan} - {subscription.amount}")
     
     except Exception as e:
         logger.error(f"Error handling subscription updated: {str(e)}")
@@ -458,52 +479,54 @@ def handle_subscription_deleted(stripe_subscription):
     try:
         logger.info(f"Subscription deleted: {stripe_subscription['id']}")
         
-        metadata = stripe_subscription.get('metadata', {})
-        company_id = metadata.get('company_id')
+        metadata = stripe_subscription.get('metadata') or {}
+        subscription = _local_subscription(stripe_subscription['id'], metadata.get('company_id'))
+        if subscription is None:
+            logger.error(f"Could not find local subscription for Stripe subscription {stripe_subscription['id']}")
+            return
         
-        if company_id:
-            try:
-                company = Company.objects.get(id=company_id)
-                subscription = Subscription.objects.get(company=company)
-                
-                subscription.status = 'expired'
-                subscription.auto_renew = False
-                subscription.save()
-                
-                logger.info(f"Canceled subscription for company {company.official_name}")
-            
-            except (Company.DoesNotExist, Subscription.DoesNotExist):
-                logger.error(f"Could not find local subscription for Stripe subscription {stripe_subscription['id']}")
+        subscription.status = 'expired'
+        subscription.auto_renew = False
+        subscription.canceled_at = _from_timestamp(stripe_subscription.get('canceled_at')) or timezone.now()
+        subscription.save()
+        
+        logger.info(f"Canceled subscription for company {subscription.company.official_name}")
     
     except Exception as e:
         logger.error(f"Error handling subscription deleted: {str(e)}")
 
 
+def _invoice_subscription(invoice):
+    """
+    Find the local row an invoice belongs to. Only an invoice for a
+    subscription we have not stored yet costs a Stripe call, to read the
+    company from the subscription's metadata.
+    """
+    subscription_id = invoice.get('subscription')
+    if not subscription_id:
+        return None
+    subscription = _local_subscription(subscription_id)
+    if subscription is None:
+        stripe_subscription = stripe_gateway.retrieve_subscription(subscription_id)
+        subscription = _local_subscription(subscription_id, stripe_subscription.metadata.get('company_id'))
+    if subscription is None:
+        logger.error(f"Could not find local subscription for invoice {invoice['id']}")
+    return subscription
+
+
 def handle_invoice_payment_succeeded(invoice):
     """Handle successful invoice payment"""
     try:
         logger.info(f"Invoice payment succeeded: {invoice['id']}")
         
-        subscription_id = invoice.get('subscription')
-        if subscription_id:
+        subscription = _invoice_subscription(invoice)
+        if subscription:
             # Update last payment date
-            stripe_subscription = stripe.Subscription.retrieve(subscription_id)
-            metadata = stripe_subscription.metadata
-            company_id = metadata.get('company_id')
+            subscription.status = 'active'
+            subscription.last_payment = timezone.now().date()
+            subscription.save()
             
-            if company_id:
-                try:
-                    company = Company.objects.get(id=company_id)
-                    subscription = Subscription.objects.get(company=company)
-                    
-                    subscription.status = 'active'
-                    subscription.last_payment = timezone.now().date()
-                    subscription.save()
-                    
-                    logger.info(f"Updated payment date for company {company.official_name}")
-                
-                except (Company.DoesNotExist, Subscription.DoesNotExist):
-                    logger.error(f"Could not find local subscription for invoice {invoice['id']}")
+            logger.info(f"Updated payment date for company {subscription.company.official_name}")
     
     except Exception as e:
         logger.error(f"Error handling invoice payment succeeded: {str(e)}")
@@ -514,24 +537,12 @@ def handle_invoice_payment_failed(invoice):
     try:
         logger.info(f"Invoice payment failed: {invoice['id']}")
         
-        subscription_id = invoice.get('subscription')
-        if subscription_id:
-            stripe_subscription = stripe.Subscription.retrieve(subscription_id)
-            metadata = stripe_subscription.metadata
-            company_id = metadata.get('company_id')
+        subscription = _invoice_subscription(invoice)
+        if subscription:
+            subscription.status = 'payment_failed'
+            subscription.save()
             
-            if company_id:
-                try:
-                    company = Company.objects.get(id=company_id)
-                    subscription = Subscription.objects.get(company=company)
-                    
-                    subscription.status = 'payment_failed'
-                    subscription.save()
-                    
-                    logger.info(f"Updated payment failed status for company {company.official_name}")
-                
-                except (Company.DoesNotExist, Subscription.DoesNotExist):
-                    logger.error(f"Could not find local subscription for invoice {invoice['id']}")
+            logger.info(f"Updated payment failed status for company {subscription.company.official_name}")
     
     except Exception as e:
         logger.error(f"Error handling invoice payment failed: {str(e)}")
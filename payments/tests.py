@@ -0,0 +1,424 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+
+import stripe
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from ads.models import Ad, Subscription
+from bids.models import Bid
+from category.models import Category, SubCategory
+from company.models import Company
+from payments.entitlements import entitlement_cache
+from payments.event_inbox import stripe_event_inbox
+from payments.models import PaymentIntent, StripeAccount, StripeEvent
+from payments.preauth_service import PreAuthorizationService
+from payments.services import CommissionCalculatorService
+from payments.subscription_service import StripeSubscriptionService
+from payments.subscription_views import handle_invoice_payment_failed, handle_subscription_updated
+from payments.stripe_gateway import FakeStripeGateway, StripeGateway, StripeUnavailableError
+from pricing.models import BaseFeature, PlanFeature, PricingPlan
+from users.models import User
+
+WEBHOOK_SECRET = 'whsec_inbox'
+
+
+def account_event(event_id, created, charges_enabled=True):
+    return {
+        'id': event_id,
+        'type': 'account.updated',
+        'created': created,
+        'data': {'object': {'id': 'acct_1', 'charges_enabled': charges_enabled, 'payouts_enabled': True}},
+    }
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, STRIPE_EVENT_WORKER_THREAD=False, STRIPE_EVENT_MAX_ATTEMPTS=2)
+class StripeEventInboxTest(TestCase):
+    """Test storing webhook events and draining them in order"""
+
+    def setUp(self):
+        user = User.objects.create(username='seller', email='seller@example.com')
+        self.account = StripeAccount.objects.create(user=user, stripe_account_id='acct_1')
+
+    def _post(self, event):
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(
+            WEBHOOK_SECRET.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256
+        ).hexdigest()
+        return self.client.post(
+            '/api/payments/webhooks/stripe/', payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}',
+        )
+
+    def test_webhook_stores_event_without_handling_it(self):
+        with mock.patch('payments.webhooks.handle_account_updated') as handler:
+            response = self._post(account_event('evt_1', 1700000000))
+        self.assertEqual(response.status_code, 200)
+        handler.assert_not_called()
+        event = StripeEvent.objects.get()
+        self.assertEqual((event.event_type, event.object_id, event.status), ('account.updated', 'acct_1', 'pending'))
+
+    def test_bad_signature_is_rejected(self):
+        response = self.client.post('/api/payments/webhooks/stripe/', json.dumps(account_event('evt_1', 1)),
+                                    content_type='application/json', HTTP_STRIPE_SIGNATURE='t=1,v1=bad')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_duplicate_delivery_is_handled_once(self):
+        self._post(account_event('evt_1', 1700000000))
+        self.assertEqual(self._post(account_event('evt_1', 1700000000)).status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+        results = stripe_event_inbox.process_due()
+        self.assertEqual([result['success'] for result in results], [True])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.account_status, 'active')
+        self.assertEqual(stripe_event_inbox.process_due(), [])
+
+    def test_failed_event_holds_back_later_events_for_its_object(self):
+        stripe_event_inbox.record(account_event('evt_new', 1700000100, charges_enabled=True))
+        stripe_event_inbox.record(account_event('evt_old', 1700000000, charges_enabled=False))
+        calls = []
+
+        def flaky(data):
+            calls.append(data['charges_enabled'])
+            if len(calls) == 1:
+                raise ConnectionError('database went away')
+
+        with mock.patch.dict('payments.webhooks.EVENT_HANDLERS', {'account.updated': flaky}):
+            results = stripe_event_inbox.process_due()
+            self.assertEqual([(r['event_id'], r['success']) for r in results], [('evt_old', False)])
+            failed = StripeEvent.objects.get(stripe_event_id='evt_old')
+            self.assertEqual((failed.attempts, failed.last_error), (1, 'database went away'))
+            self.assertGreater(failed.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+            results = stripe_event_inbox.process_due(now=timezone.now() + timedelta(minutes=1))
+
+        # The older event is retried before the newer one is handled
+        self.assertEqual([r['event_id'] for r in results], ['evt_old', 'evt_new'])
+        self.assertEqual(calls, [False, False, True])
+        self.assertFalse(StripeEvent.objects.exclude(status='processed').exists())
+
+    def test_handler_errors_roll_back_and_give_up_after_max_attempts(self):
+        stripe_event_inbox.record(account_event('evt_1', 1700000000))
+
+        def broken(data):
+            StripeAccount.objects.filter(stripe_account_id=data['id']).update(account_status='active')
+            raise ValueError('boom')
+
+        with mock.patch.dict('payments.webhooks.EVENT_HANDLERS', {'account.updated': broken}):
+            stripe_event_inbox.process_due()
+            stripe_event_inbox.process_due(now=timezone.now() + timedelta(minutes=5))
+
+        event = StripeEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ('failed', 2))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.account_status, 'pending')
+
+    def test_backlog_and_latency_metrics(self):
+        stripe_event_inbox.record(account_event('evt_1', 1700000000))
+        stripe_event_inbox.record({'id': 'evt_2', 'type': 'customer.created', 'data': {'object': {'id': 'cus_1'}}})
+        self.assertEqual(stripe_event_inbox.backlog()['pending'], 2)
+
+        processed_before = stripe_event_inbox.metrics.processed
+        stripe_event_inbox.process_due()
+        self.assertEqual(stripe_event_inbox.backlog(), {'pending': 0, 'failed': 0, 'oldest_age': 0.0})
+        self.assertEqual(stripe_event_inbox.metrics.processed - processed_before, 2)
+        self.assertGreaterEqual(stripe_event_inbox.metrics.snapshot()['p95_latency'], 0.0)
+
+
+class RecordingHTTPClient(stripe.HTTPClient):
+    """Answers every Stripe request with one canned object"""
+    name = 'recording'
+
+    def __init__(self, body):
+        super().__init__()
+        self.body = body
+        self.requests = []
+
+    def request(self, method, url, headers, post_data=None, **kwargs):
+        self.requests.append((method, url, headers))
+        return json.dumps(self.body), 200, {}
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_gateway', STRIPE_READ_TIMEOUT=2, STRIPE_WRITE_TIMEOUT=20,
+                   STRIPE_CIRCUIT_FAILURE_THRESHOLD=2, STRIPE_CIRCUIT_RESET_SECONDS=60)
+class StripeGatewayTest(SimpleTestCase):
+    """Test request options, the circuit breaker and the in-memory gateway"""
+
+    def test_writes_carry_idempotency_keys_and_clients_are_reused(self):
+        gateway = StripeGateway()
+        http_client = RecordingHTTPClient({'id': 'pi_1', 'object': 'payment_intent', 'status': 'succeeded'})
+        with mock.patch('stripe.RequestsClient', return_value=http_client) as requests_client:
+            intent = gateway.capture_payment_intent('pi_1', idempotency_key='pi_1:capture')
+            gateway.retrieve_payment_intent('pi_1')
+            gateway.retrieve_account('acct_1')
+            gateway.create_transfer({'amount': 100, 'currency': 'sek', 'destination': 'acct_1'})
+
+        self.assertEqual(intent.status, 'succeeded')
+        # One client per timeout, sharing a session
+        self.assertEqual([c.kwargs['timeout'] for c in requests_client.call_args_list], [20, 2])
+        self.assertEqual(len({id(c.kwargs['session']) for c in requests_client.call_args_list}), 1)
+
+        (capture_method, capture_url, capture_headers), _, _, (_, _, transfer_headers) = http_client.requests
+        self.assertEqual((capture_method, capture_url), ('post', 'https://api.stripe.com/v1/payment_intents/pi_1/capture'))
+        self.assertEqual(capture_headers['Idempotency-Key'], 'pi_1:capture')
+        self.assertTrue(transfer_headers['Idempotency-Key'].startswith('transfers.create:'))
+
+    def test_circuit_opens_after_consecutive_network_errors(self):
+        gateway = FakeStripeGateway(failure_rate=1.0)
+        for _ in range(2):
+            with self.assertRaises(stripe.error.APIConnectionError):
+                gateway.retrieve_account('acct_1')
+        with self.assertRaises(StripeUnavailableError):
+            gateway.retrieve_account('acct_1')
+        self.assertEqual((gateway.metrics.calls, gateway.metrics.short_circuited), (2, 1))
+        self.assertEqual(gateway.breaker.state, 'open')
+
+        # After the reset timeout one trial call goes through and closes the circuit
+        gateway.failure_rate = 0.0
+        gateway.breaker.opened_at -= 60
+        account = gateway.create_account({'type': 'express', 'email': 'seller@example.com'})
+        self.assertEqual(gateway.breaker.state, 'closed')
+        self.assertTrue(account.charges_enabled)
+
+    def test_declines_do_not_open_the_circuit(self):
+        gateway = FakeStripeGateway()
+        for _ in range(3):
+            with self.assertRaises(stripe.error.CardError):
+                gateway.create_payment_intent({'amount': 100, 'currency': 'sek', 'confirm': True,
+                                               'payment_method': 'pm_card_chargeDeclined'})
+        self.assertEqual(gateway.breaker.state, 'closed')
+
+    def test_slow_calls_time_out(self):
+        gateway = FakeStripeGateway(latency=5.0)
+        gateway.read_timeout = 0.01
+        with self.assertRaises(stripe.error.APIConnectionError):
+            gateway.retrieve_payment_intent('pi_1')
+
+
+class PreAuthorizationGatewayTest(TestCase):
+    """Test bid authorization and capture against the in-memory gateway"""
+
+    def setUp(self):
+        self.gateway = FakeStripeGateway()
+        patcher = mock.patch('payments.preauth_service.stripe_gateway', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        company = Company.objects.create(official_name='Seller AB', vat_number='SE1', email='seller@example.com',
+                                         country='Sweden', stripe_account_id='acct_seller', payment_ready=True)
+        seller = User.objects.create(username='seller', email='seller@example.com', company=company)
+        buyer = User.objects.create(username='buyer', email='buyer@example.com')
+        category = Category.objects.create(name='Plastics')
+        ad = Ad.objects.create(
+            user=seller, category=category, subcategory=SubCategory.objects.create(name='HDPE', category=category),
+            title='HDPE', available_quantity=Decimal('100'), starting_bid_price=Decimal('10.00'), currency='SEK',
+            unit_of_measurement='tons', minimum_order_quantity=Decimal('1'), status='active',
+        )
+        self.bid = Bid.objects.create(user=buyer, ad=ad, bid_price_per_unit=Decimal('12'), volume_requested=Decimal('5'))
+        self.service = PreAuthorizationService()
+
+    def test_authorize_and_capture(self):
+        result = self.service.create_authorization_hold(self.bid, 'pm_card_visa')
+        self.assertTrue(result['success'])
+        self.bid.refresh_from_db()
+        self.assertEqual(self.bid.authorization_status, 'authorized')
+
+        result = self.service.capture_authorization(self.bid)
+        self.assertTrue(result['success'])
+        self.assertEqual(self.gateway.objects[self.bid.stripe_payment_intent_id]['status'], 'succeeded')
+        self.assertTrue(PaymentIntent.objects.filter(bid=self.bid, status='succeeded').exists())
+
+    def test_retried_authorization_places_one_hold(self):
+        self.service.create_authorization_hold(self.bid, 'pm_card_visa')
+        first_intent = self.bid.stripe_payment_intent_id
+        # The same request arriving again, e.g. after a client timeout
+        self.bid.stripe_payment_intent_id = None
+        self.service.create_authorization_hold(self.bid, 'pm_card_visa')
+
+        self.assertEqual(self.bid.stripe_payment_intent_id, first_intent)
+        self.assertEqual(len([o for o in self.gateway.objects.values() if o['object'] == 'payment_intent']), 1)
+
+    def test_declined_card(self):
+        result = self.service.create_authorization_hold(self.bid, 'pm_card_chargeDeclined')
+        self.assertFalse(result['success'])
+        self.assertIn('declined', result['message'])
+
+    def test_declined_hold_is_not_replayed_on_next_attempt(self):
+        decline = stripe.error.CardError('Insufficient funds.', None, 'card_declined', http_status=402)
+        with mock.patch.object(self.gateway, '_payment_intents_create', side_effect=decline):
+            self.assertFalse(self.service.create_authorization_hold(self.bid, 'pm_card_visa', attempt='a1')['success'])
+
+        # Stripe replays the decline for the same key; a new attempt reaches the card
+        self.assertFalse(self.service.create_authorization_hold(self.bid, 'pm_card_visa', attempt='a1')['success'])
+        self.assertTrue(self.service.create_authorization_hold(self.bid, 'pm_card_visa', attempt='a2')['success'])
+
+    def test_raised_amount_does_not_reuse_the_key(self):
+        self.service.create_authorization_hold(self.bid, 'pm_card_chargeDeclined')
+        self.bid.bid_price_per_unit = Decimal('13')
+        result = self.service.create_authorization_hold(self.bid, 'pm_card_chargeDeclined')
+        self.assertEqual(result.get('error_code'), 'card_declined')
+
+
+class EntitlementCacheTest(TestCase):
+    """Test that subscription and commission lookups are served locally"""
+
+    def setUp(self):
+        entitlement_cache.invalidate()
+        self.addCleanup(entitlement_cache.invalidate)
+        self.gateway = FakeStripeGateway()
+        for target in ('payments.subscription_service.stripe_gateway', 'payments.subscription_views.stripe_gateway'):
+            patcher = mock.patch(target, self.gateway)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.company = Company.objects.create(official_name='Buyer AB', vat_number='SE2', email='buyer@example.com',
+                                              country='Sweden')
+        self.user = User.objects.create(username='buyer', email='buyer@example.com', company=self.company)
+        plan = PricingPlan.objects.create(name='Premium', plan_type='premium', price=Decimal('499'))
+        self.feature = PlanFeature.objects.create(
+            plan=plan, feature_value='Unlimited',
+            base_feature=BaseFeature.objects.create(name='auctions', category='auctions', base_description='{value}'),
+        )
+        self.subscription = Subscription.objects.create(
+            company=self.company, plan='premium', status='active', start_date=timezone.now().date(),
+            end_date=timezone.now().date() + timedelta(days=30), amount='499.00 SEK', contact_name='Buyer',
+            contact_email='buyer@example.com', stripe_subscription_id='sub_1',
+        )
+        self.commission = CommissionCalculatorService()
+
+    def test_commission_rate_costs_one_query_then_none(self):
+        entitlement_cache.get(None)  # Plan features are read once per process
+        with self.assertNumQueries(1):
+            self.assertEqual(self.commission.get_commission_rate(self.user), Decimal('0.00'))
+        with self.assertNumQueries(0):
+            entitlement = entitlement_cache.get(self.company.id)
+        self.assertEqual(entitlement.features, {'auctions': 'Unlimited'})
+
+    def test_subscription_save_invalidates_company(self):
+        self.commission.get_commission_rate(self.user)
+        self.subscription.status = 'payment_failed'
+        self.subscription.save()
+        self.assertEqual(self.commission.get_commission_rate(self.user), Decimal('9.00'))
+        self.assertFalse(entitlement_cache.get(self.company.id).has_feature('auctions'))
+
+    def test_plan_feature_change_invalidates_features(self):
+        self.assertTrue(entitlement_cache.get(self.company.id).has_feature('auctions'))
+        self.feature.is_included = False
+        self.feature.save()
+        self.assertFalse(entitlement_cache.get(self.company.id).has_feature('auctions'))
+
+    def test_subscription_status_reads_local_row(self):
+        with self.assertNumQueries(1):
+            result = StripeSubscriptionService().get_subscription_status(self.user, self.company)
+        self.assertEqual(result['subscription'], self.subscription)
+        self.assertEqual(self.gateway.calls, [])
+
+    def test_webhooks_keep_row_current_without_calling_stripe(self):
+        handle_invoice_payment_failed({'id': 'in_1', 'subscription': 'sub_1'})
+        self.assertEqual(self.commission.get_commission_rate(self.user), Decimal('9.00'))
+
+        period_end = int(time.time()) + 86400 * 30
+        handle_subscription_updated({
+            'id': 'sub_1', 'status': 'active', 'metadata': {}, 'cancel_at_period_end': True,
+            'current_period_end': period_end,
+            'items': {'data': [{'price': {'id': 'price_std', 'unit_amount': 29900, 'currency': 'sek',
+                                          'metadata': {'plan_type': 'standard'}}}]},
+        })
+        self.assertEqual(self.commission.get_commission_rate(self.user), Decimal('7.00'))
+        self.subscription.refresh_from_db()
+        self.assertEqual((self.subscription.plan, self.subscription.auto_renew), ('standard', False))
+        self.assertEqual(self.gateway.calls, [])
+
+
+class RefreshExpiringAuthorizationsTest(TestCase):
+    """Test the expiry sweeper against the in-memory gateway"""
+
+    def setUp(self):
+        self.gateway = FakeStripeGateway()
+        patcher = mock.patch('payments.preauth_service.stripe_gateway', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        company = Company.objects.create(official_name='Seller AB', vat_number='SE1', email='seller@example.com',
+                                         country='Sweden', stripe_account_id='acct_seller', payment_ready=True)
+        seller = User.objects.create(username='seller', email='seller@example.com', company=company)
+        category = Category.objects.create(name='Plastics')
+        ad = Ad.objects.create(
+            user=seller, category=category, subcategory=SubCategory.objects.create(name='HDPE', category=category),
+            title='HDPE', available_quantity=Decimal('100'), starting_bid_price=Decimal('10.00'), currency='SEK',
+            unit_of_measurement='tons', minimum_order_quantity=Decimal('1'), status='active',
+        )
+        service = PreAuthorizationService()
+        self.bids = {}
+        for name, status, expires_in, card in [
+            ('expiring', 'active', timedelta(hours=2), 'pm_card_visa'),
+            ('lost', 'lost', timedelta(hours=2), 'pm_card_visa'),
+            ('expired', 'winning', -timedelta(hours=1), 'pm_card_visa'),
+            ('declined', 'active', timedelta(hours=2), 'pm_card_chargeDeclined'),
+            ('later', 'active', timedelta(days=5), 'pm_card_visa'),
+        ]:
+            buyer = User.objects.create(username=name, email=f'{name}@example.com')
+            bid = Bid.objects.create(user=buyer, ad=ad, bid_price_per_unit=Decimal('12'), volume_requested=Decimal('5'))
+            service.create_authorization_hold(bid, 'pm_card_visa')
+            Bid.objects.filter(id=bid.id).update(
+                status=status, stripe_payment_method_id=card, authorization_expires_at=timezone.now() + expires_in,
+            )
+            bid.refresh_from_db()
+            self.bids[name] = bid
+        self.gateway.calls.clear()
+
+    def _run(self, *args):
+        output = StringIO()
+        call_command('refresh_expiring_authorizations', '--concurrency', '1', *args, stdout=output, stderr=StringIO())
+        return output.getvalue()
+
+    def test_refreshes_releases_and_marks_declined(self):
+        output = self._run()
+        self.assertIn('Refreshed 2, released 1, 1 declined, 0 canceled without a new hold, 0 left for the next run, '
+                      'of 4 expiring holds', output)
+
+        bids = {name: Bid.objects.get(id=bid.id) for name, bid in self.bids.items()}
+        for name in ('expiring', 'expired'):
+            self.assertEqual(bids[name].authorization_status, 'authorized')
+            self.assertNotEqual(bids[name].stripe_payment_intent_id, self.bids[name].stripe_payment_intent_id)
+            self.assertGreater(bids[name].authorization_expires_at, timezone.now() + timedelta(days=6))
+            self.assertEqual(self.gateway.objects[self.bids[name].stripe_payment_intent_id]['status'],
+                             'canceled' if name == 'expiring' else 'requires_capture')
+        self.assertEqual(bids['lost'].authorization_status, 'canceled')
+        self.assertEqual(bids['declined'].authorization_status, 'failed')
+        self.assertEqual(bids['later'].authorization_expires_at, self.bids['later'].authorization_expires_at)
+
+        # Everything renewed is out of the window now
+        self.assertIn('of 0 expiring holds', self._run())
+
+    def test_network_error_leaves_bid_for_next_run(self):
+        self.gateway.failure_rate = 1.0
+        self.assertIn('4 left for the next run', self._run())
+        self.assertEqual(Bid.objects.filter(authorization_status='authorized').count(), 5)
+
+    def test_canceled_hold_without_replacement_is_saved(self):
+        down = stripe.error.APIConnectionError('Stripe is down')
+        with mock.patch.object(self.gateway, '_payment_intents_create', side_effect=down):
+            output = self._run()
+        self.assertIn('released 1, 0 declined, 2 canceled without a new hold, 1 left for the next run', output)
+
+        for name in ('expiring', 'declined'):
+            bid = Bid.objects.get(id=self.bids[name].id)
+            self.assertEqual(bid.authorization_status, 'canceled')
+            self.assertEqual(self.gateway.objects[bid.stripe_payment_intent_id]['status'], 'canceled')
+        # Stripe already released the expired hold, so it is simply tried again
+        self.assertEqual(Bid.objects.get(id=self.bids['expired'].id).authorization_status, 'authorized')
+
+    def test_dry_run_calls_nothing(self):
+        self.assertIn('Would refresh 3 and release 1 authorization holds', self._run('--dry-run'))
+        self.assertEqual(self.gateway.calls, [])
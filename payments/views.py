@@ -14,6 +14,7 @@ from .serializers import (
     UserPaymentHistorySerializer, PendingPayoutsResponseSerializer
 )
 from .services import StripeConnectService, CommissionCalculatorService
+from .stripe_gateway import stripe_gateway
 from .processors import BidPaymentProcessor, PayoutProcessor, PaymentStatsProcessor
 from .verification_service import VerificationService
 from .completion_services.payment_completion import PaymentCompletionService
@@ -185,7 +186,7 @@ class PaymentConfirmationView(APIView):
                 })
 
             # Verify with Stripe that payment actually succeeded
-            stripe_payment_intent = stripe.PaymentIntent.retrieve(
+            stripe_payment_intent = stripe_gateway.retrieve_payment_intent(
                 payment_intent.stripe_payment_intent_id
             )
 
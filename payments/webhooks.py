@@ -6,8 +6,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from company.payment_utils import refresh_payment_readiness
 from .models import PaymentIntent, StripeAccount, PayoutSchedule
 from .processors import BidPaymentProcessor
+from .event_inbox import stripe_event_inbox
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +18,7 @@ logger = logging.getLogger(__name__)
 @require_POST
 def stripe_webhook(request):
     """
-    Handle Stripe webhook events
+    Verify a Stripe webhook and store it in the event inbox (see event_inbox.py)
     """
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
@@ -56,26 +58,18 @@ def stripe_webhook(request):
             logger.error("Invalid signature in Stripe webhook")
             return HttpResponseBadRequest("Invalid signature")
     
-    # Handle the event
+    # Store the event and acknowledge; drain_stripe_events runs the handlers
     try:
-        if event['type'] == 'payment_intent.succeeded':
-            handle_payment_intent_succeeded(event['data']['object'])
-        elif event['type'] == 'payment_intent.payment_failed':
-            handle_payment_intent_failed(event['data']['object'])
-        elif event['type'] == 'account.updated':
-            handle_account_updated(event['data']['object'])
-        elif event['type'] == 'payout.paid':
-            handle_payout_paid(event['data']['object'])
-        elif event['type'] == 'payout.failed':
-            handle_payout_failed(event['data']['object'])
+        if DEVELOPMENT_WEBHOOK_BYPASS:
+            stripe_event_inbox.record(event)
         else:
-            logger.info(f"Unhandled Stripe webhook event: {event['type']}")
-        
-        return HttpResponse(status=200)
-        
+            stripe_event_inbox.record_payload(payload)
     except Exception as e:
-        logger.error(f"Error handling Stripe webhook: {str(e)}")
-        return HttpResponseBadRequest(f"Webhook error: {str(e)}")
+        # Not stored: fail so Stripe delivers it again
+        logger.error(f"Error storing Stripe webhook event: {str(e)}")
+        return HttpResponse(status=500)
+
+    return HttpResponse(status=200)
 
 
 def handle_payment_intent_succeeded(payment_intent_data):
@@ -106,8 +100,6 @@ def handle_payment_intent_succeeded(payment_intent_data):
             
     except PaymentIntent.DoesNotExist:
         logger.error(f"Payment intent not found: {payment_intent_data['id']}")
-    except Exception as e:
-        logger.error(f"Error handling payment success: {str(e)}")
 
 
 def handle_payment_intent_failed(payment_intent_data):
@@ -150,14 +142,15 @@ def handle_payment_intent_failed(payment_intent_data):
         
     except PaymentIntent.DoesNotExist:
         logger.error(f"Payment intent not found: {payment_intent_data['id']}")
-    except Exception as e:
-        logger.error(f"Error handling payment failure: {str(e)}")
 
 
 def handle_account_updated(account_data):
     """
     Handle Stripe account updates
     """
+    # Keep the cached readiness of companies on this account current
+    refresh_payment_readiness(account_data)
+
     try:
         account_id = account_data['id']
         
@@ -204,8 +197,6 @@ def handle_account_updated(account_data):
         
     except StripeAccount.DoesNotExist:
         logger.error(f"Stripe account not found: {account_data['id']}")
-    except Exception as e:
-        logger.error(f"Error handling account update: {str(e)}")
 
 
 def handle_payout_paid(payout_data):
@@ -248,8 +239,6 @@ def handle_payout_paid(payout_data):
         
     except PayoutSchedule.DoesNotExist:
         logger.error(f"Payout schedule not found for payout: {payout_data['id']}")
-    except Exception as e:
-        logger.error(f"Error handling payout completion: {str(e)}")
 
 
 def handle_payout_failed(payout_data):
@@ -311,5 +300,14 @@ def handle_payout_failed(payout_data):
         
     except PayoutSchedule.DoesNotExist:
         logger.error(f"Payout schedule not found for payout: {payout_data['id']}")
-    except Exception as e:
-        logger.error(f"Error handling payout failure: {str(e)}")
+
+
+# Handlers run by the event inbox, each inside a transaction. Errors other
+# than a missing local record propagate so the event is retried.
+EVENT_HANDLERS = {
+    'payment_intent.succeeded': handle_payment_intent_succeeded,
+    'payment_intent.payment_failed': handle_payment_intent_failed,
+    'account.updated': handle_account_updated,
+    'payout.paid': handle_payout_paid,
+    'payout.failed': handle_payout_failed,
+}
@@ -2,6 +2,7 @@ from rest_framework import generics, status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from base.utils.response_cache import cache_response
 from .models import PricingPlan, BaseFeature, PlanFeature, PricingPageContent
 from .serializers import (
     PricingPlanSerializer, PricingPageContentSerializer,
@@ -50,6 +51,7 @@ class PricingPageContentView(generics.RetrieveAPIView):
 
 
 @api_view(['GET'])
+@cache_response(models=('pricing.PricingPlan', 'pricing.PlanFeature', 'pricing.BaseFeature', 'pricing.PricingPageContent'))
 def pricing_data(request):
     """
     Combined API endpoint that returns both pricing plans and page content
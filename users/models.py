@@ -4,8 +4,12 @@ from django.db import models
 from django.utils import timezone
 import datetime
 from company.models import Company
+from base.models import FieldTrackerMixin
+
+class User(FieldTrackerMixin, AbstractUser):
+    # Account changes that notify the user (notifications/signals.py)
+    tracked_fields = ('password', 'email', 'role')
 
-class User(AbstractUser):
     ROLE_CHOICES = [
         ("Admin", "Admin"),
         ("Staff", "Staff"),